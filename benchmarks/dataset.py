@@ -0,0 +1,287 @@
+"""
+Generator syntetycznego zbioru danych w skali produkcyjnej (PostgreSQL).
+
+Wiersze są strumieniowane przez COPY ... FROM STDIN, bez budowania obiektów
+modeli - to rzędy wielkości szybciej niż bulk_create przy milionach wierszy.
+Obsługuje zarówno psycopg2 (copy_expert), jak i psycopg 3 (cursor.copy).
+"""
+
+import random
+import string
+from datetime import datetime, timedelta, timezone
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+
+from files.models import UserFile, UserFileVersion
+from logs.models import ActivityLog
+
+EXTENSIONS = [
+    (".pdf", 30),
+    (".docx", 15),
+    (".xlsx", 10),
+    (".jpg", 20),
+    (".png", 8),
+    (".txt", 7),
+    (".zip", 5),
+    (".mp4", 5),
+]
+WORDS = [
+    "raport",
+    "faktura",
+    "umowa",
+    "zdjecie",
+    "projekt",
+    "notatki",
+    "prezentacja",
+    "budzet",
+    "plan",
+    "wyniki",
+    "oferta",
+    "skan",
+]
+ACTIONS = [
+    (ActivityLog.ActionType.USER_LOGIN, 25),
+    (ActivityLog.ActionType.FILE_VIEW, 30),
+    (ActivityLog.ActionType.FILE_DOWNLOAD, 15),
+    (ActivityLog.ActionType.FILE_UPLOAD, 20),
+    (ActivityLog.ActionType.FILE_DELETE, 5),
+    (ActivityLog.ActionType.FILE_RENAME, 4),
+    (ActivityLog.ActionType.USER_STATUS_CHANGE, 1),
+]
+
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _copy_value(value):
+    if value is None:
+        return "\\N"
+    if value is True:
+        return "t"
+    if value is False:
+        return "f"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value).translate(_COPY_ESCAPES)
+
+
+class _RowReader:
+    """Obiekt plikowy dla copy_expert (psycopg2) czytający wiersze z iteratora."""
+
+    def __init__(self, rows):
+        self.rows = iter(rows)
+        self.buffer = ""
+
+    def read(self, size=-1):
+        size = size if size and size > 0 else 1 << 16
+        while len(self.buffer) < size:
+            row = next(self.rows, None)
+            if row is None:
+                break
+            self.buffer += "\t".join(_copy_value(v) for v in row) + "\n"
+        chunk, self.buffer = self.buffer[:size], self.buffer[size:]
+        return chunk
+
+    readline = read
+
+
+def copy_rows(connection, model, columns, rows):
+    """Ładuje wiersze (krotki w kolejności `columns`) do tabeli modelu przez COPY."""
+    table = connection.ops.quote_name(model._meta.db_table)
+    column_list = ", ".join(connection.ops.quote_name(c) for c in columns)
+    sql = f"COPY {table} ({column_list}) FROM STDIN"
+
+    with connection.cursor() as cursor:
+        raw = cursor.cursor
+        if hasattr(raw, "copy_expert"):  # psycopg2
+            raw.copy_expert(sql, _RowReader(rows), size=1 << 16)
+        else:  # psycopg 3
+            with raw.copy(sql) as copy:
+                for row in rows:
+                    copy.write_row(row)
+
+
+def reserve_ids(connection, model, count):
+    """Rezerwuje `count` kolejnych wartości sekwencji klucza głównego."""
+    table = model._meta.db_table
+    column = model._meta.pk.column
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_get_serial_sequence(%s, %s)",
+            [connection.ops.quote_name(table), column],
+        )
+        sequence = cursor.fetchone()[0]
+        cursor.execute("SELECT nextval(%s)", [sequence])
+        first = cursor.fetchone()[0]
+        if count > 1:
+            cursor.execute("SELECT setval(%s, %s)", [sequence, first + count - 1])
+    return first
+
+
+class DatasetGenerator:
+    def __init__(self, connection, seed=0, span_days=730, stdout=None):
+        self.connection = connection
+        self.random = random.Random(seed)
+        self.now = datetime.now(timezone.utc)
+        self.span = timedelta(days=span_days).total_seconds()
+        self.stdout = stdout
+        self.extensions = [e for e, _ in EXTENSIONS]
+        self.extension_weights = [w for _, w in EXTENSIONS]
+        self.actions = [a for a, _ in ACTIONS]
+        self.action_weights = [w for _, w in ACTIONS]
+
+    def log(self, message):
+        if self.stdout is not None:
+            self.stdout.write(f"[SEED] {message}")
+
+    def timestamp(self, after=None):
+        start = after or self.now - timedelta(seconds=self.span)
+        window = (self.now - start).total_seconds()
+        return start + timedelta(seconds=self.random.random() * window)
+
+    def filename(self):
+        word = self.random.choice(WORDS)
+        suffix = "".join(self.random.choices(string.digits, k=4))
+        extension = self.random.choices(self.extensions, self.extension_weights)[0]
+        return f"{word}_{suffix}{extension}"
+
+    def file_size(self):
+        # Rozkład log-normalny: mediana ~200 KB, długi ogon do setek MB
+        return int(min(self.random.lognormvariate(12.2, 2.0), 5 * 1024**3)) + 1
+
+    def create_users(self, count, prefix, staff_ratio=0.01):
+        User = get_user_model()
+        first_id = reserve_ids(self.connection, User, count)
+        password = make_password("seed-password")
+
+        def rows():
+            for i in range(count):
+                yield (
+                    first_id + i,
+                    password,
+                    None,
+                    False,
+                    f"{prefix}_{i:07d}",
+                    "",
+                    "",
+                    f"{prefix}_{i:07d}@example.com",
+                    self.random.random() < staff_ratio,
+                    True,
+                    self.timestamp(),
+                )
+
+        copy_rows(
+            self.connection,
+            User,
+            [
+                "id",
+                "password",
+                "last_login",
+                "is_superuser",
+                "username",
+                "first_name",
+                "last_name",
+                "email",
+                "is_staff",
+                "is_active",
+                "date_joined",
+            ],
+            rows(),
+        )
+        self.log(f"Użytkownicy: {count}")
+        return list(range(first_id, first_id + count))
+
+    def owners(self, user_ids, count):
+        # Rozkład Pareto: kilku użytkowników ma bardzo dużo plików, większość mało
+        weights = [self.random.paretovariate(1.2) for _ in user_ids]
+        return self.random.choices(user_ids, weights, k=count)
+
+    def create_files(self, user_ids, count, max_versions=3):
+        first_id = reserve_ids(self.connection, UserFile, count)
+        owners = self.owners(user_ids, count)
+        versions = []
+
+        def file_rows():
+            for i in range(count):
+                owner_id = owners[i]
+                name = self.filename()
+                size = self.file_size()
+                uploaded_at = self.timestamp()
+                path = f"user_uploads/{owner_id}/{name}"
+                versions.append((first_id + i, path, name, size, uploaded_at))
+                yield (
+                    first_id + i,
+                    owner_id,
+                    path,
+                    name,
+                    uploaded_at,
+                    size,
+                    name.endswith(".zip"),
+                )
+
+        copy_rows(
+            self.connection,
+            UserFile,
+            [
+                "id",
+                "owner_id",
+                "file",
+                "original_filename",
+                "uploaded_at",
+                "file_size",
+                "is_zip",
+            ],
+            file_rows(),
+        )
+        self.log(f"Pliki: {count}")
+
+        def version_rows():
+            for file_id, path, name, size, uploaded_at in versions:
+                created_at = uploaded_at
+                for number in range(1, self.random.randint(1, max_versions) + 1):
+                    yield (file_id, number, path, name, size, created_at, None)
+                    created_at = self.timestamp(after=created_at)
+
+        copy_rows(
+            self.connection,
+            UserFileVersion,
+            [
+                "user_file_id",
+                "version_number",
+                "file_path",
+                "original_filename",
+                "file_size",
+                "created_at",
+                "restored_from_version",
+            ],
+            version_rows(),
+        )
+        self.log("Wersje plików zapisane")
+
+    def create_logs(self, user_ids, count):
+        owners = self.owners(user_ids, count)
+
+        def rows():
+            for i in range(count):
+                action = self.random.choices(self.actions, self.action_weights)[0]
+                yield (
+                    owners[i],
+                    self.timestamp(),
+                    action,
+                    f"{action}: {self.filename()}",
+                )
+
+        copy_rows(
+            self.connection,
+            ActivityLog,
+            ["user_id", "timestamp", "action", "details"],
+            rows(),
+        )
+        self.log(f"Logi aktywności: {count}")
+
+    def analyze(self):
+        with self.connection.cursor() as cursor:
+            for model in (get_user_model(), UserFile, UserFileVersion, ActivityLog):
+                cursor.execute(
+                    f"ANALYZE {self.connection.ops.quote_name(model._meta.db_table)}"
+                )
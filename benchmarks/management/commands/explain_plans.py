@@ -0,0 +1,103 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from benchmarks import plans
+
+
+class Command(BaseCommand):
+    help = (
+        "Zbiera EXPLAIN (ANALYZE, BUFFERS) dla wszystkich kombinacji list, filtrów "
+        "i sortowań API, oznacza skany sekwencyjne i porównuje z planem bazowym."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=100,
+            help="LIMIT dodawany do zapytań (0 = pełny wynik, jak obecnie zwraca API).",
+        )
+        parser.add_argument(
+            "--username", help="Użytkownik do filtrów (domyślnie: najwięcej plików)."
+        )
+        parser.add_argument(
+            "--seq-scan-min-rows",
+            type=int,
+            default=10000,
+            help="Skany sekwencyjne mniejszych tabel nie są oznaczane.",
+        )
+        parser.add_argument(
+            "--baseline", help="Plik JSON z planem bazowym do porównania."
+        )
+        parser.add_argument(
+            "--save-baseline", help="Zapisz wyniki jako nowy plan bazowy."
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.5,
+            help="Dopuszczalny wzrost kosztu planu (0.5 = 50%%).",
+        )
+        parser.add_argument(
+            "--strict",
+            action="store_true",
+            help="Zakończ błędem także przy skanach sekwencyjnych.",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("explain_plans wymaga PostgreSQL.")
+
+        if options["username"]:
+            user = get_user_model().objects.get(username=options["username"])
+        else:
+            user = plans.sample_user()
+        if user is None:
+            raise CommandError("Brak danych - uruchom najpierw seed_dataset.")
+
+        sizes = plans.table_sizes()
+        results = {}
+        for name, queryset in plans.build_cases(user):
+            summary = plans.summarize(
+                plans.explain(queryset, options["limit"]),
+                sizes,
+                options["seq_scan_min_rows"],
+            )
+            results[name] = summary
+            flag = (
+                " SEQ SCAN: " + ", ".join(summary["seq_scans"])
+                if summary["seq_scans"]
+                else ""
+            )
+            self.stdout.write(
+                f"{name:<45} {summary['execution_ms']:>10.2f} ms  "
+                f"koszt {summary['total_cost']:>12.0f}{flag}"
+            )
+
+        if options["save_baseline"]:
+            with open(options["save_baseline"], "w") as f:
+                json.dump(results, f, indent=2, ensure_ascii=False)
+                f.write("\n")
+            self.stdout.write(f"Zapisano plan bazowy: {options['save_baseline']}")
+
+        problems = []
+        if options["baseline"]:
+            with open(options["baseline"]) as f:
+                problems, changes = plans.compare(
+                    results, json.load(f), options["threshold"]
+                )
+            for change in changes:
+                self.stdout.write(f"[EXPLAIN] Zmiana planu {change}")
+            for problem in problems:
+                self.stderr.write(f"[EXPLAIN] REGRESJA {problem}")
+
+        seq_scan_cases = [name for name, r in results.items() if r["seq_scans"]]
+        if seq_scan_cases:
+            self.stderr.write(
+                f"[EXPLAIN] Skany sekwencyjne dużych tabel w {len(seq_scan_cases)} przypadkach."
+            )
+        if problems or (options["strict"] and seq_scan_cases):
+            raise CommandError("Wykryto problemy z planami zapytań.")
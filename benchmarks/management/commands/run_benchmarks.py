@@ -0,0 +1,157 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    override_settings,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+
+from benchmarks.runner import compare, run_all
+from benchmarks.scenarios import build_scenarios
+
+
+def _int_list(value):
+    return [int(v) for v in value.split(",") if v]
+
+
+class Command(BaseCommand):
+    help = (
+        "Uruchamia benchmarki widoków API na testowej bazie danych z symulowanym "
+        "Azure Blob Storage i zapisuje wyniki w JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=_int_list,
+            default=[1000, 10000, 100000],
+            help="Liczby plików/logów dla scenariuszy list (np. 1000,10000).",
+        )
+        parser.add_argument(
+            "--compare-serializers",
+            action="store_true",
+            help="Dodaj listy przez ModelSerializer (*_drf) - porównanie wierszy/s "
+            "ze ścieżką .values() (API_VALUES_LISTS).",
+        )
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--warmup", type=int, default=1)
+        parser.add_argument(
+            "--only",
+            action="append",
+            help="Uruchom tylko scenariusze zawierające podany fragment nazwy.",
+        )
+        parser.add_argument(
+            "--storage",
+            choices=["memory", "filesystem"],
+            default="memory",
+            help="Gdzie symulowany storage trzyma pliki.",
+        )
+        parser.add_argument(
+            "--storage-location",
+            default="/tmp/spc-benchmarks",
+            help="Katalog dla --storage filesystem.",
+        )
+        parser.add_argument("--latency-ms", type=float, default=20)
+        parser.add_argument("--bandwidth-mbps", type=float, default=200)
+        parser.add_argument(
+            "--account-mbps",
+            type=float,
+            default=0,
+            help="Łączna przepustowość jednego konta (0 = bez limitu).",
+        )
+        parser.add_argument(
+            "--shards",
+            type=int,
+            default=1,
+            help="Liczba symulowanych kont (files.sharding.ShardedStorage).",
+        )
+        parser.add_argument("--upload-kb", type=int, default=256)
+        parser.add_argument("--transfer-users", type=int, default=8)
+        parser.add_argument("--zip-members", type=int, default=10)
+        parser.add_argument("--delete-batch", type=int, default=10)
+        parser.add_argument("--output", help="Plik wynikowy JSON (domyślnie stdout).")
+        parser.add_argument("--baseline", help="Plik JSON z poprzedniego przebiegu.")
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.2,
+            help="Dopuszczalny wzrost względem baseline (0.2 = 20%%).",
+        )
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Nie usuwaj testowej bazy po zakończeniu.",
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"]) as f:
+                baseline = json.load(f)
+
+        storage_options = {
+            "backend": options["storage"],
+            "location": options["storage_location"],
+            "latency_ms": options["latency_ms"],
+            "bandwidth_mbps": options["bandwidth_mbps"],
+            "account_mbps": options["account_mbps"],
+            # Jak skonfigurowany prawdziwy storage
+            "overwrite_files": settings.STORAGES["default"]
+            .get("OPTIONS", {})
+            .get("overwrite_files", False),
+        }
+        default = {
+            "BACKEND": "benchmarks.storage.SimulatedAzureStorage",
+            "OPTIONS": storage_options,
+        }
+        if options["shards"] > 1:
+            default = {
+                "BACKEND": "files.sharding.ShardedStorage",
+                "OPTIONS": {
+                    "shards": {f"s{i}": default for i in range(options["shards"])}
+                },
+            }
+        storages = {
+            "default": default,
+            "staticfiles": {
+                "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+            },
+        }
+
+        verbosity = options["verbosity"]
+        setup_test_environment()
+        old_config = setup_databases(
+            verbosity, interactive=False, keepdb=options["keepdb"]
+        )
+        try:
+            with override_settings(STORAGES=storages, FILES_ASYNC_OPERATIONS=False):
+                report = run_all(
+                    build_scenarios(options),
+                    options["iterations"],
+                    options["warmup"],
+                    {**storage_options, "shards": options["shards"]},
+                    stdout=self.stderr if verbosity else None,
+                )
+        finally:
+            teardown_databases(old_config, verbosity, keepdb=options["keepdb"])
+            teardown_test_environment()
+
+        output = json.dumps(report, indent=2, ensure_ascii=False)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output + "\n")
+        else:
+            self.stdout.write(output)
+
+        if baseline is not None:
+            regressions = compare(report, baseline, options["threshold"])
+            for name, metric, before, after in regressions:
+                self.stderr.write(
+                    f"[BENCH] REGRESJA {name}.{metric}: {before} -> {after}"
+                )
+            if regressions:
+                raise CommandError(f"Wykryto {len(regressions)} regresji wydajności.")
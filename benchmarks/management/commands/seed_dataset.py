@@ -0,0 +1,54 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from benchmarks.dataset import DatasetGenerator
+
+
+class Command(BaseCommand):
+    help = (
+        "Ładuje syntetyczne dane (użytkownicy, pliki, wersje, logi) przez COPY. "
+        "Tylko dla baz deweloperskich/benchmarkowych - pliki nie mają blobów w storage."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10000)
+        parser.add_argument("--files", type=int, default=1000000)
+        parser.add_argument("--logs", type=int, default=10000000)
+        parser.add_argument("--max-versions", type=int, default=3)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--prefix",
+            default=None,
+            help="Prefiks nazw użytkowników (domyślnie losowy, żeby nie kolidować).",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("seed_dataset wymaga PostgreSQL (COPY).")
+        if options["users"] < 1:
+            raise CommandError("--users musi być większe od 0.")
+
+        prefix = options["prefix"] or f"seed{uuid.uuid4().hex[:6]}"
+        generator = DatasetGenerator(
+            connection, seed=options["seed"], stdout=self.stdout
+        )
+        started = time.monotonic()
+
+        with transaction.atomic():
+            user_ids = generator.create_users(options["users"], prefix)
+            if options["files"]:
+                generator.create_files(
+                    user_ids, options["files"], max_versions=options["max_versions"]
+                )
+            if options["logs"]:
+                generator.create_logs(user_ids, options["logs"])
+
+        generator.analyze()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Gotowe w {time.monotonic() - started:.1f}s (prefiks użytkowników: {prefix})"
+            )
+        )
@@ -0,0 +1,234 @@
+"""
+Zbieranie planów zapytań (EXPLAIN ANALYZE, BUFFERS) dla list i filtrów API
+oraz porównywanie ich z zapisanym planem bazowym.
+"""
+
+import json
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Count
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from files import folders
+from files.models import BlobTier, FileChange, Folder, UserFile
+from files.views import UserFileViewSet
+from logs.views import ActivityLogViewSet
+
+FILE_ORDERINGS = [
+    "-uploaded_at",
+    "uploaded_at",
+    "original_filename",
+    "-original_filename",
+    "-file_size",
+    "file_size",
+    "owner",
+    "-owner",
+]
+LOG_SORTS = ["-timestamp", "timestamp", "username", "-username", "action", "-action"]
+
+
+def _viewset_queryset(viewset_class, user, params):
+    request = Request(APIRequestFactory().get("/", params))
+    request.user = user
+    view = viewset_class(request=request, format_kwarg=None, action="list")
+    return view.get_queryset()
+
+
+def sample_user():
+    """Użytkownik z największą liczbą plików - najgorszy przypadek dla list."""
+    row = (
+        UserFile.objects.values("owner")
+        .annotate(total=Count("id"))
+        .order_by("-total")
+        .first()
+    )
+    User = get_user_model()
+    if row is None:
+        return User.objects.order_by("id").first()
+    return User.objects.get(pk=row["owner"])
+
+
+def build_cases(user):
+    """Zwraca listę (nazwa, queryset) dla wszystkich kombinacji list/filtrów/sortowań."""
+    User = get_user_model()
+    staff = User(username="explain_staff", is_staff=True)
+    cases = []
+
+    for ordering in FILE_ORDERINGS:
+        cases.append(
+            (
+                f"files.own.{ordering}",
+                _viewset_queryset(UserFileViewSet, user, {"ordering": ordering}),
+            )
+        )
+        cases.append(
+            (
+                f"files.all.{ordering}",
+                _viewset_queryset(
+                    UserFileViewSet, staff, {"ordering": ordering, "all_files": "true"}
+                ),
+            )
+        )
+        cases.append(
+            (
+                f"files.owner_username.{ordering}",
+                _viewset_queryset(
+                    UserFileViewSet,
+                    staff,
+                    {
+                        "ordering": ordering,
+                        "all_files": "true",
+                        "owner_username": user.username,
+                    },
+                ),
+            )
+        )
+
+    for sort in LOG_SORTS:
+        cases.append(
+            (
+                f"logs.all.{sort}",
+                _viewset_queryset(ActivityLogViewSet, staff, {"sort": sort}),
+            )
+        )
+        cases.append(
+            (
+                f"logs.user.{sort}",
+                _viewset_queryset(
+                    ActivityLogViewSet, staff, {"sort": sort, "user": user.username}
+                ),
+            )
+        )
+
+    # Audyt po polach strukturalnych (logs.views: ?file=, ?ip=, ?request_id=, ?filename=)
+    sample_file = UserFile.objects.filter(owner=user).order_by("-pk").first()
+    for name, params in (
+        ("file", {"file": str(sample_file.pk if sample_file else 0)}),
+        ("ip", {"ip": "203.0.113.7"}),
+        ("request_id", {"request_id": "0" * 32}),
+        (
+            "filename",
+            {"filename": sample_file.original_filename if sample_file else "x"},
+        ),
+    ):
+        cases.append(
+            (f"logs.{name}", _viewset_queryset(ActivityLogViewSet, staff, params))
+        )
+
+    # Foldery (jeśli użytkownik jakieś ma): zawartość folderu, podfoldery
+    # z rekurencyjnymi rozmiarami i suma poddrzewa
+    folder = Folder.objects.filter(owner=user).order_by("path").first()
+    if folder is not None:
+        cases.append(
+            (
+                "files.folder.-uploaded_at",
+                _viewset_queryset(UserFileViewSet, user, {"folder": str(folder.pk)}),
+            )
+        )
+        cases.append(
+            ("folders.children_stats", folders.children_stats_queryset(user, folder))
+        )
+        cases.append(
+            (
+                "folders.subtree",
+                folders.subtree_files(folder).order_by("-uploaded_at"),
+            )
+        )
+
+    # Zmiany od tokenu (files.changes.changes_since)
+    cases.append(
+        (
+            "files.changes",
+            FileChange.objects.filter(owner=user, id__gt=0)
+            .order_by("id")
+            .values_list("id", "file_id", "kind"),
+        )
+    )
+
+    # Partia plików do przeniesienia do Cool (files.tiering._tier_files)
+    cases.append(
+        (
+            "files.tiering",
+            UserFile.objects.alive()
+            .annotate(last_used=Coalesce("last_accessed_at", "uploaded_at"))
+            .filter(blob_tier=BlobTier.HOT, last_used__lt=timezone.now())
+            .order_by("blob_tier", "last_used")
+            .values_list("pk", "file")[:1000],
+        )
+    )
+
+    # users.views.list_users
+    cases.append(("users.list", User.objects.all().order_by("username")))
+    return cases
+
+
+def _walk(node, depth=0):
+    yield depth, node
+    for child in node.get("Plans", []):
+        yield from _walk(child, depth + 1)
+
+
+def table_sizes():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT relname, reltuples::bigint FROM pg_class WHERE relkind = 'r'"
+        )
+        return dict(cursor.fetchall())
+
+
+def explain(queryset, limit):
+    if limit:
+        queryset = queryset[:limit]
+    raw = queryset.explain(analyze=True, buffers=True, format="json")
+    data = json.loads(raw) if isinstance(raw, str) else raw
+    return data[0]
+
+
+def summarize(plan, sizes, seq_scan_min_rows):
+    root = plan["Plan"]
+    nodes, seq_scans = [], []
+    for _, node in _walk(root):
+        relation = node.get("Relation Name")
+        target = node.get("Index Name") or relation
+        nodes.append(f"{node['Node Type']}({target})" if target else node["Node Type"])
+        if (
+            node["Node Type"] == "Seq Scan"
+            and sizes.get(relation, 0) >= seq_scan_min_rows
+        ):
+            seq_scans.append(relation)
+    return {
+        "signature": nodes,
+        "total_cost": root["Total Cost"],
+        "execution_ms": plan.get("Execution Time"),
+        "planning_ms": plan.get("Planning Time"),
+        "shared_hit": root.get("Shared Hit Blocks", 0),
+        "shared_read": root.get("Shared Read Blocks", 0),
+        "seq_scans": seq_scans,
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Porównuje wyniki z planem bazowym. Zwraca (regresje, zmiany planów):
+    regresja to wzrost kosztu ponad próg, zmiana planu bez wzrostu kosztu
+    jest tylko informacją (np. nowy indeks).
+    """
+    regressions, changes = [], []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current["signature"] != previous["signature"]:
+            changes.append(
+                f"{name}: {' > '.join(previous['signature'])} "
+                f"-> {' > '.join(current['signature'])}"
+            )
+        if current["total_cost"] > previous["total_cost"] * (1 + threshold):
+            regressions.append(
+                f"{name}: koszt {previous['total_cost']:.0f} -> {current['total_cost']:.0f}"
+            )
+    return regressions, changes
@@ -0,0 +1,179 @@
+"""
+Uruchamianie scenariuszy i zbieranie wyników (p50/p99, zapytania SQL,
+wywołania storage, szczyt pamięci operacji) w formacie JSON do porównywania
+przebiegów.
+"""
+
+import math
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import django
+from django.core.files.storage import default_storage
+from django.db import connection
+
+
+def percentile(values, fraction):
+    """Percentyl metodą najbliższego rangi (bez interpolacji)."""
+    ordered = sorted(values)
+    index = max(0, math.ceil(fraction * len(ordered)) - 1)
+    return ordered[index]
+
+
+def peak_memory_kb(scenario):
+    """
+    Szczyt pamięci zaalokowanej przez jedno wykonanie scenariusza (tracemalloc,
+    ponad stan sprzed run()). ru_maxrss dotyczy całego procesu - po dużym
+    scenariuszu wszystkie kolejne pokazywałyby ten sam szczyt. Osobne
+    wykonanie poza pomiarem czasu, bo tracemalloc spowalnia kod.
+    """
+    scenario.before_each()
+    tracemalloc.start()
+    try:
+        scenario.run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return peak // 1024
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+class QueryCounter:
+    """
+    execute_wrapper liczący zapytania. CaptureQueriesContext się tu nie nadaje,
+    bo klient testowy wysyła request_started, który czyści connection.queries.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _storage_stats():
+    # Storage shardowany (files/sharding.py): suma statystyk shardów
+    storages = getattr(default_storage, "storages", None) or {"": default_storage}
+    stats = [getattr(storage, "stats", None) for storage in storages.values()]
+    if any(s is None for s in stats):
+        return None
+    return {key: sum(s[key] for s in stats) for key in stats[0]}
+
+
+def run_scenario(scenario, iterations, warmup=1):
+    scenario.setup()
+
+    durations, queries, errors = [], [], 0
+    stats_before = None
+    for i in range(warmup + iterations):
+        scenario.before_each()
+        if i == warmup:
+            stats_before = _storage_stats()
+
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            response = scenario.run()
+            elapsed = time.perf_counter() - started
+
+        if i < warmup:
+            continue
+        durations.append(elapsed * 1000)
+        queries.append(counter.count)
+        if response.status_code >= 400:
+            errors += 1
+
+    result = {
+        "iterations": iterations,
+        "errors": errors,
+        "p50_ms": round(percentile(durations, 0.50), 3),
+        "p99_ms": round(percentile(durations, 0.99), 3),
+        "mean_ms": round(statistics.fmean(durations), 3),
+        "min_ms": round(min(durations), 3),
+        "max_ms": round(max(durations), 3),
+        "queries_per_op": round(statistics.fmean(queries), 2),
+    }
+    rows = getattr(scenario, "rows", None)
+    if rows:
+        # Wiersze listy zwrócone na sekundę (zapytanie + serializacja + render JSON)
+        result["rows_per_s"] = round(rows / (result["mean_ms"] / 1000))
+
+    stats_after = _storage_stats()
+    if stats_before is not None and stats_after is not None:
+        # Uwaga: liczone razem z before_each (np. przygotowanie plików do usunięcia)
+        for key in stats_after:
+            result[f"storage_{key}_per_op"] = round(
+                (stats_after[key] - stats_before[key]) / iterations, 2
+            )
+    result["peak_memory_kb"] = peak_memory_kb(scenario)
+    return result
+
+
+def run_all(scenarios, iterations, warmup, storage_options, stdout=None):
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "storage": storage_options,
+            "iterations": iterations,
+            "warmup": warmup,
+        },
+        "scenarios": {},
+    }
+    for scenario in scenarios:
+        # Listy dużych zbiorów są drogie - mniej iteracji, ale co najmniej 3
+        size = getattr(scenario, "size", 0)
+        count = max(3, iterations * 1000 // size) if size > 1000 else iterations
+        if stdout is not None:
+            stdout.write(f"[BENCH] {scenario.name} ({count} iteracji)...")
+        result = run_scenario(scenario, count, warmup)
+        report["scenarios"][scenario.name] = result
+        if stdout is not None:
+            rows_per_s = result.get("rows_per_s")
+            stdout.write(
+                f"[BENCH] {scenario.name}: p50={result['p50_ms']} ms, "
+                f"p99={result['p99_ms']} ms, zapytania={result['queries_per_op']}"
+                + (f", wiersze/s={rows_per_s}" if rows_per_s else "")
+            )
+    return report
+
+
+COMPARED_METRICS = ("p50_ms", "p99_ms", "queries_per_op")
+
+
+def compare(report, baseline, threshold):
+    """
+    Porównuje wynik z bazowym. Zwraca listę (scenariusz, metryka, było, jest),
+    dla których wartość wzrosła o więcej niż `threshold` (np. 0.2 = 20%).
+    """
+    regressions = []
+    for name, current in report["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if previous is None:
+            continue
+        for metric in COMPARED_METRICS:
+            before, after = previous.get(metric), current.get(metric)
+            if before is None or after is None:
+                continue
+            if after > before * (1 + threshold) and after - before > 0.5:
+                regressions.append((name, metric, before, after))
+    return regressions
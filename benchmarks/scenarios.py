@@ -0,0 +1,332 @@
+"""
+Scenariusze benchmarków. Każdy przechodzi przez prawdziwe widoki
+(UserFileViewSet, ActivityLogViewSet, logowanie JWT) klientem testowym DRF.
+
+Scenariusz to klasa z metodami:
+- setup(): przygotowanie danych (nie jest mierzone)
+- before_each(): przygotowanie pojedynczej iteracji (nie jest mierzone)
+- run(): mierzona operacja, zwraca odpowiedź HTTP
+"""
+
+import io
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage, storages
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import override_settings
+from django_otp.oath import totp
+from django_otp.plugins.otp_totp.models import TOTPDevice
+from rest_framework.test import APIClient
+
+from files.models import UserFile, UserFileVersion
+from logs.models import ActivityLog
+
+PASSWORD = "benchmark-password-1"
+
+
+def make_user(prefix, staff=False):
+    return get_user_model().objects.create_user(
+        username=f"{prefix}_{uuid.uuid4().hex[:8]}",
+        email=f"{prefix}@benchmark.local",
+        password=PASSWORD,
+        is_staff=staff,
+    )
+
+
+def client_for(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def seed_files(user, count, batch_size=5000):
+    """Wstawia `count` plików (z wersją V1) bez dotykania storage."""
+    files = UserFile.objects.bulk_create(
+        [
+            UserFile(
+                owner=user,
+                file=f"user_uploads/{user.id}/seed_{i}.txt",
+                original_filename=f"seed_{i}.txt",
+                file_size=1024 + i,
+            )
+            for i in range(count)
+        ],
+        batch_size=batch_size,
+    )
+    UserFileVersion.objects.bulk_create(
+        [
+            UserFileVersion(
+                user_file=f,
+                version_number=1,
+                file_path=f.file.name,
+                original_filename=f.original_filename,
+                file_size=f.file_size,
+            )
+            for f in files
+        ],
+        batch_size=batch_size,
+    )
+    return files
+
+
+def seed_logs(user, count, batch_size=5000):
+    ActivityLog.objects.bulk_create(
+        [
+            ActivityLog(
+                user=user,
+                action=ActivityLog.ActionType.FILE_UPLOAD,
+                details=f"Benchmark {i}",
+            )
+            for i in range(count)
+        ],
+        batch_size=batch_size,
+    )
+
+
+def upload(client, name, content, zip_async=False):
+    url = "/api/files/?async=true" if zip_async else "/api/files/"
+    return client.post(
+        url, {"file": SimpleUploadedFile(name, content)}, format="multipart"
+    )
+
+
+class Scenario:
+    name = ""
+
+    def __init__(self, options):
+        self.options = options
+
+    def setup(self):
+        pass
+
+    def before_each(self):
+        pass
+
+    def run(self):
+        raise NotImplementedError
+
+
+class ListScenario(Scenario):
+    """
+    Lista `size` wierszy. values_lists=False wymusza starą ścieżkę
+    (instancje modelu + ModelSerializer) - porównanie wierszy na sekundę.
+    """
+
+    prefix = ""
+
+    def __init__(self, options, size, values_lists=True):
+        super().__init__(options)
+        self.size = size
+        self.rows = size
+        self.values_lists = values_lists
+        suffix = "" if values_lists else "_drf"
+        self.name = f"{self.prefix}_list_{size}{suffix}"
+
+    def run(self):
+        with override_settings(API_VALUES_LISTS=self.values_lists):
+            return self.client.get(self.url)
+
+
+class ListFiles(ListScenario):
+    prefix = "files"
+    url = "/api/files/"
+
+    def setup(self):
+        self.user = make_user("list")
+        seed_files(self.user, self.size)
+        self.client = client_for(self.user)
+
+
+class ListLogs(ListScenario):
+    prefix = "logs"
+
+    def setup(self):
+        self.user = make_user("logs")
+        seed_logs(self.user, self.size)
+        self.client = client_for(make_user("admin", staff=True))
+        self.url = f"/api/logs/?user={self.user.username}"
+
+
+class UploadSingle(Scenario):
+    name = "upload_single"
+
+    def setup(self):
+        self.client = client_for(make_user("upload"))
+        self.content = b"x" * (self.options["upload_kb"] * 1024)
+
+    def run(self):
+        return upload(self.client, "raport.txt", self.content)
+
+
+class ParallelTransfer(Scenario):
+    """
+    Równoległy upload i pobranie pliku przez wielu użytkowników naraz.
+    Z limitem konta (--account-mbps) czas rośnie z liczbą użytkowników,
+    a z shardami (--shards) maleje - każde konto ma własny limit.
+    """
+
+    name = "transfer_parallel"
+
+    def setup(self):
+        self.clients = [
+            client_for(make_user("transfer"))
+            for _ in range(self.options["transfer_users"])
+        ]
+        self.content = b"t" * (self.options["upload_kb"] * 1024)
+        # Storage tworzony leniwie - tworzony w wątkach puli miałby kilka instancji
+        storages["default"]
+
+    def _roundtrip(self, client):
+        try:
+            response = upload(client, "transfer.bin", self.content)
+            if response.status_code < 400:
+                name = UserFile.objects.get(pk=response.data["id"]).file.name
+                with default_storage.open(name, "rb") as f:
+                    f.read()
+            return response
+        finally:
+            # Połączenie z bazą otwarte w wątku puli
+            connection.close()
+
+    def run(self):
+        with ThreadPoolExecutor(max_workers=len(self.clients)) as pool:
+            responses = list(pool.map(self._roundtrip, self.clients))
+        return max(responses, key=lambda r: r.status_code)
+
+
+class UploadZip(Scenario):
+    name = "upload_zip"
+
+    def setup(self):
+        self.client = client_for(make_user("zip"))
+        buffer = io.BytesIO()
+        member = b"y" * (self.options["upload_kb"] * 1024)
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+            for i in range(self.options["zip_members"]):
+                archive.writestr(f"katalog/plik_{i}.txt", member)
+        self.content = buffer.getvalue()
+
+    def run(self):
+        return upload(self.client, "archiwum.zip", self.content)
+
+
+class Rename(Scenario):
+    name = "rename"
+
+    def setup(self):
+        self.client = client_for(make_user("rename"))
+        response = upload(self.client, "dokument.txt", b"z" * 4096)
+        self.file_id = response.data["id"]
+        self.counter = 0
+
+    def run(self):
+        self.counter += 1
+        return self.client.patch(
+            f"/api/files/{self.file_id}/rename/",
+            {"new_filename": f"dokument_{self.counter}.txt"},
+            format="json",
+        )
+
+
+class Restore(Scenario):
+    name = "restore_version"
+
+    def setup(self):
+        self.client = client_for(make_user("restore"))
+        response = upload(self.client, "umowa.txt", b"v1" * 2048)
+        self.file_id = response.data["id"]
+        self.version_id = (
+            UserFileVersion.objects.filter(user_file_id=self.file_id)
+            .values_list("id", flat=True)
+            .get()
+        )
+
+    def run(self):
+        return self.client.post(
+            f"/api/files/{self.file_id}/versions/restore/",
+            {"version_id": self.version_id},
+            format="json",
+        )
+
+
+class BulkDelete(Scenario):
+    """Usunięcie paczki plików (tak jak robi to frontend - DELETE po kolei)."""
+
+    name = "bulk_delete"
+
+    def setup(self):
+        self.client = client_for(make_user("delete"))
+
+    def before_each(self):
+        self.file_ids = [
+            upload(self.client, f"do_usuniecia_{i}.txt", b"d" * 1024).data["id"]
+            for i in range(self.options["delete_batch"])
+        ]
+
+    def run(self):
+        for file_id in self.file_ids:
+            response = self.client.delete(f"/api/files/{file_id}/")
+        return response
+
+
+class Login(Scenario):
+    name = "login"
+
+    def setup(self):
+        self.user = make_user("login")
+        self.client = APIClient()
+
+    def payload(self):
+        return {"username": self.user.username, "password": PASSWORD}
+
+    def run(self):
+        return self.client.post("/api/token/", self.payload(), format="json")
+
+
+class LoginTOTP(Login):
+    name = "login_totp"
+
+    def setup(self):
+        super().setup()
+        self.device = TOTPDevice.objects.create(
+            user=self.user, name="TOTP", confirmed=True
+        )
+
+    def before_each(self):
+        # Kod TOTP można użyć tylko raz w danym oknie czasowym - resetujemy licznik
+        TOTPDevice.objects.filter(pk=self.device.pk).update(last_t=-1)
+        self.device.refresh_from_db()
+
+    def payload(self):
+        token = totp(
+            self.device.bin_key, self.device.step, self.device.t0, self.device.digits
+        )
+        return {**super().payload(), "otp_token": f"{token:0{self.device.digits}d}"}
+
+
+def build_scenarios(options):
+    scenarios = []
+    for size in options["sizes"]:
+        scenarios.append(ListFiles(options, size))
+        scenarios.append(ListLogs(options, size))
+        if options.get("compare_serializers"):
+            scenarios.append(ListFiles(options, size, values_lists=False))
+            scenarios.append(ListLogs(options, size, values_lists=False))
+    scenarios += [
+        UploadSingle(options),
+        ParallelTransfer(options),
+        UploadZip(options),
+        Rename(options),
+        Restore(options),
+        BulkDelete(options),
+        Login(options),
+        LoginTOTP(options),
+    ]
+    selected = options.get("only")
+    if selected:
+        scenarios = [s for s in scenarios if any(p in s.name for p in selected)]
+    return scenarios
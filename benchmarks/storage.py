@@ -0,0 +1,148 @@
+"""
+Zamiennik Azure Blob Storage do benchmarków.
+
+Trzyma pliki w pamięci (InMemoryStorage) albo na dysku (FileSystemStorage)
+i do każdej operacji dodaje opóźnienie sieci oraz czas transferu wynikający
+z zadanej przepustowości - tak, żeby koszt wywołań storage był widoczny
+w wynikach, ale powtarzalny i bez dostępu do prawdziwego konta Azure.
+"""
+
+import threading
+import time
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, InMemoryStorage, Storage
+from django.utils.deconstruct import deconstructible
+from storages.utils import get_available_overwrite_name
+
+from monitoring.context import record_storage_call
+
+
+@deconstructible(path="benchmarks.storage.SimulatedAzureStorage")
+class SimulatedAzureStorage(Storage):
+    """
+    Opcje (STORAGES["default"]["OPTIONS"]):
+    - backend: "memory" (domyślnie) lub "filesystem"
+    - location: katalog dla backendu "filesystem"
+    - latency_ms: opóźnienie każdego wywołania (round-trip)
+    - bandwidth_mbps: przepustowość w megabitach na sekundę (0 = bez limitu)
+    - overwrite_files: jak w AzureStorage - bez sprawdzania exists() przed zapisem
+    - rehydrate_seconds: czas przywracania bloba z warstwy Archive
+    - account_mbps: łączna przepustowość konta dzielona przez równoległe
+      transfery (0 = bez limitu); z ShardedStorage każdy shard ma własny limit
+    """
+
+    def __init__(
+        self,
+        backend="memory",
+        location=None,
+        latency_ms=20,
+        bandwidth_mbps=200,
+        overwrite_files=False,
+        rehydrate_seconds=0,
+        account_mbps=0,
+    ):
+        if backend == "filesystem":
+            self.inner = FileSystemStorage(location=location)
+        else:
+            self.inner = InMemoryStorage()
+        self.latency = latency_ms / 1000
+        self.bytes_per_second = bandwidth_mbps * 1_000_000 / 8
+        self.overwrite_files = overwrite_files
+        self.rehydrate_seconds = rehydrate_seconds
+        self.account_bytes_per_second = account_mbps * 1_000_000 / 8
+        self.account_busy_until = 0.0
+        # Warstwy blobów: nazwa -> (warstwa, koniec przywracania z Archive albo None)
+        self.tiers = {}
+        self.lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats = {"calls": 0, "bytes_sent": 0, "bytes_received": 0}
+
+    def _simulate(self, sent=0, received=0):
+        transfer = 0.0
+        if self.bytes_per_second:
+            transfer = (sent + received) / self.bytes_per_second
+        if self.account_bytes_per_second and (sent or received):
+            # Transfery czekają w kolejce do łącza konta
+            with self.lock:
+                start = max(time.monotonic(), self.account_busy_until)
+                self.account_busy_until = (
+                    start + (sent + received) / self.account_bytes_per_second
+                )
+                transfer = max(transfer, self.account_busy_until - time.monotonic())
+        delay = self.latency + transfer
+        if delay:
+            time.sleep(delay)
+        with self.lock:
+            self.stats["calls"] += 1
+            self.stats["bytes_sent"] += sent
+            self.stats["bytes_received"] += received
+        record_storage_call(delay, sent=sent, received=received)
+
+    def _open(self, name, mode="rb"):
+        if self.get_tier(name)[0] == "Archive":
+            # Azure: 409 BlobArchived
+            raise OSError(f"Blob {name} jest w warstwie Archive")
+        # Jak download_blob: całe ciało odpowiedzi jest przesyłane przy otwarciu
+        with self.inner.open(name, mode) as f:
+            data = f.read()
+        self._simulate(received=len(data))
+        return ContentFile(data, name=name)
+
+    def _save(self, name, content):
+        if hasattr(content, "seek"):
+            content.seek(0)
+        data = content.read()
+        saved_name = self.inner.save(name, ContentFile(data))
+        self._simulate(sent=len(data))
+        return saved_name
+
+    def get_available_name(self, name, max_length=None):
+        if self.overwrite_files:
+            return get_available_overwrite_name(name, max_length)
+        return super().get_available_name(name, max_length=max_length)
+
+    def delete(self, name):
+        self._simulate()
+        self.inner.delete(name)
+
+    def exists(self, name):
+        self._simulate()
+        return self.inner.exists(name)
+
+    def size(self, name):
+        self._simulate()
+        return self.inner.size(name)
+
+    def listdir(self, path):
+        self._simulate()
+        return self.inner.listdir(path)
+
+    def get_modified_time(self, name):
+        self._simulate()
+        return self.inner.get_modified_time(name)
+
+    def set_tiers(self, names, tier, rehydrate_priority=None):
+        self._simulate()
+        with self.lock:
+            for name in names:
+                current = self.tiers.get(name, ("Hot", None))[0]
+                if current == "Archive" and tier != "Archive":
+                    ready_at = time.monotonic() + self.rehydrate_seconds
+                    self.tiers[name] = (tier, ready_at)
+                else:
+                    self.tiers[name] = (tier, None)
+        return []
+
+    def get_tier(self, name):
+        with self.lock:
+            tier, ready_at = self.tiers.get(name, ("Hot", None))
+        if ready_at is not None and time.monotonic() < ready_at:
+            return "Archive", f"rehydrate-pending-to-{tier.lower()}"
+        return tier, None
+
+    def url(self, name):
+        # Adres SAS Azure jest podpisywany lokalnie, bez wywołania sieciowego
+        return f"https://benchmark.blob.core.windows.net/files/{name}"
@@ -1,5 +1,8 @@
 #!/bin/bash
 
+# Profil produkcyjny (DEBUG=False) dla migracji, collectstatic, workera i gunicorna
+export DJANGO_SETTINGS_MODULE=${DJANGO_SETTINGS_MODULE:-spc.settings_production}
+
 echo "Waiting for PostgreSQL ($POSTGRES_HOST)..."
 
 # Zmieniamy 'db_spc' na zmienną środowiskową, która zawiera adres Azure
@@ -14,6 +17,9 @@ python manage.py makemigrations
 python manage.py migrate
 
 
+echo "Collecting static files..."
+python manage.py collectstatic --noinput -v0
+
 echo "Creating superuser if needed..."
 python manage.py shell -c "
 from django.contrib.auth import get_user_model;
@@ -25,7 +31,12 @@ else:
     print('Superuser already exists')
 "
 
+echo "Starting background job worker..."
+python manage.py run_jobs --threads ${JOBS_WORKER_THREADS:-4} &
+
 PORT=${PORT:-8000}
 
 echo "Starting server..."
-exec gunicorn spc.wsgi:application --bind 0.0.0.0:$PORT --workers 3 --timeout 120
\ No newline at end of file
+# gthread: strumienie SSE (/api/logs/stream/) zajmują wątek, nie cały worker
+exec gunicorn spc.wsgi:application --bind 0.0.0.0:$PORT --workers 3 \
+    --worker-class gthread --threads ${GUNICORN_THREADS:-8} --timeout 120
\ No newline at end of file
@@ -0,0 +1,104 @@
+"""
+Liczniki odczytów plików (akcje view i download).
+
+Zamiast UPDATE przy każdym odczycie proces zbiera trafienia w pamięci
+i co FILES_ACCESS_FLUSH_INTERVAL sekund zapisuje je jednym UPDATE ... FROM
+unnest(...) dla wszystkich plików naraz. Przy restarcie procesu giną
+najwyżej trafienia z ostatniego okresu - liczniki służą do wyboru warstwy
+bloba, nie do rozliczeń.
+"""
+
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from jobs.registry import enqueue
+
+from .models import BlobTier, UserFile
+
+logger = logging.getLogger(__name__)
+
+# Zapis także wtedy, gdy w buforze jest tyle różnych plików
+FLUSH_SIZE = 5000
+
+_UPDATE_SQL = f"""
+    UPDATE {UserFile._meta.db_table} AS f
+    SET access_count = f.access_count + v.hits,
+        last_accessed_at = GREATEST(f.last_accessed_at, v.accessed_at)
+    FROM unnest(%s::bigint[], %s::bigint[], %s::timestamptz[])
+        AS v(id, hits, accessed_at)
+    WHERE f.id = v.id
+    RETURNING f.id, f.blob_tier
+"""
+
+
+class AccessCounter:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hits = {}
+        self.last_flush = time.monotonic()
+
+    def record(self, file_id):
+        now = timezone.now()
+        with self.lock:
+            entry = self.hits.get(file_id)
+            if entry is None:
+                self.hits[file_id] = [1, now]
+            else:
+                entry[0] += 1
+                entry[1] = now
+            due = (
+                len(self.hits) >= FLUSH_SIZE
+                or time.monotonic() - self.last_flush
+                >= settings.FILES_ACCESS_FLUSH_INTERVAL
+            )
+        if due:
+            self.flush()
+
+    def flush(self):
+        """
+        Zapisuje zebrane trafienia. Zwraca id odczytanych plików z warstwy
+        Cool - te wracają do Hot w tle (zadanie files.promote_blobs).
+        """
+        with self.lock:
+            hits, self.hits = self.hits, {}
+            self.last_flush = time.monotonic()
+        if not hits:
+            return []
+
+        ids = list(hits)
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    _UPDATE_SQL,
+                    [ids, [hits[i][0] for i in ids], [hits[i][1] for i in ids]],
+                )
+                rows = cursor.fetchall()
+        except Exception as e:
+            logger.error(f"[ACCESS] Nie udało się zapisać liczników odczytów: {e}")
+            return []
+
+        cool = [file_id for file_id, tier in rows if tier == BlobTier.COOL]
+        if cool:
+            enqueue("files.promote_blobs", {"file_ids": cool})
+        return cool
+
+    def reset(self):
+        self.lock = threading.Lock()
+        self.hits = {}
+        self.last_flush = time.monotonic()
+
+
+COUNTER = AccessCounter()
+
+# Proces potomny nie może zapisać trafień zebranych przez rodzica drugi raz
+os.register_at_fork(after_in_child=COUNTER.reset)
+
+
+def record_access(user_file):
+    COUNTER.record(user_file.pk)
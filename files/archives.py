@@ -0,0 +1,280 @@
+"""
+Przeglądanie archiwów ZIP bez ich rozpakowywania.
+
+Archiwum wgrane w trybie "archive" jest zapisywane jako jeden blob (is_zip=True).
+Listę plików czytamy z katalogu centralnego ZIP-a (koniec pliku) odczytami
+Range, a pojedynczy plik z archiwum pobieramy, czytając tylko jego
+skompresowane bajty. Lista jest cache'owana per wersja pliku (każda wersja
+ma własny blob, więc ścieżka bloba jednoznacznie ją identyfikuje).
+"""
+
+import bz2
+import hashlib
+import io
+import posixpath
+import struct
+import zipfile
+import zlib
+
+from django.core.cache import cache
+
+from .blobs import read_blob_range
+
+# Odczyt z wyprzedzeniem: nagłówek lokalny i mały plik z archiwum w jednym Range
+READ_AHEAD_SIZE = 64 * 1024
+# Koniec pliku: rekord EOCD (22 B) + maks. komentarz (64 KB) + lokator ZIP64
+TAIL_SIZE = 22 + 0xFFFF + 20
+MEMBER_CHUNK_SIZE = 1024 * 1024
+
+MEMBERS_CACHE_TIMEOUT = 24 * 60 * 60
+
+_LOCAL_HEADER = struct.Struct("<4sHHHHHIIIHH")
+_LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+# Zapas na pole "extra" nagłówka lokalnego (może różnić się od centralnego)
+_LOCAL_EXTRA_SLACK = 1024
+
+_ENCRYPTED = 0x1
+
+
+class ArchiveError(ValueError):
+    """Uszkodzone archiwum albo nieobsługiwany wpis (np. szyfrowany)."""
+
+
+class BlobReader(io.RawIOBase):
+    """
+    Obiekt plikowy tylko do odczytu nad blobem. Każdy odczyt spoza bufora
+    to jeden odczyt Range (co najmniej `read_ahead` bajtów), więc zipfile
+    może przeszukiwać archiwum bez pobierania całości.
+    """
+
+    def __init__(self, name, size, storage, read_ahead=READ_AHEAD_SIZE):
+        self.name = name
+        self.size = size
+        self.storage = storage
+        self.read_ahead = read_ahead
+        self.position = 0
+        self._buffer = b""
+        self._buffer_start = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError("Ujemna pozycja w pliku")
+        self.position = offset
+        return self.position
+
+    def prefetch(self, start, end):
+        """Wczytuje zakres [start, end) do bufora jednym odczytem Range."""
+        start = max(0, start)
+        self._buffer = read_blob_range(
+            self.name, start, min(end, self.size) - start, storage=self.storage
+        )
+        self._buffer_start = start
+
+    def read(self, n=-1):
+        if n is None or n < 0:
+            n = self.size - self.position
+        n = min(n, self.size - self.position)
+        if n <= 0:
+            return b""
+
+        start, end = self.position, self.position + n
+        buffer_end = self._buffer_start + len(self._buffer)
+        if not (self._buffer_start <= start and end <= buffer_end):
+            self.prefetch(start, start + max(n, self.read_ahead))
+
+        offset = start - self._buffer_start
+        data = self._buffer[offset : offset + n]
+        self.position += len(data)
+        return data
+
+    def readinto(self, b):
+        data = self.read(len(b))
+        b[: len(data)] = data
+        return len(data)
+
+
+def _version_key(user_file):
+    return hashlib.sha1(user_file.file.name.encode("utf-8")).hexdigest()
+
+
+def _members_from_zipfile(zf):
+    members = []
+    for info in zf.infolist():
+        members.append(
+            {
+                "name": info.filename,
+                "is_dir": info.is_dir(),
+                "size": info.file_size,
+                "compressed_size": info.compress_size,
+                "compress_type": info.compress_type,
+                "crc": info.CRC,
+                "flag_bits": info.flag_bits,
+                "header_offset": info.header_offset,
+                "modified": "%04d-%02d-%02dT%02d:%02d:%02d" % info.date_time,
+            }
+        )
+    return members
+
+
+def read_members(fileobj):
+    """Lista wpisów archiwum z dowolnego obiektu plikowego z seek()."""
+    try:
+        with zipfile.ZipFile(fileobj, "r") as zf:
+            return _members_from_zipfile(zf)
+    except zipfile.BadZipFile as e:
+        raise ArchiveError(f"Nieprawidłowe archiwum ZIP: {e}") from e
+
+
+def get_members(user_file):
+    """
+    Lista wpisów archiwum (z katalogu centralnego), liczona raz per wersja.
+    Zwykle kosztuje dwa odczyty Range: koniec pliku i katalog centralny.
+    """
+    key = f"files:archive:members:{_version_key(user_file)}"
+    members = cache.get(key)
+    if members is None:
+        reader = BlobReader(
+            user_file.file.name, user_file.file_size, user_file.file.storage
+        )
+        reader.prefetch(user_file.file_size - TAIL_SIZE, user_file.file_size)
+        members = read_members(reader)
+        cache.set(key, members, MEMBERS_CACHE_TIMEOUT)
+    return members
+
+
+def prime_members(user_file, members):
+    """Zapamiętuje listę wpisów policzoną przy uploadzie (bez odczytu z Azure)."""
+    cache.set(
+        f"files:archive:members:{_version_key(user_file)}",
+        members,
+        MEMBERS_CACHE_TIMEOUT,
+    )
+
+
+def get_member(user_file, name):
+    for member in get_members(user_file):
+        if member["name"] == name and not member["is_dir"]:
+            return member
+    return None
+
+
+def list_directory(members, path=""):
+    """
+    Zawartość jednego katalogu archiwum: podkatalogi (także te, które w ZIP-ie
+    występują tylko jako prefiks ścieżek) i pliki bezpośrednio w `path`.
+    """
+    prefix = path.strip("/")
+    prefix = f"{prefix}/" if prefix else ""
+
+    directories = {}
+    files = []
+    for member in members:
+        name = member["name"]
+        if not name.startswith(prefix) or name == prefix:
+            continue
+        rest = name[len(prefix) :]
+        head, sep, tail = rest.partition("/")
+        if sep:
+            entry = directories.setdefault(
+                head, {"name": prefix + head + "/", "is_dir": True, "files": 0}
+            )
+            if tail and not member["is_dir"]:
+                entry["files"] += 1
+        elif not member["is_dir"]:
+            files.append(
+                {
+                    "name": name,
+                    "filename": posixpath.basename(name),
+                    "is_dir": False,
+                    "size": member["size"],
+                    "compressed_size": member["compressed_size"],
+                    "modified": member["modified"],
+                }
+            )
+
+    return sorted(directories.values(), key=lambda d: d["name"]) + sorted(
+        files, key=lambda f: f["name"]
+    )
+
+
+def _decompressor(compress_type):
+    if compress_type == zipfile.ZIP_STORED:
+        return None
+    if compress_type == zipfile.ZIP_DEFLATED:
+        return zlib.decompressobj(-15)
+    if compress_type == zipfile.ZIP_BZIP2:
+        return bz2.BZ2Decompressor()
+    raise ArchiveError(f"Nieobsługiwana metoda kompresji: {compress_type}")
+
+
+def iter_member(user_file, member, chunk_size=MEMBER_CHUNK_SIZE):
+    """
+    Generator rozpakowanych fragmentów jednego pliku z archiwum.
+    Czyta tylko nagłówek lokalny i skompresowane bajty tego wpisu.
+    """
+    if member["flag_bits"] & _ENCRYPTED:
+        raise ArchiveError("Zaszyfrowane pliki w archiwum nie są obsługiwane.")
+    decompressor = _decompressor(member["compress_type"])
+
+    name = user_file.file.name
+    storage = user_file.file.storage
+    header_offset = member["header_offset"]
+    compressed_size = member["compressed_size"]
+
+    # Nagłówek lokalny i (dla małych plików) całe dane w jednym odczycie Range
+    filename_length = len(member["name"].encode("utf-8"))
+    first_read = min(
+        _LOCAL_HEADER.size + filename_length + _LOCAL_EXTRA_SLACK + compressed_size,
+        max(chunk_size, READ_AHEAD_SIZE),
+    )
+    head = read_blob_range(name, header_offset, first_read, storage=storage)
+    if len(head) < _LOCAL_HEADER.size:
+        raise ArchiveError("Ucięty nagłówek pliku w archiwum.")
+    header = _LOCAL_HEADER.unpack_from(head)
+    if header[0] != _LOCAL_HEADER_SIGNATURE:
+        raise ArchiveError("Nieprawidłowy nagłówek pliku w archiwum.")
+
+    data_start = header_offset + _LOCAL_HEADER.size + header[9] + header[10]
+    data_end = data_start + compressed_size
+
+    crc = 0
+    position = data_start
+    buffered = head[data_start - header_offset :]
+    while position < data_end:
+        if buffered:
+            chunk = buffered[: data_end - position]
+            buffered = b""
+        else:
+            chunk = read_blob_range(
+                name, position, min(chunk_size, data_end - position), storage=storage
+            )
+            if not chunk:
+                raise ArchiveError("Ucięte dane pliku w archiwum.")
+        position += len(chunk)
+
+        data = chunk if decompressor is None else decompressor.decompress(chunk)
+        if data:
+            crc = zlib.crc32(data, crc)
+            yield data
+
+    if decompressor is not None and hasattr(decompressor, "flush"):
+        data = decompressor.flush()
+        if data:
+            crc = zlib.crc32(data, crc)
+            yield data
+
+    if crc != member["crc"]:
+        raise ArchiveError(f"Błędna suma CRC pliku {member['name']}.")
@@ -0,0 +1,118 @@
+"""
+Cache metadanych blobów (rozmiar, data modyfikacji, istnienie).
+
+Od kiedy ścieżki blobów są unikalne (ULID w user_directory_path), blob pod
+daną nazwą nigdy się nie zmienia - może być co najwyżej usunięty. Dzięki temu
+metadane zwrócone przez upload/kopiowanie można bezpiecznie zapamiętać
+i odpowiadać na size()/exists()/get_modified_time() bez zapytań HEAD do Azure.
+
+Dwa poziomy:
+- cache żądania (ContextVar, włączany przez BlobMetadataCacheMiddleware),
+- cache procesu (LRU z TTL, AZURE_METADATA_CACHE_SIZE / _TTL).
+
+Usunięcie bloba (mark_missing) widzi tylko proces, który je wykonał. Inne
+workery gunicorna i procesy zadań mogą do wygaśnięcia wpisu (TTL) uważać
+blob za istniejący i zwracać jego stary rozmiar - dlatego TTL jest krótki.
+"""
+
+import contextvars
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import NamedTuple
+
+from django.conf import settings
+
+
+class BlobMetadata(NamedTuple):
+    size: int
+    last_modified: object  # datetime (UTC) lub None
+
+
+# Blob, o którym wiemy, że nie istnieje (usunięty w tym procesie)
+MISSING = object()
+
+_request_cache = contextvars.ContextVar("spc_blob_metadata", default=None)
+
+
+class BlobMetadataCache:
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, name):
+        with self.lock:
+            entry = self.entries.get(name)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self.entries[name]
+                return None
+            self.entries.move_to_end(name)
+            return value
+
+    def set(self, name, value):
+        if self.max_entries <= 0:
+            return
+        with self.lock:
+            self.entries[name] = (value, time.monotonic() + self.ttl)
+            self.entries.move_to_end(name)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+process_cache = BlobMetadataCache(
+    getattr(settings, "AZURE_METADATA_CACHE_SIZE", 10000),
+    getattr(settings, "AZURE_METADATA_CACHE_TTL", 60),
+)
+
+
+@contextmanager
+def request_scope():
+    """Włącza cache metadanych na czas jednego żądania/zadania."""
+    token = _request_cache.set({})
+    try:
+        yield
+    finally:
+        _request_cache.reset(token)
+
+
+def lookup(name):
+    """Zwraca BlobMetadata, MISSING albo None (brak informacji)."""
+    scoped = _request_cache.get()
+    if scoped is not None and name in scoped:
+        return scoped[name]
+    value = process_cache.get(name)
+    if value is not None and scoped is not None:
+        scoped[name] = value
+    return value
+
+
+def remember(name, metadata):
+    scoped = _request_cache.get()
+    if scoped is not None:
+        scoped[name] = metadata
+    process_cache.set(name, metadata)
+
+
+def mark_missing(name):
+    remember(name, MISSING)
+
+
+class BlobMetadataCacheMiddleware:
+    """Cache metadanych blobów ograniczony do jednego żądania HTTP."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with request_scope():
+            return self.get_response(request)
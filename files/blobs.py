@@ -0,0 +1,83 @@
+"""
+Pomocnicze operacje na blobach: odczyt fragmentu (Range) bez pobierania całości
+oraz kopiowanie bloba.
+
+Dla Azure korzystamy bezpośrednio z download_blob(offset, length) i kopiowania
+po stronie serwera, dla innych backendów (np. FileSystemStorage) z seek() + read()
+i open() + save() na otwartym pliku.
+"""
+
+from django.core.files.storage import default_storage
+
+
+def _azure_client(storage):
+    """Zwraca ContainerClient, jeśli storage jest backendem Azure, inaczej None."""
+    client = getattr(storage, "client", None)
+    if client is not None and hasattr(client, "download_blob"):
+        return client
+    return None
+
+
+def _route(storage, name):
+    """Dla storage shardowanego (files/sharding.py) - backend shardu i nazwa w nim."""
+    if hasattr(storage, "route"):
+        return storage.route(name)
+    return storage, name
+
+
+def read_blob_range(name, offset, length, storage=None):
+    """
+    Czyta `length` bajtów bloba `name` począwszy od `offset`.
+    Zwraca mniej bajtów, jeśli zakres wychodzi poza koniec pliku.
+    """
+    storage, name = _route(storage or default_storage, name)
+    if length <= 0:
+        return b""
+
+    client = _azure_client(storage)
+    if client is not None:
+        downloader = client.download_blob(
+            storage._get_valid_path(name),
+            offset=offset,
+            length=length,
+            timeout=storage.timeout,
+        )
+        return downloader.readall()
+
+    with storage.open(name, "rb") as f:
+        f.seek(offset)
+        return f.read(length)
+
+
+def iter_blob_chunks(name, chunk_size, start=0, end=None, storage=None):
+    """
+    Generator kolejnych fragmentów bloba (każdy to osobny odczyt Range).
+    Pozwala przejść cały plik bez trzymania go w pamięci.
+    """
+    storage = storage or default_storage
+    if end is None:
+        end = storage.size(name)
+
+    position = start
+    while position < end:
+        chunk = read_blob_range(
+            name, position, min(chunk_size, end - position), storage=storage
+        )
+        if not chunk:
+            break
+        yield position, chunk
+        position += len(chunk)
+
+
+def copy_blob(source_name, target_name, size=None, storage=None):
+    """
+    Kopiuje blob `source_name` pod `target_name` i zwraca zapisaną nazwę.
+    Backend z metodą copy() (Azure) kopiuje po stronie serwera; `size`
+    (jeśli znany z bazy) oszczędza dodatkowe zapytanie o metadane.
+    """
+    storage = storage or default_storage
+    if hasattr(storage, "copy"):
+        return storage.copy(source_name, target_name, size=size)
+
+    with storage.open(source_name, "rb") as src:
+        return storage.save(target_name, src)
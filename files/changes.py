@@ -0,0 +1,156 @@
+"""
+Dziennik zmian plików i synchronizacja przyrostowa listy plików.
+
+Każda zmiana pliku (utworzenie, zmiana, przeniesienie do kosza / usunięcie)
+dopisuje wiersz FileChange. Klient pamięta token (id ostatniej zmiany)
+i pyta tylko o zmiany po nim, więc odpowiedź jest proporcjonalna do liczby
+zmian, a nie do liczby plików na koncie.
+
+Numery zmian pochodzą z sekwencji, która nie gwarantuje kolejności
+zatwierdzania transakcji: zmiana #11 może być widoczna przed #10 i klient,
+który zapamiętał token 11, nigdy nie zobaczyłby #10. Dlatego zapisy zmian
+jednego właściciela serializujemy blokadą doradczą na czas transakcji
+(pg_advisory_xact_lock - działa też przez pgbouncer w trybie transakcji).
+"""
+
+import logging
+from typing import NamedTuple
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import FileChange, UserFile
+
+logger = logging.getLogger(__name__)
+
+# Przestrzeń kluczy blokad doradczych dziennika zmian ("FC")
+LOCK_NAMESPACE = 0x4643
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 5000
+PRUNE_BATCH_SIZE = 5000
+
+
+class TokenExpired(Exception):
+    """Zmiany po tokenie zostały już usunięte - klient musi pobrać pełną listę."""
+
+
+class Change(NamedTuple):
+    seq: int
+    op: str  # "insert", "update" albo "delete"
+    file_id: int
+    file: object  # UserFile albo None dla usuniętych
+
+
+def _lock_owner(owner_id):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_advisory_xact_lock(%s, %s)",
+            [LOCK_NAMESPACE, owner_id % 2147483647],
+        )
+
+
+def record_changes(owner_id, file_ids, kind):
+    """Zapisuje zmianę `kind` dla plików `file_ids` jednego właściciela."""
+    file_ids = list(file_ids)
+    if not file_ids:
+        return
+    with transaction.atomic():
+        _lock_owner(owner_id)
+        FileChange.objects.bulk_create(
+            [
+                FileChange(owner_id=owner_id, file_id=file_id, kind=kind)
+                for file_id in file_ids
+            ]
+        )
+
+
+def record_change(user_file, kind):
+    record_changes(user_file.owner_id, [user_file.pk], kind)
+
+
+def current_token(owner):
+    """Token odpowiadający obecnemu stanowi listy plików użytkownika."""
+    last = (
+        FileChange.objects.filter(owner=owner)
+        .order_by("-id")
+        .values_list("id", flat=True)
+        .first()
+    )
+    return last or 0
+
+
+def _check_token(since):
+    oldest = FileChange.objects.order_by("id").values_list("id", flat=True).first()
+    # Wszystko przed `oldest` mogło zostać usunięte przez prune_changes
+    if oldest is not None and since < oldest - 1:
+        raise TokenExpired(since)
+
+
+def changes_since(owner, since, limit=DEFAULT_LIMIT):
+    """
+    Zmiany plików użytkownika po tokenie `since`, po jednej na plik
+    (ostatni stan). Zwraca (zmiany, nowy token, czy są kolejne zmiany).
+
+    Pliki utworzone i usunięte w tym samym oknie są pomijane - klient ich
+    nie zna. Plik przywrócony z kosza jest dla klienta nowym plikiem (insert).
+    """
+    _check_token(since)
+    rows = list(
+        FileChange.objects.filter(owner=owner, id__gt=since)
+        .order_by("id")
+        .values_list("id", "file_id", "kind")[: limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if not rows:
+        return [], since, False
+
+    # Plik jest nowy dla klienta, jeśli jego pierwsza zmiana w oknie to
+    # utworzenie (albo przywrócenie z kosza)
+    latest = {}
+    for seq, file_id, kind in rows:
+        created = (
+            latest[file_id][1] if file_id in latest else kind == FileChange.Kind.CREATE
+        )
+        latest[file_id] = (seq, created)
+
+    files = (
+        UserFile.objects.alive()
+        .filter(owner=owner)
+        .select_related("owner")
+        .in_bulk(list(latest))
+    )
+
+    result = []
+    for file_id, (seq, created) in sorted(latest.items(), key=lambda i: i[1][0]):
+        user_file = files.get(file_id)
+        if user_file is not None:
+            result.append(
+                Change(seq, "insert" if created else "update", file_id, user_file)
+            )
+        elif not created:
+            result.append(Change(seq, "delete", file_id, None))
+    return result, rows[-1][0], has_more
+
+
+def prune_changes(older_than, batch_size=PRUNE_BATCH_SIZE):
+    """
+    Usuwa najstarsze wpisy dziennika (starsze niż `older_than`), partiami
+    od początku klucza głównego. Zwraca liczbę usuniętych wpisów.
+    """
+    cutoff = timezone.now() - older_than
+    total = 0
+    while True:
+        batch = list(
+            FileChange.objects.order_by("id").values_list("id", "created_at")[
+                :batch_size
+            ]
+        )
+        expired = [pk for pk, created_at in batch if created_at < cutoff]
+        if not expired:
+            return total
+        deleted, _ = FileChange.objects.filter(id__lte=expired[-1]).delete()
+        total += deleted
+        logger.info(f"[CHANGES] Usunięto {deleted} starych wpisów dziennika zmian")
+        if len(expired) < len(batch):
+            return total
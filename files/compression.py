@@ -0,0 +1,278 @@
+"""
+Kompresja plików w spoczynku (gzip) dla typów, które dobrze się kompresują.
+
+Pliki tekstowe (txt, csv, json, logi...) zajmują po kompresji zwykle 5-10x
+mniej miejsca i transferu. Kodek zapisujemy w wersji pliku
+(UserFileVersion.content_encoding) i w bieżącym pliku, a blob dostaje
+nagłówek Content-Encoding: gzip:
+
+- przeglądarka i klienci HTTP akceptujący gzip pobierają blob z Azure bez
+  zmian i rozpakowują go sami (nie widzą różnicy),
+- pozostali dostają adres /api/files/<id>/content/, który rozpakowuje plik
+  strumieniowo po stronie aplikacji.
+
+Rozmiar pliku (file_size), SHA-256 i podgląd dotyczą zawsze zawartości
+rozpakowanej. Obrazy, archiwa i inne dane już skompresowane rozpoznajemy po
+sygnaturze i próbce i zapisujemy bez zmian.
+
+Gzip nie pozwala czytać od środka, więc okno podglądu (files/previews.py)
+wymaga rozpakowania pliku od początku. Pliki większe niż
+FILES_COMPRESSION_MAX_SIZE (duże logi) zapisujemy więc bez kompresji - ich
+podgląd i odczyty Range kosztują tyle samo niezależnie od pozycji w pliku.
+"""
+
+import gzip
+import mimetypes
+import os
+import tempfile
+import zlib
+
+from django.conf import settings
+from django.core.files.base import File
+
+from spc.http import accepts
+
+from .blobs import iter_blob_chunks
+
+CODEC = "gzip"
+CHUNK_SIZE = 1024 * 1024
+# Próbka z początku pliku do oceny, czy kompresja się opłaca
+SAMPLE_SIZE = 64 * 1024
+# Zapisujemy wersję skompresowaną tylko, jeśli jest mniejsza niż 90% oryginału
+MAX_RATIO = 0.9
+# Fragmenty bloba czytane przy rozpakowywaniu (okno podglądu nie wymaga więcej)
+READ_CHUNK_SIZE = 256 * 1024
+
+_TEXT_TYPES = {
+    "application/json",
+    "application/xml",
+    "application/javascript",
+    "application/x-ndjson",
+    "application/sql",
+    "application/yaml",
+    "application/x-yaml",
+    "application/csv",
+}
+_TEXT_EXTENSIONS = {
+    ".txt",
+    ".csv",
+    ".tsv",
+    ".json",
+    ".jsonl",
+    ".ndjson",
+    ".log",
+    ".xml",
+    ".yaml",
+    ".yml",
+    ".md",
+    ".sql",
+}
+# Sygnatury formatów już skompresowanych (obrazy, archiwa, media, PDF)
+_COMPRESSED_SIGNATURES = (
+    b"\x89PNG",
+    b"\xff\xd8\xff",
+    b"GIF8",
+    b"RIFF",
+    b"PK\x03\x04",
+    b"PK\x05\x06",
+    b"\x1f\x8b",
+    b"\x28\xb5\x2f\xfd",
+    b"BZh",
+    b"\xfd7zXZ\x00",
+    b"7z\xbc\xaf",
+    b"Rar!",
+    b"%PDF",
+    b"OggS",
+    b"fLaC",
+    b"ID3",
+)
+
+
+def is_compressible(name, content_type=None):
+    """Czy typ pliku (po rozszerzeniu lub Content-Type) jest tekstowy."""
+    if os.path.splitext(name or "")[1].lower() in _TEXT_EXTENSIONS:
+        return True
+    for value in (content_type, mimetypes.guess_type(name or "")[0]):
+        if value and (value.startswith("text/") or value in _TEXT_TYPES):
+            return True
+    return False
+
+
+def too_large(size):
+    """Czy plik (albo odebrana dotąd część) przekracza FILES_COMPRESSION_MAX_SIZE."""
+    return size > settings.FILES_COMPRESSION_MAX_SIZE
+
+
+def size_allowed(size):
+    """Czy plik tej wielkości kompresujemy (FILES_COMPRESSION_MIN_SIZE..MAX_SIZE)."""
+    return settings.FILES_COMPRESSION_MIN_SIZE <= size and not too_large(size)
+
+
+def worth_compressing(head):
+    """Odrzuca dane już skompresowane (po sygnaturze) i słabo kompresowalną próbkę."""
+    if not head or head.startswith(_COMPRESSED_SIGNATURES) or head[4:8] == b"ftyp":
+        return False
+    sample = head[:SAMPLE_SIZE]
+    return len(zlib.compress(sample, 1)) <= len(sample) * MAX_RATIO
+
+
+class Compressor:
+    """Strumieniowa kompresja gzip do pliku tymczasowego (w pamięci do limitu uploadu)."""
+
+    def __init__(self):
+        self.buffer = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE,
+            suffix=".upload.gz",
+            dir=settings.FILE_UPLOAD_TEMP_DIR,
+        )
+        # wbits=31 - format gzip (nagłówek bez daty, więc wynik jest powtarzalny)
+        self._zlib = zlib.compressobj(
+            settings.FILES_COMPRESSION_LEVEL, zlib.DEFLATED, 31
+        )
+
+    def write(self, data):
+        self.buffer.write(self._zlib.compress(data))
+
+    def discard(self):
+        self.buffer.close()
+
+    def finish(self, original_size):
+        """Skompresowany plik (od początku) albo None, gdy kompresja się nie opłaca."""
+        self.buffer.write(self._zlib.flush())
+        size = self.buffer.tell()
+        if not size_allowed(original_size) or size > original_size * MAX_RATIO:
+            self.discard()
+            return None
+        self.buffer.seek(0)
+        return self.buffer
+
+
+def _compress(content, name):
+    if not size_allowed(content.size) or not is_compressible(
+        name, getattr(content, "content_type", None)
+    ):
+        return None
+    content.seek(0)
+    head = content.read(SAMPLE_SIZE)
+    if not worth_compressing(head):
+        content.seek(0)
+        return None
+
+    compressor = Compressor()
+    compressor.write(head)
+    for chunk in iter(lambda: content.read(CHUNK_SIZE), b""):
+        compressor.write(chunk)
+    content.seek(0)
+    return compressor.finish(content.size)
+
+
+def prepare(content, name=None):
+    """
+    Zwraca (zawartość do zapisu w storage, kodek); kodek "" oznacza zapis
+    bez zmian. Plik z handlera uploadu (files/uploads.py) ma już
+    skompresowaną kopię, pozostałe (np. pliki z ZIP-a) kompresujemy tutaj.
+    """
+    name = name or content.name
+    if not settings.FILES_COMPRESSION_ENABLED:
+        return content, ""
+    if hasattr(content, "compressed"):
+        compressed = content.compressed
+    else:
+        compressed = _compress(content, name)
+    if compressed is None:
+        return content, ""
+
+    encoded = File(compressed, name=name)
+    # Nagłówki bloba: typ oryginału + Content-Encoding (files/storage.py)
+    encoded.content_type = (
+        getattr(content, "content_type", None)
+        or mimetypes.guess_type(name)[0]
+        or "application/octet-stream"
+    )
+    encoded.content_encoding = CODEC
+    return encoded, CODEC
+
+
+def blob_size(obj):
+    """
+    Rozmiar bloba znany z bazy (podpowiedź dla copy_blob) - dla bloba
+    skompresowanego file_size dotyczy zawartości, więc go nie znamy.
+    """
+    return None if obj.content_encoding else obj.file_size
+
+
+# --- Odczyt ---
+
+
+def serves_encoded(storage):
+    """Czy URL bloba zwraca nagłówek Content-Encoding (np. Azure, nie dysk lokalny)."""
+    return getattr(storage, "stores_content_encoding", False)
+
+
+def blob_url_usable(request, user_file):
+    """Czy klient może pobrać blob pliku bezpośrednio z URL-a storage."""
+    encoding = user_file.content_encoding
+    return not encoding or (
+        accepts(request, encoding) and serves_encoded(user_file.file.storage)
+    )
+
+
+def iter_decompressed(name, storage=None, chunk_size=READ_CHUNK_SIZE):
+    """Kolejne fragmenty rozpakowanej zawartości bloba (odczyty Range)."""
+    decompressor = zlib.decompressobj(wbits=31)
+    for _, chunk in iter_blob_chunks(name, chunk_size, storage=storage):
+        while chunk:
+            data = decompressor.decompress(chunk, CHUNK_SIZE)
+            chunk = decompressor.unconsumed_tail
+            if data:
+                yield data
+    data = decompressor.flush()
+    if data:
+        yield data
+
+
+def iter_range(name, chunk_size=CHUNK_SIZE, start=0, end=None, storage=None):
+    """
+    Jak blobs.iter_blob_chunks, ale po rozpakowanej zawartości: (pozycja,
+    fragment) z zakresu [start, end). Gzip nie pozwala zacząć w środku,
+    więc rozpakowujemy od początku - koszt rośnie z `end`, nie z rozmiarem pliku.
+    """
+    # offset - ile bajtów rozpakowanych już minęło; position - początek `pending`
+    offset = 0
+    position = start
+    pending = b""
+    for data in iter_decompressed(name, storage):
+        data_start, offset = offset, offset + len(data)
+        if offset <= start:
+            continue
+        data = data[max(start - data_start, 0) :]
+        if end is not None:
+            data = data[: max(end - max(data_start, start), 0)]
+        pending += data
+        while len(pending) >= chunk_size:
+            yield position, pending[:chunk_size]
+            position += chunk_size
+            pending = pending[chunk_size:]
+        if end is not None and offset >= end:
+            break
+    if pending:
+        yield position, pending
+
+
+def read_range(name, offset, length, storage=None):
+    """Jak blobs.read_blob_range, ale po rozpakowanej zawartości."""
+    if length <= 0:
+        return b""
+    return b"".join(
+        chunk
+        for _, chunk in iter_range(
+            name, length, start=offset, end=offset + length, storage=storage
+        )
+    )
+
+
+def decoded(fileobj, encoding):
+    """Obiekt plikowy z rozpakowaną zawartością (np. do liczenia SHA-256)."""
+    if encoding == CODEC:
+        return gzip.GzipFile(fileobj=fileobj, mode="rb")
+    return fileobj
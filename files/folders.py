@@ -0,0 +1,260 @@
+"""
+Operacje na folderach (materializowana ścieżka Folder.path, np. "/12/45/").
+
+Wszystkie operacje są wyłącznie metadanymi: nazwa bloba nie zależy od folderu,
+więc przenoszenie i zmiana nazwy folderu to UPDATE w bazie, bez wywołań Azure.
+
+Ścieżki poddrzewa zależą od ścieżek przodków, więc zmiany drzewa jednego
+właściciela (tworzenie podfolderu, przeniesienie, usunięcie) serializujemy
+blokadą doradczą na czas transakcji, jak w changes.py, i dopiero pod nią
+czytamy aktualne ścieżki. Bez tego dwa równoległe przeniesienia (A do B
+i B do A) mogłyby utworzyć cykl, a przeniesienie przodka - zostawić
+nieaktualny prefiks w UPDATE poddrzewa.
+"""
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import CharField, Count, Func, Q, Sum, Value
+from django.db.models.functions import Concat, Substr
+from django.utils import timezone
+
+from logs.models import ActivityLog
+
+from . import changes
+from .models import FileChange, Folder, UserFile
+
+MAX_FOLDER_NAME_LENGTH = 255
+# Przestrzeń blokad doradczych drzewa folderów ("FO"; changes.py używa "FC")
+LOCK_NAMESPACE = 0x464F
+
+
+def clean_folder_name(name):
+    """Nazwa folderu bez ukośników i pustych/specjalnych wartości."""
+    name = (name or "").strip()
+    if not name or name in (".", "..") or "/" in name or "\\" in name:
+        raise ValueError("Nieprawidłowa nazwa folderu.")
+    if len(name) > MAX_FOLDER_NAME_LENGTH:
+        raise ValueError("Nazwa folderu jest za długa.")
+    return name
+
+
+def _child_path(parent, folder_id):
+    return f"{parent.path if parent else '/'}{folder_id}/"
+
+
+def _lock_tree(owner_id):
+    """Blokada drzewa folderów właściciela do końca bieżącej transakcji."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_advisory_xact_lock(%s, %s)",
+            [LOCK_NAMESPACE, owner_id % 2147483647],
+        )
+
+
+def _refresh_paths(*folders):
+    """Odświeża path podanych folderów z bazy (wywoływać pod _lock_tree)."""
+    folders = [folder for folder in folders if folder is not None]
+    paths = dict(
+        Folder.objects.filter(pk__in=[folder.pk for folder in folders]).values_list(
+            "pk", "path"
+        )
+    )
+    for folder in folders:
+        if folder.pk not in paths:
+            raise ValueError("Folder nie istnieje.")
+        folder.path = paths[folder.pk]
+
+
+def create_folder(user, name, parent=None):
+    name = clean_folder_name(name)
+    with transaction.atomic():
+        if parent is not None:
+            _lock_tree(user.pk)
+            _refresh_paths(parent)
+        folder = Folder.objects.create(owner=user, parent=parent, name=name)
+        folder.path = _child_path(parent, folder.pk)
+        folder.save(update_fields=["path"])
+    return folder
+
+
+def get_or_create_folder(user, name, parent=None):
+    folder = Folder.objects.filter(owner=user, parent=parent, name=name).first()
+    if folder is not None:
+        return folder
+    try:
+        return create_folder(user, name, parent)
+    except IntegrityError:
+        # Ktoś utworzył ten folder równolegle
+        return Folder.objects.get(owner=user, parent=parent, name=name)
+
+
+def split_path(directory):
+    """Segmenty ścieżki katalogu (bez pustych, "." i ".."), przycięte do długości nazwy."""
+    parts = []
+    for part in directory.replace("\\", "/").split("/"):
+        part = part.strip()[:MAX_FOLDER_NAME_LENGTH]
+        if part not in ("", ".", ".."):
+            parts.append(part)
+    return tuple(parts)
+
+
+def ensure_folders(user, directory, root=None, cache=None):
+    """
+    Zwraca folder odpowiadający ścieżce `directory` (np. "docs/2024")
+    względem `root`, tworząc brakujące foldery. `cache` (słownik) pozwala
+    nie odpytywać bazy o te same foldery przy wielu plikach z jednego ZIP-a.
+    """
+    cache = {} if cache is None else cache
+    folder = root
+    for part in split_path(directory):
+        key = (folder.pk if folder else None, part)
+        if key not in cache:
+            cache[key] = get_or_create_folder(user, part, folder)
+        folder = cache[key]
+    return folder
+
+
+def resolve_folders(user, directories, root=None):
+    """
+    Odwzorowuje ścieżki katalogów (krotki segmentów z split_path) względem
+    `root` na id istniejących folderów, bez ich tworzenia. Jedno zapytanie
+    na poziom zagłębienia. Zwraca {ścieżka: id}; katalog główny ma id `root`
+    (None), a nieistniejących katalogów nie ma w wyniku.
+    """
+    resolved = {(): root.pk if root else None}
+    pending = {d for d in directories if d}
+    depth = 1
+    while pending:
+        level = {d[:depth] for d in pending if d[: depth - 1] in resolved}
+        if not level:
+            break
+        parent_ids = {resolved[d[:-1]] for d in level}
+        names = {d[-1] for d in level}
+
+        condition = Q(parent_id__in=[p for p in parent_ids if p is not None])
+        if None in parent_ids:
+            condition |= Q(parent__isnull=True)
+        found = {
+            (parent_id, name): folder_id
+            for folder_id, parent_id, name in Folder.objects.filter(
+                condition, owner=user, name__in=names
+            ).values_list("id", "parent_id", "name")
+        }
+        for d in level:
+            folder_id = found.get((resolved[d[:-1]], d[-1]))
+            if folder_id is not None:
+                resolved[d] = folder_id
+
+        pending = {d for d in pending if len(d) > depth}
+        depth += 1
+    return resolved
+
+
+def move_folder(folder, parent=None, name=None):
+    """
+    Przenosi folder pod `parent` (None = katalog główny) i/lub zmienia jego nazwę.
+    Ścieżki całego poddrzewa aktualizujemy jednym UPDATE.
+    """
+    name = clean_folder_name(name) if name is not None else folder.name
+
+    with transaction.atomic():
+        # Równoległe zmiany drzewa wykonują się po kolei; ścieżki i warunek
+        # cyklu sprawdzamy na stanie po poprzednich zmianach
+        _lock_tree(folder.owner_id)
+        _refresh_paths(folder, parent)
+        if parent is not None and parent.path.startswith(folder.path):
+            raise ValueError(
+                "Nie można przenieść folderu do niego samego ani do podfolderu."
+            )
+        old_path = folder.path
+        new_path = _child_path(parent, folder.pk)
+        if new_path != old_path:
+            Folder.objects.filter(path__startswith=old_path).update(
+                path=Concat(Value(new_path), Substr("path", len(old_path) + 1))
+            )
+        folder.parent = parent
+        folder.name = name
+        folder.path = new_path
+        folder.save(update_fields=["parent", "name", "path"])
+    return folder
+
+
+def subtree_files(folder):
+    """Aktywne pliki w folderze i wszystkich jego podfolderach."""
+    return UserFile.objects.alive().filter(folder__path__startswith=folder.path)
+
+
+def folder_stats(folder):
+    """Rekurencyjny rozmiar i liczba plików folderu (jedno zapytanie)."""
+    stats = subtree_files(folder).aggregate(size=Sum("file_size"), files=Count("id"))
+    return {"size": stats["size"] or 0, "files_count": stats["files"]}
+
+
+def children_stats_queryset(user, parent=None):
+    """
+    Rekurencyjne rozmiary wszystkich bezpośrednich podfolderów `parent`
+    jednym zapytaniem: pliki poddrzewa grupujemy po pierwszym segmencie
+    ścieżki folderu za prefiksem rodzica.
+    """
+    prefix = parent.path if parent else "/"
+    return (
+        UserFile.objects.alive()
+        .filter(owner=user, folder__path__startswith=prefix)
+        .annotate(
+            child=Func(
+                Substr("folder__path", len(prefix) + 1),
+                Value("/"),
+                Value(1),
+                function="split_part",
+                output_field=CharField(),
+            )
+        )
+        .order_by()
+        .values("child")
+        .annotate(size=Sum("file_size"), files=Count("id"))
+    )
+
+
+def children_stats(user, parent=None):
+    """Statystyki bezpośrednich podfolderów: {id_podfolderu: {size, files_count}}."""
+    return {
+        int(row["child"]): {"size": row["size"] or 0, "files_count": row["files"]}
+        for row in children_stats_queryset(user, parent)
+        if row["child"]
+    }
+
+
+def ancestors(folder):
+    """Foldery od katalogu głównego do `folder` włącznie (jedno zapytanie)."""
+    ids = [int(part) for part in folder.path.strip("/").split("/") if part]
+    by_id = Folder.objects.in_bulk(ids)
+    return [by_id[i] for i in ids if i in by_id]
+
+
+def trash_folder(user, folder):
+    """
+    Przenosi pliki z całego poddrzewa do kosza i usuwa foldery.
+    Po przywróceniu z kosza pliki trafiają do katalogu głównego.
+    """
+    with transaction.atomic():
+        _lock_tree(folder.owner_id)
+        try:
+            _refresh_paths(folder)
+        except ValueError:
+            # Folder usunięto równolegle
+            return 0
+        file_ids = list(subtree_files(folder).values_list("pk", flat=True))
+        trashed = UserFile.objects.filter(pk__in=file_ids).update(
+            deleted_at=timezone.now()
+        )
+        Folder.objects.filter(path__startswith=folder.path).delete()
+        changes.record_changes(folder.owner_id, file_ids, FileChange.Kind.DELETE)
+
+    ActivityLog.objects.log(
+        user,
+        ActivityLog.ActionType.FILE_DELETE,
+        f"Usunięto folder '{folder.name}' ({trashed} plików przeniesiono do kosza)",
+        folder=folder.name,
+        folder_path=folder.path,
+        files=trashed,
+    )
+    return trashed
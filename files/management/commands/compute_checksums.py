@@ -0,0 +1,81 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from files.compression import decoded
+from files.models import UserFileVersion
+from files.uploads import file_sha256
+
+logger = logging.getLogger(__name__)
+
+
+def _checksum(version):
+    try:
+        with default_storage.open(version.file_path, "rb") as f:
+            # Suma dotyczy zawartości pliku, nie skompresowanego bloba
+            return version.pk, file_sha256(decoded(f, version.content_encoding))
+    except Exception as e:
+        logger.error(f"[CHECKSUM] Nie udało się policzyć sumy {version.file_path}: {e}")
+        return version.pk, None
+
+
+class Command(BaseCommand):
+    help = (
+        "Uzupełnia SHA-256 wersji plików wgranych przed wprowadzeniem sum "
+        "kontrolnych (potrzebne do POST /api/files/manifest/)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=200,
+            help="Liczba wersji w jednej partii.",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=8,
+            help="Liczba równolegle pobieranych blobów.",
+        )
+        parser.add_argument(
+            "--limit", type=int, default=None, help="Maksymalna liczba wersji."
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        limit = options["limit"]
+        processed = failed = 0
+        last_pk = 0
+
+        with ThreadPoolExecutor(max_workers=max(1, options["concurrency"])) as pool:
+            while limit is None or processed + failed < limit:
+                size = (
+                    batch_size
+                    if limit is None
+                    else min(batch_size, limit - processed - failed)
+                )
+                # Stronicowanie po kluczu głównym (bez kursorów serwerowych)
+                batch = list(
+                    UserFileVersion.objects.filter(sha256="", pk__gt=last_pk)
+                    .order_by("pk")
+                    .only("pk", "file_path", "content_encoding")[:size]
+                )
+                if not batch:
+                    break
+                last_pk = batch[-1].pk
+
+                for pk, checksum in pool.map(_checksum, batch):
+                    if checksum is None:
+                        failed += 1
+                        continue
+                    UserFileVersion.objects.filter(pk=pk).update(sha256=checksum)
+                    processed += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Uzupełniono sumy kontrolne {processed} wersji (błędy: {failed})."
+            )
+        )
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Q
+
+from files.models import UserFileRendition, UserFileVersion
+from files.renditions import IMAGE_EXTENSIONS, RENDITION_SIZES, generate_renditions
+
+
+class Command(BaseCommand):
+    help = (
+        "Generuje brakujące miniatury i podglądy obrazów "
+        "(np. dla plików wgranych przed wdrożeniem lub po restarcie workera)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--retry-failed",
+            action="store_true",
+            help="Ponów także renditions oznaczone jako nieudane.",
+        )
+        parser.add_argument(
+            "--limit", type=int, default=None, help="Maksymalna liczba wersji."
+        )
+
+    def handle(self, *args, **options):
+        image_filter = Q()
+        for ext in IMAGE_EXTENSIONS:
+            image_filter |= Q(original_filename__iendswith=ext)
+
+        done_statuses = [UserFileRendition.Status.READY]
+        if not options["retry_failed"]:
+            done_statuses.append(UserFileRendition.Status.FAILED)
+
+        versions = (
+            UserFileVersion.objects.filter(image_filter)
+            .annotate(
+                done=Count("renditions", filter=Q(renditions__status__in=done_statuses))
+            )
+            .filter(done__lt=len(RENDITION_SIZES))
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+        if options["limit"]:
+            versions = versions[: options["limit"]]
+
+        processed = 0
+        for version_id in versions.iterator():
+            generate_renditions(version_id)
+            processed += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Przetworzono {processed} wersji plików graficznych.")
+        )
@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from files.changes import PRUNE_BATCH_SIZE, prune_changes
+
+
+class Command(BaseCommand):
+    help = (
+        "Usuwa wpisy dziennika zmian plików starsze niż FILES_CHANGES_RETENTION_DAYS "
+        "(partiami). Do uruchamiania z crona."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than-days",
+            type=float,
+            default=settings.FILES_CHANGES_RETENTION_DAYS,
+            help="Usuń wpisy starsze niż tyle dni.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=PRUNE_BATCH_SIZE,
+            help="Liczba wpisów usuwanych w jednej partii.",
+        )
+
+    def handle(self, *args, **options):
+        deleted = prune_changes(
+            timedelta(days=options["older_than_days"]),
+            batch_size=max(1, options["batch_size"]),
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Usunięto {deleted} wpisów dziennika zmian.")
+        )
@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from files.services import purge_trash
+
+
+class Command(BaseCommand):
+    help = (
+        "Trwale usuwa pliki z kosza starsze niż FILES_TRASH_RETENTION_DAYS "
+        "(bloby bieżące i wszystkich wersji, partiami). Do uruchamiania z crona."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than-days",
+            type=float,
+            default=settings.FILES_TRASH_RETENTION_DAYS,
+            help="Usuń pliki leżące w koszu dłużej niż tyle dni (0 = wszystkie).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.FILES_PURGE_BATCH_SIZE,
+            help="Liczba plików w jednej partii (jednej transakcji).",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=settings.FILES_PURGE_CONCURRENCY,
+            help="Liczba równoległych usunięć blobów.",
+        )
+
+    def handle(self, *args, **options):
+        purged = purge_trash(
+            older_than=timedelta(days=options["older_than_days"]),
+            batch_size=max(1, options["batch_size"]),
+            max_workers=max(1, options["concurrency"]),
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Usunięto trwale {purged} plików z kosza.")
+        )
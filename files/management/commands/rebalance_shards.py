@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from files.rebalance import DEFAULT_BATCH_SIZE, rebalance
+
+
+class Command(BaseCommand):
+    help = (
+        "Przenosi bloby na shardy wskazane przez pierścień (po dodaniu lub "
+        "opróżnianiu shardu). Działa online i można go wznawiać."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Liczba plików w jednej partii.",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=8,
+            help="Liczba równoległych kopii blobów.",
+        )
+        parser.add_argument(
+            "--keep-source",
+            action="store_true",
+            help="Nie usuwaj starych blobów (usunie je później reconcile_blobs).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Tylko policz bloby do przeniesienia.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            report = rebalance(
+                batch_size=max(1, options["batch_size"]),
+                concurrency=options["concurrency"],
+                delete_source=not options["keep_source"],
+                dry_run=options["dry_run"],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        verb = "Do przeniesienia" if options["dry_run"] else "Przeniesiono"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{verb}: {report.moved} blobów z {report.files} plików "
+                f"(pominięte w Archive: {report.skipped_archive}, "
+                f"nieaktualne: {report.stale}, błędy: {report.failed})."
+            )
+        )
@@ -0,0 +1,88 @@
+import json
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from files.reconcile import DEFAULT_PREFIX, reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        "Wyszukuje bloby bez wpisu w bazie (UserFile, wersje, renditions) "
+        "i - z opcją --delete - usuwa je partiami. Domyślnie tylko raport (dry run)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--prefix", default=DEFAULT_PREFIX)
+        parser.add_argument(
+            "--grace-hours",
+            type=float,
+            default=24,
+            help="Pomiń bloby młodsze niż tyle godzin (uploady w toku).",
+        )
+        parser.add_argument(
+            "--delete",
+            action="store_true",
+            help="Usuń znalezione sieroty (bez tej opcji tylko raport).",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=8,
+            help="Liczba równoległych listowań i partii usuwania.",
+        )
+        parser.add_argument(
+            "--report",
+            help="Zapisz listę sierot do pliku (JSON Lines: name, size, last_modified).",
+        )
+        parser.add_argument(
+            "--temp-dir",
+            help="Katalog na tymczasowy zbiór ścieżek z bazy (domyślnie systemowy).",
+        )
+
+    def handle(self, *args, **options):
+        report_file = open(options["report"], "w") if options["report"] else None
+
+        def on_orphan(entry):
+            if report_file:
+                report_file.write(
+                    json.dumps(
+                        {
+                            "name": entry.name,
+                            "size": entry.size,
+                            "last_modified": (
+                                entry.last_modified.isoformat()
+                                if entry.last_modified
+                                else None
+                            ),
+                        }
+                    )
+                    + "\n"
+                )
+            if options["verbosity"] > 1:
+                self.stdout.write(f"  {entry.name} ({entry.size} B)")
+
+        try:
+            report = reconcile(
+                prefix=options["prefix"],
+                grace=timedelta(hours=options["grace_hours"]),
+                dry_run=not options["delete"],
+                concurrency=max(1, options["concurrency"]),
+                on_orphan=on_orphan,
+                temp_dir=options["temp_dir"],
+            )
+        finally:
+            if report_file:
+                report_file.close()
+
+        mode = "usunięto" if options["delete"] else "dry run, nic nie usunięto"
+        self.stdout.write(
+            f"Przejrzano {report.scanned} blobów: {report.referenced} w użyciu, "
+            f"{report.skipped_recent} młodszych niż okres karencji, "
+            f"{report.orphans} sierot ({report.orphan_bytes / 1024 / 1024:.1f} MB)."
+        )
+        if options["delete"] and report.failed:
+            self.stdout.write(
+                self.style.WARNING(f"Nie udało się usunąć {report.failed} blobów.")
+            )
+        self.stdout.write(self.style.SUCCESS(f"Gotowe ({mode}: {report.deleted})."))
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from files.tiering import tier_blobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Przenosi rzadko odczytywane bloby do warstw Cool / Archive (partiami) "
+        "i kończy zakończone przywracania z Archive. Do uruchamiania z crona."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.FILES_TIER_BATCH_SIZE,
+            help="Liczba blobów przenoszonych w jednej partii.",
+        )
+
+    def handle(self, *args, **options):
+        report = tier_blobs(batch_size=max(1, options["batch_size"]))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Przywrócone z archiwum: {report['rehydrated']}, "
+                f"do Cool: {report['cool']}, do Archive: {report['archive']}, "
+                f"wersje do Archive: {report['versions_archive']}."
+            )
+        )
@@ -0,0 +1,126 @@
+"""
+Porównanie manifestu klienta ({path, size, hash}) z plikami na koncie.
+
+Klient synchronizujący katalog wysyła listę swoich plików z rozmiarem
+i SHA-256, a dostaje z powrotem tylko pliki nowe i zmienione - niezmienione
+nie są przesyłane ponownie. Ścieżka to katalogi (foldery) + nazwa pliku,
+względem wskazanego folderu albo katalogu głównego.
+"""
+
+import re
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db.models import OuterRef, Q, Subquery
+
+from . import folders
+from .models import UserFile, UserFileVersion
+
+_SHA256_RE = re.compile(r"^(sha256:)?([0-9a-fA-F]{64})$")
+
+
+class ManifestEntry(NamedTuple):
+    path: str
+    directory: tuple
+    filename: str
+    size: int
+    sha256: str
+
+
+def parse_entries(items):
+    """Sprawdza i normalizuje wpisy manifestu; błędy zgłasza jako ValueError."""
+    if not isinstance(items, list):
+        raise ValueError('Pole "files" musi być listą.')
+    if len(items) > settings.FILES_MANIFEST_MAX_ENTRIES:
+        raise ValueError(
+            f"Manifest może mieć najwyżej {settings.FILES_MANIFEST_MAX_ENTRIES} plików."
+        )
+
+    entries = []
+    for index, item in enumerate(items):
+        try:
+            path = str(item["path"])
+            size = int(item["size"])
+            match = _SHA256_RE.match(str(item["hash"]))
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"Wpis {index}: wymagane pola path, size i hash.")
+        parts = folders.split_path(path)
+        if not parts or size < 0 or match is None:
+            raise ValueError(f"Wpis {index}: nieprawidłowa ścieżka, rozmiar lub hash.")
+        entries.append(
+            ManifestEntry(path, parts[:-1], parts[-1], size, match.group(2).lower())
+        )
+    return entries
+
+
+def _current_files(user, folder_ids, filenames):
+    """Aktywne pliki w podanych folderach z rozmiarem i SHA-256 bieżącej wersji."""
+    latest_sha256 = (
+        UserFileVersion.objects.filter(user_file=OuterRef("pk"))
+        .order_by("-version_number")
+        .values("sha256")[:1]
+    )
+    condition = Q(folder_id__in=[i for i in folder_ids if i is not None])
+    if None in folder_ids:
+        condition |= Q(folder__isnull=True)
+    queryset = UserFile.objects.alive().filter(
+        condition, owner=user, original_filename__in=filenames
+    )
+
+    files = {}
+    for row in (
+        queryset.annotate(sha256=Subquery(latest_sha256))
+        .order_by("-uploaded_at")
+        .values("id", "folder_id", "original_filename", "file_size", "sha256")
+    ):
+        files.setdefault((row["folder_id"], row["original_filename"]), []).append(row)
+    return files
+
+
+def diff_manifest(user, entries, root=None):
+    """
+    Zwraca (zmiany, liczba niezmienionych). Zmiana to słownik z polami
+    path, status ("new" albo "changed"), id (plik do nowej wersji), folder
+    (id folderu docelowego, None = katalog główny) i folder_exists (False,
+    gdy katalogu jeszcze nie ma i trzeba go utworzyć przed uploadem).
+    """
+    resolved = folders.resolve_folders(user, {e.directory for e in entries}, root=root)
+    folder_ids = {resolved[e.directory] for e in entries if e.directory in resolved}
+    current = (
+        _current_files(user, folder_ids, {e.filename for e in entries})
+        if folder_ids
+        else {}
+    )
+
+    result = []
+    unchanged = 0
+    for entry in entries:
+        if entry.directory not in resolved:
+            result.append(
+                {
+                    "path": entry.path,
+                    "status": "new",
+                    "id": None,
+                    "folder": None,
+                    "folder_exists": False,
+                }
+            )
+            continue
+        folder_id = resolved[entry.directory]
+        candidates = current.get((folder_id, entry.filename), [])
+        if any(
+            c["file_size"] == entry.size and c["sha256"] == entry.sha256
+            for c in candidates
+        ):
+            unchanged += 1
+            continue
+        result.append(
+            {
+                "path": entry.path,
+                "status": "changed" if candidates else "new",
+                "id": candidates[0]["id"] if candidates else None,
+                "folder": folder_id,
+                "folder_exists": True,
+            }
+        )
+    return result, unchanged
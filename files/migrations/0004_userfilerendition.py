@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0003_fix_restored_from_version_column'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserFileRendition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('thumbnail', 'Miniatura'), ('preview', 'Podgląd')], max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'Oczekuje'), ('ready', 'Gotowy'), ('failed', 'Błąd')], default='pending', max_length=20)),
+                ('format', models.CharField(blank=True, max_length=10)),
+                ('file_path', models.CharField(blank=True, max_length=512)),
+                ('width', models.PositiveIntegerField(blank=True, null=True)),
+                ('height', models.PositiveIntegerField(blank=True, null=True)),
+                ('file_size', models.BigIntegerField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('version', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='renditions', to='files.userfileversion')),
+            ],
+            options={
+                'unique_together': {('version', 'kind')},
+            },
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Indeksy na dużych tabelach budujemy bez blokowania zapisów
+    atomic = False
+
+    dependencies = [
+        ("files", "0004_userfilerendition"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="userfile",
+            index=models.Index(
+                fields=["owner", "-uploaded_at"], name="files_owner_uploaded_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="userfile",
+            index=models.Index(
+                fields=["owner", "original_filename"], name="files_owner_name_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="userfile",
+            index=models.Index(
+                fields=["owner", "file_size"], name="files_owner_size_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="userfile",
+            index=models.Index(fields=["-uploaded_at"], name="files_uploaded_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="userfile",
+            index=models.Index(fields=["original_filename"], name="files_name_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="userfile",
+            index=models.Index(fields=["file_size"], name="files_size_idx"),
+        ),
+        # Stary indeks na samym FK usuwamy dopiero, gdy są już indeksy złożone
+        migrations.AlterField(
+            model_name="userfile",
+            name="owner",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="files",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+    ]
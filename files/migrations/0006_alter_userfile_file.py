@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:11
+
+import files.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("files", "0005_alter_userfile_owner_and_more"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="userfile",
+            name="file",
+            field=models.FileField(
+                max_length=512, upload_to=files.models.user_directory_path
+            ),
+        ),
+    ]
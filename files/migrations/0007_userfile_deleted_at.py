@@ -0,0 +1,114 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:18
+
+from django.conf import settings
+from django.contrib.postgres.operations import (
+    AddIndexConcurrently,
+    RemoveIndexConcurrently,
+)
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Indeksy na dużych tabelach budujemy bez blokowania zapisów
+    atomic = False
+
+    dependencies = [
+        ("files", "0006_alter_userfile_file"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userfile",
+            name="deleted_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        RemoveIndexConcurrently(
+            model_name="userfile",
+            name="files_owner_uploaded_idx",
+        ),
+        AddIndexConcurrently(
+            model_name="userfile",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["owner", "-uploaded_at"],
+                name="files_owner_uploaded_idx",
+            ),
+        ),
+        RemoveIndexConcurrently(
+            model_name="userfile",
+            name="files_owner_name_idx",
+        ),
+        AddIndexConcurrently(
+            model_name="userfile",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["owner", "original_filename"],
+                name="files_owner_name_idx",
+            ),
+        ),
+        RemoveIndexConcurrently(
+            model_name="userfile",
+            name="files_owner_size_idx",
+        ),
+        AddIndexConcurrently(
+            model_name="userfile",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["owner", "file_size"],
+                name="files_owner_size_idx",
+            ),
+        ),
+        RemoveIndexConcurrently(
+            model_name="userfile",
+            name="files_uploaded_idx",
+        ),
+        AddIndexConcurrently(
+            model_name="userfile",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["-uploaded_at"],
+                name="files_uploaded_idx",
+            ),
+        ),
+        RemoveIndexConcurrently(
+            model_name="userfile",
+            name="files_name_idx",
+        ),
+        AddIndexConcurrently(
+            model_name="userfile",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["original_filename"],
+                name="files_name_idx",
+            ),
+        ),
+        RemoveIndexConcurrently(
+            model_name="userfile",
+            name="files_size_idx",
+        ),
+        AddIndexConcurrently(
+            model_name="userfile",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["file_size"],
+                name="files_size_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="userfile",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", False)),
+                fields=["owner", "-deleted_at"],
+                name="files_owner_trash_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="userfile",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", False)),
+                fields=["deleted_at"],
+                name="files_trash_idx",
+            ),
+        ),
+    ]
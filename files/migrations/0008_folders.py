@@ -0,0 +1,101 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Indeks na dużej tabeli plików budujemy bez blokowania zapisów
+    atomic = False
+
+    dependencies = [
+        ("files", "0007_userfile_deleted_at"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Folder",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=255)),
+                ("path", models.CharField(blank=True, max_length=1024)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "owner",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="folders",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "parent",
+                    models.ForeignKey(
+                        blank=True,
+                        db_index=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="children",
+                        to="files.folder",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["name"],
+            },
+        ),
+        migrations.AddField(
+            model_name="userfile",
+            name="folder",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="files",
+                to="files.folder",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="userfile",
+            index=models.Index(
+                fields=["folder", "-uploaded_at"], name="files_folder_uploaded_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="folder",
+            index=models.Index(
+                fields=["path"],
+                name="folders_path_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="folder",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("parent__isnull", False)),
+                fields=("parent", "name"),
+                name="folders_unique_name",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="folder",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("parent__isnull", True)),
+                fields=("owner", "name"),
+                name="folders_unique_root_name",
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("files", "0009_filechange"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userfileversion",
+            name="sha256",
+            field=models.CharField(blank=True, default="", max_length=64),
+        ),
+    ]
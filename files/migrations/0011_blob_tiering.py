@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:35
+
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Indeksy na dużych tabelach budujemy bez blokowania zapisów
+    atomic = False
+
+    dependencies = [
+        ("files", "0010_userfileversion_sha256"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userfile",
+            name="access_count",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="userfile",
+            name="blob_tier",
+            field=models.CharField(
+                choices=[
+                    ("hot", "Hot"),
+                    ("cool", "Cool"),
+                    ("archive", "Archive"),
+                    ("rehydrating", "Przywracanie z archiwum"),
+                ],
+                default="hot",
+                max_length=12,
+            ),
+        ),
+        migrations.AddField(
+            model_name="userfile",
+            name="last_accessed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="userfileversion",
+            name="blob_tier",
+            field=models.CharField(
+                choices=[
+                    ("hot", "Hot"),
+                    ("cool", "Cool"),
+                    ("archive", "Archive"),
+                    ("rehydrating", "Przywracanie z archiwum"),
+                ],
+                default="hot",
+                max_length=12,
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="userfile",
+            index=models.Index(
+                models.F("blob_tier"),
+                django.db.models.functions.comparison.Coalesce(
+                    "last_accessed_at", "uploaded_at"
+                ),
+                condition=models.Q(
+                    ("blob_tier__in", ["hot", "cool"]), ("deleted_at__isnull", True)
+                ),
+                name="files_tiering_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="userfileversion",
+            index=models.Index(
+                condition=models.Q(("blob_tier__in", ["hot", "cool"])),
+                fields=["created_at"],
+                name="versions_tiering_idx",
+            ),
+        ),
+    ]
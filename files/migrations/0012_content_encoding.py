@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("files", "0011_blob_tiering"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userfile",
+            name="content_encoding",
+            field=models.CharField(blank=True, default="", max_length=16),
+        ),
+        migrations.AddField(
+            model_name="userfileversion",
+            name="content_encoding",
+            field=models.CharField(blank=True, default="", max_length=16),
+        ),
+    ]
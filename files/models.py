@@ -1,7 +1,9 @@
 import os
 import re
+import time
 from datetime import datetime
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.conf import settings
 import logging
 
@@ -14,65 +16,181 @@ def sanitize_filename(filename):
     Oczyszcza nazwę pliku dla Azure Blob Storage.
     Usuwa polskie znaki, spacje, znaki specjalne.
     """
-    logger.info(f"[SANITIZE] Oryginalna nazwa: {filename}")
-
     # Rozdziel nazwę i rozszerzenie
     name, ext = os.path.splitext(filename)
-    logger.info(f"[SANITIZE] Nazwa: {name}, Rozszerzenie: {ext}")
 
     # Usuń znaki nie-ASCII (polskie znaki, emoji, etc.)
     name = name.encode("ascii", "ignore").decode("ascii")
-    logger.info(f"[SANITIZE] Po usunięciu non-ASCII: {name}")
 
     # Zamień spacje i myślniki na podkreślniki
     name = name.replace(" ", "_").replace("-", "_")
-    logger.info(f"[SANITIZE] Po zamianie spacji: {name}")
 
     # Usuń wszystko oprócz liter, cyfr i podkreślników
     name = re.sub(r"[^a-zA-Z0-9_]", "", name)
-    logger.info(f"[SANITIZE] Po usunięciu znaków specjalnych: {name}")
 
     # Zamień na lowercase
     name = name.lower()
-    logger.info(f"[SANITIZE] Po lowercase: {name}")
 
     # Jeśli nazwa jest pusta (np. był tylko emoji), użyj domyślnej
     if not name:
         name = f"file_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        logger.info(f"[SANITIZE] Nazwa była pusta, użyto: {name}")
 
     # Ogranicz długość do 100 znaków
     name = name[:100]
 
     result = f"{name}{ext.lower()}"
-    logger.info(f"[SANITIZE] FINALNA nazwa: {result}")
+
+    # Jedno zdarzenie zamiast logu po każdym kroku; przy poziomie INFO nic nie kosztuje
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "[SANITIZE] %s -> %s",
+            filename,
+            result,
+            extra={
+                "event": "sanitize_filename",
+                "original": filename,
+                "result": result,
+            },
+        )
 
     return result
 
 
-def user_directory_path(instance, filename):
+_CROCKFORD_BASE32 = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+
+def new_ulid():
     """
-    Generuje bezpieczną ścieżkę dla uploadu.
-    Format: user_uploads/user_id/sanitized_filename
+    ULID: 48 bitów czasu w ms + 80 bitów losowych, 26 znaków Crockford base32.
+    Unikalny bez sprawdzania w storage i sortowalny po czasie utworzenia.
     """
-    logger.info(
-        f"[UPLOAD_PATH] Wejście - filename: {filename}, user: {instance.owner.username}, user_id: {instance.owner.id}"
+    value = (int(time.time() * 1000) << 80) | int.from_bytes(os.urandom(10), "big")
+    return "".join(
+        _CROCKFORD_BASE32[(value >> shift) & 31] for shift in range(125, -1, -5)
     )
 
-    sanitized = sanitize_filename(filename)
-    path = f"user_uploads/{instance.owner.id}/{sanitized}"
 
-    logger.info(f"[UPLOAD_PATH] FINALNA ścieżka: {path}")
+def user_directory_path(instance, filename):
+    """
+    Generuje bezpieczną, unikalną ścieżkę dla uploadu.
+    Format: user_uploads/user_id/ULID/sanitized_filename
+
+    Ścieżka jest unikalna z konstrukcji, więc storage nie musi sprawdzać
+    exists() przed zapisem (overwrite_files=True w settings.STORAGES).
+    """
+    # owner_id zamiast owner.id - bez dodatkowego zapytania o użytkownika
+    path = (
+        f"user_uploads/{instance.owner_id}/{new_ulid()}/{sanitize_filename(filename)}"
+    )
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "[UPLOAD_PATH] %s -> %s",
+            filename,
+            path,
+            extra={"event": "upload_path", "user_id": instance.owner_id, "path": path},
+        )
 
     return path
 
 
+class Folder(models.Model):
+    """
+    Folder użytkownika z materializowaną ścieżką.
+
+    path to ciąg id przodków i samego folderu, np. "/12/45/" - dzięki temu
+    poddrzewo to jedno zapytanie LIKE '/12/%' po indeksie, a przeniesienie
+    folderu to jeden UPDATE ścieżek poddrzewa (bez zmian w blobach).
+    """
+
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="folders",
+        db_index=False,
+    )
+    parent = models.ForeignKey(
+        "self",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="children",
+        db_index=False,
+    )
+    name = models.CharField(max_length=255)
+    path = models.CharField(max_length=1024, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["name"]
+        indexes = [
+            # Poddrzewo: path LIKE '/12/%'
+            models.Index(
+                fields=["path"],
+                name="folders_path_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+        ]
+        # Unikalne nazwy w folderze - te indeksy obsługują też listę
+        # bezpośrednich podfolderów (parent = X albo owner = Y AND parent IS NULL)
+        constraints = [
+            models.UniqueConstraint(
+                fields=["parent", "name"],
+                condition=models.Q(parent__isnull=False),
+                name="folders_unique_name",
+            ),
+            models.UniqueConstraint(
+                fields=["owner", "name"],
+                condition=models.Q(parent__isnull=True),
+                name="folders_unique_root_name",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} (Owner: {self.owner_id})"
+
+
+class BlobTier(models.TextChoices):
+    """Warstwa dostępu bloba w Azure (files/tiering.py)."""
+
+    HOT = "hot", "Hot"
+    COOL = "cool", "Cool"
+    ARCHIVE = "archive", "Archive"
+    # Zlecone przeniesienie z Archive do Hot (trwa do kilkunastu godzin)
+    REHYDRATING = "rehydrating", "Przywracanie z archiwum"
+
+
+class UserFileQuerySet(models.QuerySet):
+    def alive(self):
+        """Pliki poza koszem."""
+        return self.filter(deleted_at__isnull=True)
+
+    def trashed(self):
+        """Pliki w koszu."""
+        return self.filter(deleted_at__isnull=False)
+
+
 class UserFile(models.Model):
+    # Bez osobnego indeksu - owner jest prefiksem indeksów złożonych w Meta
     owner = models.ForeignKey(
-        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="files"
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="files",
+        db_index=False,
     )
 
-    file = models.FileField(upload_to=user_directory_path)
+    file = models.FileField(upload_to=user_directory_path, max_length=512)
+
+    # Folder (None = katalog główny). Nazwa bloba nie zależy od folderu,
+    # więc przenoszenie plików i folderów nie dotyka storage
+    folder = models.ForeignKey(
+        Folder,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="files",
+        db_index=False,
+    )
 
     # --- Pola dla "Przeglądania listy plików" ---
 
@@ -88,44 +206,138 @@ class UserFile(models.Model):
     # Flaga dla "Wysyłanie kilku plików na raz (np. ZIP)"
     is_zip = models.BooleanField(default=False)
 
+    # Kosz: data przeniesienia do kosza (None = plik aktywny)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+
+    # Liczniki odczytów (view/download), zapisywane zbiorczo przez files/access.py
+    access_count = models.BigIntegerField(default=0)
+    last_accessed_at = models.DateTimeField(null=True, blank=True)
+    # Warstwa bieżącego bloba - rzadko używane pliki przenosi tier_blobs
+    blob_tier = models.CharField(
+        max_length=12, choices=BlobTier.choices, default=BlobTier.HOT
+    )
+    # Kompresja bieżącego bloba (files/compression.py), "" = zapisany bez zmian
+    content_encoding = models.CharField(max_length=16, blank=True, default="")
+
+    objects = UserFileQuerySet.as_manager()
+
     class Meta:
         ordering = ["-uploaded_at"]  # Sortuj od najnowszych
-
-    def create_version_snapshot(self, restored_from_version: int | None = None):
+        indexes = [
+            # Lista plików użytkownika w każdym sortowaniu z frontendu
+            # (indeksy częściowe - tylko pliki spoza kosza)
+            models.Index(
+                fields=["owner", "-uploaded_at"],
+                name="files_owner_uploaded_idx",
+                condition=models.Q(deleted_at__isnull=True),
+            ),
+            models.Index(
+                fields=["owner", "original_filename"],
+                name="files_owner_name_idx",
+                condition=models.Q(deleted_at__isnull=True),
+            ),
+            models.Index(
+                fields=["owner", "file_size"],
+                name="files_owner_size_idx",
+                condition=models.Q(deleted_at__isnull=True),
+            ),
+            # Widok admina (all_files=true) bez filtra właściciela
+            models.Index(
+                fields=["-uploaded_at"],
+                name="files_uploaded_idx",
+                condition=models.Q(deleted_at__isnull=True),
+            ),
+            models.Index(
+                fields=["original_filename"],
+                name="files_name_idx",
+                condition=models.Q(deleted_at__isnull=True),
+            ),
+            models.Index(
+                fields=["file_size"],
+                name="files_size_idx",
+                condition=models.Q(deleted_at__isnull=True),
+            ),
+            # Zawartość jednego folderu i sumy rozmiarów poddrzewa (bez warunku -
+            # obsługuje też SET_NULL na plikach z kosza przy usuwaniu folderu)
+            models.Index(
+                fields=["folder", "-uploaded_at"], name="files_folder_uploaded_idx"
+            ),
+            # Kosz użytkownika i wyszukiwanie wygasłych plików przez purge_trash
+            models.Index(
+                fields=["owner", "-deleted_at"],
+                name="files_owner_trash_idx",
+                condition=models.Q(deleted_at__isnull=False),
+            ),
+            models.Index(
+                fields=["deleted_at"],
+                name="files_trash_idx",
+                condition=models.Q(deleted_at__isnull=False),
+            ),
+            # Najdawniej używane pliki w danej warstwie (tier_blobs)
+            models.Index(
+                "blob_tier",
+                Coalesce("last_accessed_at", "uploaded_at"),
+                name="files_tiering_idx",
+                condition=models.Q(
+                    deleted_at__isnull=True,
+                    blob_tier__in=[BlobTier.HOT, BlobTier.COOL],
+                ),
+            ),
+        ]
+
+    def create_version_snapshot(
+        self, restored_from_version: int | None = None, sha256: str = ""
+    ):
         """
         Tworzy nowy wpis wersji na podstawie aktualnego stanu pliku.
         Używane przy pierwszym uploadzie, tworzeniu nowej wersji oraz przy przywracaniu.
+        `sha256` to suma kontrolna zawartości (policzona przy uploadzie).
         """
         latest = self.versions.order_by("-version_number").first()
         next_number = (latest.version_number + 1) if latest else 1
 
-        return UserFileVersion.objects.create(
+        version = UserFileVersion.objects.create(
             user_file=self,
             version_number=next_number,
             file_path=self.file.name,
             original_filename=self.original_filename,
             file_size=self.file_size,
             restored_from_version=restored_from_version,
+            sha256=sha256 or "",
+            content_encoding=self.content_encoding,
         )
 
+        # Miniatury i podglądy generujemy w tle, po zatwierdzeniu transakcji
+        from .renditions import schedule_renditions
+
+        schedule_renditions(version)
+        return version
+
     def save(self, *args, **kwargs):
         """Automatycznie ustaw rozmiar i oryginalną nazwę przy tworzeniu"""
-        logger.info(f"[MODEL SAVE] Rozpoczynam save(), pk: {self.pk}")
-
         if not self.pk:  # Tylko przy pierwszym zapisie
             if self.file:
-                self.file_size = self.file.size
-                logger.info(f"[MODEL SAVE] Ustawiono file_size: {self.file_size}")
+                # Rozmiar zwykle znamy już z uploadu - unikamy zapytania do storage
+                if self.file_size is None:
+                    self.file_size = self.file.size
 
                 if not self.original_filename:
                     self.original_filename = self.file.name
-                    logger.info(
-                        f"[MODEL SAVE] Ustawiono original_filename: {self.original_filename}"
-                    )
 
-        logger.info("[MODEL SAVE] Wywołuję super().save()")
         super().save(*args, **kwargs)
-        logger.info("[MODEL SAVE] Zakończono super().save() - plik zapisany w Azure")
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "[MODEL SAVE] UserFile %s zapisany (%s B)",
+                self.pk,
+                self.file_size,
+                extra={
+                    "event": "user_file_saved",
+                    "file_id": self.pk,
+                    "path": self.file.name,
+                    "file_size": self.file_size,
+                },
+            )
 
     def __str__(self):
         return f"{self.original_filename} (Owner: {self.owner.username})"
@@ -143,6 +355,9 @@ class UserFileVersion(models.Model):
     - version_number: V1, V2, ...
     - file_path: ścieżka w Azure Blob (backup konkretnego bloba)
     - created_at: data utworzenia danej wersji
+    - sha256: suma kontrolna zawartości (pusta dla wersji sprzed jej wprowadzenia,
+      uzupełnia je compute_checksums)
+    - content_encoding: kompresja bloba w spoczynku ("" = brak)
     """
 
     user_file = models.ForeignKey(
@@ -156,10 +371,98 @@ class UserFileVersion(models.Model):
     # Jeśli wersja powstała w wyniku przywrócenia starszej wersji,
     # tutaj zapisujemy numer wersji źródłowej (np. 1, gdy przywrócono V1).
     restored_from_version = models.PositiveIntegerField(null=True, blank=True)
+    sha256 = models.CharField(max_length=64, blank=True, default="")
+    blob_tier = models.CharField(
+        max_length=12, choices=BlobTier.choices, default=BlobTier.HOT
+    )
+    # Kodek bloba wersji (np. "gzip"); file_size i sha256 dotyczą zawartości
+    content_encoding = models.CharField(max_length=16, blank=True, default="")
 
     class Meta:
         ordering = ["-version_number"]
         unique_together = ("user_file", "version_number")
+        indexes = [
+            # Stare wersje do przeniesienia do Archive (tier_blobs)
+            models.Index(
+                fields=["created_at"],
+                name="versions_tiering_idx",
+                condition=models.Q(blob_tier__in=[BlobTier.HOT, BlobTier.COOL]),
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user_file.original_filename} - V{self.version_number}"
+
+
+class UserFileRendition(models.Model):
+    """
+    Pomniejszona kopia obrazu (miniatura lub podgląd) dla konkretnej wersji pliku.
+
+    - kind: rodzaj renderingu (thumbnail / preview)
+    - file_path: ścieżka bloba obok oryginału w Azure Blob
+    - status: pending -> ready / failed (generowane w tle)
+    """
+
+    class Kind(models.TextChoices):
+        THUMBNAIL = "thumbnail", "Miniatura"
+        PREVIEW = "preview", "Podgląd"
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Oczekuje"
+        READY = "ready", "Gotowy"
+        FAILED = "failed", "Błąd"
+
+    version = models.ForeignKey(
+        UserFileVersion, on_delete=models.CASCADE, related_name="renditions"
+    )
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    status = models.CharField(
+        max_length=20, choices=Status.choices, default=Status.PENDING
+    )
+    format = models.CharField(max_length=10, blank=True)
+    file_path = models.CharField(max_length=512, blank=True)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    file_size = models.BigIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("version", "kind")
+
+    def __str__(self):
+        return f"{self.version} - {self.kind} ({self.status})"
+
+
+class FileChange(models.Model):
+    """
+    Dziennik zmian plików dla synchronizacji przyrostowej (GET /api/files/changes/).
+
+    id to rosnący numer zmiany (token synchronizacji). file_id nie jest kluczem
+    obcym - wpis o usunięciu musi przetrwać trwałe usunięcie pliku.
+    """
+
+    class Kind(models.TextChoices):
+        CREATE = "create", "Utworzenie"
+        UPDATE = "update", "Zmiana"
+        DELETE = "delete", "Usunięcie"
+
+    id = models.BigAutoField(primary_key=True)
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="file_changes",
+        db_index=False,
+    )
+    file_id = models.BigIntegerField()
+    kind = models.CharField(max_length=10, choices=Kind.choices)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Zmiany użytkownika od tokenu: owner = X AND id > N ORDER BY id
+            models.Index(fields=["owner", "id"], name="file_changes_owner_idx"),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} {self.kind} {self.file_id} (Owner: {self.owner_id})"
@@ -0,0 +1,289 @@
+"""
+Podgląd plików tekstowych bez pobierania całego bloba.
+
+Odczytujemy tylko okno N KB (od początku, od końca lub od wskazanego bajtu /
+numeru linii) za pomocą odczytu Range, wykrywamy kodowanie i zwracamy tekst
+wyrównany do pełnych linii. Wyniki są cache'owane per wersja pliku (każda
+wersja ma własny blob, więc ścieżka bloba jednoznacznie ją identyfikuje).
+Offsety dotyczą zawartości rozpakowanej - bloby skompresowane
+(files/compression.py, najwyżej FILES_COMPRESSION_MAX_SIZE) czytamy przez
+strumieniowe rozpakowanie.
+"""
+
+import codecs
+import hashlib
+
+from django.core.cache import cache
+
+from . import compression
+from .blobs import iter_blob_chunks, read_blob_range
+
+PREVIEW_DEFAULT_KB = 64
+PREVIEW_MAX_KB = 1024
+
+# Ile bajtów z początku pliku analizujemy przy wykrywaniu kodowania
+ENCODING_SAMPLE_SIZE = 8 * 1024
+
+# Indeks linii: zapamiętujemy offset co LINE_INDEX_STEP linii
+LINE_INDEX_STEP = 1000
+LINE_INDEX_CHUNK_SIZE = 4 * 1024 * 1024
+
+PREVIEW_CACHE_TIMEOUT = 60 * 60
+LINE_INDEX_CACHE_TIMEOUT = 24 * 60 * 60
+
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+)
+
+
+def _version_key(user_file):
+    return hashlib.sha1(user_file.file.name.encode("utf-8")).hexdigest()
+
+
+def _read(user_file, offset, length):
+    read = compression.read_range if user_file.content_encoding else read_blob_range
+    return read(user_file.file.name, offset, length, storage=user_file.file.storage)
+
+
+def _iter_chunks(user_file, chunk_size):
+    iterate = compression.iter_range if user_file.content_encoding else iter_blob_chunks
+    return iterate(
+        user_file.file.name,
+        chunk_size,
+        end=user_file.file_size,
+        storage=user_file.file.storage,
+    )
+
+
+def detect_encoding(sample):
+    """
+    Zwraca (kodowanie, długość BOM). Kodowanie None oznacza plik binarny.
+    Kolejność: BOM -> UTF-8 -> CP1250 (typowe dla polskich plików z Windows).
+    """
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding, len(bom)
+
+    if b"\x00" in sample:
+        return None, 0
+
+    try:
+        # final=False - ucięty wielobajtowy znak na końcu próbki nie jest błędem
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8", 0
+    except UnicodeDecodeError:
+        return "cp1250", 0
+
+
+def _file_info(user_file):
+    """Kodowanie i BOM pliku - liczone raz na wersję (jeden mały odczyt Range)."""
+    key = f"files:preview:info:{_version_key(user_file)}"
+    info = cache.get(key)
+    if info is None:
+        sample = _read(user_file, 0, ENCODING_SAMPLE_SIZE)
+        encoding, bom_length = detect_encoding(sample)
+        info = {"encoding": encoding, "bom_length": bom_length}
+        cache.set(key, info, LINE_INDEX_CACHE_TIMEOUT)
+    return info
+
+
+def _newline(encoding):
+    return "\n".encode(encoding)
+
+
+def _decode_window(data, encoding, start, end, total_size, aligned_start):
+    """
+    Wyrównuje okno bajtów do pełnych linii i dekoduje je.
+    Zwraca (tekst, faktyczny początek, faktyczny koniec).
+    """
+    newline = _newline(encoding)
+    width = len(newline)
+
+    if start > 0 and not aligned_start:
+        # Pomijamy niepełną pierwszą linię (jeśli okno w ogóle zawiera znak nowej linii)
+        idx = data.find(newline)
+        while idx != -1 and idx % width:
+            idx = data.find(newline, idx + 1)
+        if idx != -1:
+            data = data[idx + width :]
+            start += idx + width
+        elif encoding == "utf-8":
+            # Jedna bardzo długa linia - pomijamy bajty kontynuacji znaku UTF-8
+            skip = 0
+            while skip < len(data) and 0x80 <= data[skip] <= 0xBF:
+                skip += 1
+            data = data[skip:]
+            start += skip
+
+    if end < total_size:
+        idx = data.rfind(newline)
+        while idx != -1 and idx % width:
+            idx = data.rfind(newline, 0, idx)
+        if idx != -1:
+            data = data[: idx + width]
+        end = start + len(data)
+
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    text = decoder.decode(data, final=end >= total_size)
+    return text, start, end
+
+
+def get_line_index(user_file):
+    """
+    Rzadki indeks linii: lista offsetów bajtowych linii 1, 1+STEP, 1+2*STEP, ...
+    oraz całkowita liczba linii. Budowany raz per wersja (strumieniowo, kawałkami).
+    Zwraca None dla kodowań innych niż jednobajtowo-zgodne z ASCII.
+    """
+    info = _file_info(user_file)
+    if info["encoding"] not in ("utf-8", "cp1250"):
+        return None
+
+    key = f"files:preview:lines:{_version_key(user_file)}"
+    index = cache.get(key)
+    if index is not None:
+        return index
+
+    offsets = [info["bom_length"]]
+    lines = 0
+    last_byte = b""
+    for position, chunk in _iter_chunks(user_file, LINE_INDEX_CHUNK_SIZE):
+        count = chunk.count(b"\n")
+        if (lines % LINE_INDEX_STEP) + count < LINE_INDEX_STEP:
+            # W tym kawałku nie wypada żaden punkt kontrolny - tylko liczymy
+            lines += count
+        else:
+            idx = chunk.find(b"\n")
+            while idx != -1:
+                lines += 1
+                if lines % LINE_INDEX_STEP == 0:
+                    offsets.append(position + idx + 1)
+                idx = chunk.find(b"\n", idx + 1)
+        last_byte = chunk[-1:]
+
+    total_lines = lines + (1 if last_byte and last_byte != b"\n" else 0)
+    if offsets[-1] >= user_file.file_size and len(offsets) > 1:
+        offsets.pop()
+
+    index = {"step": LINE_INDEX_STEP, "offsets": offsets, "total_lines": total_lines}
+    cache.set(key, index, LINE_INDEX_CACHE_TIMEOUT)
+    return index
+
+
+def _offset_of_line(user_file, index, line):
+    """Offset bajtowy początku linii `line` (numeracja od 1)."""
+    checkpoint = min((line - 1) // index["step"], len(index["offsets"]) - 1)
+    position = index["offsets"][checkpoint]
+    to_skip = (line - 1) - checkpoint * index["step"]
+
+    while to_skip and position < user_file.file_size:
+        chunk = _read(user_file, position, LINE_INDEX_CHUNK_SIZE)
+        if not chunk:
+            break
+        count = chunk.count(b"\n")
+        if count < to_skip:
+            to_skip -= count
+            position += len(chunk)
+            continue
+        idx = -1
+        for _ in range(to_skip):
+            idx = chunk.find(b"\n", idx + 1)
+        position += idx + 1
+        to_skip = 0
+
+    return min(position, user_file.file_size)
+
+
+def build_text_preview(
+    user_file, size_kb=PREVIEW_DEFAULT_KB, offset=None, end=None, tail=False, line=None
+):
+    """
+    Zwraca słownik z fragmentem tekstu pliku i informacjami do stronicowania.
+
+    - offset: okno zaczyna się od tego bajtu (domyślnie 0)
+    - end: okno kończy się na tym bajcie (stronicowanie wstecz)
+    - tail: okno z końca pliku (np. ostatnie wpisy w logach)
+    - line: okno zaczyna się od linii o tym numerze (wymaga indeksu linii)
+    """
+    size = max(1, min(size_kb, PREVIEW_MAX_KB)) * 1024
+    total_size = user_file.file_size
+    version_key = _version_key(user_file)
+
+    window_key = f"{size}:{offset}:{end}:{tail}:{line}"
+    cache_key = (
+        f"files:preview:{version_key}:{hashlib.sha1(window_key.encode()).hexdigest()}"
+    )
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    info = _file_info(user_file)
+    encoding = info["encoding"]
+    preview = {
+        "encoding": encoding,
+        "is_binary": encoding is None,
+        "total_size": total_size,
+        "window_size": size,
+    }
+
+    if encoding is None:
+        preview.update({"text": None, "start": 0, "end": 0})
+        cache.set(cache_key, preview, PREVIEW_CACHE_TIMEOUT)
+        return preview
+
+    width = len(_newline(encoding))
+    aligned_start = False
+    index = None
+
+    if line is not None:
+        index = get_line_index(user_file)
+        if index is None:
+            raise ValueError(
+                "Stronicowanie po liniach nie jest dostępne dla tego kodowania."
+            )
+        start = _offset_of_line(user_file, index, line)
+        aligned_start = True
+    elif tail or end is not None:
+        window_end = total_size if end is None else min(end, total_size)
+        start = max(info["bom_length"], window_end - size)
+    else:
+        start = offset or 0
+
+    if start <= info["bom_length"]:
+        start = info["bom_length"]
+        aligned_start = True
+
+    # Wyrównanie do szerokości znaku (UTF-16)
+    start -= (start - info["bom_length"]) % width
+    window_end = min(start + size, total_size)
+    if end is not None and not tail and line is None:
+        window_end = min(window_end, end)
+
+    if not aligned_start:
+        # Czytamy też poprzedzający znak: jeśli to koniec linii, okno zaczyna się
+        # dokładnie na początku linii i niczego nie pomijamy
+        start -= width
+
+    data = _read(user_file, start, window_end - start)
+    text, start, window_end = _decode_window(
+        data, encoding, start, start + len(data), total_size, aligned_start
+    )
+
+    preview.update(
+        {
+            "text": text,
+            "start": start,
+            "end": window_end,
+            "has_more_before": start > info["bom_length"],
+            "has_more_after": window_end < total_size,
+            "next_offset": window_end if window_end < total_size else None,
+            "prev_end": start if start > info["bom_length"] else None,
+        }
+    )
+    if index is not None:
+        preview["line"] = line
+        preview["total_lines"] = index["total_lines"]
+
+    cache.set(cache_key, preview, PREVIEW_CACHE_TIMEOUT)
+    return preview
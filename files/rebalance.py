@@ -0,0 +1,165 @@
+"""
+Przenoszenie blobów między shardami po zmianie pierścienia (files/sharding.py).
+
+Działa online, partiami plików (po kluczu głównym UserFile):
+
+1. bloby pliku (bieżący, wersje, renderingi), które według pierścienia
+   powinny leżeć na innym shardzie, kopiujemy równolegle na nowy shard,
+2. w jednej transakcji podmieniamy nazwy w bazie - tylko w wierszach, które
+   nadal wskazują starą nazwę (plik zmieniony w międzyczasie zostaje na
+   starym shardzie do następnego przebiegu),
+3. po zatwierdzeniu usuwamy stare bloby (albo zostawiamy je dla
+   reconcile_blobs - wtedy działają jeszcze wydane wcześniej linki).
+
+Przerwany przebieg można po prostu uruchomić ponownie. Bloby w warstwie
+Archive pomijamy - nie da się ich skopiować bez przywrócenia.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from .models import BlobTier, UserFile, UserFileRendition, UserFileVersion
+from .sharding import split_name
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 200
+_OFFLINE_TIERS = (BlobTier.ARCHIVE, BlobTier.REHYDRATING)
+
+
+class RebalanceReport:
+    def __init__(self):
+        self.files = 0
+        self.moved = 0
+        self.skipped_archive = 0
+        self.stale = 0
+        self.failed = 0
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+def _file_blobs(file_ids):
+    """{id pliku: {nazwa bloba: warstwa}} - bieżący blob, wersje i renderingi."""
+    blobs = {file_id: {} for file_id in file_ids}
+    for pk, name, tier in UserFile.objects.filter(pk__in=file_ids).values_list(
+        "pk", "file", "blob_tier"
+    ):
+        blobs[pk][name] = tier
+    for file_id, path, tier in UserFileVersion.objects.filter(
+        user_file_id__in=file_ids
+    ).values_list("user_file_id", "file_path", "blob_tier"):
+        if blobs[file_id].get(path) not in _OFFLINE_TIERS:
+            blobs[file_id][path] = tier
+    for file_id, path in (
+        UserFileRendition.objects.filter(version__user_file_id__in=file_ids)
+        .exclude(file_path="")
+        .values_list("version__user_file_id", "file_path")
+    ):
+        blobs[file_id].setdefault(path, BlobTier.HOT)
+    return blobs
+
+
+def _copy(storage, name):
+    target = storage.qualify(storage.target_shard(name), split_name(name)[1])
+    try:
+        return name, storage.copy(name, target)
+    except Exception as e:
+        logger.error(f"[REBALANCE] Nie udało się skopiować {name}: {e}")
+        return name, None
+
+
+def _delete(storage, name):
+    try:
+        storage.delete(name)
+    except Exception as e:
+        logger.error(f"[REBALANCE] Nie udało się usunąć {name}: {e}")
+
+
+def _apply(file_id, moves):
+    """Podmienia nazwy w bazie; zwraca nazwy, których żaden wiersz już nie wskazywał."""
+    stale = []
+    with transaction.atomic():
+        for old, new in moves.items():
+            # Kopia powstaje w domyślnej warstwie konta (Hot)
+            updated = UserFile.objects.filter(pk=file_id, file=old).update(
+                file=new, blob_tier=BlobTier.HOT
+            )
+            updated += UserFileVersion.objects.filter(
+                user_file_id=file_id, file_path=old
+            ).update(file_path=new, blob_tier=BlobTier.HOT)
+            updated += UserFileRendition.objects.filter(
+                version__user_file_id=file_id, file_path=old
+            ).update(file_path=new)
+            if not updated:
+                stale.append(old)
+    return stale
+
+
+def rebalance(
+    storage=None,
+    batch_size=DEFAULT_BATCH_SIZE,
+    concurrency=8,
+    delete_source=True,
+    dry_run=False,
+):
+    """
+    Przenosi bloby na shardy wskazane przez obecny pierścień.
+    Zwraca RebalanceReport (przy dry_run `moved` to liczba blobów do przeniesienia).
+    """
+    storage = storage or default_storage
+    if not hasattr(storage, "target_shard"):
+        raise ValueError("Storage nie jest shardowany (files.sharding.ShardedStorage).")
+    report = RebalanceReport()
+    last_pk = 0
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        while True:
+            # Stronicowanie po kluczu głównym (bez kursorów serwerowych)
+            file_ids = list(
+                UserFile.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not file_ids:
+                break
+            last_pk = file_ids[-1]
+            report.files += len(file_ids)
+
+            pending = []
+            for file_id, blobs in _file_blobs(file_ids).items():
+                for name, tier in blobs.items():
+                    if storage.shard_of(name) == storage.target_shard(name):
+                        continue
+                    if tier in _OFFLINE_TIERS:
+                        report.skipped_archive += 1
+                        continue
+                    pending.append((file_id, name))
+            if dry_run:
+                report.moved += len(pending)
+                continue
+
+            copies = dict(pool.map(lambda item: _copy(storage, item[1]), pending))
+            moves = {}
+            for file_id, name in pending:
+                if copies[name] is None:
+                    report.failed += 1
+                else:
+                    moves.setdefault(file_id, {})[name] = copies[name]
+
+            obsolete = []
+            for file_id, file_moves in moves.items():
+                stale = _apply(file_id, file_moves)
+                report.stale += len(stale)
+                report.moved += len(file_moves) - len(stale)
+                # Kopia, której baza nie przejęła, jest zbędna; oryginał zostaje
+                obsolete += [file_moves[old] for old in stale]
+                if delete_source:
+                    obsolete += [old for old in file_moves if old not in stale]
+            list(pool.map(lambda name: _delete(storage, name), obsolete))
+            logger.info(f"[REBALANCE] {report.as_dict()}")
+
+    return report
@@ -0,0 +1,347 @@
+"""
+Wyszukiwanie i usuwanie osieroconych blobów (bez wpisu w bazie).
+
+Osierocone bloby zostają np. po nieudanym zapisie pliku z ZIP-a albo
+przerwanej zmianie nazwy. Uzgadnianie działa strumieniowo:
+
+1. ścieżki używane przez bazę (UserFile.file, UserFileVersion.file_path,
+   UserFileRendition.file_path) wczytujemy partiami po kluczu głównym do
+   tymczasowego zbioru na dysku (SQLite), więc pamięć nie rośnie z liczbą plików,
+2. kontener listujemy równolegle - osobne stronicowane listowanie dla każdego
+   katalogu użytkownika (user_uploads/<id>/),
+3. blob, którego nie ma w zbiorze i który jest starszy niż okres karencji,
+   jest sierotą; sieroty usuwamy partiami (Azure Blob Batch, do 256 na żądanie).
+"""
+
+import logging
+import os
+import sqlite3
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import NamedTuple
+
+from azure.storage.blob import BlobPrefix
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from . import blob_cache
+from .models import UserFile, UserFileRendition, UserFileVersion
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PREFIX = "user_uploads/"
+PAGE_SIZE = 5000
+# Limit operacji w jednym żądaniu Blob Batch
+DELETE_BATCH_SIZE = 256
+
+
+class BlobEntry(NamedTuple):
+    name: str
+    size: int
+    last_modified: object
+
+
+class ReferencedPaths:
+    """Zbiór ścieżek blobów używanych przez bazę, trzymany w pliku SQLite."""
+
+    def __init__(self, directory=None):
+        fd, self.path = tempfile.mkstemp(suffix=".reconcile.sqlite3", dir=directory)
+        os.close(fd)
+        self.db = sqlite3.connect(self.path)
+        self.db.execute("CREATE TABLE paths (path TEXT PRIMARY KEY) WITHOUT ROWID")
+        self.count = 0
+
+    def add_many(self, paths):
+        cursor = self.db.executemany(
+            "INSERT OR IGNORE INTO paths VALUES (?)", ((p,) for p in paths if p)
+        )
+        self.count += cursor.rowcount
+        self.db.commit()
+
+    def missing(self, names):
+        """Zwraca podzbiór `names`, którego nie ma w zbiorze."""
+        names = list(names)
+        found = set()
+        for i in range(0, len(names), 500):
+            chunk = names[i : i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            found.update(
+                row[0]
+                for row in self.db.execute(
+                    f"SELECT path FROM paths WHERE path IN ({placeholders})", chunk
+                )
+            )
+        return [n for n in names if n not in found]
+
+    def close(self):
+        self.db.close()
+        os.unlink(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _iter_by_pk(queryset, field, page_size):
+    """Wartości `field` partiami po kluczu głównym (działa też bez kursorów serwerowych)."""
+    last_pk = 0
+    while True:
+        rows = list(
+            queryset.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .values_list("pk", field)[:page_size]
+        )
+        if not rows:
+            return
+        yield [value for _, value in rows]
+        last_pk = rows[-1][0]
+
+
+def load_referenced_paths(refs, page_size=PAGE_SIZE):
+    """Wczytuje do `refs` wszystkie ścieżki blobów, do których odwołuje się baza."""
+    sources = [
+        (UserFile.objects.all(), "file"),
+        (UserFileVersion.objects.all(), "file_path"),
+        (UserFileRendition.objects.exclude(file_path=""), "file_path"),
+    ]
+    for queryset, field in sources:
+        for paths in _iter_by_pk(queryset, field, page_size):
+            refs.add_many(paths)
+    return refs
+
+
+# --- Listowanie kontenera ---
+
+
+def _azure_client(storage):
+    client = getattr(storage, "client", None)
+    if client is not None and hasattr(client, "list_blobs"):
+        return client
+    return None
+
+
+def _relative(storage, name):
+    location = getattr(storage, "location", "") or ""
+    if location and name.startswith(location.rstrip("/") + "/"):
+        return name[len(location.rstrip("/")) + 1 :]
+    return name
+
+
+def _azure_partitions(storage, prefix):
+    """Podkatalogi prefiksu (np. user_uploads/<id>/) i bloby leżące bezpośrednio w nim."""
+    client = _azure_client(storage)
+    partitions, loose = [], []
+    for item in client.walk_blobs(
+        name_starts_with=storage._get_valid_path(prefix), delimiter="/"
+    ):
+        if isinstance(item, BlobPrefix):
+            partitions.append(item.name)
+        else:
+            loose.append(
+                BlobEntry(_relative(storage, item.name), item.size, item.last_modified)
+            )
+    return partitions, loose
+
+
+def _azure_list(storage, full_prefix):
+    client = _azure_client(storage)
+    return [
+        BlobEntry(_relative(storage, blob.name), blob.size, blob.last_modified)
+        for blob in client.list_blobs(
+            name_starts_with=full_prefix,
+            results_per_page=PAGE_SIZE,
+            timeout=storage.timeout,
+        )
+    ]
+
+
+def _storage_list(storage, path, recursive=True):
+    """Listowanie dowolnego backendu Django (np. FileSystemStorage)."""
+    entries = []
+    try:
+        directories, files = storage.listdir(path)
+    except FileNotFoundError:
+        return entries
+    for name in files:
+        full = f"{path.rstrip('/')}/{name}"
+        entries.append(
+            BlobEntry(full, storage.size(full), storage.get_modified_time(full))
+        )
+    if recursive:
+        for directory in directories:
+            entries.extend(_storage_list(storage, f"{path.rstrip('/')}/{directory}"))
+    return entries
+
+
+def iter_blobs(storage, prefix=DEFAULT_PREFIX, concurrency=8):
+    """
+    Generator wszystkich blobów pod `prefix`. Katalogi użytkowników są
+    listowane równolegle (najwyżej `concurrency` naraz), a wyniki oddawane
+    w kolejności, więc w pamięci jest najwyżej `concurrency` list naraz.
+    """
+    if hasattr(storage, "storages"):
+        # Storage shardowany: każdy shard osobno, nazwy z prefiksem shardu jak w bazie
+        for shard, shard_storage in storage.storages.items():
+            for entry in iter_blobs(shard_storage, prefix, concurrency):
+                yield entry._replace(name=storage.qualify(shard, entry.name))
+        return
+
+    if _azure_client(storage) is not None:
+        partitions, loose = _azure_partitions(storage, prefix)
+        list_partition = lambda p: _azure_list(storage, p)  # noqa: E731
+    else:
+        try:
+            directories, _ = storage.listdir(prefix)
+        except FileNotFoundError:
+            return
+        partitions = [f"{prefix.rstrip('/')}/{d}" for d in sorted(directories)]
+        loose = _storage_list(storage, prefix, recursive=False)
+        list_partition = lambda p: _storage_list(storage, p)  # noqa: E731
+
+    yield from loose
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        pending = deque()
+        partitions = iter(partitions)
+        for partition in partitions:
+            pending.append(pool.submit(list_partition, partition))
+            if len(pending) >= concurrency:
+                break
+        while pending:
+            yield from pending.popleft().result()
+            next_partition = next(partitions, None)
+            if next_partition is not None:
+                pending.append(pool.submit(list_partition, next_partition))
+
+
+# --- Uzgadnianie ---
+
+
+class ReconcileReport:
+    def __init__(self):
+        self.scanned = 0
+        self.referenced = 0
+        self.orphans = 0
+        self.orphan_bytes = 0
+        self.skipped_recent = 0
+        self.deleted = 0
+        self.failed = 0
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+def iter_orphans(entries, refs, grace, report, batch_size=1000):
+    """Filtruje strumień blobów do sierot starszych niż okres karencji."""
+    cutoff = timezone.now() - grace
+    batch = []
+
+    def flush():
+        missing = set(refs.missing(e.name for e in batch))
+        for entry in (e for e in batch if e.name in missing):
+            if entry.last_modified and entry.last_modified > cutoff:
+                # Może to być upload w toku (blob już jest, wiersza jeszcze nie ma)
+                report.skipped_recent += 1
+                continue
+            report.orphans += 1
+            report.orphan_bytes += entry.size or 0
+            yield entry
+        batch.clear()
+
+    for entry in entries:
+        report.scanned += 1
+        batch.append(entry)
+        if len(batch) >= batch_size:
+            yield from flush()
+    yield from flush()
+    report.referenced = report.scanned - report.orphans - report.skipped_recent
+
+
+def delete_blobs(storage, names):
+    """
+    Usuwa bloby partiami. Dla Azure jedno żądanie Blob Batch na 256 blobów,
+    dla innych backendów - pojedyncze delete(). Zwraca liczbę błędów.
+    """
+    if hasattr(storage, "route"):
+        by_shard = {}
+        for name in names:
+            shard_storage, path = storage.route(name)
+            by_shard.setdefault(shard_storage, []).append(path)
+        return sum(delete_blobs(s, paths) for s, paths in by_shard.items())
+
+    client = _azure_client(storage)
+    if client is None or not hasattr(client, "delete_blobs"):
+        failed = 0
+        for name in names:
+            try:
+                storage.delete(name)
+            except Exception as e:
+                logger.error(f"[RECONCILE] Nie udało się usunąć {name}: {e}")
+                failed += 1
+        return failed
+
+    full_names = [storage._get_valid_path(n) for n in names]
+    responses = client.delete_blobs(
+        *full_names, raise_on_any_failure=False, timeout=storage.timeout
+    )
+    failed = 0
+    for name, response in zip(names, responses):
+        # 404 - blob zniknął w międzyczasie, to nie błąd
+        if response.status_code not in (200, 202, 404):
+            logger.error(
+                f"[RECONCILE] Nie udało się usunąć {name}: HTTP {response.status_code}"
+            )
+            failed += 1
+        else:
+            blob_cache.mark_missing(storage._cache_key(storage._get_valid_path(name)))
+    return failed
+
+
+def reconcile(
+    storage=None,
+    prefix=DEFAULT_PREFIX,
+    grace=timedelta(hours=24),
+    dry_run=True,
+    concurrency=8,
+    on_orphan=None,
+    temp_dir=None,
+):
+    """
+    Znajduje (i przy dry_run=False usuwa) osierocone bloby pod `prefix`.
+    `on_orphan(entry)` jest wołane dla każdej sieroty (np. zapis raportu).
+    Zwraca ReconcileReport.
+    """
+    storage = storage or default_storage
+    report = ReconcileReport()
+
+    with ReferencedPaths(temp_dir) as refs:
+        load_referenced_paths(refs)
+        logger.info(f"[RECONCILE] Ścieżek w bazie: {refs.count}")
+
+        with ThreadPoolExecutor(max_workers=concurrency) as deleters:
+            futures = []
+            to_delete = []
+            for entry in iter_orphans(
+                iter_blobs(storage, prefix, concurrency), refs, grace, report
+            ):
+                if on_orphan:
+                    on_orphan(entry)
+                if dry_run:
+                    continue
+                to_delete.append(entry.name)
+                if len(to_delete) >= DELETE_BATCH_SIZE:
+                    futures.append(deleters.submit(delete_blobs, storage, to_delete))
+                    to_delete = []
+            if to_delete:
+                futures.append(deleters.submit(delete_blobs, storage, to_delete))
+            for future in futures:
+                report.failed += future.result()
+
+    if not dry_run:
+        report.deleted = report.orphans - report.failed
+    logger.info(f"[RECONCILE] {report.as_dict()}")
+    return report
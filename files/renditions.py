@@ -0,0 +1,139 @@
+"""
+Generowanie miniatur i podglądów obrazów (renditions) w tle (kolejka jobs).
+
+Dla każdej nowej wersji pliku graficznego tworzymy dwa pomniejszone bloby
+(miniatura do list/galerii oraz podgląd do okna modalnego) i zapisujemy je
+obok oryginału. Dzięki temu widok galerii pobiera kilobajty zamiast
+pełnowymiarowych oryginałów.
+"""
+
+import logging
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from jobs.registry import enqueue
+from PIL import Image, ImageOps, features
+
+from .models import UserFileRendition, UserFileVersion
+
+logger = logging.getLogger(__name__)
+
+# Maksymalne wymiary (szerokość, wysokość) dla poszczególnych rodzajów
+RENDITION_SIZES = {
+    UserFileRendition.Kind.THUMBNAIL: (256, 256),
+    UserFileRendition.Kind.PREVIEW: (1280, 1280),
+}
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".bmp", ".webp", ".tif", ".tiff"}
+
+
+def is_image(filename):
+    """Czy plik (po rozszerzeniu) nadaje się do generowania miniatur."""
+    return os.path.splitext(filename or "")[1].lower() in IMAGE_EXTENSIONS
+
+
+def rendition_format():
+    """Zwraca (format Pillow, rozszerzenie) - WebP, a gdy brak wsparcia, JPEG."""
+    if features.check("webp"):
+        return "WEBP", "webp"
+    return "JPEG", "jpg"
+
+
+def rendition_path(version, kind, ext):
+    """Ścieżka bloba obok oryginału, np. user_uploads/5/foto__thumbnail.webp"""
+    root, _ = os.path.splitext(version.file_path)
+    return f"{root}__{kind}.{ext}"
+
+
+def schedule_renditions(version):
+    """
+    Zleca wygenerowanie renditions dla wersji pliku (tylko obrazy).
+    Zadanie zapisuje się w tej samej transakcji co wersja, więc worker
+    zobaczy je dopiero razem z zatwierdzonym wierszem wersji.
+    """
+    if not is_image(version.original_filename):
+        return None
+
+    return enqueue("files.generate_renditions", {"version_id": version.pk})
+
+
+def _render(image, max_size, pil_format):
+    """Zmniejsza obraz do max_size (z zachowaniem proporcji) i koduje go."""
+    rendition = image.copy()
+    rendition.thumbnail(max_size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+    if pil_format == "JPEG" and rendition.mode not in ("RGB", "L"):
+        rendition = rendition.convert("RGB")
+    elif rendition.mode not in ("RGB", "RGBA", "L", "LA"):
+        rendition = rendition.convert("RGBA")
+
+    buffer = BytesIO()
+    rendition.save(buffer, format=pil_format, quality=80, method=4)
+    return buffer.getvalue(), rendition.size
+
+
+def generate_renditions(version_id):
+    """
+    Generuje wszystkie brakujące renditions dla wskazanej wersji pliku.
+    Zwraca listę utworzonych/zaktualizowanych obiektów UserFileRendition.
+    """
+    try:
+        version = UserFileVersion.objects.get(pk=version_id)
+    except UserFileVersion.DoesNotExist:
+        return []
+
+    pending = []
+    for kind in RENDITION_SIZES:
+        rendition, _ = UserFileRendition.objects.get_or_create(version=version, kind=kind)
+        if rendition.status != UserFileRendition.Status.READY:
+            pending.append(rendition)
+
+    if not pending:
+        return []
+
+    storage = default_storage
+    pil_format, ext = rendition_format()
+
+    try:
+        with storage.open(version.file_path, "rb") as src:
+            image = Image.open(src)
+            # Dla JPEG dekoder od razu skaluje w dół (draft), co mocno przyspiesza duże zdjęcia
+            largest = max(RENDITION_SIZES[r.kind] for r in pending)
+            image.draft("RGB", largest)
+            image = ImageOps.exif_transpose(image)
+            image.load()
+    except Exception as e:
+        logger.warning(f"[RENDITIONS] Nie można otworzyć obrazu {version.file_path}: {e}")
+        for rendition in pending:
+            rendition.status = UserFileRendition.Status.FAILED
+            rendition.error = str(e)
+            rendition.save(update_fields=["status", "error"])
+        return pending
+
+    for rendition in pending:
+        try:
+            data, (width, height) = _render(
+                image, RENDITION_SIZES[rendition.kind], pil_format
+            )
+            saved_path = storage.save(
+                rendition_path(version, rendition.kind, ext), ContentFile(data)
+            )
+            rendition.status = UserFileRendition.Status.READY
+            rendition.format = ext
+            rendition.file_path = saved_path
+            rendition.width = width
+            rendition.height = height
+            rendition.file_size = len(data)
+            rendition.error = ""
+        except Exception as e:
+            logger.error(
+                f"[RENDITIONS] Nie udało się wygenerować {rendition.kind} dla {version.file_path}: {e}"
+            )
+            rendition.status = UserFileRendition.Status.FAILED
+            rendition.error = str(e)
+        rendition.save()
+
+    logger.info(f"[RENDITIONS] Przetworzono wersję {version_id}: {version.file_path}")
+    return pending
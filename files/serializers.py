@@ -1,15 +1,62 @@
+from django.db import models
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from rest_framework import serializers
-from .models import UserFile, UserFileVersion
 
+from monitoring.serializers import (
+    TimedListSerializer,
+    TimedSerializerMixin,
+    ValuesSerializer,
+)
 
-class UserFileSerializer(serializers.ModelSerializer):
+from .models import Folder, UserFile, UserFileRendition, UserFileVersion
+
+
+def attach_ready_renditions(files):
+    """
+    Gotowe renditions bieżących wersji plików jednym zapytaniem dla całej
+    listy (zamiast zapytania per plik w UserFileSerializer._ready_renditions).
+    """
+    files = [f for f in files if not hasattr(f, "_ready_renditions")]
+    if not files:
+        return
+    by_file = {}
+    for rendition in UserFileRendition.objects.filter(
+        version__user_file__in=[f.pk for f in files],
+        version_id=Subquery(
+            UserFileVersion.objects.filter(user_file=OuterRef("version__user_file"))
+            .order_by("-version_number")
+            .values("pk")[:1]
+        ),
+        status=UserFileRendition.Status.READY,
+    ).annotate(user_file_id=F("version__user_file_id")):
+        by_file.setdefault(rendition.user_file_id, {})[rendition.kind] = rendition
+    for f in files:
+        f._ready_renditions = by_file.get(f.pk, {})
+
+
+class UserFileListSerializer(TimedListSerializer):
+    """Lista plików: miniatury całej strony ładowane razem (attach_ready_renditions)."""
+
+    def to_representation(self, data):
+        files = list(
+            data.all() if isinstance(data, models.manager.BaseManager) else data
+        )
+        attach_ready_renditions(files)
+        return super().to_representation(files)
+
+
+class UserFileSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     file_url = serializers.SerializerMethodField()
     owner_username = serializers.CharField(source="owner.username", read_only=True)
     latest_version = serializers.SerializerMethodField()
     versions_count = serializers.SerializerMethodField()
+    thumbnail_url = serializers.SerializerMethodField()
+    preview_url = serializers.SerializerMethodField()
 
     class Meta:
         model = UserFile
+        list_serializer_class = UserFileListSerializer
         fields = [
             "id",
             "file",
@@ -18,10 +65,18 @@ class UserFileSerializer(serializers.ModelSerializer):
             "file_size",
             "uploaded_at",
             "is_zip",
+            "deleted_at",
+            "folder",
             "owner",
             "owner_username",
             "latest_version",
             "versions_count",
+            "thumbnail_url",
+            "preview_url",
+            "access_count",
+            "last_accessed_at",
+            "blob_tier",
+            "content_encoding",
         ]
         read_only_fields = [
             "id",
@@ -31,10 +86,29 @@ class UserFileSerializer(serializers.ModelSerializer):
             "owner_username",
             "original_filename",
             "file_size",
+            "is_zip",
+            "deleted_at",
             "latest_version",
             "versions_count",
+            "thumbnail_url",
+            "preview_url",
+            "access_count",
+            "last_accessed_at",
+            "blob_tier",
+            "content_encoding",
         ]
 
+    def validate_folder(self, folder):
+        """Plik można umieścić tylko w folderze jego właściciela."""
+        if folder is None:
+            return folder
+        owner_id = self.instance.owner_id if self.instance else None
+        if owner_id is None:
+            owner_id = self.context["request"].user.id
+        if folder.owner_id != owner_id:
+            raise serializers.ValidationError("Nie ma takiego folderu.")
+        return folder
+
     def get_file_url(self, obj):
         """Zwróć pełny URL do pliku w Azure Blob Storage"""
         if obj.file:
@@ -54,6 +128,133 @@ class UserFileSerializer(serializers.ModelSerializer):
     def get_versions_count(self, obj):
         return obj.versions.count()
 
+    def _ready_renditions(self, obj):
+        """Gotowe renditions bieżącej (najnowszej) wersji, zapamiętane na obiekcie."""
+        if not hasattr(obj, "_ready_renditions"):
+            latest = obj.versions.order_by("-version_number").values("pk")[:1]
+            obj._ready_renditions = {
+                r.kind: r
+                for r in UserFileRendition.objects.filter(
+                    version__in=latest, status=UserFileRendition.Status.READY
+                )
+            }
+        return obj._ready_renditions
+
+    def _rendition_url(self, obj, kind):
+        rendition = self._ready_renditions(obj).get(kind)
+        if not rendition:
+            return None
+        try:
+            return obj.file.storage.url(rendition.file_path)
+        except Exception:
+            return None
+
+    def get_thumbnail_url(self, obj):
+        return self._rendition_url(obj, UserFileRendition.Kind.THUMBNAIL)
+
+    def get_preview_url(self, obj):
+        return self._rendition_url(obj, UserFileRendition.Kind.PREVIEW)
+
+
+def _versions_of_file():
+    return UserFileVersion.objects.filter(user_file=OuterRef("pk"))
+
+
+class UserFileValuesSerializer(ValuesSerializer):
+    """
+    Lista plików (UserFileViewSet.list / trash) w kształcie UserFileSerializer
+    bez zapytań per plik: numer i liczba wersji z podzapytań, miniatury
+    jednym zapytaniem dla całej strony.
+    """
+
+    serializer_class = UserFileSerializer
+    annotations = {
+        "latest_version_number": Coalesce(
+            Subquery(
+                _versions_of_file()
+                .order_by("-version_number")
+                .values("version_number")[:1]
+            ),
+            # Brak wpisu w historii traktujemy jako V1 (jak UserFileSerializer)
+            Value(1),
+        ),
+        "latest_version_id": Subquery(
+            _versions_of_file().order_by("-version_number").values("pk")[:1]
+        ),
+        "versions_total": Coalesce(
+            Subquery(
+                _versions_of_file()
+                .order_by()
+                .values("user_file")
+                .annotate(count=Count("pk"))
+                .values("count"),
+                output_field=IntegerField(),
+            ),
+            Value(0),
+        ),
+    }
+    extra_columns = (
+        "file",
+        "latest_version_number",
+        "latest_version_id",
+        "versions_total",
+    )
+
+    def __init__(self, context=None):
+        super().__init__(context)
+        self.storage = UserFile._meta.get_field("file").storage
+        self.request = self.context.get("request")
+
+    def _url(self, name):
+        try:
+            return self.storage.url(name)
+        except Exception:
+            return None
+
+    def prepare(self, rows):
+        # Jeden podpis URL na plik (pola file i file_url)
+        for row in rows:
+            row["url"] = self._url(row["file"]) if row["file"] else None
+        self.renditions = {
+            (version_id, kind): file_path
+            for version_id, kind, file_path in UserFileRendition.objects.filter(
+                version_id__in={
+                    row["latest_version_id"]
+                    for row in rows
+                    if row["latest_version_id"] is not None
+                },
+                status=UserFileRendition.Status.READY,
+            ).values_list("version_id", "kind", "file_path")
+        }
+
+    def get_file(self, row):
+        # Jak serializers.FileField: adres absolutny względem żądania
+        if not row["file"]:
+            return None
+        url = self.storage.url(row["file"]) if row["url"] is None else row["url"]
+        if self.request is not None:
+            return self.request.build_absolute_uri(url)
+        return url
+
+    def get_file_url(self, row):
+        return row["url"]
+
+    def get_latest_version(self, row):
+        return row["latest_version_number"]
+
+    def get_versions_count(self, row):
+        return row["versions_total"]
+
+    def _rendition_url(self, row, kind):
+        file_path = self.renditions.get((row["latest_version_id"], kind))
+        return self._url(file_path) if file_path else None
+
+    def get_thumbnail_url(self, row):
+        return self._rendition_url(row, UserFileRendition.Kind.THUMBNAIL)
+
+    def get_preview_url(self, row):
+        return self._rendition_url(row, UserFileRendition.Kind.PREVIEW)
+
 
 class UserFileVersionSerializer(serializers.ModelSerializer):
     class Meta:
@@ -65,4 +266,37 @@ class UserFileVersionSerializer(serializers.ModelSerializer):
             "file_size",
             "created_at",
             "restored_from_version",
+            "sha256",
+            "blob_tier",
+            "content_encoding",
         ]
+
+
+class FolderSerializer(serializers.ModelSerializer):
+    parent = serializers.PrimaryKeyRelatedField(
+        queryset=Folder.objects.all(), allow_null=True, required=False
+    )
+    # Rekurencyjne statystyki poddrzewa (liczone w widoku jednym zapytaniem)
+    size = serializers.SerializerMethodField()
+    files_count = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Folder
+        fields = ["id", "name", "parent", "path", "created_at", "size", "files_count"]
+        read_only_fields = ["id", "path", "created_at", "size", "files_count"]
+        # Unikalność nazwy sprawdza baza (IntegrityError w widoku)
+        validators = []
+
+    def validate_parent(self, parent):
+        if parent is not None and parent.owner_id != self.context["request"].user.id:
+            raise serializers.ValidationError("Nie ma takiego folderu.")
+        return parent
+
+    def _stats(self, obj):
+        return self.context.get("stats", {}).get(obj.pk, {})
+
+    def get_size(self, obj):
+        return self._stats(obj).get("size", 0)
+
+    def get_files_count(self, obj):
+        return self._stats(obj).get("files_count", 0)
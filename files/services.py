@@ -0,0 +1,499 @@
+"""
+Ciężkie operacje na plikach, współdzielone przez widoki (tryb synchroniczny)
+i handlery zadań w tle (files/tasks.py).
+"""
+
+import hashlib
+import logging
+import os
+import posixpath
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from logs.models import ActivityLog
+
+from . import archives, changes, compression, folders
+from .blobs import copy_blob
+from .models import (
+    BlobTier,
+    FileChange,
+    UserFile,
+    UserFileRendition,
+    UserFileVersion,
+    user_directory_path,
+)
+from .uploads import file_sha256
+
+logger = logging.getLogger(__name__)
+
+
+def extract_zip(user, archive_name, archive_file, folder=None):
+    """
+    Rozpakowuje plik ZIP i zapisuje poszczególne pliki do storage.
+    `archive_file` musi być obiektem plikowym z obsługą seek().
+    Struktura katalogów z archiwum jest odtwarzana jako foldery w `folder`
+    (None = katalog główny).
+    Zwraca listę informacji o rozpakowanych plikach.
+    """
+    extracted_files = []
+    folder_cache = {}
+
+    try:
+        # Otwórz ZIP bezpośrednio z pliku (bez kopiowania całości do pamięci)
+        archive_file.seek(0)
+        with zipfile.ZipFile(archive_file, "r") as zip_ref:
+            # Pobierz listę plików w ZIP-ie
+            file_list = zip_ref.namelist()
+
+            # Filtruj tylko pliki (nie katalogi)
+            files_to_extract = [f for f in file_list if not f.endswith("/")]
+
+            if not files_to_extract:
+                raise ValueError("ZIP nie zawiera żadnych plików")
+
+            # Puste katalogi z archiwum też odtwarzamy jako foldery
+            for directory in (f for f in file_list if f.endswith("/")):
+                folders.ensure_folders(user, directory, folder, folder_cache)
+
+            logger.info(
+                f"[ZIP UPLOAD] Rozpakowywanie {len(files_to_extract)} plików z ZIP: {archive_name}"
+            )
+
+            # Rozpakuj i zapisz każdy plik
+            for zip_file_path in files_to_extract:
+                try:
+                    # Wyciągnij zawartość pliku
+                    with zip_ref.open(zip_file_path) as file_in_zip:
+                        file_content = file_in_zip.read()
+                        file_size = len(file_content)
+
+                    # Przygotuj dane dla nowego pliku: nazwa bez ścieżki,
+                    # a katalogi z archiwum jako foldery
+                    directory, original_filename = posixpath.split(zip_file_path)
+
+                    # Utwórz instancję UserFile bez zapisywania jeszcze
+                    user_file = UserFile(
+                        owner=user,
+                        original_filename=original_filename,
+                        file_size=file_size,
+                        is_zip=False,
+                        folder=folders.ensure_folders(
+                            user, directory, folder, folder_cache
+                        ),
+                    )
+
+                    # Wygeneruj ścieżkę dla pliku
+                    file_path = user_directory_path(user_file, original_filename)
+
+                    # Zapisz plik do storage (S3/Azure), tekstowe skompresowane
+                    storage = user_file.file.storage
+                    content, user_file.content_encoding = compression.prepare(
+                        ContentFile(file_content, name=original_filename)
+                    )
+                    saved_path = storage.save(file_path, content)
+
+                    # Ustaw rzeczywistą ścieżkę pliku i zapisz w bazie
+                    user_file.file.name = saved_path
+                    user_file.save()
+
+                    # Dodaj wersję początkową (V1) dla rozpakowanego pliku
+                    try:
+                        user_file.create_version_snapshot(
+                            sha256=hashlib.sha256(file_content).hexdigest()
+                        )
+                    except Exception as ve:
+                        logger.error(
+                            f"[VERSIONING] Nie udało się utworzyć wersji początkowej (ZIP): {ve}"
+                        )
+
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug(
+                            "[ZIP UPLOAD] Zapisano plik: %s",
+                            original_filename,
+                            extra={
+                                "event": "zip_member_saved",
+                                "file_id": user_file.id,
+                            },
+                        )
+
+                    # Dodaj do listy rozpakowanych plików
+                    extracted_files.append(
+                        {
+                            "id": user_file.id,
+                            "original_filename": user_file.original_filename,
+                            "file_size": user_file.file_size,
+                            "uploaded_at": user_file.uploaded_at.isoformat(),
+                        }
+                    )
+
+                    # Loguj każdy rozpakowany plik
+                    ActivityLog.objects.log(
+                        user,
+                        ActivityLog.ActionType.FILE_UPLOAD,
+                        f"Rozpakowano z ZIP '{archive_name}': {original_filename}",
+                        file=user_file,
+                        bytes_transferred=file_size,
+                        archive=archive_name,
+                    )
+
+                except Exception as e:
+                    logger.error(
+                        f"[ZIP UPLOAD] Błąd podczas rozpakowywania pliku {zip_file_path}: {str(e)}"
+                    )
+                    continue
+
+        logger.info(f"[ZIP UPLOAD] Pomyślnie rozpakowano ZIP: {archive_name}")
+        return extracted_files
+
+    except Exception as e:
+        logger.error(
+            f"[ZIP UPLOAD] Błąd podczas przetwarzania ZIP {archive_name}: {str(e)}"
+        )
+        # Loguj błąd
+        ActivityLog.objects.log(
+            user,
+            ActivityLog.ActionType.FILE_UPLOAD,
+            f"Błąd podczas rozpakowywania ZIP '{archive_name}': {str(e)}",
+            archive=archive_name,
+            error=str(e),
+        )
+        raise
+
+    finally:
+        # Dziennik zmian: jeden zapis dla wszystkich plików z archiwum
+        # (także tych rozpakowanych przed błędem)
+        changes.record_changes(
+            user.pk, [f["id"] for f in extracted_files], FileChange.Kind.CREATE
+        )
+
+
+def store_archive(user, uploaded_file, folder=None):
+    """
+    Zapisuje ZIP jako jeden blob (is_zip=True) do przeglądania w miejscu.
+    Katalog centralny czytamy jeszcze z wgranego pliku, więc pierwsze
+    wyświetlenie listy nie wymaga odczytu z Azure.
+    """
+    uploaded_file.seek(0)
+    members = archives.read_members(uploaded_file)
+    uploaded_file.seek(0)
+
+    user_file = UserFile(
+        owner=user,
+        original_filename=uploaded_file.name,
+        file_size=uploaded_file.size,
+        is_zip=True,
+        folder=folder,
+    )
+    checksum = file_sha256(uploaded_file)
+    user_file.file.save(uploaded_file.name, uploaded_file, save=False)
+    user_file.save()
+    user_file.create_version_snapshot(sha256=checksum)
+    archives.prime_members(user_file, members)
+    changes.record_change(user_file, FileChange.Kind.CREATE)
+
+    files_count = sum(not m["is_dir"] for m in members)
+    ActivityLog.objects.log(
+        user,
+        ActivityLog.ActionType.FILE_UPLOAD,
+        f"Utworzono archiwum (V1): {user_file.original_filename} ({files_count} plików)",
+        file=user_file,
+        bytes_transferred=user_file.file_size,
+        files=files_count,
+    )
+    return user_file
+
+
+def extract_archive_member(user, user_file, member):
+    """
+    Wypakowuje jeden plik z archiwum jako nowy UserFile
+    (czyta tylko skompresowane bajty tego wpisu).
+    """
+    original_filename = os.path.basename(member["name"])
+
+    with tempfile.SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+    ) as tmp:
+        sha256 = hashlib.sha256()
+        for chunk in archives.iter_member(user_file, member):
+            tmp.write(chunk)
+            sha256.update(chunk)
+
+        new_file = UserFile(
+            owner=user_file.owner,
+            original_filename=original_filename,
+            file_size=tmp.tell(),
+            is_zip=False,
+            folder_id=user_file.folder_id,
+        )
+        tmp.seek(0)
+        content, new_file.content_encoding = compression.prepare(
+            File(tmp, name=original_filename)
+        )
+        new_file.file.save(original_filename, content, save=False)
+    new_file.save()
+    new_file.create_version_snapshot(sha256=sha256.hexdigest())
+    changes.record_change(new_file, FileChange.Kind.CREATE)
+
+    ActivityLog.objects.log(
+        user,
+        ActivityLog.ActionType.FILE_UPLOAD,
+        f"Wypakowano z archiwum '{user_file.original_filename}': {member['name']}",
+        file=new_file,
+        bytes_transferred=new_file.file_size,
+        archive=user_file.original_filename,
+        member=member["name"],
+    )
+    return new_file
+
+
+def restore_version(user, user_file, version):
+    """
+    Przywraca wskazaną wersję pliku (kopiuje jej blob i tworzy nową wersję bieżącą).
+    Zwraca nowo utworzoną wersję.
+    """
+    storage = user_file.file.storage
+    source_path = version.file_path
+
+    # Nowa ścieżka dla przywróconej wersji (aby nie nadpisywać starego bloba)
+    restored_path = user_directory_path(user_file, version.original_filename)
+
+    saved_path = copy_blob(
+        source_path, restored_path, size=compression.blob_size(version), storage=storage
+    )
+
+    user_file.file.name = saved_path
+    user_file.original_filename = version.original_filename
+    user_file.file_size = version.file_size
+    user_file.content_encoding = version.content_encoding
+    # Kopia bloba powstaje w domyślnej warstwie (Hot)
+    user_file.blob_tier = BlobTier.HOT
+    user_file.save()
+
+    # Tworzymy nową wersję bieżącą, pamiętając z której została przywrócona
+    new_version = user_file.create_version_snapshot(
+        restored_from_version=version.version_number, sha256=version.sha256
+    )
+    changes.record_change(user_file, FileChange.Kind.UPDATE)
+
+    ActivityLog.objects.log(
+        user,
+        ActivityLog.ActionType.FILE_UPLOAD,
+        (
+            f"Przywrócono plik '{user_file.original_filename}' "
+            f"do wersji V{version.version_number} jako nową wersję V{new_version.version_number}."
+        ),
+        version=new_version,
+        restored_from=version.version_number,
+    )
+    return new_version
+
+
+def rename_file(user, user_file, new_filename):
+    """
+    Zmienia nazwę pliku (zarówno w bazie danych, jak i w Blob Storage).
+    W razie błędu usuwa nowo utworzoną kopię i rzuca wyjątek dalej.
+    """
+    old_original_name = user_file.original_filename
+    storage = user_file.file.storage
+    old_name_path = user_file.file.name
+
+    # Generujemy nową ścieżkę używając tej samej funkcji 'upload_to' z modelu
+    new_name_path = user_directory_path(user_file, new_filename)
+
+    try:
+        # Krok 1: Kopia w Blob Storage (po stronie serwera, bez pobierania pliku)
+        new_name_path = copy_blob(
+            old_name_path,
+            new_name_path,
+            size=compression.blob_size(user_file),
+            storage=storage,
+        )
+
+        # Krok 2: Aktualizacja Bazy Danych
+        user_file.original_filename = new_filename
+        user_file.file.name = (
+            new_name_path  # Kluczowe: aktualizujemy ścieżkę w FileField
+        )
+        user_file.blob_tier = BlobTier.HOT
+        user_file.save()
+        changes.record_change(user_file, FileChange.Kind.UPDATE)
+
+        # Krok 3: Usunięcie starego pliku (dopiero po sukcesie zapisu w DB)
+        storage.delete(old_name_path)
+
+        # Krok 4: Logowanie
+        ActivityLog.objects.log(
+            user,
+            ActivityLog.ActionType.FILE_RENAME,
+            f"Zmieniono nazwę pliku z '{old_original_name}' na '{new_filename}'",
+            file=user_file,
+            old_name=old_original_name,
+        )
+        return user_file
+
+    except Exception:
+        # Obsługa błędu: Jeśli coś pójdzie nie tak (np. krok 2 lub 3 się nie uda),
+        # możemy mieć zduplikowany plik (nowy) bez wpisu w DB.
+        # W ramach bezpieczeństwa usuwamy nowy plik, jeśli już powstał
+        # (delete nie zgłasza błędu, gdy bloba nie ma).
+        try:
+            storage.delete(new_name_path)
+        except Exception as cleanup_e:
+            # Logujemy błąd czyszczenia, ale główny błąd jest ważniejszy
+            logger.error(
+                f"[RENAME] Błąd podczas czyszczenia po nieudanej zmianie nazwy: {cleanup_e}"
+            )
+        raise
+
+
+def trash_file(user, instance):
+    """Przenosi plik do kosza (bez operacji na storage - bloby usuwa purge_trash)."""
+    instance.deleted_at = timezone.now()
+    instance.save(update_fields=["deleted_at"])
+    changes.record_change(instance, FileChange.Kind.DELETE)
+    logger.info(f"[DELETE] Przeniesiono do kosza: {instance.file.name}")
+
+    ActivityLog.objects.log(
+        user,
+        ActivityLog.ActionType.FILE_DELETE,
+        f"Przeniesiono do kosza: {instance.original_filename}",
+        file=instance,
+    )
+
+
+def restore_from_trash(user, instance):
+    """Przywraca plik z kosza."""
+    instance.deleted_at = None
+    instance.save(update_fields=["deleted_at"])
+    changes.record_change(instance, FileChange.Kind.CREATE)
+
+    ActivityLog.objects.log(
+        user,
+        ActivityLog.ActionType.FILE_UPLOAD,
+        f"Przywrócono plik z kosza: {instance.original_filename}",
+        file=instance,
+    )
+
+
+def _blob_paths(user_files):
+    """Ścieżki wszystkich blobów plików (bieżący, wersje, renditions) -> id plików."""
+    ids = [f.pk for f in user_files]
+    paths = {}
+    for f in user_files:
+        if f.file:
+            paths.setdefault(f.file.name, set()).add(f.pk)
+    for file_id, path in UserFileVersion.objects.filter(
+        user_file_id__in=ids
+    ).values_list("user_file_id", "file_path"):
+        paths.setdefault(path, set()).add(file_id)
+    for file_id, path in (
+        UserFileRendition.objects.filter(version__user_file_id__in=ids)
+        .exclude(file_path="")
+        .values_list("version__user_file_id", "file_path")
+    ):
+        paths.setdefault(path, set()).add(file_id)
+    return paths
+
+
+def purge_files(user_files, max_workers=None):
+    """
+    Trwale usuwa pliki: najpierw równolegle wszystkie ich bloby, potem wiersze
+    (z wersjami i renditions). Pliki, których blobów nie udało się usunąć,
+    zostają w bazie do ponowienia. Zwraca liczbę usuniętych plików.
+    """
+    if not user_files:
+        return 0
+    paths = _blob_paths(user_files)
+    failed = set()
+
+    with ThreadPoolExecutor(
+        max_workers=max_workers or settings.FILES_PURGE_CONCURRENCY
+    ) as pool:
+        futures = {pool.submit(default_storage.delete, path): path for path in paths}
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                logger.error(
+                    f"[PURGE] Nie udało się usunąć bloba {futures[future]}: {e}"
+                )
+                failed.update(paths[futures[future]])
+
+    purged = [f.pk for f in user_files if f.pk not in failed]
+    UserFile.objects.filter(pk__in=purged).delete()
+    return len(purged)
+
+
+def purge_trash(older_than=None, batch_size=None, max_workers=None):
+    """
+    Trwale usuwa pliki, które leżą w koszu dłużej niż `older_than`, partiami
+    po `batch_size`. Wiersze blokujemy z SKIP LOCKED, więc kilka procesów
+    może czyścić kosz jednocześnie. Zwraca liczbę usuniętych plików.
+    """
+    if older_than is None:
+        older_than = timedelta(days=settings.FILES_TRASH_RETENTION_DAYS)
+    batch_size = batch_size or settings.FILES_PURGE_BATCH_SIZE
+    cutoff = timezone.now() - older_than
+
+    total = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                UserFile.objects.trashed()
+                .filter(deleted_at__lt=cutoff)
+                .select_for_update(skip_locked=True)
+                .order_by("deleted_at")
+                .only("pk", "file")[:batch_size]
+            )
+            purged = purge_files(batch, max_workers=max_workers)
+        total += purged
+        if purged:
+            logger.info(f"[PURGE] Usunięto z kosza {purged} plików")
+        # Koniec kosza albo partia samych błędów (ponowimy przy kolejnym uruchomieniu)
+        if len(batch) < batch_size or not purged:
+            return total
+
+
+def delete_file(user, instance):
+    """
+    Trwale usuwa plik: wszystkie jego bloby (także wersje) i wpis z bazy.
+    Jeśli bloby nie dały się usunąć, plik zostaje w koszu do ponowienia.
+    """
+    original_filename = instance.original_filename
+    file_id = instance.pk
+    # Plik z kosza zniknął już z listy klientów (zmiana zapisana przy trash_file)
+    was_alive = instance.deleted_at is None
+    if purge_files([instance]):
+        if was_alive:
+            changes.record_change(instance, FileChange.Kind.DELETE)
+        logger.info(f"[DELETE] Usunięto trwale: {original_filename}")
+        # Wiersza pliku już nie ma - id i nazwa zostają tylko w payload
+        ActivityLog.objects.log(
+            user,
+            ActivityLog.ActionType.FILE_DELETE,
+            f"Deleted file: {original_filename}",
+            filename=original_filename,
+            file_id=file_id,
+        )
+        return
+
+    if was_alive:
+        instance.deleted_at = timezone.now()
+        instance.save(update_fields=["deleted_at"])
+        changes.record_change(instance, FileChange.Kind.DELETE)
+    ActivityLog.objects.log(
+        user,
+        ActivityLog.ActionType.FILE_DELETE,
+        f"Failed to delete file: {original_filename}. Plik pozostaje w koszu.",
+        file=instance,
+        error="blob_delete_failed",
+    )
+    raise OSError(f"Nie udało się usunąć blobów pliku {original_filename}")
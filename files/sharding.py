@@ -0,0 +1,233 @@
+"""
+Storage rozłożony na kilka kont / kontenerów Azure (shardów).
+
+Jedno konto Azure ma własne limity liczby żądań i przepustowości, więc
+z N shardami łączna przepustowość uploadu i pobierania rośnie ~N razy.
+
+- nowy blob trafia na shard wskazany przez pierścień spójnego haszowania;
+  kluczem jest właściciel (user_uploads/<id>/...), więc pliki jednego
+  użytkownika leżą na jednym koncie i kopie (zmiana nazwy, wersje) nie
+  przechodzą między kontami,
+- shard jest zapisany w nazwie bloba w bazie (UserFile.file,
+  UserFileVersion.file_path): "<shard>:user_uploads/...". Każde wywołanie
+  storage (open, url, copy, delete...) trafia więc od razu na właściwe konto,
+  bez zapytań do bazy. Nazwy bez prefiksu należą do shardu domyślnego
+  (pliki sprzed włączenia shardingu nie wymagają migracji),
+- po dodaniu shardu pierścień przypisuje mu część użytkowników (~1/N);
+  ich bloby przenosi w tle rebalance_shards (files/rebalance.py), a do tego
+  czasu są czytane ze starego miejsca. Shard z wagą 0 nie dostaje nowych
+  blobów - tak opróżnia się konto przed wyłączeniem.
+"""
+
+import bisect
+import hashlib
+import re
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import Storage
+from django.utils.module_loading import import_string
+
+from .blobs import copy_blob
+
+# Węzły wirtualne na jednostkę wagi shardu (równomierniejszy podział kluczy)
+VNODES = 128
+SEPARATOR = ":"
+
+_SHARD_NAME_RE = re.compile(r"^[a-z0-9_-]+$")
+_OWNER_RE = re.compile(r"^user_uploads/(\d+)/")
+
+
+def _hash(value):
+    return int.from_bytes(
+        hashlib.blake2b(value.encode(), digest_size=8).digest(), "big"
+    )
+
+
+class HashRing:
+    """Pierścień spójnego haszowania z węzłami wirtualnymi."""
+
+    def __init__(self, weights, vnodes=VNODES):
+        points = sorted(
+            (_hash(f"{node}#{i}"), node)
+            for node, weight in weights.items()
+            for i in range(round(vnodes * weight))
+        )
+        if not points:
+            raise ImproperlyConfigured("Co najmniej jeden shard musi mieć wagę > 0.")
+        self._points = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node(self, key):
+        index = bisect.bisect(self._points, _hash(str(key)))
+        return self._nodes[index % len(self._nodes)]
+
+
+def placement_key(path):
+    """Klucz pierścienia: właściciel dla plików użytkownika, inaczej sama ścieżka."""
+    match = _OWNER_RE.match(path)
+    return f"user:{match.group(1)}" if match else path
+
+
+def split_name(name):
+    """Rozdziela nazwę z bazy na (shard, ścieżka); bez prefiksu shard to None."""
+    shard, separator, path = name.partition(SEPARATOR)
+    if separator and _SHARD_NAME_RE.match(shard):
+        return shard, path
+    return None, name
+
+
+class ShardedStorage(Storage):
+    """
+    Opcje (STORAGES["default"]["OPTIONS"]):
+    - shards: {nazwa: {"BACKEND": ..., "OPTIONS": {...}, "WEIGHT": 1}} -
+      każdy shard to osobny backend (np. files.storage.AzureStorage
+      z innym kontem lub kontenerem),
+    - default_shard: shard nazw bez prefiksu (domyślnie pierwszy),
+    - vnodes: węzły wirtualne na jednostkę wagi.
+    """
+
+    def __init__(self, shards, default_shard=None, vnodes=VNODES):
+        if not shards:
+            raise ImproperlyConfigured(
+                "ShardedStorage wymaga co najmniej jednego shardu."
+            )
+        self.storages = {}
+        weights = {}
+        for shard, config in shards.items():
+            if not _SHARD_NAME_RE.match(shard):
+                raise ImproperlyConfigured(f"Nieprawidłowa nazwa shardu: {shard!r}")
+            weights[shard] = config.get("WEIGHT", 1)
+            self.storages[shard] = import_string(config["BACKEND"])(
+                **config.get("OPTIONS", {})
+            )
+        self.default_shard = default_shard or next(iter(shards))
+        if self.default_shard not in self.storages:
+            raise ImproperlyConfigured(f"Nieznany shard domyślny: {self.default_shard}")
+        self.ring = HashRing(weights, vnodes)
+
+    @property
+    def stores_content_encoding(self):
+        return all(
+            getattr(storage, "stores_content_encoding", False)
+            for storage in self.storages.values()
+        )
+
+    # --- Nazwy i rozmieszczenie ---
+
+    def shard_of(self, name):
+        """Shard, na którym leży blob o tej nazwie (z bazy)."""
+        return split_name(name)[0] or self.default_shard
+
+    def target_shard(self, name):
+        """Shard, na którym blob powinien leżeć według obecnego pierścienia."""
+        return self.ring.node(placement_key(split_name(name)[1]))
+
+    def qualify(self, shard, path):
+        if shard == self.default_shard:
+            return path
+        return f"{shard}{SEPARATOR}{path}"
+
+    def route(self, name):
+        """(backend shardu, nazwa bloba w nim) dla nazwy z bazy."""
+        shard, path = split_name(name)
+        return self.storages[shard or self.default_shard], path
+
+    # --- API Storage ---
+
+    def save(self, name, content, max_length=None):
+        # Nazwa z prefiksem (np. miniatura obok oryginału) zostaje na swoim shardzie
+        shard, path = split_name(name)
+        shard = shard or self.target_shard(path)
+        prefix = len(self.qualify(shard, ""))
+        saved = self.storages[shard].save(
+            path, content, max_length=max_length and max_length - prefix
+        )
+        return self.qualify(shard, saved)
+
+    def _open(self, name, mode="rb"):
+        storage, path = self.route(name)
+        return storage.open(path, mode)
+
+    def delete(self, name):
+        storage, path = self.route(name)
+        storage.delete(path)
+
+    def exists(self, name):
+        storage, path = self.route(name)
+        return storage.exists(path)
+
+    def size(self, name):
+        storage, path = self.route(name)
+        return storage.size(path)
+
+    def url(self, name, *args, **kwargs):
+        storage, path = self.route(name)
+        return storage.url(path, *args, **kwargs)
+
+    def listdir(self, path):
+        storage, path = self.route(path)
+        return storage.listdir(path)
+
+    def path(self, name):
+        storage, path = self.route(name)
+        return storage.path(path)
+
+    def get_modified_time(self, name):
+        storage, path = self.route(name)
+        return storage.get_modified_time(path)
+
+    def get_created_time(self, name):
+        storage, path = self.route(name)
+        return storage.get_created_time(path)
+
+    def get_accessed_time(self, name):
+        storage, path = self.route(name)
+        return storage.get_accessed_time(path)
+
+    def copy(self, source_name, target_name, size=None):
+        """
+        Kopia w obrębie shardu idzie po stronie serwera; między shardami
+        (nowy shard wg pierścienia) Azure kopiuje z URL-a z SAS źródła.
+        """
+        source, source_path = self.route(source_name)
+        shard, target_path = split_name(target_name)
+        shard = shard or self.target_shard(target_path)
+        target = self.storages[shard]
+
+        if target is source:
+            saved = copy_blob(source_path, target_path, size=size, storage=target)
+        elif hasattr(target, "copy_from_url"):
+            if size is None:
+                size = source.size(source_path)
+            source_url = source.url(source_path, expire=3600)
+            saved = target.copy_from_url(source_url, target_path, size)
+        else:
+            with source.open(source_path, "rb") as src:
+                saved = target.save(target_path, src)
+        return self.qualify(shard, saved)
+
+    # --- Warstwy dostępu (files/tiering.py) ---
+
+    def set_tiers(self, names, tier, rehydrate_priority=None):
+        by_shard = {}
+        for name in names:
+            shard, path = split_name(name)
+            by_shard.setdefault(shard or self.default_shard, {})[path] = name
+        failed = []
+        for shard, paths in by_shard.items():
+            storage = self.storages[shard]
+            if not hasattr(storage, "set_tiers"):
+                continue
+            failed.extend(
+                paths[path]
+                for path in storage.set_tiers(
+                    list(paths), tier, rehydrate_priority=rehydrate_priority
+                )
+            )
+        return failed
+
+    def get_tier(self, name):
+        storage, path = self.route(name)
+        if not hasattr(storage, "get_tier"):
+            return "Hot", None
+        return storage.get_tier(path)
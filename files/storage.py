@@ -0,0 +1,344 @@
+"""
+Backend Azure Blob Storage używany jako default_storage.
+
+Wszystkie instancje storage w procesie współdzielą jeden BlobServiceClient
+(a więc jedną sesję HTTP z pulą połączeń keep-alive), dzięki czemu kolejne
+wywołania nie zestawiają od nowa połączenia TCP/TLS. Rozmiary bloków
+i równoległość transferów są konfigurowalne (settings.STORAGES).
+"""
+
+import os
+import threading
+import time
+from tempfile import SpooledTemporaryFile
+
+from azure.core.exceptions import ResourceNotFoundError
+from azure.storage.blob import BlobServiceClient, ContentSettings
+from django.core.files.base import File
+from django.utils import timezone
+from storages.backends.azure_storage import AzureStorage as BaseAzureStorage
+from storages.backends.azure_storage import AzureStorageFile
+from storages.utils import clean_name, setting
+
+from monitoring.azure import InstrumentedRequestsTransport
+
+from . import blob_cache
+from .blob_cache import BlobMetadata
+
+MB = 1024 * 1024
+# Limit operacji w jednym żądaniu Blob Batch
+TIER_BATCH_SIZE = 256
+
+_service_clients = {}
+_service_clients_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    # Sesja HTTP i jej gniazda nie mogą być współdzielone między procesami
+    global _service_clients_lock
+    _service_clients.clear()
+    _service_clients_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class PooledRequestsTransport(InstrumentedRequestsTransport):
+    """Transport z pulą `max_connections` połączeń keep-alive na host."""
+
+    def __init__(self, max_connections=32, **kwargs):
+        self.max_connections = max_connections
+        super().__init__(**kwargs)
+
+    def _init_session(self, session):
+        super()._init_session(session)
+        # Ten sam adapter co w azure-core, tylko z większą pulą połączeń
+        for prefix, adapter in list(session.adapters.items()):
+            session.mount(
+                prefix,
+                type(adapter)(
+                    pool_connections=self.max_connections,
+                    pool_maxsize=self.max_connections,
+                    max_retries=adapter.max_retries,
+                ),
+            )
+
+
+class ParallelAzureStorageFile(AzureStorageFile):
+    """Plik z Azure pobierany równolegle (max_concurrency) zamiast chunk po chunku."""
+
+    def _get_file(self):
+        if self._file is not None:
+            return self._file
+
+        file = SpooledTemporaryFile(
+            max_size=self._storage.max_memory_size,
+            suffix=".AzureStorageFile",
+            dir=setting("FILE_UPLOAD_TEMP_DIR", None),
+        )
+        if "r" in self._mode or "a" in self._mode:
+            download_stream = self._storage.client.download_blob(
+                self._path,
+                max_concurrency=self._storage.download_max_conn,
+                timeout=self._storage.timeout,
+            )
+            download_stream.readinto(file)
+        if "r" in self._mode:
+            file.seek(0)
+
+        self._file = file
+        return self._file
+
+    file = property(_get_file, AzureStorageFile._set_file)
+
+
+class AzureStorage(BaseAzureStorage):
+    """
+    AzureStorage z django-storages ze współdzielonym klientem, strojeniem
+    transferów, cache metadanych blobów i pomiarem wywołań
+    (nagłówek Server-Timing i /metrics).
+    """
+
+    # Blob skompresowany (files/compression.py) ma nagłówek Content-Encoding
+    stores_content_encoding = True
+
+    def get_default_settings(self):
+        return {
+            **super().get_default_settings(),
+            # Maksymalna liczba otwartych połączeń do Azure w procesie
+            "max_connections": setting("AZURE_MAX_CONNECTIONS", 32),
+            "download_max_conn": setting("AZURE_DOWNLOAD_MAX_CONN", 4),
+            # Pliki większe niż max_single_put_size są wysyłane blokami równolegle
+            "max_single_put_size": setting("AZURE_MAX_SINGLE_PUT_SIZE", 8 * MB),
+            "max_block_size": setting("AZURE_MAX_BLOCK_SIZE", 4 * MB),
+            # Pobieranie: pierwsze żądanie do max_single_get_size, dalej chunkami
+            "max_single_get_size": setting("AZURE_MAX_SINGLE_GET_SIZE", 8 * MB),
+            "max_chunk_get_size": setting("AZURE_MAX_CHUNK_GET_SIZE", 4 * MB),
+            "connection_timeout": setting("AZURE_SOCKET_CONNECT_TIMEOUT_SECS", 10),
+            "read_timeout": setting("AZURE_SOCKET_READ_TIMEOUT_SECS", 60),
+        }
+
+    def _client_key(self):
+        return (
+            self.connection_string,
+            self.account_name,
+            self.account_key,
+            self.sas_token,
+            id(self.token_credential) if self.token_credential else None,
+            self.endpoint_suffix,
+            self.azure_ssl,
+            self.api_version,
+            self.max_connections,
+            self.max_single_put_size,
+            self.max_block_size,
+            self.max_single_get_size,
+            self.max_chunk_get_size,
+            self.connection_timeout,
+            self.read_timeout,
+            repr(sorted(self.client_options.items())),
+        )
+
+    def _get_service_client(self):
+        key = self._client_key()
+        with _service_clients_lock:
+            client = _service_clients.get(key)
+            if client is None:
+                client = _service_clients[key] = self._create_service_client()
+        return client
+
+    def _create_service_client(self):
+        # Opcje lokalnie - self.client_options wchodzi do _client_key(), więc
+        # jego zmiana dawałaby przy następnym wywołaniu drugiego klienta i pulę
+        options = {
+            "transport": PooledRequestsTransport(
+                max_connections=self.max_connections,
+                connection_timeout=self.connection_timeout,
+                read_timeout=self.read_timeout,
+            ),
+            "max_single_put_size": self.max_single_put_size,
+            "max_block_size": self.max_block_size,
+            "max_single_get_size": self.max_single_get_size,
+            "max_chunk_get_size": self.max_chunk_get_size,
+            **self.client_options,
+        }
+        if self.connection_string is not None:
+            return BlobServiceClient.from_connection_string(
+                self.connection_string, **options
+            )
+
+        # Jak AzureStorage._get_service_client z django-storages, które czyta
+        # (i przy api_version zmienia) self.client_options
+        account_url = (
+            f"{self.azure_protocol}://{self.account_name}.blob.{self.endpoint_suffix}"
+        )
+        credential = None
+        if self.account_key:
+            credential = {
+                "account_name": self.account_name,
+                "account_key": self.account_key,
+            }
+        elif self.sas_token:
+            credential = self.sas_token
+        elif self.token_credential:
+            credential = self.token_credential
+        if self.api_version:
+            options["api_version"] = self.api_version
+        return BlobServiceClient(account_url, credential=credential, **options)
+
+    def _open(self, name, mode="rb"):
+        return ParallelAzureStorageFile(name, mode, self)
+
+    # --- Metadane (files/blob_cache.py) ---
+
+    def _cache_key(self, path):
+        # Ta sama ścieżka może istnieć na kilku kontach (files/sharding.py)
+        return f"{self.account_name}/{self.azure_container}/{path}"
+
+    def _properties(self, name):
+        path = self._get_valid_path(name)
+        cached = blob_cache.lookup(self._cache_key(path))
+        if isinstance(cached, BlobMetadata):
+            return cached
+        properties = self.client.get_blob_client(path).get_blob_properties(
+            timeout=self.timeout
+        )
+        metadata = BlobMetadata(properties.size, properties.last_modified)
+        blob_cache.remember(self._cache_key(path), metadata)
+        return metadata
+
+    def _get_content_settings_parameters(self, name, content=None):
+        params = super()._get_content_settings_parameters(name, content)
+        # Kodowanie ustawione przez files/compression.py (domyślnie zgadywane z nazwy)
+        params["content_encoding"] = (
+            getattr(content, "content_encoding", None) or params["content_encoding"]
+        )
+        return params
+
+    def _save(self, name, content):
+        cleaned_name = clean_name(name)
+        name = self._get_valid_path(name)
+        params = self._get_content_settings_parameters(name, content)
+
+        # Unwrap django file (wrapped by parent's save call)
+        if isinstance(content, File):
+            content = content.file
+
+        content.seek(0, os.SEEK_END)
+        size = content.tell()
+        content.seek(0)
+        result = self.client.upload_blob(
+            name,
+            content,
+            content_settings=ContentSettings(**params),
+            max_concurrency=self.upload_max_conn,
+            timeout=self.timeout,
+            overwrite=self.overwrite_files,
+        )
+        blob_cache.remember(
+            self._cache_key(name), BlobMetadata(size, result.get("last_modified"))
+        )
+        return cleaned_name
+
+    def copy(self, source_name, target_name, size=None):
+        """
+        Kopiuje blob po stronie Azure (bez przesyłania danych przez aplikację).
+        Zwraca nazwę docelową, tak jak save().
+        """
+        if self.account_key:
+            # W obrębie jednego konta źródło autoryzuje ten sam klucz
+            source_url = self.client.get_blob_client(
+                self._get_valid_path(source_name)
+            ).url
+        else:
+            source_url = self.url(source_name, expire=self.expiration_secs or 3600)
+        if size is None:
+            size = self._properties(source_name).size
+        return self.copy_from_url(source_url, target_name, size)
+
+    def copy_from_url(self, source_url, target_name, size):
+        """
+        Kopiuje blob spod `source_url` (np. URL z SAS innego konta) pod
+        `target_name` po stronie Azure. Zwraca nazwę docelową.
+        """
+        target_path = self._get_valid_path(target_name)
+        target = self.client.get_blob_client(target_path)
+        result = target.start_copy_from_url(source_url, timeout=self.timeout)
+        status = result.get("copy_status")
+        last_modified = result.get("last_modified")
+        while status == "pending":
+            time.sleep(0.2)
+            properties = target.get_blob_properties(timeout=self.timeout)
+            status = properties.copy.status
+            size, last_modified = properties.size, properties.last_modified
+        if status != "success":
+            # Bez source_url w komunikacie - może zawierać token SAS
+            raise OSError(f"Kopiowanie do {target_path}: {status}")
+
+        blob_cache.remember(
+            self._cache_key(target_path), BlobMetadata(size, last_modified)
+        )
+        return clean_name(target_name)
+
+    # --- Warstwy dostępu (files/tiering.py) ---
+
+    def set_tiers(self, names, tier, rehydrate_priority=None):
+        """
+        Zmienia warstwę blobów (Hot/Cool/Cold/Archive) żądaniami Blob Batch
+        po 256 blobów. Zwraca listę nazw, których nie udało się zmienić.
+        """
+        failed = []
+        for i in range(0, len(names), TIER_BATCH_SIZE):
+            chunk = names[i : i + TIER_BATCH_SIZE]
+            responses = self.client.set_standard_blob_tier_blobs(
+                tier,
+                *[self._get_valid_path(name) for name in chunk],
+                rehydrate_priority=rehydrate_priority,
+                raise_on_any_failure=False,
+                timeout=self.timeout,
+            )
+            failed.extend(
+                name
+                for name, response in zip(chunk, responses)
+                if response.status_code not in (200, 202)
+            )
+        return failed
+
+    def get_tier(self, name):
+        """Warstwa bloba i stan przywracania z Archive (np. "rehydrate-pending-to-hot")."""
+        properties = self.client.get_blob_client(
+            self._get_valid_path(name)
+        ).get_blob_properties(timeout=self.timeout)
+        return properties.blob_tier, properties.archive_status
+
+    def size(self, name):
+        return self._properties(name).size
+
+    def exists(self, name):
+        if not name:
+            return True
+        path = self._get_valid_path(name)
+        cached = blob_cache.lookup(self._cache_key(path))
+        if cached is blob_cache.MISSING:
+            return False
+        if cached is not None:
+            return True
+        try:
+            self._properties(name)
+        except ResourceNotFoundError:
+            return False
+        return True
+
+    def delete(self, name):
+        # Jedno idempotentne wywołanie: 404 (już usunięty) nie jest błędem
+        super().delete(name)
+        blob_cache.mark_missing(self._cache_key(self._get_valid_path(name)))
+
+    def get_modified_time(self, name):
+        last_modified = self._properties(name).last_modified
+        if not setting("USE_TZ", False):
+            return timezone.make_naive(last_modified)
+
+        tz = timezone.get_current_timezone()
+        if timezone.is_naive(last_modified):
+            return timezone.make_aware(last_modified, tz)
+        return last_modified.astimezone(tz)
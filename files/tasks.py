@@ -0,0 +1,84 @@
+"""
+Handlery zadań w tle dla aplikacji files (rejestrowane automatycznie przez jobs).
+
+Operacje, których ponowienie mogłoby zduplikować dane (ZIP, zmiana nazwy,
+przywracanie), mają jedną próbę; idempotentne (usuwanie, miniatury) - kilka.
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+
+from jobs.registry import job_handler
+
+from . import services, tiering
+from .models import Folder, UserFile, UserFileVersion
+from .renditions import generate_renditions
+
+
+def _get_user(job):
+    user_id = job.payload.get("user_id")
+    if user_id is None:
+        return None
+    return get_user_model().objects.filter(pk=user_id).first()
+
+
+@job_handler("files.generate_renditions")
+def generate_renditions_task(job):
+    renditions = generate_renditions(job.payload["version_id"])
+    return {"renditions": [r.kind for r in renditions]}
+
+
+@job_handler("files.extract_zip", max_attempts=1)
+def extract_zip_task(job):
+    """
+    Rozpakowuje ZIP wgrany wcześniej do tymczasowego bloba (staging_path).
+    Tymczasowy blob usuwamy po sukcesie lub po ostatniej nieudanej próbie.
+    """
+    staging_path = job.payload["staging_path"]
+    try:
+        with default_storage.open(staging_path, "rb") as archive:
+            extracted_files = services.extract_zip(
+                _get_user(job),
+                job.payload["archive_name"],
+                archive,
+                folder=Folder.objects.filter(pk=job.payload.get("folder_id")).first(),
+            )
+    except Exception:
+        if job.is_last_attempt:
+            default_storage.delete(staging_path)
+        raise
+
+    default_storage.delete(staging_path)
+    return {"extracted_files": extracted_files}
+
+
+@job_handler("files.rename", max_attempts=1)
+def rename_task(job):
+    user_file = UserFile.objects.get(pk=job.payload["file_id"])
+    services.rename_file(_get_user(job), user_file, job.payload["new_filename"])
+    return {"id": user_file.pk, "original_filename": user_file.original_filename}
+
+
+@job_handler("files.restore_version", max_attempts=1)
+def restore_version_task(job):
+    user_file = UserFile.objects.get(pk=job.payload["file_id"])
+    version = UserFileVersion.objects.get(
+        pk=job.payload["version_id"], user_file=user_file
+    )
+    new_version = services.restore_version(_get_user(job), user_file, version)
+    return {"id": user_file.pk, "version_number": new_version.version_number}
+
+
+@job_handler("files.delete")
+def delete_task(job):
+    user_file = UserFile.objects.filter(pk=job.payload["file_id"]).first()
+    if user_file is None:
+        # Już usunięty (np. ponowienie po częściowym sukcesie)
+        return {"id": job.payload["file_id"], "deleted": True}
+    services.delete_file(_get_user(job), user_file)
+    return {"id": job.payload["file_id"], "deleted": True}
+
+
+@job_handler("files.promote_blobs")
+def promote_blobs_task(job):
+    return {"promoted": tiering.promote_files(job.payload["file_ids"])}
@@ -1,3 +1,224 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import access, tiering
+from .models import BlobTier, UserFile, UserFileVersion
+
+
+class StubStorage:
+    """Storage z warstwami Azure: zapisuje wywołania set_tiers zamiast żądań Blob Batch."""
+
+    def __init__(self, tiers=None, fail=()):
+        self.tiers = tiers or {}
+        self.fail = set(fail)
+        self.calls = []
+
+    def set_tiers(self, names, tier, rehydrate_priority=None):
+        self.calls.append((sorted(names), tier, rehydrate_priority))
+        return [name for name in names if name in self.fail]
+
+    def get_tier(self, name):
+        return self.tiers.get(name, ("Hot", None))
+
+
+def make_file(owner, name, days_old=0, **fields):
+    user_file = UserFile.objects.create(
+        owner=owner,
+        file=f"{owner.pk}/{name}",
+        original_filename=name,
+        file_size=10,
+        **fields,
+    )
+    UserFile.objects.filter(pk=user_file.pk).update(
+        uploaded_at=timezone.now() - timedelta(days=days_old)
+    )
+    return user_file
+
+
+def make_version(user_file, number, file_path, days_old=0):
+    version = UserFileVersion.objects.create(
+        user_file=user_file,
+        version_number=number,
+        file_path=file_path,
+        original_filename=user_file.original_filename,
+        file_size=10,
+    )
+    UserFileVersion.objects.filter(pk=version.pk).update(
+        created_at=timezone.now() - timedelta(days=days_old)
+    )
+    return version
+
+
+class FilesTestCase(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "alice", "alice@example.com", "pw12345!"
+        )
+
+
+@override_settings(FILES_ACCESS_FLUSH_INTERVAL=3600)
+class AccessCounterTests(FilesTestCase):
+    def test_flush_aggregates_hits(self):
+        hot = make_file(self.user, "a.txt", access_count=10)
+        cool = make_file(self.user, "b.txt", blob_tier=BlobTier.COOL)
+        counter = access.AccessCounter()
+        for file_id in (hot.pk, cool.pk, hot.pk, hot.pk):
+            counter.record(file_id)
+
+        with mock.patch.object(access, "enqueue") as enqueue:
+            promoted = counter.flush()
+
+        hot.refresh_from_db()
+        cool.refresh_from_db()
+        self.assertEqual(hot.access_count, 13)
+        self.assertEqual(cool.access_count, 1)
+        self.assertIsNotNone(hot.last_accessed_at)
+        self.assertGreaterEqual(hot.last_accessed_at, cool.last_accessed_at)
+        # Odczytany plik z Cool wraca do Hot w tle
+        self.assertEqual(promoted, [cool.pk])
+        enqueue.assert_called_once_with("files.promote_blobs", {"file_ids": [cool.pk]})
+        self.assertEqual(counter.hits, {})
+
+    def test_flush_keeps_newer_access_time(self):
+        later = timezone.now() + timedelta(hours=1)
+        user_file = make_file(self.user, "a.txt", last_accessed_at=later)
+        counter = access.AccessCounter()
+        counter.record(user_file.pk)
+
+        with mock.patch.object(access, "enqueue") as enqueue:
+            self.assertEqual(counter.flush(), [])
+
+        user_file.refresh_from_db()
+        self.assertEqual(user_file.access_count, 1)
+        self.assertEqual(user_file.last_accessed_at, later)
+        enqueue.assert_not_called()
+
+
+@override_settings(
+    FILES_TIER_COOL_AFTER_DAYS=30,
+    FILES_TIER_ARCHIVE_AFTER_DAYS=0,
+    FILES_TIER_VERSION_ARCHIVE_AFTER_DAYS=30,
+)
+class TierBlobsTests(FilesTestCase):
+    def test_selects_idle_files_and_old_versions(self):
+        idle = make_file(self.user, "idle.txt", days_old=40)
+        recent = make_file(self.user, "recent.txt", days_old=5)
+        read = make_file(
+            self.user,
+            "read.txt",
+            days_old=40,
+            last_accessed_at=timezone.now() - timedelta(days=1),
+        )
+        trashed = make_file(
+            self.user, "trashed.txt", days_old=40, deleted_at=timezone.now()
+        )
+        # Bieżąca wersja dzieli blob z plikiem, starsze mają własne
+        current = make_version(idle, 2, idle.file.name, days_old=40)
+        old = make_version(idle, 1, f"{self.user.pk}/idle_v1.txt", days_old=40)
+        young = make_version(recent, 1, f"{self.user.pk}/recent_v1.txt", days_old=5)
+        storage = StubStorage()
+
+        report = tiering.tier_blobs(storage=storage, batch_size=10)
+
+        self.assertEqual(
+            report, {"rehydrated": 0, "cool": 1, "archive": 0, "versions_archive": 1}
+        )
+        self.assertEqual(
+            storage.calls,
+            [
+                ([idle.file.name], "Cool", None),
+                ([old.file_path], "Archive", None),
+            ],
+        )
+        tiers = dict(UserFile.objects.values_list("pk", "blob_tier"))
+        self.assertEqual(tiers[idle.pk], BlobTier.COOL)
+        self.assertEqual(tiers[recent.pk], BlobTier.HOT)
+        self.assertEqual(tiers[read.pk], BlobTier.HOT)
+        self.assertEqual(tiers[trashed.pk], BlobTier.HOT)
+        versions = dict(UserFileVersion.objects.values_list("pk", "blob_tier"))
+        self.assertEqual(versions[current.pk], BlobTier.COOL)
+        self.assertEqual(versions[old.pk], BlobTier.ARCHIVE)
+        self.assertEqual(versions[young.pk], BlobTier.HOT)
+
+    def test_batches_and_failed_blobs(self):
+        files = [make_file(self.user, f"f{i}.txt", days_old=40) for i in range(3)]
+        storage = StubStorage(fail=[files[1].file.name])
+
+        report = tiering.tier_blobs(storage=storage, batch_size=2)
+
+        # Blob, którego nie udało się przenieść, wraca w kolejnych partiach,
+        # aż partia będzie niepełna
+        self.assertEqual(report["cool"], 2)
+        self.assertEqual([len(names) for names, _, _ in storage.calls], [2, 2, 1])
+        tiers = dict(UserFile.objects.values_list("pk", "blob_tier"))
+        self.assertEqual(tiers[files[0].pk], BlobTier.COOL)
+        self.assertEqual(tiers[files[1].pk], BlobTier.HOT)
+        self.assertEqual(tiers[files[2].pk], BlobTier.COOL)
+
+    @override_settings(FILES_TIER_VERSION_ARCHIVE_AFTER_DAYS=0)
+    def test_version_archive_disabled(self):
+        user_file = make_file(self.user, "a.txt", days_old=5)
+        old = make_version(user_file, 1, f"{self.user.pk}/a_v1.txt", days_old=400)
+        storage = StubStorage()
+
+        report = tiering.tier_blobs(storage=storage, batch_size=10)
+
+        self.assertEqual(report["versions_archive"], 0)
+        self.assertEqual(storage.calls, [])
+        old.refresh_from_db()
+        self.assertEqual(old.blob_tier, BlobTier.HOT)
+
+
+@override_settings(FILES_REHYDRATE_PRIORITY="High", FILES_REHYDRATE_RETRY_AFTER=900)
+class EnsureOnlineTests(FilesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.storage = StubStorage()
+        # FieldFile bierze storage z pola przy tworzeniu instancji
+        patcher = mock.patch.object(
+            UserFile._meta.get_field("file"), "storage", self.storage
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user_file = make_file(self.user, "a.txt", blob_tier=BlobTier.ARCHIVE)
+        self.name = self.user_file.file.name
+
+    def test_archive_starts_rehydration(self):
+        with self.assertRaises(tiering.BlobRehydrating) as raised:
+            tiering.ensure_online(self.user_file)
+
+        self.assertEqual(raised.exception.retry_after, 900)
+        self.assertEqual(self.storage.calls, [([self.name], "Hot", "High")])
+        self.user_file.refresh_from_db()
+        self.assertEqual(self.user_file.blob_tier, BlobTier.REHYDRATING)
+
+    def test_rehydrating_until_online(self):
+        UserFile.objects.filter(pk=self.user_file.pk).update(
+            blob_tier=BlobTier.REHYDRATING
+        )
+        self.user_file.refresh_from_db()
+        self.storage.tiers[self.name] = ("Archive", "rehydrate-pending-to-hot")
+        with self.assertRaises(tiering.BlobRehydrating):
+            tiering.ensure_online(self.user_file)
+
+        self.storage.tiers[self.name] = ("Hot", None)
+        tiering.ensure_online(self.user_file)
+
+        self.assertEqual(self.storage.calls, [])
+        self.user_file.refresh_from_db()
+        self.assertEqual(self.user_file.blob_tier, BlobTier.HOT)
+
+    def test_view_returns_202(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        response = client.get(f"/api/files/{self.user_file.pk}/view/")
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response["Retry-After"], "900")
+        self.assertEqual(response.data["status"], "rehydrating")
@@ -0,0 +1,227 @@
+"""
+Automatyczne przenoszenie rzadko używanych blobów do tańszych warstw Azure.
+
+- bieżący blob pliku nieodczytywanego od FILES_TIER_COOL_AFTER_DAYS trafia
+  do Cool (odczyt działa od razu, tylko drożej), a po
+  FILES_TIER_ARCHIVE_AFTER_DAYS (0 = nigdy) do Archive,
+- bloby starszych wersji (nie bieżącej) po FILES_TIER_VERSION_ARCHIVE_AFTER_DAYS
+  trafiają do Archive - czyta je tylko przywracanie wersji,
+- odczyt pliku z Cool przenosi go z powrotem do Hot (files/access.py),
+- żądanie pliku z Archive zleca przywrócenie (rehydratację) i zwraca 202
+  z Retry-After; klient ponawia żądanie, aż blob będzie znowu dostępny.
+
+Warstwę zmieniamy żądaniami Blob Batch (do 256 blobów naraz). Backend bez
+warstw (np. FileSystemStorage) zmienia tylko stan w bazie.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import F
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import BlobTier, UserFile, UserFileVersion
+
+logger = logging.getLogger(__name__)
+
+_AZURE_TIERS = {
+    BlobTier.HOT: "Hot",
+    BlobTier.COOL: "Cool",
+    BlobTier.ARCHIVE: "Archive",
+}
+
+
+class BlobRehydrating(Exception):
+    """Blob jest w warstwie Archive - przywracanie trwa, trzeba spróbować później."""
+
+    def __init__(self, name, retry_after):
+        super().__init__(name)
+        self.name = name
+        self.retry_after = retry_after
+
+
+def _set_tiers(storage, names, tier, rehydrate_priority=None):
+    """Zmienia warstwę blobów; zwraca zbiór nazw, których nie udało się zmienić."""
+    if not names or not hasattr(storage, "set_tiers"):
+        return set()
+    try:
+        return set(
+            storage.set_tiers(
+                names, _AZURE_TIERS[tier], rehydrate_priority=rehydrate_priority
+            )
+        )
+    except Exception as e:
+        logger.error(f"[TIERING] Nie udało się zmienić warstwy na {tier}: {e}")
+        return set(names)
+
+
+def _is_online(storage, name):
+    if not hasattr(storage, "get_tier"):
+        return True
+    tier, archive_status = storage.get_tier(name)
+    return tier != "Archive" and not archive_status
+
+
+def _update_files(file_ids, tier):
+    """Warstwa bieżących blobów plików i wersji, które wskazują ten sam blob."""
+    UserFile.objects.filter(pk__in=file_ids).update(blob_tier=tier)
+    UserFileVersion.objects.filter(
+        user_file_id__in=file_ids, file_path=F("user_file__file")
+    ).update(blob_tier=tier)
+
+
+# --- Przenoszenie do tańszych warstw ---
+
+
+def _tier_files(storage, from_tier, to_tier, older_than, batch_size):
+    cutoff = timezone.now() - older_than
+    total = 0
+    while True:
+        batch = list(
+            UserFile.objects.alive()
+            .annotate(last_used=Coalesce("last_accessed_at", "uploaded_at"))
+            .filter(blob_tier=from_tier, last_used__lt=cutoff)
+            .order_by("blob_tier", "last_used")
+            .values_list("pk", "file")[:batch_size]
+        )
+        if not batch:
+            return total
+        failed = _set_tiers(storage, [name for _, name in batch], to_tier)
+        moved = [pk for pk, name in batch if name not in failed]
+        _update_files(moved, to_tier)
+        total += len(moved)
+        logger.info(f"[TIERING] {from_tier} -> {to_tier}: {len(moved)} plików")
+        # Partia samych błędów - ponowimy przy kolejnym uruchomieniu
+        if len(batch) < batch_size or not moved:
+            return total
+
+
+def _archive_versions(storage, older_than, batch_size):
+    cutoff = timezone.now() - older_than
+    total = 0
+    while True:
+        # Tylko starsze wersje: bieżący blob pliku obsługuje _tier_files
+        batch = list(
+            UserFileVersion.objects.filter(
+                blob_tier__in=[BlobTier.HOT, BlobTier.COOL], created_at__lt=cutoff
+            )
+            .exclude(file_path=F("user_file__file"))
+            .order_by("created_at")
+            .values_list("pk", "file_path")[:batch_size]
+        )
+        if not batch:
+            return total
+        failed = _set_tiers(storage, [path for _, path in batch], BlobTier.ARCHIVE)
+        moved = [pk for pk, path in batch if path not in failed]
+        UserFileVersion.objects.filter(pk__in=moved).update(blob_tier=BlobTier.ARCHIVE)
+        total += len(moved)
+        logger.info(f"[TIERING] wersje -> archive: {len(moved)}")
+        if len(batch) < batch_size or not moved:
+            return total
+
+
+def finish_rehydration(storage=None):
+    """Oznacza jako Hot bloby, których przywracanie z Archive już się zakończyło."""
+    storage = storage or default_storage
+    done = 0
+    for pk, name in UserFile.objects.filter(blob_tier=BlobTier.REHYDRATING).values_list(
+        "pk", "file"
+    ):
+        if _is_online(storage, name):
+            _update_files([pk], BlobTier.HOT)
+            done += 1
+    for pk, path in UserFileVersion.objects.filter(
+        blob_tier=BlobTier.REHYDRATING
+    ).values_list("pk", "file_path"):
+        if _is_online(storage, path):
+            UserFileVersion.objects.filter(pk=pk).update(blob_tier=BlobTier.HOT)
+            done += 1
+    return done
+
+
+def tier_blobs(storage=None, batch_size=None):
+    """Jedno przejście tier_blobs. Zwraca liczniki przeniesionych blobów."""
+    storage = storage or default_storage
+    batch_size = batch_size or settings.FILES_TIER_BATCH_SIZE
+    report = {
+        "rehydrated": finish_rehydration(storage),
+        "cool": _tier_files(
+            storage,
+            BlobTier.HOT,
+            BlobTier.COOL,
+            timedelta(days=settings.FILES_TIER_COOL_AFTER_DAYS),
+            batch_size,
+        ),
+        "archive": 0,
+        "versions_archive": 0,
+    }
+    if settings.FILES_TIER_ARCHIVE_AFTER_DAYS:
+        report["archive"] = _tier_files(
+            storage,
+            BlobTier.COOL,
+            BlobTier.ARCHIVE,
+            timedelta(days=settings.FILES_TIER_ARCHIVE_AFTER_DAYS),
+            batch_size,
+        )
+    if settings.FILES_TIER_VERSION_ARCHIVE_AFTER_DAYS:
+        report["versions_archive"] = _archive_versions(
+            storage,
+            timedelta(days=settings.FILES_TIER_VERSION_ARCHIVE_AFTER_DAYS),
+            batch_size,
+        )
+    return report
+
+
+# --- Powrót do Hot ---
+
+
+def promote_files(file_ids, storage=None):
+    """Przenosi odczytywane pliki z Cool z powrotem do Hot."""
+    storage = storage or default_storage
+    files = list(
+        UserFile.objects.filter(pk__in=file_ids, blob_tier=BlobTier.COOL).values_list(
+            "pk", "file"
+        )
+    )
+    failed = _set_tiers(storage, [name for _, name in files], BlobTier.HOT)
+    promoted = [pk for pk, name in files if name not in failed]
+    _update_files(promoted, BlobTier.HOT)
+    return len(promoted)
+
+
+def _mark(user_file, version, tier):
+    if version:
+        UserFileVersion.objects.filter(pk=version.pk).update(blob_tier=tier)
+        version.blob_tier = tier
+    else:
+        _update_files([user_file.pk], tier)
+        user_file.blob_tier = tier
+
+
+def ensure_online(user_file, version=None):
+    """
+    Sprawdza, czy blob pliku (albo wskazanej wersji) da się odczytać.
+    Blob z Archive jest przywracany do Hot, a wywołujący dostaje
+    BlobRehydrating - do czasu zakończenia przywracania (do kilkunastu godzin).
+    """
+    tier = (version or user_file).blob_tier
+    if tier not in (BlobTier.ARCHIVE, BlobTier.REHYDRATING):
+        return
+    name = version.file_path if version else user_file.file.name
+    storage = user_file.file.storage
+
+    if tier == BlobTier.REHYDRATING:
+        if _is_online(storage, name):
+            _mark(user_file, version, BlobTier.HOT)
+            return
+    else:
+        priority = settings.FILES_REHYDRATE_PRIORITY
+        if _set_tiers(storage, [name], BlobTier.HOT, rehydrate_priority=priority):
+            raise OSError(f"Nie udało się zlecić przywrócenia {name} z archiwum")
+        _mark(user_file, version, BlobTier.REHYDRATING)
+        logger.info(f"[TIERING] Zlecono przywrócenie z archiwum: {name}")
+
+    raise BlobRehydrating(name, settings.FILES_REHYDRATE_RETRY_AFTER)
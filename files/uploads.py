@@ -0,0 +1,109 @@
+"""
+Handlery uploadu liczące SHA-256 pliku w trakcie odbierania żądania.
+
+Zastępują domyślne handlery Django (pamięć / plik tymczasowy) i dopisują
+do wgranego pliku atrybut `sha256`, więc suma kontrolna nie wymaga
+ponownego czytania pliku ani pobierania bloba z Azure. Pliki tekstowe są
+przy tym od razu kompresowane (atrybut `compressed`, files/compression.py).
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.files.uploadhandler import (
+    MemoryFileUploadHandler,
+    TemporaryFileUploadHandler,
+)
+
+from .compression import Compressor, is_compressible, too_large, worth_compressing
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class ChecksumMixin:
+    def new_file(self, *args, **kwargs):
+        # Przed super() - handler pamięciowy kończy new_file wyjątkiem StopFutureHandlers
+        self._sha256 = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        result = super().receive_data_chunk(raw_data, start)
+        if result is None:
+            # Ten handler zapisał fragment (nie przekazuje go dalej)
+            self._sha256.update(raw_data)
+        return result
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None:
+            file.sha256 = self._sha256.hexdigest()
+        return file
+
+
+class CompressionMixin:
+    """
+    Kompresuje plik tekstowy równolegle z odbieraniem. `compressed` to plik
+    gzip do zapisu w storage albo None (typ nietekstowy, dane już
+    skompresowane, zbyt mały zysk, plik większy niż FILES_COMPRESSION_MAX_SIZE).
+    """
+
+    def new_file(self, field_name, file_name, content_type, *args, **kwargs):
+        self._compressor = None
+        self._compress = settings.FILES_COMPRESSION_ENABLED and is_compressible(
+            file_name, content_type
+        )
+        super().new_file(field_name, file_name, content_type, *args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        result = super().receive_data_chunk(raw_data, start)
+        if result is None and self._compress:
+            if self._compressor is None:
+                # Decyzja po pierwszym fragmencie (sygnatura i próbka danych)
+                if start or not worth_compressing(raw_data):
+                    self._compress = False
+                    return result
+                self._compressor = Compressor()
+            if too_large(start + len(raw_data)):
+                # Za duży na kompresję - przestajemy kompresować od razu
+                self._compressor.discard()
+                self._compressor = None
+                self._compress = False
+                return result
+            self._compressor.write(raw_data)
+        return result
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None:
+            file.compressed = (
+                self._compressor.finish(file_size) if self._compressor else None
+            )
+        return file
+
+
+class ChecksumMemoryFileUploadHandler(
+    CompressionMixin, ChecksumMixin, MemoryFileUploadHandler
+):
+    pass
+
+
+class ChecksumTemporaryFileUploadHandler(
+    CompressionMixin, ChecksumMixin, TemporaryFileUploadHandler
+):
+    pass
+
+
+def file_sha256(fileobj, chunk_size=CHUNK_SIZE):
+    """
+    SHA-256 obiektu plikowego. Dla plików wgranych przez handlery powyżej
+    zwraca policzoną już sumę bez czytania danych.
+    """
+    checksum = getattr(fileobj, "sha256", None)
+    if checksum:
+        return checksum
+    sha256 = hashlib.sha256()
+    fileobj.seek(0)
+    for chunk in iter(lambda: fileobj.read(chunk_size), b""):
+        sha256.update(chunk)
+    fileobj.seek(0)
+    return sha256.hexdigest()
@@ -2,13 +2,14 @@
 
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import UserFileViewSet
+from .views import FolderViewSet, UserFileViewSet
 
 # Router automatycznie generuje adresy dla 'Kierownika'
 # GET, POST -> /api/files/
 # GET, DELETE -> /api/files/1/
 router = DefaultRouter()
 router.register(r"files", UserFileViewSet, basename="file")
+router.register(r"folders", FolderViewSet, basename="folder")
 
 urlpatterns = [
     path("", include(router.urls)),
@@ -3,16 +3,46 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError
 from django.shortcuts import get_object_or_404
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import StreamingHttpResponse
+from django.urls import reverse
 from urllib.parse import quote
 import logging
-import zipfile
-import os
-from io import BytesIO
-from django.core.files.base import ContentFile
-
-from .models import UserFile, user_directory_path, UserFileVersion
-from .serializers import UserFileSerializer, UserFileVersionSerializer
+import mimetypes
+
+from . import (
+    access,
+    archives,
+    changes,
+    compression,
+    folders,
+    manifest,
+    services,
+    tiering,
+)
+from .models import (
+    BlobTier,
+    FileChange,
+    Folder,
+    UserFile,
+    user_directory_path,
+    UserFileVersion,
+    new_ulid,
+    sanitize_filename,
+)
+from .blobs import iter_blob_chunks
+from .previews import PREVIEW_DEFAULT_KB, build_text_preview
+from .uploads import file_sha256
+from .serializers import (
+    FolderSerializer,
+    UserFileSerializer,
+    UserFileValuesSerializer,
+    UserFileVersionSerializer,
+)
+from jobs.registry import enqueue
 from logs.models import ActivityLog
 
 logger = logging.getLogger(__name__)
@@ -24,9 +54,10 @@ class UserFileViewSet(viewsets.ModelViewSet):
     # --- KONTROLA DOSTĘPU I SORTOWANIE (Bez zmian, jest poprawne) ---
     def get_queryset(self):
         user = self.request.user
-        queryset = UserFile.objects.all()
+        queryset = self._base_queryset()
 
-        sort_by = self.request.query_params.get("ordering", "-uploaded_at")
+        default_ordering = "-deleted_at" if self.action == "trash" else "-uploaded_at"
+        sort_by = self.request.query_params.get("ordering", default_ordering)
         user_filter = self.request.query_params.get("owner_username", None)
         all_files_flag = (
             self.request.query_params.get("all_files", "false").lower() == "true"
@@ -47,26 +78,83 @@ class UserFileViewSet(viewsets.ModelViewSet):
         else:
             queryset = queryset.filter(owner=user)
 
+        # Zawartość jednego folderu (?folder=<id> albo ?folder=root)
+        folder = self.request.query_params.get("folder")
+        if folder is not None and self.action == "list":
+            if folder == "root":
+                queryset = queryset.filter(folder__isnull=True)
+            elif folder.isdigit():
+                queryset = queryset.filter(folder_id=folder)
+            else:
+                return queryset.none()
+
         if sort_by:
             if "owner" in sort_by:
                 sort_by = sort_by.replace("owner", "owner__username")
             return queryset.order_by(sort_by)
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        if not settings.API_VALUES_LISTS:
+            return super().list(request, *args, **kwargs)
+        return self._values_response(self.filter_queryset(self.get_queryset()))
+
+    def _values_response(self, queryset):
+        """Lista przez UserFileValuesSerializer (ten sam JSON, bez instancji modelu)."""
+        values = UserFileValuesSerializer(context=self.get_serializer_context())
+        rows = values.queryset(queryset)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(values.to_representation(page))
+        return Response(values.to_representation(rows))
+
     def perform_create(self, serializer):
         """
         Ustaw automatycznie właściciela pliku na aktualnie zalogowanego użytkownika.
+        Pliki tekstowe zapisujemy skompresowane (files/compression.py).
         """
-        serializer.save(owner=self.request.user)
+        uploaded_file = serializer.validated_data["file"]
+        content, encoding = compression.prepare(uploaded_file)
+        instance = serializer.save(
+            owner=self.request.user,
+            file=content,
+            file_size=uploaded_file.size,
+            content_encoding=encoding,
+        )
+        changes.record_change(instance, FileChange.Kind.CREATE)
+
+    def perform_update(self, serializer):
+        instance = serializer.save()
+        changes.record_change(instance, FileChange.Kind.UPDATE)
+
+    def _base_queryset(self):
+        """Pliki z kosza widzą tylko akcje kosza, pozostałe - pliki aktywne."""
+        if self.action in ("trash", "restore_from_trash", "purge"):
+            return UserFile.objects.trashed()
+        return UserFile.objects.alive()
 
     def get_object(self):
-        obj = get_object_or_404(UserFile, pk=self.kwargs.get("pk"))
+        obj = get_object_or_404(self._base_queryset(), pk=self.kwargs.get("pk"))
         user = self.request.user
 
         if obj.owner != user and not (user.is_staff or user.is_superuser):
             raise PermissionDenied("Nie masz uprawnień do tego pliku.")
         return obj
 
+    def handle_exception(self, exc):
+        # Blob w warstwie Archive: przywracanie zlecone, klient ponawia po Retry-After
+        if isinstance(exc, tiering.BlobRehydrating):
+            return Response(
+                {
+                    "status": "rehydrating",
+                    "detail": "Plik jest przywracany z archiwum. Spróbuj ponownie później.",
+                    "retry_after": exc.retry_after,
+                },
+                status=status.HTTP_202_ACCEPTED,
+                headers={"Retry-After": str(exc.retry_after)},
+            )
+        return super().handle_exception(exc)
+
     # --- UPLOAD (Zmodyfikowany dla rozpakowywania ZIP) ---
     def create(self, request, *args, **kwargs):
         uploaded_file = request.data.get("file")
@@ -78,9 +166,56 @@ class UserFileViewSet(viewsets.ModelViewSet):
 
         # Sprawdź czy to plik ZIP
         if uploaded_file.name.lower().endswith(".zip"):
+            folder_id = request.data.get("folder") or None
+            folder = None
+            if folder_id is not None:
+                folder = Folder.objects.filter(
+                    pk=folder_id if str(folder_id).isdigit() else None,
+                    owner=request.user,
+                ).first()
+                if folder is None:
+                    return Response(
+                        {"error": "Nie ma takiego folderu."},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+
+            if self._zip_mode() == "archive":
+                # Jeden blob zamiast rozpakowywania - przeglądanie przez /archive/
+                try:
+                    user_file = services.store_archive(
+                        request.user, uploaded_file, folder=folder
+                    )
+                except archives.ArchiveError as e:
+                    return Response(
+                        {"error": str(e)}, status=status.HTTP_400_BAD_REQUEST
+                    )
+                serializer = self.get_serializer(user_file)
+                return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+            if self._wants_async():
+                # Zapisz archiwum tymczasowo i rozpakuj je w tle
+                staging_path = default_storage.save(
+                    f"job_uploads/{request.user.id}/{new_ulid()}/"
+                    f"{sanitize_filename(uploaded_file.name)}",
+                    uploaded_file,
+                )
+                job = enqueue(
+                    "files.extract_zip",
+                    {
+                        "user_id": request.user.id,
+                        "archive_name": uploaded_file.name,
+                        "staging_path": staging_path,
+                        "folder_id": folder.pk if folder else None,
+                    },
+                    user=request.user,
+                )
+                return self._accepted(job)
+
             # Rozpakuj ZIP i zapisz poszczególne pliki
             try:
-                extracted_files = self._handle_zip_upload(uploaded_file)
+                extracted_files = services.extract_zip(
+                    request.user, uploaded_file.name, uploaded_file, folder=folder
+                )
                 return Response(
                     {
                         "message": f"Pomyślnie rozpakowano {len(extracted_files)} plików z archiwum ZIP",
@@ -101,11 +236,16 @@ class UserFileViewSet(viewsets.ModelViewSet):
             if response.status_code in (status.HTTP_201_CREATED, status.HTTP_200_OK):
                 try:
                     instance = UserFile.objects.get(pk=response.data["id"])
-                    instance.create_version_snapshot()
-                    ActivityLog.objects.create(
-                        user=request.user,
-                        action=ActivityLog.ActionType.FILE_UPLOAD,
-                        details=f"Utworzono plik (V1): {instance.original_filename}",
+                    version = instance.create_version_snapshot(
+                        sha256=file_sha256(uploaded_file)
+                    )
+                    ActivityLog.objects.log(
+                        request.user,
+                        ActivityLog.ActionType.FILE_UPLOAD,
+                        f"Utworzono plik (V1): {instance.original_filename}",
+                        version=version,
+                        bytes_transferred=instance.file_size,
+                        content_encoding=instance.content_encoding,
                     )
                 except Exception as e:
                     logger.error(
@@ -113,112 +253,29 @@ class UserFileViewSet(viewsets.ModelViewSet):
                     )
             return response
 
-    def _handle_zip_upload(self, uploaded_file):
-        """
-        Rozpakowuje plik ZIP i zapisuje poszczególne pliki do S3.
-        Zwraca listę informacji o rozpakowanych plikach.
-        """
-        extracted_files = []
-
-        try:
-            # Zapisz ZIP tymczasowo w pamięci
-            zip_buffer = BytesIO(uploaded_file.read())
-            zip_buffer.seek(0)
-
-            # Otwórz ZIP
-            with zipfile.ZipFile(zip_buffer, "r") as zip_ref:
-                # Pobierz listę plików w ZIP-ie
-                file_list = zip_ref.namelist()
-
-                # Filtruj tylko pliki (nie katalogi)
-                files_to_extract = [f for f in file_list if not f.endswith("/")]
-
-                if not files_to_extract:
-                    raise ValueError("ZIP nie zawiera żadnych plików")
-
-                logger.info(
-                    f"[ZIP UPLOAD] Rozpakowywanie {len(files_to_extract)} plików z ZIP: {uploaded_file.name}"
-                )
-
-                # Rozpakuj i zapisz każdy plik
-                for zip_file_path in files_to_extract:
-                    try:
-                        # Wyciągnij zawartość pliku
-                        with zip_ref.open(zip_file_path) as file_in_zip:
-                            file_content = file_in_zip.read()
-                            file_size = len(file_content)
-
-                        # Przygotuj dane dla nowego pliku
-                        original_filename = os.path.basename(
-                            zip_file_path
-                        )  # Tylko nazwa pliku, bez ścieżki
-
-                        # Utwórz instancję UserFile bez zapisywania jeszcze
-                        user_file = UserFile(
-                            owner=self.request.user,
-                            original_filename=original_filename,
-                            file_size=file_size,
-                            is_zip=False,
-                        )
-
-                        # Wygeneruj ścieżkę dla pliku
-                        file_path = user_directory_path(user_file, original_filename)
-
-                        # Zapisz plik do storage (S3/Azure)
-                        storage = user_file.file.storage
-                        saved_path = storage.save(file_path, ContentFile(file_content))
-
-                        # Ustaw rzeczywistą ścieżkę pliku i zapisz w bazie
-                        user_file.file.name = saved_path
-                        user_file.save()
-
-                        # Dodaj wersję początkową (V1) dla rozpakowanego pliku
-                        try:
-                            user_file.create_version_snapshot()
-                        except Exception as ve:
-                            logger.error(
-                                f"[VERSIONING] Nie udało się utworzyć wersji początkowej (ZIP): {ve}"
-                            )
-
-                        logger.info(f"[ZIP UPLOAD] Zapisano plik: {original_filename}")
-
-                        # Dodaj do listy rozpakowanych plików
-                        extracted_files.append(
-                            {
-                                "id": user_file.id,
-                                "original_filename": user_file.original_filename,
-                                "file_size": user_file.file_size,
-                                "uploaded_at": user_file.uploaded_at.isoformat(),
-                            }
-                        )
-
-                        # Loguj każdy rozpakowany plik
-                        ActivityLog.objects.create(
-                            user=self.request.user,
-                            action=ActivityLog.ActionType.FILE_UPLOAD,
-                            details=f"Rozpakowano z ZIP '{uploaded_file.name}': {original_filename}",
-                        )
-
-                    except Exception as e:
-                        logger.error(
-                            f"[ZIP UPLOAD] Błąd podczas rozpakowywania pliku {zip_file_path}: {str(e)}"
-                        )
-                        continue
-
-            logger.info(f"[ZIP UPLOAD] Pomyślnie rozpakowano ZIP: {uploaded_file.name}")
-            return extracted_files
-
-        except Exception as e:
-            logger.error(
-                f"[ZIP UPLOAD] Błąd podczas przetwarzania ZIP {uploaded_file.name}: {str(e)}"
-            )
-            # Loguj błąd
-            ActivityLog.objects.create(
-                user=self.request.user,
-                action=ActivityLog.ActionType.FILE_UPLOAD,
-                details=f"Błąd podczas rozpakowywania ZIP '{uploaded_file.name}': {str(e)}",
-            )
-            raise
+    # --- OPERACJE W TLE (kolejka jobs) ---
+    def _wants_async(self):
+        """Czy klient prosi o wykonanie operacji w tle (?async=true)."""
+        value = self.request.query_params.get("async")
+        if value is None:
+            return settings.FILES_ASYNC_OPERATIONS
+        return value.lower() == "true"
+
+    def _zip_mode(self):
+        """Tryb uploadu ZIP: "extract" (rozpakuj) albo "archive" (?zip_mode=)."""
+        mode = self.request.query_params.get("zip_mode", settings.FILES_ZIP_UPLOAD_MODE)
+        return "archive" if mode.lower() == "archive" else "extract"
+
+    def _accepted(self, job):
+        """Odpowiedź 202 z adresem, pod którym frontend może sprawdzać status zadania."""
+        return Response(
+            {
+                "job_id": job.id,
+                "status": job.status,
+                "status_url": reverse("job-detail", kwargs={"pk": job.id}),
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
 
     # --- WERSJONOWANIE PLIKÓW ---
     @action(detail=True, methods=["get"], url_path="versions")
@@ -251,19 +308,28 @@ class UserFileViewSet(viewsets.ModelViewSet):
             # Wygeneruj nową ścieżkę z użyciem tego samego helpera
             new_path = user_directory_path(user_file, uploaded_file.name)
             # Zapisz nowy blob i zapamiętaj faktyczną ścieżkę zwróconą przez storage
-            saved_path = storage.save(new_path, uploaded_file)
+            content, encoding = compression.prepare(uploaded_file)
+            saved_path = storage.save(new_path, content)
 
             user_file.file.name = saved_path
             user_file.original_filename = uploaded_file.name
             user_file.file_size = uploaded_file.size
+            user_file.content_encoding = encoding
+            user_file.blob_tier = BlobTier.HOT
             user_file.save()
 
-            version = user_file.create_version_snapshot()
-
-            ActivityLog.objects.create(
-                user=request.user,
-                action=ActivityLog.ActionType.FILE_UPLOAD,
-                details=f"Utworzono nową wersję pliku V{version.version_number}: {user_file.original_filename}",
+            version = user_file.create_version_snapshot(
+                sha256=file_sha256(uploaded_file)
+            )
+            changes.record_change(user_file, FileChange.Kind.UPDATE)
+
+            ActivityLog.objects.log(
+                request.user,
+                ActivityLog.ActionType.FILE_UPLOAD,
+                f"Utworzono nową wersję pliku V{version.version_number}: {user_file.original_filename}",
+                version=version,
+                bytes_transferred=user_file.file_size,
+                content_encoding=user_file.content_encoding,
             )
 
             serializer = self.get_serializer(user_file)
@@ -302,35 +368,22 @@ class UserFileViewSet(viewsets.ModelViewSet):
                 {"error": "Wskazana wersja nie istnieje dla tego pliku."},
                 status=status.HTTP_404_NOT_FOUND,
             )
-
-        storage = user_file.file.storage
-        source_path = version.file_path
-
-        try:
-            # Nowa ścieżka dla przywróconej wersji (aby nie nadpisywać starego bloba)
-            restored_path = user_directory_path(user_file, version.original_filename)
-
-            with storage.open(source_path, "rb") as src:
-                saved_path = storage.save(restored_path, src)
-
-            user_file.file.name = saved_path
-            user_file.original_filename = version.original_filename
-            user_file.file_size = version.file_size
-            user_file.save()
-
-            # Tworzymy nową wersję bieżącą, pamiętając z której została przywrócona
-            new_version = user_file.create_version_snapshot(
-                restored_from_version=version.version_number
-            )
-
-            ActivityLog.objects.create(
+        tiering.ensure_online(user_file, version)
+
+        if self._wants_async():
+            job = enqueue(
+                "files.restore_version",
+                {
+                    "user_id": request.user.id,
+                    "file_id": user_file.id,
+                    "version_id": version.id,
+                },
                 user=request.user,
-                action=ActivityLog.ActionType.FILE_UPLOAD,
-                details=(
-                    f"Przywrócono plik '{user_file.original_filename}' "
-                    f"do wersji V{version.version_number} jako nową wersję V{new_version.version_number}."
-                ),
             )
+            return self._accepted(job)
+
+        try:
+            services.restore_version(request.user, user_file, version)
 
             serializer = self.get_serializer(user_file)
             return Response(serializer.data, status=status.HTTP_200_OK)
@@ -346,24 +399,44 @@ class UserFileViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=["get"])
     def view(self, request, pk=None):
         user_file = self.get_object()
-        ActivityLog.objects.create(
-            user=request.user,
-            action=ActivityLog.ActionType.FILE_VIEW,
-            details=f"Wyświetlono plik: {user_file.original_filename}",
+        tiering.ensure_online(user_file)
+        access.record_access(user_file)
+        ActivityLog.objects.log(
+            request.user,
+            ActivityLog.ActionType.FILE_VIEW,
+            f"Wyświetlono plik: {user_file.original_filename}",
+            file=user_file,
+            bytes_transferred=user_file.file_size,
         )
-        view_url = user_file.file.url
+        if compression.blob_url_usable(request, user_file):
+            view_url = user_file.file.url
+        else:
+            view_url = self._content_url(request, user_file)
         return Response({"url": view_url, "filename": user_file.original_filename})
 
     @action(detail=True, methods=["get"])
     def download(self, request, pk=None):
         """Zwraca URL wymuszający pobranie (wymaga poprawnego zegara)"""
         user_file = self.get_object()
-        ActivityLog.objects.create(
-            user=request.user,
-            action=ActivityLog.ActionType.FILE_DOWNLOAD,
-            details=f"Pobrano plik: {user_file.original_filename}",
+        tiering.ensure_online(user_file)
+        access.record_access(user_file)
+        ActivityLog.objects.log(
+            request.user,
+            ActivityLog.ActionType.FILE_DOWNLOAD,
+            f"Pobrano plik: {user_file.original_filename}",
+            file=user_file,
+            bytes_transferred=user_file.file_size,
         )
 
+        # Klient bez obsługi gzip pobiera plik skompresowany przez aplikację
+        if not compression.blob_url_usable(request, user_file):
+            return Response(
+                {
+                    "url": self._content_url(request, user_file, download=True),
+                    "filename": user_file.original_filename,
+                }
+            )
+
         # 1. Pobieramy bazowy URL z poprawnym podpisem SAS
         # (Zakładając, że zegar jest naprawiony)
         base_url = user_file.file.url
@@ -378,47 +451,397 @@ class UserFileViewSet(viewsets.ModelViewSet):
 
         return Response({"url": final_url, "filename": user_file.original_filename})
 
-    def perform_destroy(self, instance):
+    def _content_url(self, request, user_file, download=False):
+        url = request.build_absolute_uri(reverse("file-content", args=[user_file.pk]))
+        return f"{url}?download=true" if download else url
+
+    @action(detail=True, methods=["get"])
+    def content(self, request, pk=None):
+        """
+        Zawartość pliku przez aplikację (dla plików skompresowanych w spoczynku).
+        Klient akceptujący kodowanie bloba (Accept-Encoding) dostaje bajty bez
+        zmian z nagłówkiem Content-Encoding, pozostali - rozpakowane strumieniowo.
+        Parametr download=true wymusza pobranie (Content-Disposition: attachment).
+        """
+        user_file = self.get_object()
+        tiering.ensure_online(user_file)
+        access.record_access(user_file)
+
+        name = user_file.file.name
+        storage = user_file.file.storage
+        encoding = user_file.content_encoding
+        content_type = (
+            mimetypes.guess_type(user_file.original_filename)[0]
+            or "application/octet-stream"
+        )
+        if not encoding:
+            chunks = (
+                chunk
+                for _, chunk in iter_blob_chunks(
+                    name,
+                    compression.CHUNK_SIZE,
+                    end=user_file.file_size,
+                    storage=storage,
+                )
+            )
+            response = StreamingHttpResponse(chunks, content_type=content_type)
+            response["Content-Length"] = str(user_file.file_size)
+        elif compression.accepts(request, encoding):
+            chunks = (
+                chunk
+                for _, chunk in iter_blob_chunks(
+                    name, compression.CHUNK_SIZE, storage=storage
+                )
+            )
+            response = StreamingHttpResponse(chunks, content_type=content_type)
+            response["Content-Encoding"] = encoding
+            response["Content-Length"] = str(storage.size(name))
+        else:
+            response = StreamingHttpResponse(
+                compression.iter_decompressed(name, storage), content_type=content_type
+            )
+            response["Content-Length"] = str(user_file.file_size)
+        response["Vary"] = "Accept-Encoding"
+
+        disposition = (
+            "attachment"
+            if request.query_params.get("download", "false").lower() == "true"
+            else "inline"
+        )
+        response["Content-Disposition"] = (
+            f"{disposition}; filename*=UTF-8''{quote(user_file.original_filename)}"
+        )
+        return response
+
+    @action(detail=True, methods=["get"])
+    def preview(self, request, pk=None):
+        """
+        Zwraca fragment pliku tekstowego (domyślnie pierwsze 64 KB) zamiast całego bloba.
+
+        Parametry (query string):
+        - size: rozmiar okna w KB (max 1024)
+        - offset: bajt początkowy (kolejna strona = next_offset z poprzedniej odpowiedzi)
+        - end: bajt końcowy (poprzednia strona = prev_end z poprzedniej odpowiedzi)
+        - tail=true: okno z końca pliku
+        - line: numer linii, od której zacząć (buduje indeks linii przy pierwszym użyciu)
+        """
+        user_file = self.get_object()  # Sprawdza uprawnienia
+        tiering.ensure_online(user_file)
+
+        def int_param(name):
+            value = request.query_params.get(name)
+            if value in (None, ""):
+                return None
+            value = int(value)
+            if value < 0 or (name in ("size", "line") and value == 0):
+                raise ValueError(name)
+            return value
+
+        try:
+            size_kb = int_param("size") or PREVIEW_DEFAULT_KB
+            offset = int_param("offset")
+            end = int_param("end")
+            line = int_param("line")
+        except ValueError:
+            return Response(
+                {"error": "Parametry size, offset, end i line muszą być liczbami."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        tail = request.query_params.get("tail", "false").lower() == "true"
+
+        try:
+            data = build_text_preview(
+                user_file, size_kb=size_kb, offset=offset, end=end, tail=tail, line=line
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error(f"[PREVIEW] Błąd podczas odczytu podglądu: {e}")
+            return Response(
+                {"error": "Nie udało się odczytać podglądu pliku."},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+        data["filename"] = user_file.original_filename
+        return Response(data, status=status.HTTP_200_OK)
+
+    # --- ARCHIWA ZIP (przeglądanie bez rozpakowywania) ---
+    def _get_archive(self):
+        user_file = self.get_object()  # Sprawdza uprawnienia
+        if not user_file.is_zip:
+            return user_file, Response(
+                {"error": "Plik nie jest archiwum ZIP."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        tiering.ensure_online(user_file)
+        return user_file, None
+
+    def _get_archive_member(self, user_file, name):
+        if not name:
+            return None, Response(
+                {"error": 'Brak wymaganego pola "name".'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        member = archives.get_member(user_file, name)
+        if member is None:
+            return None, Response(
+                {"error": "Nie ma takiego pliku w archiwum."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        return member, None
+
+    @action(detail=True, methods=["get"], url_path="archive")
+    def archive(self, request, pk=None):
+        """
+        Zawartość katalogu w archiwum ZIP (czytana z katalogu centralnego).
+
+        Parametry (query string):
+        - path: katalog w archiwum (domyślnie główny)
+        - offset, limit: stronicowanie wpisów (limit max 1000)
         """
-        Nadpisujemy perform_destroy, aby fizycznie usunąć plik z Azure Blob Storage.
+        user_file, error = self._get_archive()
+        if error:
+            return error
+
+        try:
+            offset = max(0, int(request.query_params.get("offset", 0)))
+            limit = min(max(1, int(request.query_params.get("limit", 200))), 1000)
+        except ValueError:
+            return Response(
+                {"error": "Parametry offset i limit muszą być liczbami."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        path = request.query_params.get("path", "")
+
+        try:
+            members = archives.get_members(user_file)
+        except archives.ArchiveError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error(f"[ARCHIVE] Błąd podczas odczytu archiwum: {e}")
+            return Response(
+                {"error": "Nie udało się odczytać archiwum."},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+        entries = archives.list_directory(members, path)
+        return Response(
+            {
+                "filename": user_file.original_filename,
+                "path": path.strip("/"),
+                "total": len(entries),
+                "total_files": sum(not m["is_dir"] for m in members),
+                "entries": entries[offset : offset + limit],
+                "next_offset": (
+                    offset + limit if offset + limit < len(entries) else None
+                ),
+            },
+            status=status.HTTP_200_OK,
+        )
+
+    @action(detail=True, methods=["get"], url_path="archive/member")
+    def archive_member(self, request, pk=None):
+        """Pobiera jeden plik z archiwum (?name=ścieżka/w/archiwum)."""
+        user_file, error = self._get_archive()
+        if error:
+            return error
+        member, error = self._get_archive_member(
+            user_file, request.query_params.get("name")
+        )
+        if error:
+            return error
+
+        ActivityLog.objects.log(
+            request.user,
+            ActivityLog.ActionType.FILE_DOWNLOAD,
+            f"Pobrano z archiwum '{user_file.original_filename}': {member['name']}",
+            file=user_file,
+            bytes_transferred=member["size"],
+            member=member["name"],
+        )
+
+        filename = member["name"].rsplit("/", 1)[-1]
+        content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        response = StreamingHttpResponse(
+            archives.iter_member(user_file, member), content_type=content_type
+        )
+        response["Content-Length"] = str(member["size"])
+        response["Content-Disposition"] = (
+            f"attachment; filename*=UTF-8''{quote(filename)}"
+        )
+        return response
+
+    @action(detail=True, methods=["post"], url_path="archive/extract")
+    def archive_extract(self, request, pk=None):
         """
+        Wypakowuje jeden plik z archiwum jako nowy plik użytkownika.
+        Oczekuje {"name": "ścieżka/w/archiwum"} w ciele żądania.
+        """
+        user_file, error = self._get_archive()
+        if error:
+            return error
+        member, error = self._get_archive_member(user_file, request.data.get("name"))
+        if error:
+            return error
+
         try:
-            # Usuń fizyczny plik z Azure Blob
-            if instance.file:
-                file_path = instance.file.name
-                storage = instance.file.storage
+            new_file = services.extract_archive_member(request.user, user_file, member)
+        except archives.ArchiveError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error(f"[ARCHIVE] Błąd podczas wypakowywania pliku: {e}")
+            return Response(
+                {"error": "Nie udało się wypakować pliku z archiwum."},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
 
-                logger.info(f"[DELETE] Próba usunięcia: {file_path}")
+        serializer = self.get_serializer(new_file)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-                if storage.exists(file_path):
-                    storage.delete(file_path)
-                    logger.info(f"[DELETE] Usunięto blob: {file_path}")
-                else:
-                    logger.warning(f"[DELETE] Blob nie istnieje: {file_path}")
+    def perform_destroy(self, instance):
+        """
+        Usunięcie przenosi plik do kosza (natychmiast, bez wywołań Azure).
+        Bloby usuwa później purge_trash albo akcja purge.
+        """
+        services.trash_file(self.request.user, instance)
+
+    # --- KOSZ ---
+    @action(detail=False, methods=["get"])
+    def trash(self, request):
+        """Lista plików w koszu (parametry jak dla listy plików)."""
+        if settings.API_VALUES_LISTS:
+            return self._values_response(self.get_queryset())
+        serializer = self.get_serializer(self.get_queryset(), many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=["post"], url_path="restore")
+    def restore_from_trash(self, request, pk=None):
+        """Przywraca plik z kosza."""
+        user_file = self.get_object()  # Sprawdza uprawnienia
+        services.restore_from_trash(request.user, user_file)
+        serializer = self.get_serializer(user_file)
+        return Response(serializer.data, status=status.HTTP_200_OK)
 
-            # Usuń wpis z bazy
-            instance.delete()
-            logger.info(f"[DELETE] Usunięto z bazy: {instance.original_filename}")
+    @action(detail=True, methods=["delete"])
+    def purge(self, request, pk=None):
+        """Trwale usuwa plik z kosza (wszystkie bloby, także wersji)."""
+        user_file = self.get_object()  # Sprawdza uprawnienia
 
-            # Log sukcesu
-            ActivityLog.objects.create(
-                user=self.request.user,
-                action=ActivityLog.ActionType.FILE_DELETE,  # ← POPRAWKA
-                details=f"Deleted file: {instance.original_filename}",  # ← POPRAWKA: original_filename
+        if self._wants_async():
+            job = enqueue(
+                "files.delete",
+                {"user_id": request.user.id, "file_id": user_file.id},
+                user=request.user,
             )
+            return self._accepted(job)
 
+        try:
+            services.delete_file(request.user, user_file)
         except Exception as e:
-            logger.error(f"[DELETE] Błąd podczas usuwania: {str(e)}")
+            logger.error(f"[DELETE] Błąd podczas trwałego usuwania pliku: {e}")
+            return Response(
+                {"error": "Nie udało się trwale usunąć pliku."},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
-            # Log błędu
-            ActivityLog.objects.create(
-                user=self.request.user,
-                action=ActivityLog.ActionType.FILE_DELETE,  # ← POPRAWKA
-                details=f"Failed to delete file: {instance.original_filename}. Error: {str(e)}",  # ← POPRAWKA
+    # --- SYNCHRONIZACJA PRZYROSTOWA ---
+    @action(detail=False, methods=["get"], url_path="changes")
+    def list_changes(self, request):
+        """
+        Zmiany plików zalogowanego użytkownika od tokenu (?since=<token>).
+
+        Bez `since` zwraca tylko bieżący token - klient pobiera go przed
+        pełną listą plików, a potem pyta o zmiany od niego. Odpowiedź:
+        {"token", "has_more", "changes": [{"op": "insert"|"update", "id", "file"}
+        albo {"op": "delete", "id"}]}. Przy has_more=true należy od razu
+        zapytać ponownie z nowym tokenem. 410 oznacza, że token wygasł
+        i trzeba pobrać pełną listę.
+        """
+        since = request.query_params.get("since")
+        if since in (None, ""):
+            token = changes.current_token(request.user)
+            return Response(
+                {"token": str(token), "has_more": False, "changes": []},
+                status=status.HTTP_200_OK,
             )
 
-            # Usuń z bazy nawet jeśli blob nie został usunięty
-            instance.delete()
+        try:
+            since = int(since)
+            limit = int(request.query_params.get("limit", changes.DEFAULT_LIMIT))
+        except ValueError:
+            return Response(
+                {"error": "Parametry since i limit muszą być liczbami."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        limit = min(max(1, limit), changes.MAX_LIMIT)
+
+        try:
+            entries, token, has_more = changes.changes_since(
+                request.user, max(0, since), limit
+            )
+        except changes.TokenExpired:
+            return Response(
+                {"error": "Token synchronizacji wygasł - pobierz pełną listę plików."},
+                status=status.HTTP_410_GONE,
+            )
+
+        values = UserFileValuesSerializer(context=self.get_serializer_context())
+        rows = values.queryset(
+            UserFile.objects.filter(
+                pk__in=[entry.file_id for entry in entries if entry.file is not None]
+            )
+        )
+        by_id = {item["id"]: item for item in values.to_representation(rows)}
+        data = []
+        for entry in entries:
+            item = {"op": entry.op, "id": entry.file_id}
+            if entry.file is not None:
+                item["file"] = by_id[entry.file_id]
+            data.append(item)
+
+        return Response(
+            {"token": str(token), "has_more": has_more, "changes": data},
+            status=status.HTTP_200_OK,
+        )
+
+    @action(detail=False, methods=["post"], url_path="manifest")
+    def manifest(self, request):
+        """
+        Porównuje manifest klienta z plikami na koncie i zwraca tylko pliki
+        nowe lub zmienione (niezmienionych nie trzeba wysyłać ponownie).
+
+        Oczekuje w body:
+        {
+            "folder": <id folderu bazowego albo null (katalog główny)>,
+            "files": [{"path": "katalog/plik.txt", "size": 123, "hash": "<sha256>"}, ...]
+        }
+        Nowe pliki wysyła się przez POST /api/files/ (pole folder), zmienione
+        przez POST /api/files/<id>/versions/upload/.
+        """
+        folder_id = request.data.get("folder")
+        root = None
+        if folder_id is not None:
+            root = Folder.objects.filter(
+                pk=folder_id if str(folder_id).isdigit() else None,
+                owner=request.user,
+            ).first()
+            if root is None:
+                return Response(
+                    {"error": "Nie ma takiego folderu."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+        try:
+            entries = manifest.parse_entries(request.data.get("files"))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        files, unchanged = manifest.diff_manifest(request.user, entries, root=root)
+        return Response(
+            {"files": files, "unchanged": unchanged, "total": len(entries)},
+            status=status.HTTP_200_OK,
+        )
 
     # --- NOWA AKCJA: ZMIANA NAZWY ---
     @action(detail=True, methods=["patch"], url_path="rename")
@@ -443,53 +866,130 @@ class UserFileViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        storage = user_file.file.storage
-        old_name_path = user_file.file.name
-
-        # Generujemy nową ścieżkę używając tej samej funkcji 'upload_to' z modelu
-        new_name_path = user_directory_path(user_file, new_filename)
+        tiering.ensure_online(user_file)
+        if self._wants_async():
+            job = enqueue(
+                "files.rename",
+                {
+                    "user_id": request.user.id,
+                    "file_id": user_file.id,
+                    "new_filename": new_filename,
+                },
+                user=request.user,
+            )
+            return self._accepted(job)
 
         try:
-            # Krok 1: Kopia w Blob Storage
-            # Otwieramy stary plik i zapisujemy go pod nową ścieżką
-            with storage.open(old_name_path, "rb") as old_file_content:
-                storage.save(new_name_path, old_file_content)
+            services.rename_file(request.user, user_file, new_filename)
+
+            # Zwróć zaktualizowany obiekt
+            serializer = self.get_serializer(user_file)
+            return Response(serializer.data, status=status.HTTP_200_OK)
 
-            # Krok 2: Aktualizacja Bazy Danych
-            user_file.original_filename = new_filename
-            user_file.file.name = (
-                new_name_path  # Kluczowe: aktualizujemy ścieżkę w FileField
+        except Exception as e:
+            logger.error(f"[RENAME] Błąd podczas zmiany nazwy pliku: {e}")
+            return Response(
+                {"error": f"Nie udało się zmienić nazwy pliku. Błąd: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
-            user_file.save()
 
-            # Krok 3: Usunięcie starego pliku (dopiero po sukcesie zapisu w DB)
-            storage.delete(old_name_path)
 
-            # Krok 4: Logowanie
-            ActivityLog.objects.create(
-                user=request.user,
-                action=ActivityLog.ActionType.FILE_RENAME,
-                details=f"Zmieniono nazwę pliku z '{old_original_name}' na '{new_filename}'",
+class FolderViewSet(viewsets.ModelViewSet):
+    """
+    Foldery użytkownika. Lista zwraca bezpośrednie podfoldery (?parent=<id>,
+    domyślnie katalog główny) z rekurencyjnym rozmiarem i liczbą plików.
+    Pliki folderu: GET /api/files/?folder=<id>.
+    """
+
+    serializer_class = FolderSerializer
+
+    def get_queryset(self):
+        return Folder.objects.filter(owner=self.request.user)
+
+    def _stats_serializer(self, instance, stats, many=False):
+        context = {**self.get_serializer_context(), "stats": stats}
+        return self.get_serializer(instance, many=many, context=context)
+
+    def _folder_param(self, value):
+        """None dla katalogu głównego, Folder dla id; ValueError dla złej wartości."""
+        if value in (None, "", "root"):
+            return None
+        if not str(value).isdigit():
+            raise ValueError(value)
+        folder = self.get_queryset().filter(pk=value).first()
+        if folder is None:
+            raise ValueError(value)
+        return folder
+
+    def list(self, request, *args, **kwargs):
+        try:
+            parent = self._folder_param(request.query_params.get("parent"))
+        except ValueError:
+            return Response(
+                {"error": "Nie ma takiego folderu."}, status=status.HTTP_404_NOT_FOUND
             )
 
-            # Krok 5: Zwróć zaktualizowany obiekt
-            serializer = self.get_serializer(user_file)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+        children = self.get_queryset().filter(parent=parent)
+        stats = folders.children_stats(request.user, parent)
+        serializer = self._stats_serializer(children, stats, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
 
-        except Exception as e:
-            # Obsługa błędu: Jeśli coś pójdzie nie tak (np. krok 2 lub 3 się nie uda),
-            # możemy mieć zduplikowany plik (nowy) bez wpisu w DB.
-            # W ramach bezpieczeństwa usuwamy nowy plik, jeśli już powstał.
-            try:
-                if storage.exists(new_name_path):
-                    storage.delete(new_name_path)
-            except Exception as cleanup_e:
-                # Logujemy błąd czyszczenia, ale główny błąd jest ważniejszy
-                print(
-                    f"Błąd podczas czyszczenia po nieudanej zmianie nazwy: {cleanup_e}"
-                )
+    def retrieve(self, request, *args, **kwargs):
+        folder = self.get_object()
+        data = self._stats_serializer(
+            folder, {folder.pk: folders.folder_stats(folder)}
+        ).data
+        # Ścieżka do wyświetlenia (breadcrumbs), od katalogu głównego
+        data["ancestors"] = [
+            {"id": f.pk, "name": f.name} for f in folders.ancestors(folder)
+        ]
+        return Response(data, status=status.HTTP_200_OK)
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            folder = folders.create_folder(
+                request.user,
+                serializer.validated_data["name"],
+                serializer.validated_data.get("parent"),
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except IntegrityError:
+            return Response(
+                {"error": "Folder o tej nazwie już istnieje."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(
+            self.get_serializer(folder).data, status=status.HTTP_201_CREATED
+        )
+
+    def update(self, request, *args, **kwargs):
+        """Zmiana nazwy i/lub przeniesienie folderu (tylko metadane, bez Azure)."""
+        folder = self.get_object()
+        serializer = self.get_serializer(folder, data=request.data, partial=True)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
 
+        try:
+            folders.move_folder(
+                folder,
+                parent=data["parent"] if "parent" in data else folder.parent,
+                name=data.get("name"),
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except IntegrityError:
             return Response(
-                {"error": f"Nie udało się zmienić nazwy pliku. Błąd: {str(e)}"},
-                status=status.HTTP_500_INTERNAL_SERVER_SERVICE_ERROR,
+                {"error": "Folder o tej nazwie już istnieje."},
+                status=status.HTTP_400_BAD_REQUEST,
             )
+        data = self._stats_serializer(
+            folder, {folder.pk: folders.folder_stats(folder)}
+        ).data
+        return Response(data, status=status.HTTP_200_OK)
+
+    def perform_destroy(self, instance):
+        """Pliki z poddrzewa trafiają do kosza, foldery są usuwane."""
+        folders.trash_folder(self.request.user, instance)
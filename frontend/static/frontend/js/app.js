@@ -0,0 +1,1079 @@
+// --- INICJALIZACJA PAMIĘCI ---
+let accessToken = localStorage.getItem('access_token');
+let refreshToken = localStorage.getItem('refresh_token');
+let currentUsername = '';
+let isAdmin = false;
+let allFiles = [];
+let changesToken = null; // Token synchronizacji przyrostowej (/api/files/changes/)
+let twoFAEnabled = false;
+let twoFASetupData = null;
+
+// --- NARZĘDZIA OGÓLNE ---
+function getAuthHeaders(contentType = 'application/json') {
+    const headers = {
+        'Authorization': `Bearer ${accessToken}`
+    };
+    if (contentType) {
+        headers['Content-Type'] = contentType;
+    }
+    return headers;
+}
+
+// Stub dla modala 2FA (flow przywrócone do pola w formularzu)
+function submitOTPCode() {
+    console.warn('Modal 2FA nieużywany — wpisz kod w polu logowania.');
+}
+
+function decodeToken(token) {
+    const payload = JSON.parse(atob(token.split('.')[1]));
+    currentUsername = payload.username;
+    isAdmin = payload.is_staff || payload.is_superuser || false;
+}
+
+function toggleView(isLoggedIn) {
+    document.getElementById('auth-screen').classList.toggle('d-none', isLoggedIn);
+    const dashboard = document.getElementById('dashboard-screen');
+    dashboard.classList.toggle('d-none', !isLoggedIn);
+    document.getElementById('logout-btn').classList.toggle('d-none', !isLoggedIn);
+    document.getElementById('username-display').classList.toggle('d-none', !isLoggedIn);
+
+    if (isLoggedIn) {
+        const displayText = isAdmin ? `${currentUsername} (Admin)` : currentUsername;
+        document.getElementById('username-display').innerHTML = `
+            <div class="user-avatar">${currentUsername.charAt(0).toUpperCase()}</div>
+            <span>${displayText}</span>
+        `;
+        document.getElementById('admin-dashboard').classList.toggle('d-none', !isAdmin);
+        loadFiles();
+        fetch2FAStatus();
+    } else {
+        currentUsername = '';
+        isAdmin = false;
+        document.getElementById('username-display').innerHTML = '';
+        twoFAEnabled = false;
+        twoFASetupData = null;
+        update2FAUI();
+    }
+}
+
+// --- LOGIKA UWIERZYTELNIANIA I JWT ---
+async function login() {
+    const data = {
+        username: document.getElementById('login-username').value,
+        password: document.getElementById('login-password').value
+    };
+    const otpInput = document.getElementById('login-otp');
+    const otpValue = otpInput ? otpInput.value.trim() : '';
+    if (otpValue) {
+        data.otp_token = otpValue;
+    }
+    const errorElement = document.getElementById('login-error');
+    errorElement.textContent = '';
+    errorElement.classList.add('d-none');
+
+    try {
+        const response = await fetch('/api/users/token/', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(data)
+        });
+
+        if (response.ok) {
+            const tokenData = await response.json();
+            accessToken = tokenData.access;
+            refreshToken = tokenData.refresh;
+            localStorage.setItem('access_token', accessToken);
+            localStorage.setItem('refresh_token', refreshToken);
+            decodeToken(accessToken);
+            toggleView(true);
+            return;
+        }
+
+        const errorData = await response.json().catch(() => null);
+        let message = 'Nieprawidłowa nazwa użytkownika lub hasło';
+        if (errorData && errorData.otp_token) {
+            const otpMsg = Array.isArray(errorData.otp_token) ? errorData.otp_token.join(' ') : errorData.otp_token;
+            message = otpMsg || 'Wymagany kod 2FA.';
+            const otpGroup = document.getElementById('login-otp-group');
+            if (otpGroup) {
+                otpGroup.classList.remove('d-none');
+            }
+            if (otpInput) {
+                otpInput.focus();
+            }
+            errorElement.textContent = message;
+            errorElement.classList.remove('d-none'); // pokaż czerwony komunikat
+            return;
+        }
+        errorElement.textContent = message;
+        errorElement.classList.remove('d-none');
+    } catch (error) {
+        errorElement.textContent = 'Błąd połączenia z serwerem';
+        errorElement.classList.remove('d-none');
+    }
+}
+
+async function registerUser() {
+    const data = {
+        username: document.getElementById('reg-username').value,
+        email: document.getElementById('reg-email').value,
+        password: document.getElementById('reg-password').value,
+    };
+    const errorElement = document.getElementById('register-error');
+    const successElement = document.getElementById('register-success');
+    errorElement.textContent = '';
+    errorElement.classList.add('d-none');
+    successElement.textContent = '';
+    successElement.classList.add('d-none');
+
+    try {
+        const response = await fetch('/api/users/register/', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(data)
+        });
+
+        if (response.status === 201) {
+            successElement.textContent = 'Konto utworzone pomyślnie! Możesz się teraz zalogować.';
+            successElement.classList.remove('d-none');
+            setTimeout(() => {
+                new bootstrap.Tab(document.getElementById('login-tab')).show();
+            }, 1500);
+        } else {
+            const errorData = await response.json();
+            errorElement.textContent = 'Błąd rejestracji: ' + JSON.stringify(errorData);
+            errorElement.classList.remove('d-none');
+        }
+    } catch (error) {
+        errorElement.textContent = 'Błąd połączenia z serwerem';
+        errorElement.classList.remove('d-none');
+    }
+}
+
+function logout() {
+    accessToken = null;
+    refreshToken = null;
+    localStorage.removeItem('access_token');
+    localStorage.removeItem('refresh_token');
+    toggleView(false);
+}
+
+async function refreshAccessToken() {
+    if (!refreshToken) return false;
+
+    try {
+        const response = await fetch('/api/users/token/refresh/', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ refresh: refreshToken })
+        });
+
+        if (response.ok) {
+            const tokenData = await response.json();
+            accessToken = tokenData.access;
+            localStorage.setItem('access_token', accessToken);
+            decodeToken(accessToken);
+            return true;
+        }
+    } catch (e) {
+        console.error("Błąd odświeżania tokenu:", e);
+    }
+    return false;
+}
+
+// --- 2FA (TOTP) ---
+function setTwoFAMessage(type, text) {
+    const el = document.getElementById('twofa-messages');
+    if (!el) return;
+    if (!text) {
+        el.innerHTML = '';
+        return;
+    }
+    const classes = {
+        success: 'alert alert-success',
+        error: 'alert alert-danger',
+        warning: 'alert alert-warning',
+        info: 'alert alert-info'
+    };
+    const cls = classes[type] || classes.info;
+    el.innerHTML = `<div class="${cls}">${text}</div>`;
+}
+
+function update2FAUI() {
+    const badge = document.getElementById('twofa-status-badge');
+    const startBtn = document.getElementById('twofa-start-btn');
+    const disableBtn = document.getElementById('twofa-disable-btn');
+    const setupSection = document.getElementById('twofa-setup-section');
+    if (!badge || !startBtn || !disableBtn || !setupSection) return;
+
+    if (twoFAEnabled) {
+        badge.textContent = 'Włączone';
+        badge.className = 'badge bg-success';
+        startBtn.classList.add('d-none');
+        disableBtn.classList.remove('d-none');
+        setupSection.classList.add('d-none');
+    } else {
+        badge.textContent = 'Wyłączone';
+        badge.className = 'badge bg-secondary';
+        startBtn.classList.remove('d-none');
+        disableBtn.classList.add('d-none');
+        if (!twoFASetupData) {
+            setupSection.classList.add('d-none');
+        }
+    }
+}
+
+async function fetch2FAStatus() {
+    const badge = document.getElementById('twofa-status-badge');
+    if (!accessToken || !badge) return;
+    badge.textContent = 'Sprawdzam...';
+    badge.className = 'badge bg-secondary';
+    setTwoFAMessage('', '');
+
+    try {
+        const response = await fetch('/api/users/2fa/status/', {
+            method: 'GET',
+            headers: getAuthHeaders()
+        });
+
+        if (response.status === 401) {
+            if (await refreshAccessToken()) return fetch2FAStatus();
+            return toggleView(false);
+        }
+
+        if (!response.ok) throw new Error('status');
+
+        const data = await response.json();
+        twoFAEnabled = !!data.enabled;
+        if (twoFAEnabled) {
+            twoFASetupData = null;
+        }
+    } catch (error) {
+        setTwoFAMessage('error', 'Nie udało się pobrać statusu 2FA.');
+    }
+    update2FAUI();
+}
+
+async function start2FASetup() {
+    setTwoFAMessage('', '');
+    const setupSection = document.getElementById('twofa-setup-section');
+    if (!setupSection) return;
+    try {
+        const response = await fetch('/api/users/2fa/setup/', {
+            method: 'POST',
+            headers: getAuthHeaders()
+        });
+
+        if (response.status === 401) {
+            if (await refreshAccessToken()) return start2FASetup();
+            return toggleView(false);
+        }
+
+        if (!response.ok) {
+            const err = await response.json().catch(() => null);
+            const msg = err?.detail || 'Nie udało się rozpocząć konfiguracji 2FA.';
+            setTwoFAMessage('error', msg);
+            return;
+        }
+
+        const data = await response.json();
+        if (!data.qr_code_base64) {
+            setTwoFAMessage('info', data.detail || '2FA jest już włączone.');
+            twoFAEnabled = true;
+            update2FAUI();
+            return;
+        }
+
+        twoFASetupData = data;
+        document.getElementById('twofa-qr').src = `data:image/png;base64,${data.qr_code_base64}`;
+        document.getElementById('twofa-secret').value = data.secret;
+        document.getElementById('twofa-otpauth').value = data.otpauth_url;
+        document.getElementById('twofa-confirm-code').value = '';
+        setupSection.classList.remove('d-none');
+        twoFAEnabled = false;
+        update2FAUI();
+        setTwoFAMessage('info', 'Zeskanuj kod i potwierdź 6-cyfrowym kodem.');
+    } catch (error) {
+        setTwoFAMessage('error', 'Błąd połączenia podczas konfiguracji 2FA.');
+    }
+}
+
+async function confirm2FA() {
+    const codeInput = document.getElementById('twofa-confirm-code');
+    const code = (codeInput.value || '').trim();
+    if (!code) {
+        setTwoFAMessage('warning', 'Podaj kod z aplikacji (6 cyfr).');
+        return;
+    }
+
+    try {
+        const response = await fetch('/api/users/2fa/confirm/', {
+            method: 'POST',
+            headers: getAuthHeaders(),
+            body: JSON.stringify({ otp_token: code })
+        });
+
+        if (response.status === 401) {
+            if (await refreshAccessToken()) return confirm2FA();
+            return toggleView(false);
+        }
+
+        if (!response.ok) {
+            const err = await response.json().catch(() => null);
+            const msg = err?.otp_token || err?.detail || 'Nie udało się potwierdzić 2FA.';
+            setTwoFAMessage('error', Array.isArray(msg) ? msg.join(' ') : msg);
+            return;
+        }
+
+        setTwoFAMessage('success', '2FA zostało włączone.');
+        twoFAEnabled = true;
+        twoFASetupData = null;
+        document.getElementById('twofa-setup-section').classList.add('d-none');
+        update2FAUI();
+        fetch2FAStatus();
+    } catch (error) {
+        setTwoFAMessage('error', 'Błąd połączenia podczas potwierdzania 2FA.');
+    }
+}
+
+async function disable2FA() {
+    if (!confirm('Na pewno wyłączyć 2FA?')) return;
+    try {
+        const response = await fetch('/api/users/2fa/disable/', {
+            method: 'POST',
+            headers: getAuthHeaders()
+        });
+
+        if (response.status === 401) {
+            if (await refreshAccessToken()) return disable2FA();
+            return toggleView(false);
+        }
+
+        if (!response.ok) {
+            const err = await response.json().catch(() => null);
+            const msg = err?.detail || 'Nie udało się wyłączyć 2FA.';
+            setTwoFAMessage('error', msg);
+            return;
+        }
+
+        twoFAEnabled = false;
+        twoFASetupData = null;
+        document.getElementById('twofa-setup-section').classList.add('d-none');
+        update2FAUI();
+        setTwoFAMessage('success', '2FA zostało wyłączone.');
+    } catch (error) {
+        setTwoFAMessage('error', 'Błąd połączenia podczas wyłączania 2FA.');
+    }
+}
+
+function copyToClipboard(elementId) {
+    const el = document.getElementById(elementId);
+    if (!el) return;
+    const value = el.value || el.textContent;
+    if (!navigator.clipboard) {
+        setTwoFAMessage('info', 'Skopiuj ręcznie: ' + value);
+        return;
+    }
+    navigator.clipboard.writeText(value).then(() => {
+        setTwoFAMessage('info', 'Skopiowano do schowka.');
+    }).catch(() => {
+        setTwoFAMessage('warning', 'Nie udało się skopiować. Skopiuj ręcznie.');
+    });
+}
+
+// --- LOGIKA PLIKÓW (CRUD) ---
+async function loadFiles() {
+    if (!accessToken) return toggleView(false);
+
+    const listElement = document.getElementById('file-list');
+    const loadingElement = document.getElementById('loading-files');
+    const noFilesElement = document.getElementById('no-files-msg');
+
+    if (!listElement || !loadingElement || !noFilesElement) {
+        console.error("Krytyczny błąd DOM: Nie znaleziono kluczowych kontenerów. Przerwano ładowanie.");
+        return;
+    }
+
+    const sortValue = document.getElementById('sort-select').value;
+    const userFilter = document.getElementById('user-filter').value;
+    let url = '/api/files/';
+    let params = [];
+
+    if (isAdmin) {
+        params.push('all_files=true');
+        if (userFilter) {
+            params.push(`owner_username=${userFilter}`);
+            document.getElementById('files-owner-info').textContent = `Użytkownika: ${userFilter}`;
+        } else {
+            document.getElementById('files-owner-info').textContent = `WSZYSTKICH UŻYTKOWNIKÓW`;
+        }
+    } else {
+        document.getElementById('files-owner-info').textContent = `Twoje`;
+    }
+
+    params.push(`ordering=${sortValue}`);
+    if (params.length > 0) {
+        url += '?' + params.join('&');
+    }
+
+    listElement.innerHTML = '';
+    loadingElement.classList.remove('d-none');
+    noFilesElement.classList.add('d-none');
+
+    try {
+        // Token pobieramy przed listą - zmiany w międzyczasie przyjdą w syncFiles()
+        changesToken = isAdmin ? null : await fetchChangesToken();
+
+        const response = await fetch(url, {
+            method: 'GET',
+            headers: getAuthHeaders()
+        });
+
+        if (response.status === 401) {
+            if (await refreshAccessToken()) return loadFiles();
+            return toggleView(false);
+        }
+
+        const files = await response.json();
+        loadingElement.classList.add('d-none');
+
+        allFiles = files; // Zapisz pliki globalnie
+        renderFiles(files); // Wyrenderuj pliki
+
+    } catch (error) {
+        loadingElement.classList.add('d-none');
+        console.error('Błąd ładowania plików:', error);
+        document.getElementById('file-list').innerHTML = '<div class="alert alert-danger">Błąd ładowania plików.</div>';
+    }
+}
+
+async function fetchChangesToken() {
+    const response = await fetch('/api/files/changes/', {
+        method: 'GET',
+        headers: getAuthHeaders()
+    });
+    if (!response.ok) return null;
+    return (await response.json()).token;
+}
+
+function sortFiles(files) {
+    const sortValue = document.getElementById('sort-select').value;
+    const field = sortValue.replace('-', '');
+    const direction = sortValue.startsWith('-') ? -1 : 1;
+    return files.sort((a, b) => {
+        const x = field === 'original_filename' ? a[field].toLowerCase() : a[field];
+        const y = field === 'original_filename' ? b[field].toLowerCase() : b[field];
+        return (x < y ? -1 : x > y ? 1 : 0) * direction;
+    });
+}
+
+async function syncFiles() {
+    // Po zmianie pobieramy tylko zmiany od ostatniego tokenu zamiast całej listy
+    if (isAdmin || changesToken === null) return loadFiles();
+
+    try {
+        while (true) {
+            const response = await fetch(`/api/files/changes/?since=${changesToken}`, {
+                method: 'GET',
+                headers: getAuthHeaders()
+            });
+
+            if (response.status === 401) {
+                if (await refreshAccessToken()) continue;
+                return toggleView(false);
+            }
+            if (!response.ok) return loadFiles(); // np. 410 - token wygasł
+
+            const data = await response.json();
+            const byId = new Map(allFiles.map(file => [file.id, file]));
+            data.changes.forEach(change => {
+                if (change.op === 'delete') byId.delete(change.id);
+                else byId.set(change.id, change.file);
+            });
+            allFiles = sortFiles(Array.from(byId.values()));
+            changesToken = data.token;
+            if (!data.has_more) break;
+        }
+        filterFiles();
+    } catch (error) {
+        console.error('Błąd synchronizacji plików:', error);
+        loadFiles();
+    }
+}
+
+function getFileIcon(filename) {
+    const extension = filename.split('.').pop().toLowerCase();
+
+    const imageExtensions = ['jpg', 'jpeg', 'png', 'gif', 'bmp', 'webp', 'svg', 'ico'];
+    if (imageExtensions.includes(extension)) return '🖼️';
+
+    if (extension === 'pdf') return '📕';
+    if (['doc', 'docx'].includes(extension)) return '📘';
+    if (['xls', 'xlsx'].includes(extension)) return '📗';
+    if (['ppt', 'pptx'].includes(extension)) return '📙';
+
+    if (['js', 'jsx', 'ts', 'tsx'].includes(extension)) return '📜';
+    if (['py'].includes(extension)) return '🐍';
+    if (['java'].includes(extension)) return '☕';
+    if (['html', 'htm'].includes(extension)) return '🌐';
+    if (['css', 'scss', 'sass'].includes(extension)) return '🎨';
+    if (['json', 'xml', 'yaml', 'yml'].includes(extension)) return '⚙️';
+
+    if (['txt', 'md', 'log'].includes(extension)) return '📝';
+
+    if (['zip', 'rar', '7z', 'tar', 'gz'].includes(extension)) return '📦';
+
+    if (['mp4', 'avi', 'mkv', 'mov', 'wmv', 'flv', 'webm'].includes(extension)) return '🎬';
+
+    if (['mp3', 'wav', 'ogg', 'flac', 'aac', 'm4a'].includes(extension)) return '🎵';
+
+    if (['exe', 'msi', 'app', 'deb', 'rpm'].includes(extension)) return '⚙️';
+
+    return '📄';
+}
+
+function renderFiles(files) {
+    const listElement = document.getElementById('file-list');
+    const noFilesElement = document.getElementById('no-files-msg');
+
+    listElement.innerHTML = '';
+
+    // Aktualizuj liczniki
+    document.getElementById('total-count').textContent = allFiles.length;
+    document.getElementById('filtered-count').textContent = files.length;
+
+    if (files.length === 0) {
+        noFilesElement.classList.remove('d-none');
+    } else {
+        noFilesElement.classList.add('d-none');
+        files.forEach(file => {
+            const ownerInfo = (isAdmin) ? `${file.owner_username || file.owner}` : '';
+            const fileSizeKB = (file.file_size / 1024).toFixed(2);
+            const fileIcon = getFileIcon(file.original_filename);
+            listElement.innerHTML += `
+                <div class="file-list-item" data-filename="${file.original_filename.toLowerCase()}">
+                    <div class="d-flex justify-content-between align-items-center flex-wrap gap-3">
+                        <div class="flex-grow-1">
+                            <div class="d-flex align-items-center mb-2">
+                                ${file.thumbnail_url ? `<img src="${file.thumbnail_url}" alt="" class="file-thumbnail" loading="lazy">` : `<span class="file-icon">${fileIcon}</span>`}
+                                <strong><a href="#" class="file-name-link" onclick="previewFile(${file.id}, '${file.original_filename.replace(/'/g, "\\'")}', '${file.file_url}', '${file.preview_url || ''}'); return false;"><span id="filename-${file.id}">${file.original_filename}</span></a></strong>
+                                ${ownerInfo ? `<span class="badge bg-secondary ms-2">${ownerInfo}</span>` : ''}
+                            </div>
+                            <small class="text-muted d-block mb-1">${file.description || 'Brak opisu'}</small>
+                            <small class="text-muted"><i class="bi bi-hdd"></i> ${fileSizeKB} KB • <i class="bi bi-clock"></i> ${new Date(file.uploaded_at).toLocaleString('pl-PL')}</small>
+                        </div>
+                        <div class="btn-group" role="group">
+                            <a href="${file.file_url}" class="btn btn-sm btn-outline-info" download title="Pobierz">
+                                <i class="bi bi-download"></i> <span class="d-none d-md-inline">Pobierz</span>
+                            </a>
+                            <button class="btn btn-sm btn-outline-warning" onclick="renameFile(${file.id}, '${file.original_filename.replace(/'/g, "\\'")}')" title="Zmień nazwę">
+                                <i class="bi bi-pencil"></i> <span class="d-none d-md-inline">Zmień</span>
+                            </button>
+                            <button class="btn btn-sm btn-outline-danger" onclick="deleteFile(${file.id})" title="Usuń">
+                                <i class="bi bi-trash"></i> <span class="d-none d-md-inline">Usuń</span>
+                            </button>
+                            <button class="btn btn-sm btn-outline-secondary" onclick="showVersions(${file.id}, '${file.original_filename.replace(/'/g, "\\'")}')" title="Wersje">
+                                <i class="bi bi-layers"></i> <span class="d-none d-md-inline">Wersje</span>
+                            </button>
+                        </div>
+                    </div>
+                </div>
+            `;
+        });
+    }
+}
+
+function filterFiles() {
+    const searchInput = document.getElementById('search-input');
+    const searchTerm = searchInput.value.toLowerCase().trim();
+
+    if (searchTerm === '') {
+        // Pokaż wszystkie pliki
+        renderFiles(allFiles);
+    } else {
+        // Filtruj pliki po nazwie
+        const filtered = allFiles.filter(file => 
+            file.original_filename.toLowerCase().includes(searchTerm)
+        );
+        renderFiles(filtered);
+    }
+}
+
+function clearSearch() {
+    document.getElementById('search-input').value = '';
+    filterFiles();
+}
+
+async function uploadFiles() {
+    const fileInput = document.getElementById('file-input');
+    const descriptionInput = document.getElementById('file-description');
+    const statusElement = document.getElementById('upload-status');
+
+    if (!fileInput.files.length) {
+        statusElement.innerHTML = '<div class="alert alert-warning">Wybierz przynajmniej jeden plik!</div>';
+        return;
+    }
+
+    const files = Array.from(fileInput.files);
+    const totalFiles = files.length;
+    let successCount = 0;
+    let failCount = 0;
+
+    statusElement.innerHTML = `<div class="spinner-border spinner-border-sm text-primary" role="status"></div> Wysyłanie ${totalFiles} plik(ów)...`;
+
+    for (let i = 0; i < files.length; i++) {
+        const file = files[i];
+        const formData = new FormData();
+        formData.append('file', file);
+        formData.append('description', descriptionInput.value);
+
+        // Archiwa ZIP rozpakowujemy w tle (202 + odpytywanie statusu zadania)
+        const isZip = file.name.toLowerCase().endsWith('.zip');
+
+        try {
+            const response = await fetch(isZip ? '/api/files/?async=true' : '/api/files/', {
+                method: 'POST',
+                headers: getAuthHeaders(null),
+                body: formData
+            });
+
+            if (response.status === 401) {
+                if (await refreshAccessToken()) {
+                    i--; // Ponów próbę dla tego pliku
+                    continue;
+                }
+                statusElement.innerHTML = '<div class="alert alert-danger">❌ Sesja wygasła. Zaloguj się ponownie.</div>';
+                return toggleView(false);
+            }
+
+            if (response.status === 202) {
+                const accepted = await response.json();
+                statusElement.innerHTML = `<div class="spinner-border spinner-border-sm text-primary" role="status"></div> Rozpakowywanie ${file.name} w tle...`;
+                const job = await waitForJob(accepted.status_url);
+                if (job && job.status === 'succeeded') {
+                    successCount += job.result.extracted_files.length;
+                } else {
+                    failCount++;
+                }
+            } else if (response.status === 201) {
+                const responseData = await response.json().catch(() => null);
+
+                // Sprawdź czy to był ZIP upload (zawiera pole extracted_files)
+                if (responseData && responseData.extracted_files) {
+                    // ZIP upload - dodaj liczbę rozpakowanych plików do successCount
+                    successCount += responseData.extracted_files.length;
+                    statusElement.innerHTML = `<div class="spinner-border spinner-border-sm text-primary" role="status"></div> Rozpakowano ${responseData.extracted_files.length} plików z ZIP...`;
+                } else {
+                    // Zwykły upload pojedynczego pliku
+                    successCount++;
+                    statusElement.innerHTML = `<div class="spinner-border spinner-border-sm text-primary" role="status"></div> Wysłano ${successCount}/${totalFiles} plików...`;
+                }
+            } else {
+                failCount++;
+            }
+        } catch (error) {
+            failCount++;
+        }
+    }
+
+    // Podsumowanie
+    if (failCount === 0) {
+        statusElement.innerHTML = `<div class="alert alert-success"><i class="bi bi-check-circle"></i> Wszystkie pliki wgrane pomyślnie (${successCount}/${totalFiles})</div>`;
+    } else if (successCount === 0) {
+        statusElement.innerHTML = `<div class="alert alert-danger"><i class="bi bi-x-circle"></i> Nie udało się wgrać żadnego pliku</div>`;
+    } else {
+        statusElement.innerHTML = `<div class="alert alert-warning"><i class="bi bi-exclamation-triangle"></i> Wgrano ${successCount} z ${totalFiles} plików (${failCount} błędów)</div>`;
+    }
+
+    fileInput.value = '';
+    descriptionInput.value = '';
+    document.getElementById('file-count').textContent = '0';
+    syncFiles();
+}
+
+async function waitForJob(statusUrl, intervalMs = 1000) {
+    // Odpytuje status zadania w tle aż do zakończenia (sukces lub błąd)
+    while (true) {
+        const response = await fetch(statusUrl, {
+            method: 'GET',
+            headers: getAuthHeaders()
+        });
+
+        if (response.status === 401) {
+            if (await refreshAccessToken()) continue;
+            return null;
+        }
+        if (!response.ok) return null;
+
+        const job = await response.json();
+        if (job.status === 'succeeded' || job.status === 'failed') return job;
+        await new Promise(resolve => setTimeout(resolve, intervalMs));
+    }
+}
+
+async function deleteFile(fileId) {
+    if (!confirm('Czy na pewno chcesz usunąć ten plik?')) return;
+
+    try {
+        const response = await fetch(`/api/files/${fileId}/`, {
+            method: 'DELETE',
+            headers: getAuthHeaders()
+        });
+
+        if (response.status === 401) {
+            if (await refreshAccessToken()) return deleteFile(fileId);
+            return toggleView(false);
+        }
+
+        if (response.status === 204) {
+            syncFiles();
+        } else {
+            alert('Nie udało się usunąć pliku');
+        }
+    } catch (error) {
+        alert('Błąd połączenia z serwerem');
+    }
+}
+
+function previewFile(fileId, filename, fileUrl, previewUrl) {
+    const modal = new bootstrap.Modal(document.getElementById('filePreviewModal'));
+    const previewContainer = document.getElementById('preview-container');
+    const previewFilename = document.getElementById('preview-filename');
+    const downloadBtn = document.getElementById('preview-download-btn');
+
+    // Ustaw nazwę pliku i link do pobrania
+    previewFilename.textContent = filename;
+    downloadBtn.href = fileUrl;
+    downloadBtn.download = filename;
+
+    // Wyświetl spinner podczas ładowania
+    previewContainer.innerHTML = '<div class="spinner-border text-info" role="status"><span class="visually-hidden">Ładowanie...</span></div>';
+
+    // Otwórz modal
+    modal.show();
+
+    // Wykryj typ pliku na podstawie rozszerzenia
+    const extension = filename.split('.').pop().toLowerCase();
+    const imageExtensions = ['jpg', 'jpeg', 'png', 'gif', 'bmp', 'webp', 'svg'];
+    const videoExtensions = ['mp4', 'webm', 'ogg'];
+    const audioExtensions = ['mp3', 'wav', 'ogg', 'aac'];
+    const pdfExtensions = ['pdf'];
+    const textExtensions = ['txt', 'csv', 'json', 'xml', 'log', 'md'];
+
+    if (imageExtensions.includes(extension)) {
+        // Obrazy - jeśli jest gotowy podgląd, nie pobieramy pełnego oryginału
+        previewContainer.innerHTML = `<img src="${previewUrl || fileUrl}" alt="${filename}" class="img-fluid">`;
+    } else if (pdfExtensions.includes(extension)) {
+        // PDF
+        previewContainer.innerHTML = `<iframe src="${fileUrl}" type="application/pdf"></iframe>`;
+    } else if (videoExtensions.includes(extension)) {
+        // Wideo
+        previewContainer.innerHTML = `
+            <video controls style="max-width: 100%; max-height: 70vh;">
+                <source src="${fileUrl}" type="video/${extension}">
+                Twoja przeglądarka nie obsługuje odtwarzania wideo.
+            </video>
+        `;
+    } else if (audioExtensions.includes(extension)) {
+        // Audio
+        previewContainer.innerHTML = `
+            <audio controls style="width: 100%;">
+                <source src="${fileUrl}" type="audio/${extension}">
+                Twoja przeglądarka nie obsługuje odtwarzania audio.
+            </audio>
+            <p class="mt-3"><i class="bi bi-music-note-beamed"></i> ${filename}</p>
+        `;
+    } else if (textExtensions.includes(extension)) {
+        // Pliki tekstowe - pobieramy tylko pierwsze KB przez API (kolejne na żądanie)
+        previewContainer.innerHTML = `<pre id="text-preview" style="text-align: left; max-height: 70vh; overflow: auto; background-color: #2d2d2d; padding: 15px; border-radius: 5px;"></pre><div id="text-preview-more"></div>`;
+        loadTextPreview(fileId, 0);
+    } else {
+        // Nieobsługiwany typ
+        previewContainer.innerHTML = `
+            <div class="alert alert-warning">
+                <p><i class="bi bi-exclamation-triangle"></i> Podgląd tego typu pliku nie jest obsługiwany</p>
+                <p>Pobierz plik, aby go otworzyć</p>
+            </div>
+        `;
+    }
+}
+
+async function loadTextPreview(fileId, offset) {
+    const previewContainer = document.getElementById('preview-container');
+    const moreElement = document.getElementById('text-preview-more');
+
+    try {
+        const response = await fetch(`/api/files/${fileId}/preview/?offset=${offset}`, {
+            method: 'GET',
+            headers: getAuthHeaders()
+        });
+
+        if (response.status === 401) {
+            if (await refreshAccessToken()) return loadTextPreview(fileId, offset);
+            return toggleView(false);
+        }
+        if (!response.ok) throw new Error('preview');
+
+        const data = await response.json();
+        if (data.is_binary) {
+            previewContainer.innerHTML = '<p class="text-warning"><i class="bi bi-exclamation-triangle"></i> Plik wygląda na binarny - pobierz go, aby go otworzyć</p>';
+            return;
+        }
+
+        document.getElementById('text-preview').textContent += data.text;
+        if (data.next_offset !== null) {
+            const loadedKB = (data.end / 1024).toFixed(0);
+            const totalKB = (data.total_size / 1024).toFixed(0);
+            moreElement.innerHTML = `<button class="btn btn-sm btn-outline-info mt-2" onclick="loadTextPreview(${fileId}, ${data.next_offset})">Pokaż więcej (${loadedKB} / ${totalKB} KB)</button>`;
+        } else {
+            moreElement.innerHTML = '';
+        }
+    } catch (error) {
+        previewContainer.innerHTML = '<p class="text-warning"><i class="bi bi-exclamation-triangle"></i> Nie można załadować zawartości pliku tekstowego</p>';
+    }
+}
+
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text;
+    return div.innerHTML;
+}
+
+async function renameFile(fileId, currentName) {
+    const newName = prompt('Podaj nową nazwę pliku:', currentName);
+
+    if (!newName || newName.trim() === '') {
+        return;
+    }
+
+    if (newName === currentName) {
+        return;
+    }
+
+    try {
+        const response = await fetch(`/api/files/${fileId}/rename/`, {
+            method: 'PATCH',
+            headers: getAuthHeaders(),
+            body: JSON.stringify({ new_filename: newName.trim() })
+        });
+
+        if (response.status === 401) {
+            if (await refreshAccessToken()) return renameFile(fileId, currentName);
+            return toggleView(false);
+        }
+
+        if (response.ok) {
+            const updatedFile = await response.json();
+
+            const filenameElement = document.getElementById(`filename-${fileId}`);
+            if (filenameElement) {
+                filenameElement.textContent = updatedFile.original_filename;
+            }
+
+            syncFiles();
+        } else {
+            const errorData = await response.json();
+            alert(`Błąd zmiany nazwy: ${errorData.error || JSON.stringify(errorData)}`);
+        }
+    } catch (error) {
+        console.error('Błąd zmiany nazwy:', error);
+        alert('Błąd połączenia z serwerem');
+    }
+}
+
+// --- WERSJE PLIKÓW (HISTORIA, NOWA WERSJA, PRZYWRACANIE) ---
+let currentVersionsFileId = null;
+
+async function showVersions(fileId, filename) {
+    currentVersionsFileId = fileId;
+    const modalElement = document.getElementById('fileVersionsModal');
+    const modal = new bootstrap.Modal(modalElement);
+    const titleSpan = document.getElementById('versions-filename');
+    const listContainer = document.getElementById('versions-list');
+    const loadingEl = document.getElementById('versions-loading');
+    const emptyEl = document.getElementById('versions-empty');
+    const statusEl = document.getElementById('new-version-status');
+    const fileInput = document.getElementById('new-version-file');
+
+    if (titleSpan) titleSpan.textContent = filename;
+    if (listContainer) listContainer.innerHTML = '';
+    if (statusEl) statusEl.innerHTML = '';
+    if (fileInput) fileInput.value = '';
+    if (emptyEl) emptyEl.classList.add('d-none');
+    if (loadingEl) loadingEl.style.display = 'block';
+
+    try {
+        const response = await fetch(`/api/files/${fileId}/versions/`, {
+            method: 'GET',
+            headers: getAuthHeaders()
+        });
+
+        if (response.status === 401) {
+            if (await refreshAccessToken()) return showVersions(fileId, filename);
+            return toggleView(false);
+        }
+
+        const versions = await response.json();
+        if (loadingEl) loadingEl.style.display = 'none';
+
+        if (!Array.isArray(versions) || versions.length === 0) {
+            if (emptyEl) emptyEl.classList.remove('d-none');
+            return modal.show();
+        }
+
+        if (listContainer) {
+            versions.forEach(v => {
+                const sizeKB = (v.file_size / 1024).toFixed(2);
+                const created = new Date(v.created_at).toLocaleString('pl-PL');
+                const restoredInfo = v.restored_from_version
+                    ? `<span class="badge bg-info ms-2">Przywrócona z V${v.restored_from_version}</span>`
+                    : '';
+                const row = document.createElement('div');
+                row.className = 'file-list-item mb-2';
+                row.innerHTML = `
+                    <div class="d-flex justify-content-between align-items-center flex-wrap gap-2">
+                        <div>
+                            <strong>Wersja V${v.version_number}</strong>
+                            ${restoredInfo}<br>
+                            <small class="text-muted">${sizeKB} KB • ${created}</small>
+                        </div>
+                        <div>
+                            <button class="btn btn-sm btn-outline-primary" onclick="restoreVersion(${fileId}, ${v.id})">
+                                <i class="bi bi-arrow-counterclockwise"></i> Przywróć
+                            </button>
+                        </div>
+                    </div>
+                `;
+                listContainer.appendChild(row);
+            });
+        }
+
+        modal.show();
+    } catch (error) {
+        if (loadingEl) loadingEl.style.display = 'none';
+        console.error('Błąd ładowania wersji pliku:', error);
+        if (listContainer) {
+            listContainer.innerHTML = '<div class="alert alert-danger">Nie udało się załadować wersji pliku.</div>';
+        }
+        modal.show();
+    }
+}
+
+async function restoreVersion(fileId, versionId) {
+    if (!confirm('Czy na pewno chcesz przywrócić tę wersję pliku jako nową bieżącą wersję?')) return;
+
+    const statusEl = document.getElementById('new-version-status');
+    if (statusEl) {
+        statusEl.innerHTML = '<div class="alert alert-info">Przywracanie wybranej wersji...</div>';
+    }
+
+    try {
+        const response = await fetch(`/api/files/${fileId}/versions/restore/`, {
+            method: 'POST',
+            headers: getAuthHeaders(),
+            body: JSON.stringify({ version_id: versionId })
+        });
+
+        if (response.status === 401) {
+            if (await refreshAccessToken()) return restoreVersion(fileId, versionId);
+            return toggleView(false);
+        }
+
+        if (response.ok) {
+            if (statusEl) {
+                statusEl.innerHTML = '<div class="alert alert-success">Wersja została przywrócona jako nowa wersja pliku.</div>';
+            }
+            await syncFiles();
+            await showVersions(fileId, document.getElementById('versions-filename').textContent || '');
+        } else {
+            const errorData = await response.json().catch(() => null);
+            if (statusEl) {
+                statusEl.innerHTML = `<div class="alert alert-danger">Błąd przywracania wersji: ${errorData?.error || 'Nieznany błąd'}</div>`;
+            }
+        }
+    } catch (error) {
+        console.error('Błąd przywracania wersji:', error);
+        if (statusEl) {
+            statusEl.innerHTML = '<div class="alert alert-danger">Błąd połączenia podczas przywracania wersji.</div>';
+        }
+    }
+}
+
+async function uploadNewVersionForCurrentFile() {
+    if (!currentVersionsFileId) return;
+
+    const fileInput = document.getElementById('new-version-file');
+    const statusEl = document.getElementById('new-version-status');
+
+    if (!fileInput || !fileInput.files.length) {
+        if (statusEl) {
+            statusEl.innerHTML = '<div class="alert alert-warning">Wybierz plik, który ma być nową wersją.</div>';
+        }
+        return;
+    }
+
+    const file = fileInput.files[0];
+    const formData = new FormData();
+    formData.append('file', file);
+
+    if (statusEl) {
+        statusEl.innerHTML = '<div class="alert alert-info">Wgrywanie nowej wersji...</div>';
+    }
+
+    try {
+        const response = await fetch(`/api/files/${currentVersionsFileId}/versions/upload/`, {
+            method: 'POST',
+            headers: getAuthHeaders(null),
+            body: formData
+        });
+
+        if (response.status === 401) {
+            if (await refreshAccessToken()) return uploadNewVersionForCurrentFile();
+            return toggleView(false);
+        }
+
+        if (response.ok) {
+            if (statusEl) {
+                statusEl.innerHTML = '<div class="alert alert-success">Nowa wersja została zapisana.</div>';
+            }
+            fileInput.value = '';
+            await syncFiles();
+            await showVersions(currentVersionsFileId, document.getElementById('versions-filename').textContent || '');
+        } else {
+            const errorData = await response.json().catch(() => null);
+            if (statusEl) {
+                statusEl.innerHTML = `<div class="alert alert-danger">Błąd zapisu nowej wersji: ${errorData?.error || 'Nieznany błąd'}</div>`;
+            }
+        }
+    } catch (error) {
+        console.error('Błąd wgrywania nowej wersji:', error);
+        if (statusEl) {
+            statusEl.innerHTML = '<div class="alert alert-danger">Błąd połączenia podczas zapisywania nowej wersji.</div>';
+        }
+    }
+}
+
+// Inicjalizacja przy starcie
+window.addEventListener('DOMContentLoaded', () => {
+    // Inicjalizacja autoryzacji
+    if (accessToken) {
+        decodeToken(accessToken);
+        toggleView(true);
+    } else {
+        toggleView(false);
+    }
+
+    // Licznik wybranych plików
+    const fileInput = document.getElementById('file-input');
+    if (fileInput) {
+        fileInput.addEventListener('change', (e) => {
+            const count = e.target.files.length;
+            document.getElementById('file-count').textContent = count;
+        });
+    }
+
+    const uploadNewVersionBtn = document.getElementById('upload-new-version-btn');
+    if (uploadNewVersionBtn) {
+        uploadNewVersionBtn.addEventListener('click', uploadNewVersionForCurrentFile);
+    }
+});
@@ -1,11 +1,49 @@
 # frontend/views.py
 
+import hashlib
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
 from django.views.generic import TemplateView
 
-class FrontendAppView(TemplateView):
+
+class ShellView(TemplateView):
+    """
+    Strona aplikacji (SPA) nie zależy od żądania - renderujemy ją raz na
+    proces, a przeglądarka rewaliduje ją ETagiem (304 bez treści). Zmiana
+    plików statycznych zmienia ich hashe w HTML, a więc i ETag strony.
+    W DEBUG renderujemy przy każdym żądaniu (edycja szablonu bez restartu).
+    """
+
+    _rendered = {}
+
+    def _content(self):
+        cached = self._rendered.get(self.template_name)
+        if cached is None:
+            content = render_to_string(self.template_name)
+            etag = quote_etag(hashlib.sha256(content.encode()).hexdigest()[:32])
+            cached = (content, etag)
+            if not settings.DEBUG:
+                self._rendered[self.template_name] = cached
+        return cached
+
+    def get(self, request, *args, **kwargs):
+        content, etag = self._content()
+        response = get_conditional_response(request, etag=etag) or HttpResponse(
+            content
+        )
+        response["ETag"] = etag
+        patch_cache_control(response, no_cache=True)
+        return response
+
+
+class FrontendAppView(ShellView):
     # Po prostu pokaż ten plik HTML
     template_name = "frontend/index.html"
 
-class UserView(TemplateView):
+class UserView(ShellView):
     # Po prostu pokaż ten plik HTML
-    template_name = "frontend/userView.html"
\ No newline at end of file
+    template_name = "frontend/userView.html"
@@ -0,0 +1,84 @@
+import multiprocessing
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs.worker import Worker
+
+
+def _run_worker_process(threads, poll_interval, once):
+    worker = Worker(threads=threads, poll_interval=poll_interval, once=once)
+    signal.signal(signal.SIGTERM, worker.stop)
+    worker.run()
+
+
+class Command(BaseCommand):
+    help = "Uruchamia worker kolejki zadań w tle (pula wątków lub procesów)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=settings.JOBS_WORKER_THREADS,
+            help="Liczba wątków w każdym procesie.",
+        )
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=1,
+            help="Liczba procesów workera (dla zadań obciążających CPU).",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.JOBS_POLL_INTERVAL,
+            help="Co ile sekund sprawdzać kolejkę, gdy jest pusta.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Opróżnij kolejkę i zakończ (np. do crona lub testów).",
+        )
+
+    def handle(self, *args, **options):
+        threads = max(1, options["threads"])
+        processes = max(1, options["processes"])
+        poll_interval = options["poll_interval"]
+        once = options["once"]
+
+        self.stdout.write(f"Worker zadań: {processes} proces(ów) x {threads} wątk(ów)")
+
+        if processes == 1:
+            _run_worker_process(threads, poll_interval, once)
+            return
+
+        # Połączenia z bazą (ani pula z jej wątkami) nie mogą być współdzielone
+        # między procesami - każdy proces potomny otworzy własne
+        connections.close_all()
+        for connection in connections.all(initialized_only=True):
+            if getattr(connection, "pool", None) is not None:
+                connection.close_pool()
+        context = multiprocessing.get_context("fork")
+        children = [
+            context.Process(
+                target=_run_worker_process, args=(threads, poll_interval, once)
+            )
+            for _ in range(processes)
+        ]
+        for child in children:
+            child.start()
+
+        def terminate(*args):
+            for child in children:
+                child.terminate()
+
+        signal.signal(signal.SIGTERM, terminate)
+        try:
+            for child in children:
+                child.join()
+        except KeyboardInterrupt:
+            terminate()
+            for child in children:
+                child.join()
@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """
+    Zadanie w tle (kolejka oparta o bazę danych, bez zewnętrznego brokera).
+
+    - kind: nazwa zarejestrowanego handlera, np. "files.extract_zip"
+    - payload: argumenty zadania (JSON)
+    - run_after: najwcześniejszy moment uruchomienia (używany też przy ponowieniach)
+    - locked_by / locked_at: który worker i od kiedy wykonuje zadanie
+    """
+
+    class Status(models.TextChoices):
+        QUEUED = "queued", "W kolejce"
+        RUNNING = "running", "W trakcie"
+        SUCCEEDED = "succeeded", "Zakończone"
+        FAILED = "failed", "Błąd"
+
+    kind = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(
+        max_length=20, choices=Status.choices, default=Status.QUEUED
+    )
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="jobs",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            # Częściowy indeks - worker przegląda tylko zadania czekające w kolejce
+            models.Index(
+                fields=["run_after", "id"],
+                condition=Q(status="queued"),
+                name="jobs_job_queued_idx",
+            ),
+            models.Index(
+                fields=["locked_at"],
+                condition=Q(status="running"),
+                name="jobs_job_running_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"[{self.kind}] #{self.pk} ({self.status})"
+
+    @property
+    def is_last_attempt(self):
+        return self.attempts >= self.max_attempts
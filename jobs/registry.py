@@ -0,0 +1,49 @@
+"""
+Rejestr handlerów zadań oraz funkcja enqueue() do zlecania pracy w tle.
+
+Handler to zwykła funkcja przyjmująca obiekt Job i zwracająca wynik
+serializowalny do JSON (zapisywany w Job.result):
+
+    @job_handler("files.extract_zip")
+    def extract_zip(job):
+        ...
+"""
+
+from django.utils import timezone
+
+from .models import Job
+
+_handlers = {}
+
+
+def job_handler(kind, max_attempts=3):
+    """Rejestruje funkcję jako handler zadań danego rodzaju."""
+
+    def decorator(func):
+        func.max_attempts = max_attempts
+        _handlers[kind] = func
+        return func
+
+    return decorator
+
+
+def get_handler(kind):
+    return _handlers.get(kind)
+
+
+def enqueue(kind, payload=None, user=None, max_attempts=None, run_after=None):
+    """
+    Dodaje zadanie do kolejki. Wiersz zapisuje się w bieżącej transakcji,
+    więc zadanie staje się widoczne dla workera dopiero po jej zatwierdzeniu.
+    """
+    handler = get_handler(kind)
+    if handler is None:
+        raise ValueError(f"Nieznany rodzaj zadania: {kind}")
+
+    return Job.objects.create(
+        kind=kind,
+        payload=payload or {},
+        created_by=user if user is not None and user.is_authenticated else None,
+        max_attempts=max_attempts or handler.max_attempts,
+        run_after=run_after or timezone.now(),
+    )
@@ -0,0 +1,27 @@
+# jobs/views.py
+from rest_framework import viewsets
+
+from .models import Job
+from .serializers import JobSerializer
+
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Status zadań w tle (frontend odpytuje GET /api/jobs/<id>/ po odpowiedzi 202).
+    Użytkownik widzi swoje zadania, administrator wszystkie.
+    """
+
+    serializer_class = JobSerializer
+
+    def get_queryset(self):
+        user = self.request.user
+        queryset = Job.objects.all()
+
+        if not (user.is_staff or user.is_superuser):
+            queryset = queryset.filter(created_by=user)
+
+        status_filter = self.request.query_params.get("status", None)
+        if status_filter:
+            queryset = queryset.filter(status=status_filter)
+
+        return queryset.order_by("-created_at")
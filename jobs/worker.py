@@ -0,0 +1,256 @@
+"""
+Worker kolejki zadań.
+
+Zadania pobieramy przez SELECT ... FOR UPDATE SKIP LOCKED, więc wiele wątków
+i procesów (także na różnych maszynach) może bezpiecznie pracować na tej samej
+tabeli - każdy dostaje inne zadanie, bez czekania na cudze blokady.
+"""
+
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+from .registry import get_handler
+
+logger = logging.getLogger(__name__)
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}"
+
+
+def retry_delay(attempts):
+    """Wykładniczy backoff z losowym rozrzutem (jitter), ograniczony z góry."""
+    base = settings.JOBS_RETRY_BACKOFF_SECONDS
+    delay = min(
+        base * (2 ** max(attempts - 1, 0)), settings.JOBS_RETRY_BACKOFF_MAX_SECONDS
+    )
+    return timedelta(seconds=delay * random.uniform(1.0, 1.25))
+
+
+def claim_next_job():
+    """Pobiera i blokuje najstarsze gotowe zadanie. Zwraca None, gdy kolejka jest pusta."""
+    now = timezone.now()
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.Status.QUEUED, run_after__lte=now)
+            .order_by("run_after", "id")
+            .first()
+        )
+        if job is None:
+            return None
+
+        job.status = Job.Status.RUNNING
+        job.attempts += 1
+        job.locked_by = worker_name()[:100]
+        job.locked_at = now
+        job.save(update_fields=["status", "attempts", "locked_by", "locked_at"])
+    return job
+
+
+class Heartbeat(threading.Thread):
+    """
+    Odświeża locked_at wykonywanego zadania co JOBS_HEARTBEAT_SECONDS, aby
+    requeue_stale_jobs() uznawał za porzucone tylko zadania martwego workera,
+    a nie te, które po prostu długo trwają.
+    """
+
+    def __init__(self, job):
+        super().__init__(name=f"jobs-heartbeat-{job.pk}", daemon=True)
+        self.job = job
+        self._stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self._stopped.wait(settings.JOBS_HEARTBEAT_SECONDS):
+                try:
+                    Job.objects.filter(
+                        pk=self.job.pk,
+                        status=Job.Status.RUNNING,
+                        locked_by=self.job.locked_by,
+                    ).update(locked_at=timezone.now())
+                except Exception as e:
+                    logger.warning(
+                        f"[JOBS] Nie udało się odświeżyć blokady {self.job}: {e}"
+                    )
+        finally:
+            # Wątek ma własne połączenie z bazą
+            connection.close()
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+def run_job(job):
+    """Wykonuje zadanie i zapisuje wynik, błąd albo termin ponowienia."""
+    handler = get_handler(job.kind)
+    started = time.monotonic()
+    heartbeat = Heartbeat(job)
+    heartbeat.start()
+
+    try:
+        try:
+            if handler is None:
+                raise LookupError(f"Brak handlera dla zadania {job.kind}")
+            result = handler(job)
+        finally:
+            heartbeat.stop()
+    except Exception as e:
+        job.error = "".join(traceback.format_exception(e))[-4000:]
+        job.locked_by = ""
+        job.locked_at = None
+        if handler is None or job.is_last_attempt:
+            job.status = Job.Status.FAILED
+            job.finished_at = timezone.now()
+            logger.error(f"[JOBS] Zadanie {job} nie powiodło się: {e}")
+        else:
+            job.status = Job.Status.QUEUED
+            job.run_after = timezone.now() + retry_delay(job.attempts)
+            logger.warning(
+                f"[JOBS] Zadanie {job} nie powiodło się (próba {job.attempts}/{job.max_attempts}), "
+                f"ponowienie o {job.run_after:%H:%M:%S}: {e}"
+            )
+        job.save(
+            update_fields=[
+                "status",
+                "error",
+                "run_after",
+                "finished_at",
+                "locked_by",
+                "locked_at",
+            ]
+        )
+        return job
+
+    job.status = Job.Status.SUCCEEDED
+    job.result = result
+    job.error = ""
+    job.finished_at = timezone.now()
+    job.locked_by = ""
+    job.locked_at = None
+    job.save(
+        update_fields=[
+            "status",
+            "result",
+            "error",
+            "finished_at",
+            "locked_by",
+            "locked_at",
+        ]
+    )
+    logger.info(f"[JOBS] Zakończono {job} w {time.monotonic() - started:.2f}s")
+    return job
+
+
+def requeue_stale_jobs():
+    """
+    Odzyskuje zadania, które utknęły w stanie RUNNING (worker zabity w trakcie
+    pracy - heartbeat przestał odświeżać locked_at). Zadania z wolnymi próbami
+    wracają do kolejki, a te po ostatniej próbie (np. nieidempotentne
+    z max_attempts=1) kończą się błędem zamiast drugiego uruchomienia.
+    Zwraca liczbę zadań przywróconych do kolejki.
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(
+        status=Job.Status.RUNNING,
+        locked_at__lt=now - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT_SECONDS),
+    )
+    failed = stale.filter(attempts__gte=F("max_attempts")).update(
+        status=Job.Status.FAILED,
+        error="Worker przestał odpowiadać w trakcie wykonywania zadania",
+        finished_at=now,
+        locked_by="",
+        locked_at=None,
+    )
+    if failed:
+        logger.error(
+            f"[JOBS] {failed} porzuconych zadań bez kolejnych prób oznaczono jako błąd"
+        )
+    return stale.filter(attempts__lt=F("max_attempts")).update(
+        status=Job.Status.QUEUED, locked_by="", locked_at=None
+    )
+
+
+def run_next_job():
+    """Pobiera i wykonuje jedno zadanie. Zwraca False, gdy kolejka była pusta."""
+    close_old_connections()
+    job = claim_next_job()
+    if job is None:
+        return False
+    run_job(job)
+    return True
+
+
+class Worker:
+    """Pula wątków, z których każdy w pętli pobiera i wykonuje zadania."""
+
+    def __init__(self, threads=1, poll_interval=1.0, once=False):
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.once = once
+        self.stop_event = threading.Event()
+
+    def _loop(self):
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    worked = run_next_job()
+                except Exception as e:
+                    logger.error(f"[JOBS] Błąd pętli workera: {e}")
+                    worked = False
+
+                if not worked:
+                    if self.once:
+                        return
+                    self.stop_event.wait(self.poll_interval)
+        finally:
+            close_old_connections()
+
+    def _maintenance_loop(self):
+        while not self.stop_event.wait(max(self.poll_interval, 30)):
+            try:
+                close_old_connections()
+                requeued = requeue_stale_jobs()
+                if requeued:
+                    logger.warning(f"[JOBS] Przywrócono do kolejki {requeued} zadań")
+            except Exception as e:
+                logger.error(f"[JOBS] Błąd przy odzyskiwaniu zadań: {e}")
+
+    def stop(self, *args):
+        self.stop_event.set()
+
+    def run(self):
+        requeue_stale_jobs()
+        workers = [
+            threading.Thread(target=self._loop, name=f"jobs-{i}", daemon=True)
+            for i in range(self.threads)
+        ]
+        for thread in workers:
+            thread.start()
+
+        if not self.once:
+            threading.Thread(
+                target=self._maintenance_loop, name="jobs-maintenance", daemon=True
+            ).start()
+
+        try:
+            for thread in workers:
+                while thread.is_alive():
+                    thread.join(timeout=1.0)
+        except KeyboardInterrupt:
+            self.stop()
+            for thread in workers:
+                thread.join()
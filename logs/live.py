@@ -0,0 +1,384 @@
+"""
+Podgląd LogBooka na żywo (Server-Sent Events, GET /api/logs/stream/).
+
+Nowe wpisy zgłasza baza: wyzwalacz na logs_activitylog wysyła
+pg_notify('activity_log', id) przy zatwierdzeniu transakcji. W każdym
+procesie jeden wątek słucha tego kanału na osobnym połączeniu (LISTEN),
+pobiera nowe wiersze jednym zapytaniem i rozsyła je do wszystkich
+otwartych strumieni w procesie. Klient podglądu nie trzyma więc połączenia
+z bazą ani nie odpytuje tabeli - czeka w pamięci na kolejne zdarzenia.
+
+LISTEN nie działa przez PgBouncer w trybie transaction: wtedy słuchamy
+przez bezpośrednie połączenie (LOGS_STREAM_DB_HOST / LOGS_STREAM_DB_PORT),
+a bez niego jeden wątek na proces odpytuje tabelę co
+LOGS_STREAM_POLL_INTERVAL sekund (nadal niezależnie od liczby klientów).
+
+Id z sekwencji jest nadawane przy INSERT, a wiersz staje się widoczny
+dopiero przy COMMIT: wpis o niższym id może pojawić się po wpisie o wyższym.
+Dlatego nadrabianie i odpytywanie nie kończą się na `pk > last_id` -
+przeglądają też wpisy z ostatnich LOGS_STREAM_LATE_COMMIT_SECONDS sekund,
+a wysłane już id pamiętamy (Hub.seen), żeby nie rozesłać ich dwa razy.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, connections
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.renderers import BaseRenderer
+
+from .models import ActivityLog
+from .serializers import ActivityLogSerializer
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "activity_log"
+# Limit wierszy pobieranych naraz (nadrabianie po ponownym połączeniu)
+FETCH_LIMIT = 500
+# Limit zdarzeń czekających na wolnego klienta - starsze odrzucamy
+QUEUE_SIZE = 1000
+RECONNECT_DELAY = 5
+# Komentarz SSE co tyle sekund - proxy nie zamyka bezczynnego strumienia
+KEEPALIVE_INTERVAL = 15
+# Po rozłączeniu przeglądarka wznawia strumień po tylu ms (pole retry)
+RETRY_MS = 3000
+# Po tylu sekundach bez powiadomień wątek sprawdza, czy ktoś jeszcze słucha
+IDLE_TIMEOUT = 30
+# Okno (s) zbierania powiadomień w jedną partię
+BATCH_WINDOW = 0.05
+
+
+def _serialize(rows):
+    return [
+        (row.pk, row.user.username if row.user else None, row.action, data)
+        for row, data in zip(rows, ActivityLogSerializer(rows, many=True).data)
+    ]
+
+
+def late_window():
+    """Czas zapisu, od którego wpis może jeszcze nie być zatwierdzony."""
+    return timezone.now() - timedelta(seconds=settings.LOGS_STREAM_LATE_COMMIT_SECONDS)
+
+
+def fetch_events(**filters):
+    """(id, login, akcja, dane) wpisów spełniających filtry, rosnąco po id."""
+    rows = list(
+        ActivityLog.objects.select_related("user")
+        .filter(**filters)
+        .order_by("pk")[:FETCH_LIMIT]
+    )
+    return _serialize(rows)
+
+
+class Subscription:
+    """Kolejka zdarzeń jednego klienta podglądu."""
+
+    def __init__(self, hub):
+        self.hub = hub
+        self.events = deque(maxlen=QUEUE_SIZE)
+        self.ready = threading.Condition()
+
+    def push(self, events):
+        with self.ready:
+            self.events.extend(events)
+            self.ready.notify()
+
+    def wait(self, timeout):
+        """Zdarzenia, które przyszły od ostatniego wywołania (pusta lista po `timeout`)."""
+        with self.ready:
+            if not self.events:
+                self.ready.wait(timeout)
+            events = list(self.events)
+            self.events.clear()
+        return events
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class Hub:
+    """Rozsyłanie nowych wpisów do klientów podglądu w obrębie procesu."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = set()
+        self.thread = None
+        self.last_id = None
+        # Id już rozesłanych (lub zastanych przy starcie) wpisów z okna późnych
+        # zatwierdzeń; `seen_order` - kolejność dodania do usuwania starych
+        self.seen = set()
+        self.seen_order = deque()
+
+    def subscribe(self):
+        """
+        Nowa kolejka klienta. Zwraca (subskrypcja, id): wszystkie wpisy
+        o id większym od zwróconego oraz zatwierdzone później wpisy o id
+        niższym trafią do kolejki.
+        """
+        subscription = Subscription(self)
+        with self.lock:
+            if self.last_id is None:
+                last = ActivityLog.objects.order_by("-pk").values_list("pk", flat=True)
+                self.last_id = last.first() or 0
+                self._remember(
+                    ActivityLog.objects.filter(
+                        timestamp__gte=late_window()
+                    ).values_list("pk", flat=True)
+                )
+            self.subscribers.add(subscription)
+            last_id = self.last_id
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self._run, name="activity-log-listener", daemon=True
+                )
+                self.thread.start()
+        return subscription, last_id
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscribers.discard(subscription)
+
+    def _remember(self, ids):
+        """Dodaje id do `seen` i zapomina te spoza okna (wywoływać pod self.lock)."""
+        now = time.monotonic()
+        for pk in ids:
+            if pk not in self.seen:
+                self.seen.add(pk)
+                self.seen_order.append((now, pk))
+        # Podwójne okno - zapas na różnicę zegarów procesów zapisujących wpisy
+        horizon = now - 2 * settings.LOGS_STREAM_LATE_COMMIT_SECONDS
+        while self.seen_order and self.seen_order[0][0] < horizon:
+            self.seen.discard(self.seen_order.popleft()[1])
+
+    def publish(self, events):
+        with self.lock:
+            events = [event for event in events if event[0] not in self.seen]
+            if not events:
+                return
+            self._remember(event[0] for event in events)
+            self.last_id = max(self.last_id, max(event[0] for event in events))
+            subscribers = list(self.subscribers)
+        for subscription in subscribers:
+            subscription.push(events)
+
+    def _fetch(self, **filters):
+        try:
+            return fetch_events(**filters)
+        finally:
+            # Połączenie z puli wraca do puli między partiami
+            connection.close()
+
+    def _catch_up(self):
+        """
+        Wpisy po ostatnim znanym id i nierozesłane wpisy z okna późnych
+        zatwierdzeń (start wątku, przerwa w połączeniu, odpytywanie).
+        """
+        try:
+            ids = set(
+                ActivityLog.objects.filter(
+                    Q(pk__gt=self.last_id) | Q(timestamp__gte=late_window())
+                ).values_list("pk", flat=True)
+            )
+            with self.lock:
+                ids = sorted(ids - self.seen)
+        finally:
+            connection.close()
+        for start in range(0, len(ids), FETCH_LIMIT):
+            self.publish(self._fetch(pk__in=ids[start : start + FETCH_LIMIT]))
+
+    def _run(self):
+        while True:
+            try:
+                self._catch_up()
+                params = listen_connection_params()
+                if params is None:
+                    self._poll()
+                else:
+                    self._listen(params)
+                return
+            except Exception as e:
+                logger.error(f"[LOG STREAM] Błąd nasłuchu nowych wpisów: {e}")
+                close_old_connections()
+                time.sleep(RECONNECT_DELAY)
+                if self._stop_if_idle():
+                    return
+
+    def _listen(self, params):
+        import psycopg
+
+        with psycopg.connect(**params, autocommit=True) as listener:
+            listener.execute(f"LISTEN {CHANNEL}")
+            logger.info("[LOG STREAM] Nasłuch kanału activity_log")
+            # Nadrabiamy wpisy z czasu zestawiania połączenia
+            self._catch_up()
+            while True:
+                # Czekamy na pierwsze powiadomienie, kolejne z tej samej chwili
+                # pobieramy tym samym zapytaniem
+                ids = [
+                    int(notify.payload)
+                    for notify in listener.notifies(timeout=IDLE_TIMEOUT, stop_after=1)
+                ]
+                if ids:
+                    ids += [
+                        int(notify.payload)
+                        for notify in listener.notifies(
+                            timeout=BATCH_WINDOW, stop_after=FETCH_LIMIT
+                        )
+                    ]
+                if ids:
+                    self.publish(self._fetch(pk__in=ids))
+                elif self._stop_if_idle():
+                    return
+
+    def _poll(self):
+        logger.info("[LOG STREAM] Brak LISTEN (PgBouncer) - odpytywanie tabeli")
+        while True:
+            time.sleep(settings.LOGS_STREAM_POLL_INTERVAL)
+            if self._stop_if_idle():
+                return
+            self._catch_up()
+
+    def _stop_if_idle(self):
+        """Bez klientów wątek kończy pracę i zwalnia połączenie (wznowi go subscribe)."""
+        with self.lock:
+            if self.subscribers:
+                return False
+            self.thread = None
+            self.last_id = None
+            self.seen = set()
+            self.seen_order = deque()
+            return True
+
+    def reset(self):
+        self.lock = threading.Lock()
+        self.subscribers = set()
+        self.thread = None
+        self.last_id = None
+        self.seen = set()
+        self.seen_order = deque()
+
+
+HUB = Hub()
+
+# Wątek nasłuchu nie przechodzi do procesu potomnego (np. workera gunicorna)
+os.register_at_fork(after_in_child=HUB.reset)
+
+
+def listen_connection_params():
+    """
+    Parametry połączenia dla LISTEN albo None, gdy go nie ma (PgBouncer
+    w trybie transaction bez bezpośredniego adresu bazy albo psycopg2).
+    """
+    if not settings.PSYCOPG3:
+        return None
+    direct_host = settings.LOGS_STREAM_DB_HOST
+    if settings.DB_CONNECTION_MODE == "pgbouncer" and not direct_host:
+        return None
+    params = connections["default"].get_connection_params()
+    params.pop("cursor_factory", None)
+    if direct_host:
+        params["host"] = direct_host
+        params["port"] = settings.LOGS_STREAM_DB_PORT
+    return params
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Negocjacja treści dla Accept: text/event-stream (EventSource). Strumień
+    zwraca sam widok; renderer formatuje tylko błędy (np. 403) jako zdarzenie.
+    """
+
+    media_type = "text/event-stream"
+    format = "sse"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return f"event: error\ndata: {json.dumps(data, default=str)}\n\n".encode()
+
+
+def format_event(event_id, data):
+    return f"id: {event_id}\nevent: activity\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _matches(event, username, action):
+    _, event_username, event_action, _ = event
+    if username is not None and (event_username or "").lower() != username.lower():
+        return False
+    return action is None or event_action == action
+
+
+def _missed_events(after_id, until_id, username, action):
+    """
+    Wpisy z przerwy w połączeniu (after_id, until_id], najwyżej
+    LOGS_STREAM_RESUME_LIMIT najnowszych; drugi element - czy coś pominięto.
+
+    Dochodzą do nich wpisy o id < after_id zapisane do
+    LOGS_STREAM_LATE_COMMIT_SECONDS przed wpisem after_id - mogły zostać
+    zatwierdzone już po nim. Część z nich klient mógł dostać wcześniej,
+    więc powtórzenia rozpoznaje po polu `id` w danych.
+    """
+    condition = Q(pk__gt=after_id, pk__lte=until_id)
+    after_timestamp = (
+        ActivityLog.objects.filter(pk__lte=after_id)
+        .order_by("-pk")
+        .values_list("timestamp", flat=True)
+        .first()
+    )
+    if after_timestamp is not None:
+        condition |= Q(
+            pk__lt=after_id,
+            timestamp__gte=after_timestamp
+            - timedelta(seconds=settings.LOGS_STREAM_LATE_COMMIT_SECONDS),
+        )
+    queryset = ActivityLog.objects.filter(condition)
+    if username is not None:
+        queryset = queryset.filter(user__username__iexact=username)
+    if action is not None:
+        queryset = queryset.filter(action=action)
+    limit = settings.LOGS_STREAM_RESUME_LIMIT
+    rows = list(queryset.select_related("user").order_by("-pk")[: limit + 1])
+    truncated = len(rows) > limit
+    return _serialize(rows[:limit][::-1]), truncated
+
+
+def event_stream(last_event_id=None, username=None, action=None):
+    """
+    Strumień SSE nowych wpisów (opcjonalnie tylko użytkownika / akcji). Po
+    LOGS_STREAM_MAX_SECONDS kończy się, a klient łączy się ponownie
+    z Last-Event-ID - wątek workera nie jest zajęty bez końca.
+    """
+    subscription, last_id = HUB.subscribe()
+    # Pole id zdarzenia to najwyższe wysłane id: późno zatwierdzony wpis
+    # o niższym id nie cofa Last-Event-ID, od którego klient wznowi strumień
+    high_id = last_id if last_event_id is None else max(last_event_id, last_id)
+    resumed = set()
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        # Wpisy do last_id z bazy, późniejsze trafią do kolejki subskrypcji
+        if last_event_id is not None:
+            events, truncated = _missed_events(last_event_id, last_id, username, action)
+            if truncated:
+                yield "event: truncated\ndata: {}\n\n"
+            resumed = {event[0] for event in events}
+            yield "".join(format_event(high_id, event[3]) for event in events)
+        # Czekanie na zdarzenia nie trzyma połączenia z bazą (wraca do puli)
+        connection.close()
+
+        deadline = time.monotonic() + settings.LOGS_STREAM_MAX_SECONDS
+        while (remaining := deadline - time.monotonic()) > 0:
+            chunk = []
+            for event in subscription.wait(min(KEEPALIVE_INTERVAL, remaining)):
+                if event[0] in resumed or not _matches(event, username, action):
+                    continue
+                high_id = max(high_id, event[0])
+                chunk.append(format_event(high_id, event[3]))
+            yield "".join(chunk) or ": ping\n\n"
+    finally:
+        subscription.close()
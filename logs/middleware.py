@@ -0,0 +1,91 @@
+"""
+Dane klienta bieżącego żądania (IP, User-Agent, id żądania) dla wpisów
+ActivityLog.
+
+Middleware zapisuje je w ContextVar, więc ActivityLog.objects.log() wypełnia
+kolumny także wtedy, gdy wpis powstaje głęboko w files/services.py. Poza
+żądaniem (worker zadań, komendy) kolumny zostają puste.
+"""
+
+import contextvars
+import ipaddress
+
+from django.conf import settings
+
+from monitoring import context as metrics_context
+
+# Długość kolumny ActivityLog.user_agent
+USER_AGENT_MAX_LENGTH = 512
+
+_client = contextvars.ContextVar("spc_activity_client", default=None)
+
+
+class ClientInfo:
+    __slots__ = ("ip_address", "user_agent", "request_id")
+
+    def __init__(self, ip_address=None, user_agent="", request_id=""):
+        self.ip_address = ip_address
+        self.user_agent = user_agent
+        self.request_id = request_id
+
+
+def parse_ip(value):
+    """Adres IP z nagłówka; Azure App Service dopisuje port ("1.2.3.4:5678")."""
+    value = (value or "").strip().strip("[]")
+    for candidate in (value, value.rsplit(":", 1)[0].strip("[]")):
+        try:
+            return str(ipaddress.ip_address(candidate))
+        except ValueError:
+            continue
+    return None
+
+
+def client_ip(request):
+    """
+    IP klienta. Za proxy (LOGS_TRUSTED_PROXIES > 0) bierzemy wpis
+    X-Forwarded-For dopisany przez najbliższe zaufane proxy - wcześniejsze
+    wpisy może podrobić sam klient.
+    """
+    proxies = settings.LOGS_TRUSTED_PROXIES
+    forwarded = request.META.get("HTTP_X_FORWARDED_FOR")
+    if proxies and forwarded:
+        hops = [hop for hop in forwarded.split(",") if hop.strip()]
+        if hops:
+            return parse_ip(hops[-min(proxies, len(hops))])
+    return parse_ip(request.META.get("REMOTE_ADDR"))
+
+
+def current_client():
+    """Dane klienta bieżącego żądania albo None poza żądaniem."""
+    return _client.get()
+
+
+def current_request_id():
+    client = _client.get()
+    if client is not None:
+        return client.request_id
+    # Kod wywołany poza tym middleware, ale w mierzonym żądaniu
+    metrics = metrics_context.current()
+    return metrics.request_id if metrics is not None else ""
+
+
+class ActivityContextMiddleware:
+    """Musi działać po RequestMetricsMiddleware (id żądania w request.request_id)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _client.set(
+            ClientInfo(
+                ip_address=client_ip(request),
+                user_agent=request.headers.get("User-Agent", "")[
+                    :USER_AGENT_MAX_LENGTH
+                ],
+                request_id=getattr(request, "request_id", ""),
+            )
+        )
+        try:
+            return self.get_response(request)
+        finally:
+            _client.reset(token)
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Indeksy na dużych tabelach budujemy bez blokowania zapisów
+    atomic = False
+
+    dependencies = [
+        ("logs", "0004_alter_activitylog_action"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="activitylog",
+            index=models.Index(fields=["-timestamp"], name="logs_timestamp_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="activitylog",
+            index=models.Index(
+                fields=["user", "-timestamp"], name="logs_user_timestamp_idx"
+            ),
+        ),
+        # Stary indeks na samym FK usuwamy dopiero, gdy są już indeksy złożone
+        migrations.AlterField(
+            model_name="activitylog",
+            name="user",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="activity_logs",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+    ]
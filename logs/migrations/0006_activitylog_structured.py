@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Same kolumny z NULL / stałą wartością domyślną - bez przepisywania tabeli.
+    # Dane starych wpisów uzupełnia 0007, indeksy powstają dopiero w 0008
+
+    dependencies = [
+        ("files", "0012_content_encoding"),
+        ("logs", "0005_alter_activitylog_user_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="activitylog",
+            name="bytes_transferred",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="activitylog",
+            name="file",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="activity_logs",
+                to="files.userfile",
+            ),
+        ),
+        migrations.AddField(
+            model_name="activitylog",
+            name="ip_address",
+            field=models.GenericIPAddressField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="activitylog",
+            name="payload",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name="activitylog",
+            name="request_id",
+            field=models.CharField(blank=True, default="", max_length=64),
+        ),
+        migrations.AddField(
+            model_name="activitylog",
+            name="user_agent",
+            field=models.CharField(blank=True, default="", max_length=512),
+        ),
+        migrations.AddField(
+            model_name="activitylog",
+            name="version",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="activity_logs",
+                to="files.userfileversion",
+            ),
+        ),
+    ]
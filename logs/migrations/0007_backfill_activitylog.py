@@ -0,0 +1,137 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:55
+
+import posixpath
+import re
+
+from django.conf import settings
+from django.db import migrations, transaction
+
+# Formaty `details` zapisywane przed wprowadzeniem pól strukturalnych
+_PATTERNS = [
+    re.compile(p)
+    for p in (
+        r"^Utworzono plik \(V1\): (?P<filename>.+)$",
+        r"^Utworzono nową wersję pliku V(?P<version>\d+): (?P<filename>.+)$",
+        r"^Utworzono archiwum \(V1\): (?P<filename>.+) \((?P<files>\d+) plików\)$",
+        r"^Wyświetlono plik: (?P<filename>.+)$",
+        r"^Pobrano plik: (?P<filename>.+)$",
+        r"^Pobrano z archiwum '(?P<filename>.+?)': (?P<member>.+)$",
+        r"^Rozpakowano z ZIP '(?P<archive>.+?)': (?P<filename>.+)$",
+        r"^Błąd podczas rozpakowywania ZIP '(?P<archive>.+?)': (?P<error>.*)$",
+        r"^Wypakowano z archiwum '(?P<archive>.+?)': (?P<member>.+)$",
+        r"^Przywrócono plik '(?P<filename>.+)' do wersji V(?P<restored_from>\d+) "
+        r"jako nową wersję V(?P<version>\d+)\.$",
+        r"^Zmieniono nazwę pliku z '(?P<old_name>.+)' na '(?P<filename>.+)'$",
+        r"^Przeniesiono do kosza: (?P<filename>.+)$",
+        r"^Przywrócono plik z kosza: (?P<filename>.+)$",
+        # Plik usunięty na stałe - nazwa w payload, bez powiązania
+        r"^Deleted file: (?P<deleted_filename>.+)$",
+        r"^Failed to delete file: (?P<filename>.+)\. Plik pozostaje w koszu\.$",
+        r"^Usunięto folder '(?P<folder>.+)' \((?P<files>\d+) plików przeniesiono do kosza\)$",
+        r"^Zmieniono status użytkownika (?P<target_user>.+) na: (?P<new_status>.+)\.$",
+    )
+]
+_INTEGER_KEYS = {"version", "restored_from", "files"}
+
+
+def _parse(details):
+    """(payload, czy szukać pliku po nazwie) albo (None, False) dla innych formatów."""
+    for pattern in _PATTERNS:
+        match = pattern.match(details)
+        if match:
+            payload = {
+                key: int(value) if key in _INTEGER_KEYS else value
+                for key, value in match.groupdict().items()
+            }
+            if "deleted_filename" in payload:
+                payload["filename"] = payload.pop("deleted_filename")
+                return payload, False
+            if "member" in payload and "filename" not in payload:
+                # Wypakowany plik dostaje nazwę bez ścieżki z archiwum
+                payload["filename"] = posixpath.basename(payload["member"])
+            return payload, True
+    return None, False
+
+
+def _unique_files(UserFile, keys):
+    """{(właściciel, nazwa): id} - tylko nazwy jednoznaczne u danego właściciela."""
+    owners = {owner for owner, _ in keys}
+    names = {name for _, name in keys}
+    found = {}
+    # Osobno pliki aktywne i z kosza - każde zapytanie trafia w swój indeks częściowy
+    for trashed in (False, True):
+        for pk, owner, name in UserFile.objects.filter(
+            owner_id__in=owners, original_filename__in=names, deleted_at__isnull=trashed
+        ).values_list("pk", "owner_id", "original_filename"):
+            found.setdefault((owner, name), []).append(pk)
+    return {key: pks[0] for key, pks in found.items() if len(pks) == 1}
+
+
+def backfill(apps, schema_editor):
+    """
+    Uzupełnia payload (i plik / wersję, jeśli nazwę da się jednoznacznie
+    przypisać) dla starych wpisów. Partiami po kluczu głównym, każda partia
+    w osobnej transakcji - tabela pozostaje dostępna do zapisu.
+    """
+    ActivityLog = apps.get_model("logs", "ActivityLog")
+    UserFile = apps.get_model("files", "UserFile")
+    UserFileVersion = apps.get_model("files", "UserFileVersion")
+    batch_size = settings.LOGS_BACKFILL_BATCH_SIZE
+    last_pk = 0
+
+    while True:
+        rows = list(
+            ActivityLog.objects.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .only("pk", "user_id", "details")[:batch_size]
+        )
+        if not rows:
+            break
+        last_pk = rows[-1].pk
+
+        parsed = []
+        for row in rows:
+            payload, resolve = _parse(row.details)
+            if payload:
+                parsed.append((row, payload, resolve))
+        if not parsed:
+            continue
+
+        files = _unique_files(
+            UserFile,
+            {
+                (row.user_id, payload["filename"])
+                for row, payload, resolve in parsed
+                if resolve and row.user_id and "filename" in payload
+            },
+        )
+        versions = {
+            (file_id, number): pk
+            for pk, file_id, number in UserFileVersion.objects.filter(
+                user_file_id__in=set(files.values())
+            ).values_list("pk", "user_file_id", "version_number")
+        }
+
+        for row, payload, resolve in parsed:
+            row.payload = payload
+            row.file_id = (
+                files.get((row.user_id, payload.get("filename"))) if resolve else None
+            )
+            row.version_id = versions.get((row.file_id, payload.get("version")))
+        with transaction.atomic():
+            ActivityLog.objects.bulk_update(
+                [row for row, _, _ in parsed], ["payload", "file", "version"]
+            )
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("files", "0012_content_encoding"),
+        ("logs", "0006_activitylog_structured"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop, elidable=True),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:55
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Indeksy na dużych tabelach budujemy bez blokowania zapisów
+    atomic = False
+
+    dependencies = [
+        ("logs", "0007_backfill_activitylog"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="activitylog",
+            index=models.Index(
+                condition=models.Q(("file__isnull", False)),
+                fields=["file", "-timestamp"],
+                name="logs_file_timestamp_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="activitylog",
+            index=models.Index(
+                condition=models.Q(("version__isnull", False)),
+                fields=["version"],
+                name="logs_version_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="activitylog",
+            index=models.Index(
+                condition=models.Q(("ip_address__isnull", False)),
+                fields=["ip_address", "-timestamp"],
+                name="logs_ip_timestamp_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="activitylog",
+            index=models.Index(
+                condition=models.Q(("request_id", ""), _negated=True),
+                fields=["request_id"],
+                name="logs_request_id_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="activitylog",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["payload"],
+                name="logs_payload_gin_idx",
+                opclasses=["jsonb_path_ops"],
+            ),
+        ),
+        # Statystyki po backfillu payload - inaczej planer nie wybierze indeksu GIN
+        migrations.RunSQL("ANALYZE logs_activitylog", migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:10
+
+from django.db import migrations
+
+# Powiadomienie o nowym wpisie dla podglądu na żywo (logs/live.py). NOTIFY
+# dochodzi do słuchaczy dopiero po zatwierdzeniu transakcji, więc wpis jest
+# już widoczny, gdy wątek nasłuchu go pobiera.
+NOTIFY_SQL = """
+CREATE OR REPLACE FUNCTION logs_activitylog_notify() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('activity_log', NEW.id::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER logs_activitylog_notify
+    AFTER INSERT ON logs_activitylog
+    FOR EACH ROW EXECUTE FUNCTION logs_activitylog_notify();
+"""
+
+DROP_SQL = """
+DROP TRIGGER IF EXISTS logs_activitylog_notify ON logs_activitylog;
+DROP FUNCTION IF EXISTS logs_activitylog_notify();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("logs", "0008_activitylog_indexes"),
+    ]
+
+    operations = [
+        migrations.RunSQL(NOTIFY_SQL, DROP_SQL),
+    ]
@@ -1,9 +1,49 @@
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+
+from .middleware import current_client, current_request_id
+
+REQUEST_ID_MAX_LENGTH = 64
+
+
+class ActivityLogManager(models.Manager):
+    def log(self, user, action, details='', *, file=None, version=None,
+            bytes_transferred=None, **payload):
+        """
+        Tworzy wpis z kolumnami do wyszukiwania (plik, wersja, IP, id żądania)
+        i danymi akcji w `payload` (JSONB). IP, User-Agent i id żądania
+        pochodzą z bieżącego żądania (logs/middleware.py).
+        """
+        if file is None and version is not None:
+            file = version.user_file
+        if file is not None:
+            payload.setdefault('filename', file.original_filename)
+        if version is not None:
+            payload.setdefault('version', version.version_number)
+
+        client = current_client()
+        return self.create(
+            user=user,
+            action=action,
+            details=details,
+            file=file,
+            version=version,
+            bytes_transferred=bytes_transferred,
+            ip_address=client.ip_address if client else None,
+            user_agent=client.user_agent if client else '',
+            request_id=current_request_id()[:REQUEST_ID_MAX_LENGTH],
+            payload=payload,
+        )
+
 
 class ActivityLog(models.Model):
     """
     Model LogBooka - rejestruje kluczowe działania użytkowników.
+
+    `details` to opis dla człowieka; do wyszukiwania służą kolumny
+    z indeksami (plik, wersja, IP, id żądania) i `payload` (JSONB z indeksem
+    GIN, zapytania payload__contains={...}).
     """
 
     class ActionType(models.TextChoices):
@@ -21,7 +61,8 @@ class ActivityLog(models.Model):
         on_delete=models.SET_NULL,
         null=True,
         blank=True, 
-        related_name='activity_logs'
+        related_name='activity_logs',
+        db_index=False,  # user jest prefiksem indeksu (user, timestamp)
     )
     
     timestamp = models.DateTimeField(auto_now_add=True)
@@ -34,8 +75,68 @@ class ActivityLog(models.Model):
     # Dodatkowe szczegóły, np. nazwa pliku, IP itp.
     details = models.TextField(blank=True)
 
+    # --- Pola strukturalne (wyszukiwanie po indeksach zamiast LIKE po details) ---
+    # Indeksy na FK są częściowe (niżej) - większość wpisów nie dotyczy pliku
+    file = models.ForeignKey(
+        'files.UserFile',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='activity_logs',
+        db_index=False,
+    )
+    version = models.ForeignKey(
+        'files.UserFileVersion',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='activity_logs',
+        db_index=False,
+    )
+    # Rozmiar przesłanej / udostępnionej zawartości w bajtach
+    bytes_transferred = models.BigIntegerField(null=True, blank=True)
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    user_agent = models.CharField(max_length=512, blank=True, default='')
+    # X-Request-ID (ten sam co w nagłówku odpowiedzi i logach aplikacji)
+    request_id = models.CharField(max_length=REQUEST_ID_MAX_LENGTH, blank=True, default='')
+    # Dane akcji, np. {"filename": ..., "version": 2, "archive": ...}
+    payload = models.JSONField(default=dict, blank=True)
+
+    objects = ActivityLogManager()
+
     class Meta:
         ordering = ['-timestamp'] # Sortuj od najnowszych
+        indexes = [
+            models.Index(fields=['-timestamp'], name='logs_timestamp_idx'),
+            models.Index(fields=['user', '-timestamp'], name='logs_user_timestamp_idx'),
+            # Historia jednego pliku / wersji (i SET_NULL przy usuwaniu plików)
+            models.Index(
+                fields=['file', '-timestamp'],
+                name='logs_file_timestamp_idx',
+                condition=models.Q(file__isnull=False),
+            ),
+            models.Index(
+                fields=['version'],
+                name='logs_version_idx',
+                condition=models.Q(version__isnull=False),
+            ),
+            models.Index(
+                fields=['ip_address', '-timestamp'],
+                name='logs_ip_timestamp_idx',
+                condition=models.Q(ip_address__isnull=False),
+            ),
+            models.Index(
+                fields=['request_id'],
+                name='logs_request_id_idx',
+                condition=~models.Q(request_id=''),
+            ),
+            # jsonb_path_ops: mniejszy indeks, obsługuje zapytania @> (payload__contains)
+            GinIndex(
+                fields=['payload'],
+                name='logs_payload_gin_idx',
+                opclasses=['jsonb_path_ops'],
+            ),
+        ]
 
     def __str__(self):
         user_str = self.user.username if self.user else "System"
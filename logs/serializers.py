@@ -1,10 +1,22 @@
 from rest_framework import serializers
+from monitoring.serializers import TimedListSerializer, TimedSerializerMixin, ValuesSerializer
 from .models import ActivityLog
 
-class ActivityLogSerializer(serializers.ModelSerializer):
+class ActivityLogSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     username = serializers.ReadOnlyField(source='user.username')
 
     class Meta:
         model = ActivityLog
-        fields = ['id', 'username', 'timestamp', 'action', 'details']
-        read_only_fields = ['__all__']
\ No newline at end of file
+        list_serializer_class = TimedListSerializer
+        fields = [
+            'id', 'username', 'timestamp', 'action', 'details',
+            'file', 'version', 'bytes_transferred', 'ip_address', 'user_agent',
+            'request_id', 'payload',
+        ]
+        read_only_fields = ['__all__']
+
+
+class ActivityLogValuesSerializer(ValuesSerializer):
+    """Lista logów (ActivityLogViewSet.list) w kształcie ActivityLogSerializer."""
+
+    serializer_class = ActivityLogSerializer
@@ -1,14 +1,22 @@
 # logs/views.py
+from django.conf import settings
+from django.http import StreamingHttpResponse
 from rest_framework import viewsets
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAdminUser  # Klasa uprawnień dla admina
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from . import live
+from .middleware import parse_ip
 from .models import ActivityLog
-from .serializers import ActivityLogSerializer
+from .serializers import ActivityLogSerializer, ActivityLogValuesSerializer
 
 
 class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
     """
     API do przeglądania logów aktywności.
-    Umożliwia dostęp tylko administratorom i sortowanie.
+    Umożliwia dostęp tylko administratorom, sortowanie i filtrowanie
+    (użytkownik, plik, wersja, IP, id żądania, akcja, nazwa pliku).
     """
 
     serializer_class = ActivityLogSerializer
@@ -32,6 +40,30 @@ class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
         if username is not None:
             queryset = queryset.filter(user__username__iexact=username)
 
+        # --- FILTRY STRUKTURALNE (każdy trafia w indeks, bez LIKE po details) ---
+        # ?file=<id>, ?version=<id>, ?ip=<adres>, ?request_id=..., ?action=DOWNLOAD
+        params = self.request.query_params
+        for param, field in (("file", "file_id"), ("version", "version_id")):
+            value = params.get(param)
+            if value is not None:
+                if not value.isdigit():
+                    return queryset.none()
+                queryset = queryset.filter(**{field: value})
+        if params.get("ip"):
+            ip_address = parse_ip(params["ip"])
+            if ip_address is None:
+                return queryset.none()
+            queryset = queryset.filter(ip_address=ip_address)
+        if params.get("request_id"):
+            queryset = queryset.filter(request_id=params["request_id"])
+        if params.get("action"):
+            queryset = queryset.filter(action=params["action"])
+        # ?filename=raport.csv - także pliki już usunięte (nazwa zostaje w payload)
+        if params.get("filename"):
+            queryset = queryset.filter(
+                payload__contains={"filename": params["filename"]}
+            )
+
         # --- SORTOWANIE ---
         # Sortowanie domyślne to '-timestamp' (najnowsze na górze)
         sort_by = self.request.query_params.get("sort", "-timestamp")
@@ -44,3 +76,45 @@ class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
             return queryset.order_by("-user__username")
 
         return queryset.order_by(sort_by)
+
+    def list(self, request, *args, **kwargs):
+        if not settings.API_VALUES_LISTS:
+            return super().list(request, *args, **kwargs)
+        # Ten sam JSON co ActivityLogSerializer, bez instancji modelu
+        values = ActivityLogValuesSerializer(context=self.get_serializer_context())
+        rows = values.queryset(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(values.to_representation(page))
+        return Response(values.to_representation(rows))
+
+    @action(
+        detail=False,
+        methods=["get"],
+        renderer_classes=[live.EventStreamRenderer, JSONRenderer],
+    )
+    def stream(self, request):
+        """
+        GET /api/logs/stream/?user=...&action=... - nowe wpisy na żywo (SSE).
+        Wznowienie od nagłówka Last-Event-ID (lub ?last_event_id=).
+        """
+        params = request.query_params
+        last_event_id = request.headers.get("Last-Event-ID") or params.get(
+            "last_event_id"
+        )
+        response = StreamingHttpResponse(
+            live.event_stream(
+                last_event_id=(
+                    int(last_event_id)
+                    if last_event_id and last_event_id.isdigit()
+                    else None
+                ),
+                username=params.get("user") or None,
+                action=params.get("action") or None,
+            ),
+            content_type="text/event-stream",
+        )
+        response["Cache-Control"] = "no-cache"
+        # Nginx / Azure Front Door nie buforują strumienia
+        response["X-Accel-Buffering"] = "no"
+        return response
@@ -0,0 +1,33 @@
+import time
+
+from azure.core.pipeline.transport import RequestsTransport
+
+from .context import record_storage_call
+
+
+def _content_length(headers):
+    try:
+        return int(headers.get("Content-Length") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+class InstrumentedRequestsTransport(RequestsTransport):
+    """
+    Transport HTTP klienta Azure Blob, który dla każdego wywołania zapisuje
+    w pomiarach żądania: liczbę wywołań, opóźnienie oraz przesłane bajty.
+    """
+
+    def send(self, request, **kwargs):
+        started = time.perf_counter()
+        response = None
+        try:
+            response = super().send(request, **kwargs)
+            return response
+        finally:
+            received = _content_length(response.headers) if response is not None else 0
+            record_storage_call(
+                time.perf_counter() - started,
+                sent=_content_length(request.headers),
+                received=received,
+            )
@@ -0,0 +1,108 @@
+"""
+Pomiary bieżącego żądania HTTP (liczba i czas zapytań SQL, wywołania storage,
+czas serializacji, liczba wpisów w logach).
+
+Stan trzymamy w ContextVar, więc każdy wątek/żądanie ma własne liczniki,
+a kod poza żądaniem (worker zadań, komendy) po prostu nic nie mierzy.
+"""
+
+import contextvars
+import time
+from contextlib import contextmanager
+
+_current = contextvars.ContextVar("spc_request_metrics", default=None)
+
+
+class RequestMetrics:
+    __slots__ = (
+        "request_id",
+        "started",
+        "db_queries",
+        "db_time",
+        "storage_calls",
+        "storage_time",
+        "storage_bytes_sent",
+        "storage_bytes_received",
+        "serializer_time",
+        "log_records",
+    )
+
+    def __init__(self, request_id):
+        self.request_id = request_id
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.storage_calls = 0
+        self.storage_time = 0.0
+        self.storage_bytes_sent = 0
+        self.storage_bytes_received = 0
+        self.serializer_time = 0.0
+        self.log_records = 0
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+def begin(request_id):
+    """Rozpoczyna pomiar żądania. Zwraca token do przekazania do end()."""
+    return _current.set(RequestMetrics(request_id))
+
+
+def end(token):
+    metrics = _current.get()
+    _current.reset(token)
+    return metrics
+
+
+def current():
+    return _current.get()
+
+
+def record_query(duration):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.db_queries += 1
+        metrics.db_time += duration
+
+
+def record_storage_call(duration, sent=0, received=0):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.storage_calls += 1
+        metrics.storage_time += duration
+        metrics.storage_bytes_sent += sent
+        metrics.storage_bytes_received += received
+
+
+def record_log_record():
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.log_records += 1
+
+
+@contextmanager
+def timed(attribute):
+    """Dolicza czas wykonania bloku do wskazanego pola bieżącego pomiaru."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(
+            metrics,
+            attribute,
+            getattr(metrics, attribute) + time.perf_counter() - started,
+        )
+
+
+def db_execute_wrapper(execute, sql, params, many, context):
+    """connection.execute_wrapper - mierzy każde zapytanie SQL w żądaniu."""
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        record_query(time.perf_counter() - started)
@@ -0,0 +1,11 @@
+import logging
+
+from .context import record_log_record
+
+
+class RequestLogCounter(logging.Filter):
+    """Filtr handlera logów - zlicza wpisy wyemitowane w trakcie żądania."""
+
+    def filter(self, record):
+        record_log_record()
+        return True
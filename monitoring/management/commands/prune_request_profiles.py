@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from monitoring.profiling import PRUNE_BATCH_SIZE, prune_profiles
+
+
+class Command(BaseCommand):
+    help = (
+        "Usuwa profile żądań (wraz z archiwami ZIP w storage) starsze niż "
+        "PROFILING_RETENTION_DAYS (partiami). Do uruchamiania z crona."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than-days",
+            type=float,
+            default=settings.PROFILING_RETENTION_DAYS,
+            help="Usuń profile starsze niż tyle dni.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=PRUNE_BATCH_SIZE,
+            help="Liczba profili usuwanych w jednej partii.",
+        )
+
+    def handle(self, *args, **options):
+        deleted = prune_profiles(
+            timedelta(days=options["older_than_days"]),
+            batch_size=max(1, options["batch_size"]),
+        )
+        self.stdout.write(self.style.SUCCESS(f"Usunięto {deleted} profili żądań."))
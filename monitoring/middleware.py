@@ -0,0 +1,78 @@
+import uuid
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import context, profiling
+from .registry import observe_request
+
+
+def _server_timing(metrics):
+    """Buduje nagłówek Server-Timing (czasy w milisekundach)."""
+    storage_bytes = metrics.storage_bytes_sent + metrics.storage_bytes_received
+    return ", ".join(
+        [
+            f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.db_queries} queries"',
+            f"storage;dur={metrics.storage_time * 1000:.1f};"
+            f'desc="{metrics.storage_calls} calls, {storage_bytes} B"',
+            f"serializer;dur={metrics.serializer_time * 1000:.1f}",
+            f'log;desc="{metrics.log_records} records"',
+            f"total;dur={metrics.elapsed * 1000:.1f}",
+        ]
+    )
+
+
+class RequestMetricsMiddleware:
+    """
+    Mierzy każde żądanie: zapytania SQL (execute_wrapper), wywołania storage,
+    serializację i logi. Wynik trafia do nagłówka Server-Timing oraz do
+    histogramów per widok wystawianych przez /metrics.
+    Powinien być pierwszym middleware, żeby objąć pomiarem cały stos.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+        request.request_id = request_id
+
+        token = context.begin(request_id)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(context.db_execute_wrapper)
+                    )
+                response = self.get_response(request)
+        finally:
+            metrics = context.end(token)
+
+        match = request.resolver_match
+        view = match.view_name if match else "unmatched"
+        observe_request(view, request.method, response.status_code, metrics)
+
+        response["Server-Timing"] = _server_timing(metrics)
+        response["X-Request-ID"] = request_id
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Profil żądania na życzenie administratora (nagłówek X-Profile lub
+    ?_profile=1, monitoring/profiling.py). Bez flagi nie robi nic więcej niż
+    sprawdzenie nagłówka. Powinien działać zaraz po RequestMetricsMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = settings.PROFILING_ENABLED and profiling.requested_mode(request)
+        if not mode:
+            return self.get_response(request)
+        user = profiling.staff_user(request)
+        if user is None:
+            return self.get_response(request)
+        return profiling.profile_request(request, self.get_response, user, mode)
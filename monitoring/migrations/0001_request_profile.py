@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RequestProfile",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("request_id", models.CharField(blank=True, max_length=64)),
+                ("method", models.CharField(max_length=10)),
+                ("path", models.CharField(max_length=512)),
+                ("view_name", models.CharField(blank=True, max_length=200)),
+                ("status_code", models.PositiveSmallIntegerField()),
+                ("duration", models.FloatField()),
+                ("peak_memory", models.BigIntegerField(blank=True, null=True)),
+                ("mode", models.CharField(max_length=16)),
+                (
+                    "artifact",
+                    models.FileField(max_length=512, upload_to="profiles/%Y/%m/"),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="request_profiles",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-created_at"],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.db import models
+
+
+class RequestProfile(models.Model):
+    """
+    Profil jednego żądania (monitoring/profiling.py). Raporty leżą
+    w archiwum ZIP w storage: stacks.collapsed (flame graph), memory.txt
+    (tracemalloc), cprofile.txt / cprofile.prof (tryb cprofile), profile.json.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="request_profiles",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    request_id = models.CharField(max_length=64, blank=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=512)
+    view_name = models.CharField(max_length=200, blank=True)
+    status_code = models.PositiveSmallIntegerField()
+    duration = models.FloatField()
+    peak_memory = models.BigIntegerField(null=True, blank=True)
+    mode = models.CharField(max_length=16)
+    artifact = models.FileField(upload_to="profiles/%Y/%m/", max_length=512)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration:.3f} s)"
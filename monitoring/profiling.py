@@ -0,0 +1,348 @@
+"""
+Profilowanie pojedynczego żądania na życzenie (tylko administrator).
+
+Żądanie z nagłówkiem `X-Profile: 1` (lub `?_profile=1`) od użytkownika
+z is_staff jest profilowane w całości (middleware -> widok -> serializacja):
+
+- próbkowanie stosu wątku żądania co PROFILING_SAMPLE_INTERVAL s - wynik
+  w formacie "collapsed stacks" (flamegraph.pl, speedscope, inferno),
+- tracemalloc - szczyt pamięci i miejsca największych alokacji,
+- opcjonalnie cProfile (`X-Profile: cprofile`) - dokładne czasy funkcji,
+  kosztem ~2x wolniejszego żądania.
+
+Wynik trafia do storage jako archiwum ZIP (model RequestProfile, GET
+/api/profiles/<id>/download/), a odpowiedź dostaje nagłówek X-Profile-Id.
+Bez flagi middleware tylko sprawdza nagłówek i parametr - nic nie mierzy.
+
+Odpowiedź strumieniowa (StreamingHttpResponse, np. pobieranie pliku) jest
+mierzona do końca wysyłania treści (najwyżej PROFILING_MAX_SECONDS). Nagłówki
+wychodzą wcześniej, więc zamiast X-Profile-Id dostaje ona X-Profile: deferred,
+a profil znajduje się po X-Request-ID: GET /api/profiles/?request_id=...
+"""
+
+import cProfile
+import io
+import json
+import logging
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+import zipfile
+from collections import Counter
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .models import RequestProfile
+
+logger = logging.getLogger(__name__)
+
+HEADER = "X-Profile"
+QUERY_PARAM = "_profile"
+MODE_SAMPLE = "sample"
+MODE_CPROFILE = "cprofile"
+# Pozycje w raportach tekstowych (cProfile, tracemalloc)
+TOP_ENTRIES = 40
+# Profile usuwane w jednej partii przez prune_request_profiles
+PRUNE_BATCH_SIZE = 500
+
+# Jedno profilowane żądanie naraz w procesie: tracemalloc i cProfile
+# (od Pythona 3.12) działają dla całego procesu
+_lock = threading.Lock()
+# Ścieżki skracane w etykietach ramek (site-packages, katalog projektu)
+_PATH_PREFIXES = sorted(
+    {os.path.dirname(os.__file__), str(settings.BASE_DIR)}
+    | {path for path in sys.path if path.endswith("-packages")},
+    key=len,
+    reverse=True,
+)
+
+
+def requested_mode(request):
+    """Tryb z nagłówka X-Profile / parametru ?_profile= albo None."""
+    value = request.headers.get(HEADER) or request.GET.get(QUERY_PARAM)
+    if not value or value.lower() in ("0", "false", "no"):
+        return None
+    return MODE_CPROFILE if value.lower() == MODE_CPROFILE else MODE_SAMPLE
+
+
+def staff_user(request):
+    """
+    Administrator wysyłający żądanie albo None. API uwierzytelnia JWT dopiero
+    w widoku, więc sprawdzamy token tymi samymi klasami co DRF.
+    """
+    drf_request = Request(
+        request,
+        authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+    )
+    try:
+        user = drf_request.user
+    except APIException:
+        return None
+    return user if user.is_authenticated and user.is_staff else None
+
+
+def _label(code):
+    filename = code.co_filename
+    for prefix in _PATH_PREFIXES:
+        if filename.startswith(prefix):
+            filename = filename[len(prefix) :].lstrip(os.sep)
+            break
+    name = getattr(code, "co_qualname", code.co_name)
+    # ";" rozdziela ramki w formacie collapsed
+    return f"{name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+
+class StackSampler(threading.Thread):
+    """Próbkuje stos wskazanego wątku; wynik: {stos "a;b;c": liczba próbek}."""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name="request-profiler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stopped = threading.Event()
+
+    def run(self):
+        deadline = time.monotonic() + settings.PROFILING_MAX_SECONDS
+        while not self._stopped.wait(self.interval) and time.monotonic() < deadline:
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+    def collapsed(self):
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self.stacks.most_common()
+        )
+
+
+class Profile:
+    """Pomiar jednego żądania (context manager); raporty w build_archive()."""
+
+    def __init__(self, mode):
+        self.mode = mode
+        self.sampler = StackSampler(
+            threading.get_ident(), settings.PROFILING_SAMPLE_INTERVAL
+        )
+        self.profiler = None
+        self.snapshot = None
+        self.peak_memory = None
+        self.duration = None
+        self._tracing = False
+
+    def __enter__(self):
+        if settings.PROFILING_TRACEMALLOC_FRAMES and not tracemalloc.is_tracing():
+            tracemalloc.start(settings.PROFILING_TRACEMALLOC_FRAMES)
+            self._tracing = True
+        if self.mode == MODE_CPROFILE:
+            self.profiler = cProfile.Profile()
+            try:
+                self.profiler.enable()
+            except ValueError:
+                # Inne narzędzie profilujące jest już aktywne w procesie
+                self.profiler = None
+        self.sampler.start()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.duration = time.perf_counter() - self._started
+        self.sampler.stop()
+        if self.profiler is not None:
+            self.profiler.disable()
+        if self._tracing:
+            self.peak_memory = tracemalloc.get_traced_memory()[1]
+            self.snapshot = tracemalloc.take_snapshot().filter_traces(
+                [
+                    tracemalloc.Filter(False, tracemalloc.__file__),
+                    tracemalloc.Filter(False, __file__),
+                ]
+            )
+            tracemalloc.stop()
+        return False
+
+    def _memory_report(self):
+        lines = [f"Szczyt pamięci: {self.peak_memory} B", ""]
+        lines.append("Największe alokacje żyjące na końcu żądania:")
+        for stat in self.snapshot.statistics("traceback")[:TOP_ENTRIES]:
+            lines.append(f"{stat.size} B w {stat.count} blokach")
+            lines.extend(f"    {line}" for line in stat.traceback.format())
+        return "\n".join(lines) + "\n"
+
+    def build_archive(self, summary):
+        """Archiwum ZIP z raportami i podsumowaniem żądania (bajty)."""
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("stacks.collapsed", self.sampler.collapsed())
+            if self.snapshot is not None:
+                archive.writestr("memory.txt", self._memory_report())
+            if self.profiler is not None:
+                report = io.StringIO()
+                stats = pstats.Stats(self.profiler, stream=report)
+                stats.sort_stats("cumulative").print_stats(TOP_ENTRIES)
+                archive.writestr("cprofile.txt", report.getvalue())
+                # Format pliku z Stats.dump_stats (pstats, snakeviz)
+                archive.writestr("cprofile.prof", marshal.dumps(stats.stats))
+            archive.writestr("profile.json", json.dumps(summary, indent=2, default=str))
+        return buffer.getvalue()
+
+
+class _ProfiledStream:
+    """
+    Treść odpowiedzi strumieniowej, po której wysłaniu (albo zamknięciu
+    połączenia, albo po PROFILING_MAX_SECONDS) kończy się pomiar.
+    """
+
+    def __init__(self, content, finish):
+        self.content = content
+        self.finish = finish
+        self.deadline = time.monotonic() + settings.PROFILING_MAX_SECONDS
+        self.done = False
+
+    def __iter__(self):
+        try:
+            for chunk in self.content:
+                if not self.done and time.monotonic() >= self.deadline:
+                    self.close()
+                yield chunk
+        finally:
+            self.close()
+
+    def close(self):
+        # Django zamyka też nieodczytaną odpowiedź (np. HEAD) - blokada wraca
+        if not self.done:
+            self.done = True
+            self.finish()
+
+
+def _save(request, response, user, mode, profile):
+    """Zapisuje RequestProfile z raportami; zwraca go albo None przy błędzie."""
+    match = request.resolver_match
+    summary = {
+        "request_id": getattr(request, "request_id", ""),
+        "method": request.method,
+        "path": request.get_full_path(),
+        "view": match.view_name if match else "",
+        "status": response.status_code,
+        "streaming": response.streaming,
+        "duration": profile.duration,
+        "mode": mode if profile.profiler is not None else MODE_SAMPLE,
+        "samples": profile.sampler.samples,
+        "sample_interval": settings.PROFILING_SAMPLE_INTERVAL,
+        "peak_memory": profile.peak_memory,
+    }
+    try:
+        record = RequestProfile(
+            user=user,
+            request_id=summary["request_id"][:64],
+            method=request.method,
+            path=summary["path"][:512],
+            view_name=summary["view"][:200],
+            status_code=response.status_code,
+            duration=profile.duration,
+            peak_memory=profile.peak_memory,
+            mode=summary["mode"],
+        )
+        record.artifact.save(
+            f"{record.request_id or 'profile'}.zip",
+            ContentFile(profile.build_archive(summary)),
+        )
+    except Exception as e:
+        logger.error(f"[PROFILING] Nie udało się zapisać profilu żądania: {e}")
+        return None
+
+    logger.info(
+        f"[PROFILING] {request.method} {summary['path']} - {profile.duration:.3f} s, "
+        f"profil #{record.pk}"
+    )
+    return record
+
+
+def profile_request(request, get_response, user, mode):
+    """Wykonuje żądanie pod profilerem i zapisuje RequestProfile."""
+    if not _lock.acquire(blocking=False):
+        response = get_response(request)
+        response[HEADER] = "busy"
+        return response
+    profile = Profile(mode)
+    try:
+        profile.__enter__()
+        response = get_response(request)
+    except BaseException:
+        profile.__exit__(None, None, None)
+        _lock.release()
+        raise
+
+    def finish():
+        try:
+            profile.__exit__(None, None, None)
+        finally:
+            _lock.release()
+        return _save(request, response, user, mode, profile)
+
+    # Odpowiedź asynchroniczna (ASGI) jest odczytywana poza tym wątkiem
+    if response.streaming and not getattr(response, "is_async", False):
+        response.streaming_content = _ProfiledStream(response.streaming_content, finish)
+        response[HEADER] = "deferred"
+        return response
+
+    record = finish()
+    if record is None:
+        response[HEADER] = "failed"
+        return response
+    response[HEADER] = record.mode
+    response["X-Profile-Id"] = str(record.pk)
+    return response
+
+
+def prune_profiles(older_than, batch_size=PRUNE_BATCH_SIZE):
+    """
+    Usuwa profile starsze niż `older_than` razem z archiwami w storage,
+    partiami od początku klucza głównego. Profil, którego archiwum nie udało
+    się usunąć, zostaje do kolejnego uruchomienia. Zwraca liczbę usuniętych.
+    """
+    cutoff = timezone.now() - older_than
+    storage = RequestProfile._meta.get_field("artifact").storage
+    total = 0
+    last_id = 0
+    while True:
+        batch = list(
+            RequestProfile.objects.filter(pk__gt=last_id, created_at__lt=cutoff)
+            .order_by("pk")
+            .values_list("pk", "artifact")[:batch_size]
+        )
+        if not batch:
+            return total
+        last_id = batch[-1][0]
+        removed = []
+        for pk, name in batch:
+            try:
+                if name:
+                    storage.delete(name)
+            except Exception as e:
+                logger.error(f"[PROFILING] Nie udało się usunąć archiwum {name}: {e}")
+                continue
+            removed.append(pk)
+        deleted, _ = RequestProfile.objects.filter(pk__in=removed).delete()
+        total += deleted
+        logger.info(f"[PROFILING] Usunięto {deleted} starych profili żądań")
+        if len(batch) < batch_size:
+            return total
@@ -0,0 +1,225 @@
+"""
+Prosty rejestr metryk (liczniki i histogramy) w formacie tekstowym Prometheusa.
+
+Każdy proces (worker gunicorna) ma własny rejestr. Jeśli ustawiono
+METRICS_MULTIPROC_DIR, procesy okresowo zapisują migawkę do pliku JSON,
+a endpoint /metrics scala migawki wszystkich procesów.
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+
+    def inc(self, labels=(), amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def snapshot(self):
+        return [[list(labels), value] for labels, value in self.values.items()]
+
+    @staticmethod
+    def merge(target, value):
+        return (target or 0) + value
+
+    def samples(self, series):
+        for labels, value in series.items():
+            yield self.name, dict(zip(self.labelnames, labels)), value
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.values = {}
+
+    def observe(self, labels, value):
+        # [liczniki kubełków..., suma, liczba obserwacji]
+        state = self.values.get(labels)
+        if state is None:
+            state = self.values[labels] = [0] * len(self.buckets) + [0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                state[i] += 1
+        state[-2] += value
+        state[-1] += 1
+
+    def snapshot(self):
+        return [[list(labels), list(state)] for labels, state in self.values.items()]
+
+    @staticmethod
+    def merge(target, value):
+        if target is None:
+            return list(value)
+        return [a + b for a, b in zip(target, value)]
+
+    def samples(self, series):
+        for labels, state in series.items():
+            base = dict(zip(self.labelnames, labels))
+            for bound, count in zip(self.buckets, state):
+                yield f"{self.name}_bucket", {**base, "le": repr(bound)}, count
+            yield f"{self.name}_bucket", {**base, "le": "+Inf"}, state[-1]
+            yield f"{self.name}_sum", base, state[-2]
+            yield f"{self.name}_count", base, state[-1]
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_sample(name, labels, value):
+    if labels:
+        rendered = ",".join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+        return f"{name}{{{rendered}}} {value}"
+    return f"{name} {value}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self.last_flush = 0.0
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def snapshot(self):
+        with self.lock:
+            return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+    # --- Tryb wieloprocesowy -------------------------------------------------
+
+    def _snapshot_path(self):
+        directory = getattr(settings, "METRICS_MULTIPROC_DIR", "")
+        if not directory:
+            return None
+        return Path(directory) / f"metrics_{os.getpid()}.json"
+
+    def flush(self, force=False):
+        """Zapisuje migawkę procesu (najwyżej raz na METRICS_FLUSH_INTERVAL s)."""
+        path = self._snapshot_path()
+        if path is None:
+            return
+        now = time.monotonic()
+        if not force and now - self.last_flush < settings.METRICS_FLUSH_INTERVAL:
+            return
+        self.last_flush = now
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self.snapshot()))
+        os.replace(tmp_path, path)
+
+    def collect(self):
+        """Zwraca scalone serie {nazwa: {etykiety: wartość}} ze wszystkich procesów."""
+        path = self._snapshot_path()
+        if path is None:
+            snapshots = [self.snapshot()]
+        else:
+            self.flush(force=True)
+            snapshots = []
+            for snapshot_file in path.parent.glob("metrics_*.json"):
+                try:
+                    snapshots.append(json.loads(snapshot_file.read_text()))
+                except (OSError, ValueError):
+                    continue
+
+        merged = {name: {} for name in self.metrics}
+        for snapshot in snapshots:
+            for name, series in snapshot.items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                for labels, value in series:
+                    key = tuple(labels)
+                    merged[name][key] = metric.merge(merged[name].get(key), value)
+        return merged
+
+    def render(self):
+        lines = []
+        for name, series in self.collect().items():
+            metric = self.metrics[name]
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.type}")
+            for sample_name, labels, value in metric.samples(series):
+                lines.append(_format_sample(sample_name, labels, value))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.counter(
+    "spc_http_requests_total", "Liczba żądań HTTP.", ("view", "method", "status")
+)
+REQUEST_DURATION = REGISTRY.histogram(
+    "spc_http_request_duration_seconds", "Czas obsługi żądania.", ("view", "method")
+)
+DB_QUERIES = REGISTRY.histogram(
+    "spc_db_queries_per_request",
+    "Liczba zapytań SQL na żądanie.",
+    ("view",),
+    buckets=(1, 2, 5, 10, 20, 50, 100, 250),
+)
+DB_DURATION = REGISTRY.histogram(
+    "spc_db_duration_seconds", "Łączny czas zapytań SQL w żądaniu.", ("view",)
+)
+STORAGE_CALLS = REGISTRY.histogram(
+    "spc_storage_calls_per_request",
+    "Liczba wywołań storage (Azure Blob) na żądanie.",
+    ("view",),
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100),
+)
+STORAGE_DURATION = REGISTRY.histogram(
+    "spc_storage_duration_seconds", "Łączny czas wywołań storage w żądaniu.", ("view",)
+)
+STORAGE_BYTES = REGISTRY.counter(
+    "spc_storage_bytes_total",
+    "Bajty przesłane do/z storage.",
+    ("view", "direction"),
+)
+SERIALIZER_DURATION = REGISTRY.histogram(
+    "spc_serializer_duration_seconds", "Czas serializacji odpowiedzi.", ("view",)
+)
+LOG_RECORDS = REGISTRY.counter(
+    "spc_log_records_total", "Wpisy w logach wyemitowane w żądaniach.", ("view",)
+)
+
+
+def observe_request(view, method, status, metrics):
+    with REGISTRY.lock:
+        REQUESTS.inc((view, method, str(status)))
+        REQUEST_DURATION.observe((view, method), metrics.elapsed)
+        DB_QUERIES.observe((view,), metrics.db_queries)
+        DB_DURATION.observe((view,), metrics.db_time)
+        STORAGE_CALLS.observe((view,), metrics.storage_calls)
+        STORAGE_DURATION.observe((view,), metrics.storage_time)
+        STORAGE_BYTES.inc((view, "sent"), metrics.storage_bytes_sent)
+        STORAGE_BYTES.inc((view, "received"), metrics.storage_bytes_received)
+        SERIALIZER_DURATION.observe((view,), metrics.serializer_time)
+        LOG_RECORDS.inc((view,), metrics.log_records)
+    REGISTRY.flush()
@@ -0,0 +1,134 @@
+from rest_framework import serializers
+
+from .context import timed
+from .models import RequestProfile
+
+
+class TimedListSerializer(serializers.ListSerializer):
+    """ListSerializer mierzący czas serializacji całej listy."""
+
+    @property
+    def data(self):
+        with timed("serializer_time"):
+            return super().data
+
+
+class TimedSerializerMixin:
+    """
+    Mierzy czas serializacji pojedynczego obiektu. Dla list ustaw w Meta:
+    list_serializer_class = TimedListSerializer
+    """
+
+    @property
+    def data(self):
+        with timed("serializer_time"):
+            return super().data
+
+
+class RequestProfileSerializer(serializers.ModelSerializer):
+    username = serializers.ReadOnlyField(source="user.username")
+
+    class Meta:
+        model = RequestProfile
+        fields = [
+            "id",
+            "username",
+            "created_at",
+            "request_id",
+            "method",
+            "path",
+            "view_name",
+            "status_code",
+            "duration",
+            "peak_memory",
+            "mode",
+        ]
+        read_only_fields = fields
+
+
+# Pola, których to_representation nie zmienia wartości z bazy (str, int, bool,
+# JSON, klucz obcy z values()) - przepisujemy je bez wywołania
+_PASSTHROUGH_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.IntegerField,
+    serializers.JSONField,
+    serializers.PrimaryKeyRelatedField,
+    serializers.ReadOnlyField,
+)
+
+
+class ValuesSerializer:
+    """
+    Szybka ścieżka list: wiersze z QuerySet.values() zamiast instancji modelu
+    i maszynerii Serializer.to_representation. Wynik ma ten sam kształt co
+    `serializer_class` - mapowanie pól budujemy raz, z jego własnych pól:
+
+    - pola proste (str, int, bool, JSON, klucze obce) przepisujemy bez zmian,
+    - pozostałe (np. daty) przechodzą przez to_representation pola DRF,
+    - pole z metodą `get_<nazwa>(row)` w podklasie liczy ta metoda;
+      `prepare(rows)` może przed tym pobrać dane dla całej strony naraz,
+    - `annotations` to adnotacje zapytania ({kolumna: wyrażenie}).
+
+    Pole z kropką w source (np. user.username) jak w DRF znika z wyniku,
+    gdy relacja jest pusta.
+    """
+
+    serializer_class = None
+    annotations = {}
+    # Dodatkowe kolumny potrzebne metodom get_<pole>
+    extra_columns = ()
+
+    def __init__(self, context=None):
+        self.context = context or {}
+        self.mappers = []
+        columns = list(self.extra_columns)
+        fields = self.serializer_class(context=self.context).fields
+        for name, field in fields.items():
+            if field.write_only:
+                continue
+            getter = getattr(self, f"get_{name}", None)
+            if getter is not None:
+                self.mappers.append((name, None, getter, False))
+                continue
+            column = field.source.replace(".", "__")
+            convert = (
+                None
+                if isinstance(field, _PASSTHROUGH_FIELDS)
+                else field.to_representation
+            )
+            self.mappers.append((name, column, convert, "." in field.source))
+            columns.append(column)
+        self.columns = list(dict.fromkeys(columns))
+
+    def queryset(self, queryset):
+        """Zapytanie zwracające słowniki z kolumnami potrzebnymi do mapowania."""
+        if self.annotations:
+            queryset = queryset.annotate(**self.annotations)
+        return queryset.values(*self.columns)
+
+    def prepare(self, rows):
+        pass
+
+    def to_representation(self, rows):
+        rows = list(rows)
+        with timed("serializer_time"):
+            self.prepare(rows)
+            return [self._row(row) for row in rows]
+
+    def _row(self, row):
+        data = {}
+        for name, column, convert, skip_none in self.mappers:
+            if column is None:
+                data[name] = convert(row)
+                continue
+            value = row[column]
+            if value is None:
+                if not skip_none:
+                    data[name] = None
+            elif convert is None:
+                data[name] = value
+            else:
+                data[name] = convert(value)
+        return data
@@ -0,0 +1,10 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import RequestProfileViewSet
+
+router = DefaultRouter()
+router.register(r"profiles", RequestProfileViewSet, basename="profile")
+
+urlpatterns = [
+    path("", include(router.urls)),
+]
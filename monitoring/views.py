@@ -0,0 +1,83 @@
+import hmac
+import zipfile
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseForbidden
+from rest_framework import mixins, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser
+
+from .models import RequestProfile
+from .profiling import staff_user
+from .registry import REGISTRY
+from .serializers import RequestProfileSerializer
+
+
+def metrics(request):
+    """
+    Endpoint /metrics w formacie Prometheusa. Z METRICS_TOKEN wymaga nagłówka
+    "Authorization: Bearer <token>", bez niego - administratora (sesja lub JWT).
+    """
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if token:
+        provided = request.headers.get("Authorization", "")
+        if not hmac.compare_digest(provided, f"Bearer {token}"):
+            return HttpResponseForbidden()
+    elif not request.user.is_staff and staff_user(request) is None:
+        return HttpResponseForbidden()
+
+    return HttpResponse(
+        REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+class RequestProfileViewSet(
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.DestroyModelMixin,
+    viewsets.GenericViewSet,
+):
+    """
+    Profile żądań (nagłówek X-Profile, monitoring/profiling.py), tylko admin.
+    Filtry: ?view=<nazwa widoku>, ?request_id=...
+    """
+
+    serializer_class = RequestProfileSerializer
+    permission_classes = [IsAdminUser]
+
+    def get_queryset(self):
+        queryset = RequestProfile.objects.select_related("user")
+        params = self.request.query_params
+        if params.get("view"):
+            queryset = queryset.filter(view_name=params["view"])
+        if params.get("request_id"):
+            queryset = queryset.filter(request_id=params["request_id"])
+        return queryset.order_by("-created_at")
+
+    @action(detail=True, methods=["get"])
+    def download(self, request, pk=None):
+        """Archiwum ZIP ze wszystkimi raportami profilu."""
+        profile = self.get_object()
+        return FileResponse(
+            profile.artifact.open("rb"),
+            as_attachment=True,
+            filename=f"profile-{profile.pk}.zip",
+        )
+
+    @action(detail=True, methods=["get"])
+    def stacks(self, request, pk=None):
+        """
+        Sam plik collapsed stacks - wejście dla flamegraph.pl / speedscope:
+        curl -H "Authorization: Bearer ..." .../stacks/ | flamegraph.pl > profile.svg
+        """
+        profile = self.get_object()
+        with profile.artifact.open("rb") as artifact:
+            with zipfile.ZipFile(artifact) as archive:
+                stacks = archive.read("stacks.collapsed")
+        return HttpResponse(stacks, content_type="text/plain; charset=utf-8")
+
+    def perform_destroy(self, instance):
+        name = instance.artifact.name
+        storage = instance.artifact.storage
+        instance.delete()
+        storage.delete(name)
@@ -0,0 +1,21 @@
+"""
+Wspólne narzędzia HTTP projektu - negocjacja kodowania odpowiedzi
+(kompresja odpowiedzi w spc/middleware.py, pliki skompresowane
+w spoczynku w files/compression.py).
+"""
+
+
+def accepts(request, encoding):
+    """Czy klient akceptuje odpowiedź w tym kodowaniu (nagłówek Accept-Encoding)."""
+    for item in request.headers.get("Accept-Encoding", "").split(","):
+        token, _, params = item.strip().partition(";")
+        if token.strip().lower() not in (encoding, "*"):
+            continue
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                return float(quality[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
@@ -0,0 +1,102 @@
+"""
+Kompresja odpowiedzi (gzip lub brotli) negocjowana nagłówkiem Accept-Encoding.
+
+Listy plików i logów w JSON kompresują się ~10x. Kompresujemy tylko
+odpowiedzi tekstowe (JSON, HTML, text/*) większe niż COMPRESSION_MIN_SIZE;
+pomijamy strumienie (pobieranie plików, SSE) i treść już zakodowaną.
+
+BREACH: atak wymaga, by przeglądarka ofiary sama dołączała poświadczenia
+do żądań wywołanych przez atakującego, czyli ciasteczek sesji (panel
+admina, przeglądarkowe API). Token JWT w nagłówku Authorization nie jest
+dołączany automatycznie, więc odpowiedzi API kompresujemy zwyczajnie.
+Żądania z ciasteczkiem sesji bez nagłówka Authorization dostają tylko
+gzip z losowym dopełnieniem nagłówka ("Heal The Breach", jak
+django.middleware.gzip), które rozmywa długość odpowiedzi.
+"""
+
+import re
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+from .http import accepts
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+_COMPRESSIBLE_TYPES = re.compile(
+    r"^(text/(?!event-stream)|application/(json|javascript|xml|[\w.+-]+\+json))"
+)
+# Jak w django.middleware.gzip.GZipMiddleware
+MAX_RANDOM_BYTES = 100
+
+
+def _ambient_credentials(request):
+    """Czy żądanie uwierzytelnia ciasteczko sesji (wysyłane przez przeglądarkę samo)."""
+    return (
+        settings.SESSION_COOKIE_NAME in request.COOKIES
+        and "Authorization" not in request.headers
+    )
+
+
+def _encoding(request):
+    if (
+        brotli is not None
+        and accepts(request, "br")
+        and not _ambient_credentials(request)
+    ):
+        return "br"
+    if accepts(request, "gzip"):
+        return "gzip"
+    return None
+
+
+class CompressionMiddleware:
+    """Powinien działać przed middleware, które czytają lub zmieniają treść odpowiedzi."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            response.streaming
+            or response.has_header("Content-Encoding")
+            or len(response.content) < settings.COMPRESSION_MIN_SIZE
+            or not _COMPRESSIBLE_TYPES.match(response.get("Content-Type", ""))
+            or "no-transform" in response.get("Cache-Control", "")
+        ):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = _encoding(request)
+        if encoding is None:
+            return response
+
+        if encoding == "br":
+            compressed = brotli.compress(
+                response.content,
+                mode=brotli.MODE_TEXT,
+                quality=settings.COMPRESSION_BROTLI_QUALITY,
+            )
+        else:
+            compressed = compress_string(
+                response.content,
+                max_random_bytes=(
+                    MAX_RANDOM_BYTES if _ambient_credentials(request) else None
+                ),
+            )
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response["Content-Length"] = str(len(compressed))
+        response["Content-Encoding"] = encoding
+        # Silny ETag dotyczy bajtów nieskompresowanych (RFC 9110)
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        return response
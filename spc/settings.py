@@ -1,6 +1,8 @@
 from pathlib import Path
 from dotenv import load_dotenv
 from datetime import timedelta
+from importlib.util import find_spec
+import json
 import os 
 
 load_dotenv()
@@ -47,11 +49,31 @@ INSTALLED_APPS = [
     'users',
     'files',
     'logs',
+    'jobs',
+    'monitoring',
+    'benchmarks',
     'frontend',
 ]
 
+# JSON przez orjson (spc/renderers.py), bez niego - stdlib json z DRF
+if find_spec('orjson') is not None:
+    JSON_RENDERER = 'spc.renderers.ORJSONRenderer'
+    JSON_PARSER = 'spc.renderers.ORJSONParser'
+else:
+    JSON_RENDERER = 'rest_framework.renderers.JSONRenderer'
+    JSON_PARSER = 'rest_framework.parsers.JSONParser'
+
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_RENDERER_CLASSES': [
+        JSON_RENDERER,
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        JSON_PARSER,
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ],
@@ -60,6 +82,10 @@ REST_FRAMEWORK = {
     ]
 }
 
+# Listy plików i logów przez .values() zamiast instancji modelu i ModelSerializer
+# (ten sam JSON, files/serializers.py, logs/serializers.py); false = stara ścieżka
+API_VALUES_LISTS = os.getenv('API_VALUES_LISTS', 'true').lower() == 'true'
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=15),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
@@ -69,8 +95,21 @@ SIMPLE_JWT = {
 OTP_TOTP_ISSUER = os.getenv('OTP_TOTP_ISSUER', 'SPC')
 TWO_FACTOR_PATCH_ADMIN = False
 
+WHITENOISE = find_spec('whitenoise') is not None
+
 MIDDLEWARE = [
+    # Pierwszy, żeby mierzyć cały stos (Server-Timing, /metrics)
+    'monitoring.middleware.RequestMetricsMiddleware',
+    # Profil żądania na życzenie administratora (X-Profile); bez flagi nic nie mierzy
+    'monitoring.middleware.ProfilingMiddleware',
+    # Kompresja gzip/brotli dużych odpowiedzi tekstowych (przed middleware zmieniającymi treść)
+    'spc.middleware.CompressionMiddleware',
+    'files.blob_cache.BlobMetadataCacheMiddleware',
+    # IP, User-Agent i id żądania dla wpisów ActivityLog (po RequestMetricsMiddleware)
+    'logs.middleware.ActivityContextMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # Pliki statyczne z cache i kompresją (po SecurityMiddleware, przed resztą)
+    *(['whitenoise.middleware.WhiteNoiseMiddleware'] if WHITENOISE else []),
     'corsheaders.middleware.CorsMiddleware', 
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -112,11 +151,47 @@ DATABASES = {
         'HOST': DB_HOST, 
         'PORT': os.getenv('POSTGRES_PORT', '5432'),     
         'OPTIONS': {
-            'sslmode': 'require' if 'azure.com' in DB_HOST else 'allow' 
+            'sslmode': 'require' if 'azure.com' in DB_HOST else 'allow',
+            'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', '5')),
         }
     }
 }
 
+# --- POŁĄCZENIA Z BAZĄ ---
+# DB_CONNECTION_MODE:
+#   pool       - pula połączeń psycopg 3 w każdym procesie (domyślnie)
+#   persistent - jedno trwałe połączenie na wątek (CONN_MAX_AGE) z health checkiem
+#   pgbouncer  - za PgBouncerem w trybie transaction: bez prepared statements
+#                i kursorów po stronie serwera
+#   direct     - nowe połączenie przy każdym żądaniu (stare zachowanie)
+DB_CONNECTION_MODE = os.getenv('DB_CONNECTION_MODE', 'pool')
+
+PSYCOPG3 = find_spec('psycopg') is not None
+if DB_CONNECTION_MODE == 'pool' and find_spec('psycopg_pool') is None:
+    # psycopg2 lub psycopg bez extras [pool]
+    DB_CONNECTION_MODE = 'persistent'
+
+# Sprawdzenie połączenia przed użyciem (zerwane np. po restarcie bazy lub failoverze)
+DATABASES['default']['CONN_HEALTH_CHECKS'] = DB_CONNECTION_MODE != 'direct'
+
+if DB_CONNECTION_MODE == 'pool':
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+        # Na proces: co najmniej tyle, ile wątków obsługuje żądania/zadania
+        'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+        # Ile czekać na wolne połączenie, zanim żądanie dostanie błąd
+        'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+        'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', '300')),
+        'max_lifetime': float(os.getenv('DB_POOL_MAX_LIFETIME', '1800')),
+    }
+elif DB_CONNECTION_MODE in ('persistent', 'pgbouncer'):
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.getenv('DB_CONN_MAX_AGE', '600'))
+    if DB_CONNECTION_MODE == 'pgbouncer':
+        DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+        if PSYCOPG3:
+            # psycopg 3: prepared statements nie działają w trybie transaction
+            DATABASES['default']['OPTIONS']['prepare_threshold'] = None
+
 # --- PODSTAWOWE USTAWIENIA ---
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'Europe/Warsaw'
@@ -135,23 +210,184 @@ MEDIA_URL = f'https://{AZURE_CUSTOM_DOMAIN}/{AZURE_CONTAINER}/'
 # Magazyn TYLKO dla MEDIA (wgrane pliki użytkowników)
 STORAGES = {
     "default": {
-        "BACKEND": "storages.backends.azure_storage.AzureStorage",
+        "BACKEND": "files.storage.AzureStorage",
         "OPTIONS": {
             "account_name": AZURE_ACCOUNT_NAME,
             "account_key": os.getenv("AZURE_ACCOUNT_KEY"),
             "azure_container": AZURE_CONTAINER,
             "azure_ssl": True, 
             "expiration_secs": timedelta(hours=1).total_seconds(),
-            "overwrite_files": False,
+            # Ścieżki są unikalne z konstrukcji (ULID w user_directory_path),
+            # więc zapis nie sprawdza wcześniej exists() w Azure
+            "overwrite_files": True,
+            # Transfery: pula połączeń keep-alive i równoległe bloki (files/storage.py)
+            "max_connections": int(os.getenv("AZURE_MAX_CONNECTIONS", "32")),
+            "upload_max_conn": int(os.getenv("AZURE_UPLOAD_MAX_CONN", "4")),
+            "download_max_conn": int(os.getenv("AZURE_DOWNLOAD_MAX_CONN", "4")),
+            "max_single_put_size": int(os.getenv("AZURE_MAX_SINGLE_PUT_SIZE", str(8 * 1024 * 1024))),
+            "max_block_size": int(os.getenv("AZURE_MAX_BLOCK_SIZE", str(4 * 1024 * 1024))),
         },
     },
+    # Nazwy z hashem treści (manifest) i gotowe warianty .gz / .br (collectstatic)
     "staticfiles": {
-        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+        "BACKEND": (
+            "whitenoise.storage.CompressedManifestStaticFilesStorage"
+            if WHITENOISE
+            else "django.contrib.staticfiles.storage.ManifestStaticFilesStorage"
+        ),
     }
 }
 
-# STATIC - minimalna konfiguracja (Django domyślnie)
+# Sharding (files/sharding.py): dodatkowe konta / kontenery jako JSON, np.
+# {"eu2": {"account_name": "...", "account_key": "...", "azure_container": "files"}}
+# Nowe pliki rozkładane są między shard "default" (konto powyżej) i podane shardy
+# (klucz "weight", domyślnie 1; 0 = shard opróżniany przez rebalance_shards)
+AZURE_SHARDS = json.loads(os.getenv('AZURE_SHARDS', '{}'))
+if AZURE_SHARDS:
+    STORAGES["default"] = {
+        "BACKEND": "files.sharding.ShardedStorage",
+        "OPTIONS": {
+            "default_shard": "default",
+            "shards": {
+                "default": {
+                    **STORAGES["default"],
+                    "WEIGHT": float(os.getenv('AZURE_DEFAULT_SHARD_WEIGHT', '1')),
+                },
+                **{
+                    name: {
+                        "BACKEND": "files.storage.AzureStorage",
+                        "OPTIONS": {
+                            **STORAGES["default"]["OPTIONS"],
+                            **{k: v for k, v in shard.items() if k != "weight"},
+                        },
+                        "WEIGHT": shard.get("weight", 1),
+                    }
+                    for name, shard in AZURE_SHARDS.items()
+                },
+            },
+        },
+    }
+
+# Cache metadanych blobów (rozmiar/data/istnienie, files/blob_cache.py). Bloby są niezmienne
+# (unikalne ścieżki), ale cache jest osobny w każdym procesie: usunięcie bloba w jednym workerze
+# gunicorna lub procesie zadań nie czyści wpisów pozostałych, które do końca TTL mogą zwracać
+# exists()=True i stary rozmiar. TTL ogranicza więc czas tej nieaktualności między procesami.
+AZURE_METADATA_CACHE_SIZE = int(os.getenv('AZURE_METADATA_CACHE_SIZE', '10000'))
+AZURE_METADATA_CACHE_TTL = int(os.getenv('AZURE_METADATA_CACHE_TTL', '60'))
+
+# Upload liczy SHA-256 pliku i kompresuje pliki tekstowe w trakcie odbierania (files/uploads.py)
+FILE_UPLOAD_HANDLERS = [
+    'files.uploads.ChecksumMemoryFileUploadHandler',
+    'files.uploads.ChecksumTemporaryFileUploadHandler',
+]
+
+# --- ZADANIA W TLE (kolejka w bazie, worker: python manage.py run_jobs) ---
+JOBS_WORKER_THREADS = int(os.getenv('JOBS_WORKER_THREADS', '4'))
+JOBS_POLL_INTERVAL = float(os.getenv('JOBS_POLL_INTERVAL', '1.0'))
+# Wykonywane zadanie odświeża locked_at co tyle sekund (heartbeat workera)
+JOBS_HEARTBEAT_SECONDS = int(os.getenv('JOBS_HEARTBEAT_SECONDS', '30'))
+# Zadanie "RUNNING" bez heartbeatu przez ten czas uznajemy za porzucone: wraca do
+# kolejki albo, po ostatniej próbie, kończy się błędem
+JOBS_LOCK_TIMEOUT_SECONDS = int(os.getenv('JOBS_LOCK_TIMEOUT_SECONDS', '300'))
+JOBS_RETRY_BACKOFF_SECONDS = int(os.getenv('JOBS_RETRY_BACKOFF_SECONDS', '10'))
+JOBS_RETRY_BACKOFF_MAX_SECONDS = int(os.getenv('JOBS_RETRY_BACKOFF_MAX_SECONDS', '3600'))
+
+# Czy ciężkie operacje na plikach (ZIP, zmiana nazwy, przywracanie, usuwanie)
+# domyślnie wykonywać w tle (202 Accepted). Klient może to wymusić parametrem ?async=true
+FILES_ASYNC_OPERATIONS = os.getenv('FILES_ASYNC_OPERATIONS', 'false').lower() == 'true'
+
+# Co robić z wgranym ZIP-em: "extract" - rozpakować do osobnych plików,
+# "archive" - zapisać jako jeden blob i przeglądać w miejscu (files/archives.py).
+# Klient może to wybrać parametrem ?zip_mode=
+FILES_ZIP_UPLOAD_MODE = os.getenv('FILES_ZIP_UPLOAD_MODE', 'extract')
+
+# Kosz: usunięte pliki czekają tyle dni, potem usuwa je purge_trash (partiami,
+# z równoległym usuwaniem blobów)
+FILES_TRASH_RETENTION_DAYS = int(os.getenv('FILES_TRASH_RETENTION_DAYS', '30'))
+FILES_PURGE_BATCH_SIZE = int(os.getenv('FILES_PURGE_BATCH_SIZE', '500'))
+FILES_PURGE_CONCURRENCY = int(os.getenv('FILES_PURGE_CONCURRENCY', '16'))
+
+# Synchronizacja katalogów (POST /api/files/manifest/): maks. liczba plików w jednym manifeście
+FILES_MANIFEST_MAX_ENTRIES = int(os.getenv('FILES_MANIFEST_MAX_ENTRIES', '10000'))
+
+# Dziennik zmian plików (GET /api/files/changes/): wpisy starsze niż tyle dni
+# usuwa prune_file_changes; klient ze starszym tokenem dostaje 410 i pobiera pełną listę
+FILES_CHANGES_RETENTION_DAYS = int(os.getenv('FILES_CHANGES_RETENTION_DAYS', '30'))
+
+# Liczniki odczytów (view/download) zbierane w pamięci procesu i zapisywane co tyle sekund
+FILES_ACCESS_FLUSH_INTERVAL = float(os.getenv('FILES_ACCESS_FLUSH_INTERVAL', '10'))
+
+# Warstwy blobów (tier_blobs): plik nieodczytywany od N dni trafia do Cool,
+# a po kolejnych N dniach do Archive (0 = nigdy - linki file_url wskazują blob wprost);
+# bloby starszych wersji trafiają do Archive po N dniach od utworzenia (0 = nigdy).
+# Archive domyślnie wyłączone: przywrócenie wersji trwa wtedy godziny, a blob
+# usunięty przed upływem 180 dni Azure i tak rozlicza za pełny okres
+FILES_TIER_COOL_AFTER_DAYS = int(os.getenv('FILES_TIER_COOL_AFTER_DAYS', '30'))
+FILES_TIER_ARCHIVE_AFTER_DAYS = int(os.getenv('FILES_TIER_ARCHIVE_AFTER_DAYS', '0'))
+FILES_TIER_VERSION_ARCHIVE_AFTER_DAYS = int(os.getenv('FILES_TIER_VERSION_ARCHIVE_AFTER_DAYS', '0'))
+FILES_TIER_BATCH_SIZE = int(os.getenv('FILES_TIER_BATCH_SIZE', '1000'))
+# Przywracanie z Archive: priorytet Azure (Standard / High) i Retry-After w odpowiedzi 202
+FILES_REHYDRATE_PRIORITY = os.getenv('FILES_REHYDRATE_PRIORITY', 'Standard')
+FILES_REHYDRATE_RETRY_AFTER = int(os.getenv('FILES_REHYDRATE_RETRY_AFTER', '3600'))
+
+# Kompresja w spoczynku (gzip) plików tekstowych (txt, csv, json, logi...) przy uploadzie;
+# obrazy, archiwa i dane już skompresowane zapisujemy bez zmian (files/compression.py)
+FILES_COMPRESSION_ENABLED = os.getenv('FILES_COMPRESSION_ENABLED', 'true').lower() == 'true'
+FILES_COMPRESSION_LEVEL = int(os.getenv('FILES_COMPRESSION_LEVEL', '6'))
+# Mniejszych plików nie kompresujemy (zysk nie pokrywa narzutu nagłówków)
+FILES_COMPRESSION_MIN_SIZE = int(os.getenv('FILES_COMPRESSION_MIN_SIZE', '1024'))
+# Większych nie kompresujemy: gzip trzeba rozpakowywać od początku, więc podgląd końca
+# dużego logu kosztowałby pobranie i rozpakowanie całego bloba przy każdym żądaniu
+FILES_COMPRESSION_MAX_SIZE = int(os.getenv('FILES_COMPRESSION_MAX_SIZE', str(8 * 1024 * 1024)))
+
+# --- LOGBOOK (ActivityLog) ---
+# Liczba zaufanych proxy przed aplikacją (np. 1 dla Azure App Service); IP klienta
+# bierzemy z X-Forwarded-For tylko od nich. 0 = zawsze REMOTE_ADDR
+LOGS_TRUSTED_PROXIES = int(os.getenv('LOGS_TRUSTED_PROXIES', '1'))
+# Backfill pól strukturalnych dla starych wpisów (migracja logs 0007): wielkość partii
+LOGS_BACKFILL_BATCH_SIZE = int(os.getenv('LOGS_BACKFILL_BATCH_SIZE', '2000'))
+# Podgląd na żywo (/api/logs/stream/, logs/live.py): długość jednego strumienia
+# (potem klient wznawia od Last-Event-ID) i limit wpisów nadrabianych przy wznowieniu
+LOGS_STREAM_MAX_SECONDS = int(os.getenv('LOGS_STREAM_MAX_SECONDS', '300'))
+LOGS_STREAM_RESUME_LIMIT = int(os.getenv('LOGS_STREAM_RESUME_LIMIT', '500'))
+# LISTEN nie działa przez PgBouncer (transaction) - bezpośredni adres bazy dla
+# nasłuchu; bez niego jeden wątek na proces odpytuje tabelę co POLL_INTERVAL s
+LOGS_STREAM_DB_HOST = os.getenv('LOGS_STREAM_DB_HOST', '')
+LOGS_STREAM_DB_PORT = os.getenv('LOGS_STREAM_DB_PORT', '5432')
+LOGS_STREAM_POLL_INTERVAL = float(os.getenv('LOGS_STREAM_POLL_INTERVAL', '2'))
+# Id nadaje INSERT, a wpis jest widoczny po COMMIT: nadrabianie i wznawianie przeglądają
+# też wpisy zapisane w ostatnich tylu sekundach (najdłuższa transakcja zapisująca log)
+LOGS_STREAM_LATE_COMMIT_SECONDS = int(os.getenv('LOGS_STREAM_LATE_COMMIT_SECONDS', '60'))
+
+# --- METRYKI (/metrics w formacie Prometheusa) ---
+# Jeśli ustawiony, endpoint wymaga nagłówka "Authorization: Bearer <token>" (scraper
+# Prometheusa); bez tokenu metryki widzi tylko administrator
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+# Katalog na migawki metryk, gdy działa kilka procesów (np. workery gunicorna)
+METRICS_MULTIPROC_DIR = os.getenv('METRICS_MULTIPROC_DIR', '')
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '5'))
+
+# --- KOMPRESJA ODPOWIEDZI (spc/middleware.py) ---
+# Mniejsze odpowiedzi nie są kompresowane (narzut nagłówków i CPU większy niż zysk)
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+# Jakość brotli 0-11; 4-5 to typowy kompromis dla odpowiedzi generowanych dynamicznie
+COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', '4'))
+
+# --- PROFILOWANIE ŻĄDAŃ (nagłówek X-Profile od administratora, monitoring/profiling.py) ---
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'true').lower() == 'true'
+# Odstęp próbek stosu (s) i limit czasu próbkowania jednego żądania
+PROFILING_SAMPLE_INTERVAL = float(os.getenv('PROFILING_SAMPLE_INTERVAL', '0.005'))
+PROFILING_MAX_SECONDS = int(os.getenv('PROFILING_MAX_SECONDS', '300'))
+# Głębokość stosu alokacji w tracemalloc (0 = bez profilu pamięci)
+PROFILING_TRACEMALLOC_FRAMES = int(os.getenv('PROFILING_TRACEMALLOC_FRAMES', '10'))
+# Profile (wiersze i archiwa ZIP) starsze niż tyle dni usuwa prune_request_profiles
+PROFILING_RETENTION_DAYS = int(os.getenv('PROFILING_RETENTION_DAYS', '14'))
+
+# --- STATIC (frontend/static, panel admina) ---
+# collectstatic (entrypoint.sh) zbiera pliki do STATIC_ROOT; WhiteNoise serwuje je
+# z nagłówkiem Cache-Control: immutable (nazwy z hashem) i w wersji gzip/brotli
 STATIC_URL = '/static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
 
 
 # --- LOGOWANIE DEBUG ---
@@ -164,14 +400,26 @@ LOGGING = {
             'style': '{',
         },
     },
+    'filters': {
+        'request_log_counter': {
+            '()': 'monitoring.log_counter.RequestLogCounter',
+        },
+    },
     'handlers': {
         'console': {
             'class': 'logging.StreamHandler',
             'formatter': 'verbose',
+            'filters': ['request_log_counter'],
         },
     },
     'loggers': {
         'files': {  # Logger z files/models.py
+            'handlers': ['console'],
+            # Zdarzenia ścieżki krytycznej (nazwy plików, ścieżki) są na poziomie DEBUG
+            'level': os.getenv('FILES_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+        'jobs': {
             'handlers': ['console'],
             'level': 'INFO',
             'propagate': False,
@@ -0,0 +1,23 @@
+# spc/settings_production.py
+# Profil produkcyjny: DJANGO_SETTINGS_MODULE=spc.settings_production
+
+from .settings import *  # noqa: F401,F403
+
+# Bez trybu DEBUG: connection.queries nie rośnie z każdym zapytaniem,
+# a szablony są ładowane z cache
+DEBUG = False
+
+# Tylko JSON - bez renderowania przeglądarkowego API (i jego dodatkowych zapytań)
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_RENDERER_CLASSES': [
+        JSON_RENDERER,
+    ],
+}
+
+# Za proxy Azure Container Apps (SECURE_PROXY_SSL_HEADER jest w settings.py)
+SESSION_COOKIE_SECURE = True
+CSRF_COOKIE_SECURE = True
+
+# Logi na poziomie INFO tylko dla zdarzeń biznesowych; szczegóły ścieżki uploadu są DEBUG
+LOGGING['loggers']['django']['level'] = os.getenv('DJANGO_LOG_LEVEL', 'WARNING')
@@ -5,6 +5,7 @@ from django.urls import path, include
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 from users.views import CustomTokenObtainPairView
 from rest_framework_simplejwt.views import TokenRefreshView
+from monitoring.views import metrics
 
 # Importy dla serwowania plików MEDIA lokalnie (tylko w trybie DEBUG)
 from django.conf import settings
@@ -12,6 +13,7 @@ from django.conf.urls.static import static
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics, name='metrics'),
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),  # <-- DODAJ TO
     path('api/schema/swagger-ui/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
     
@@ -22,6 +24,8 @@ urlpatterns = [
 
     path('api/', include('files.urls')),
     path('api/', include('logs.urls')),
+    path('api/', include('jobs.urls')),
+    path('api/', include('monitoring.urls')),
 
     path('', include('frontend.urls')),
 ]
\ No newline at end of file
@@ -44,7 +44,8 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
 
         # Jeżeli użytkownik ma aktywne 2FA (TOTP), wymagamy poprawnego kodu
         devices = TOTPDevice.objects.filter(user=self.user, confirmed=True)
-        if devices.exists():
+        has_otp = devices.exists()
+        if has_otp:
             otp_raw = (otp_token or "").strip().replace(" ", "")
             if not otp_raw:
                 raise serializers.ValidationError(
@@ -62,10 +63,11 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
                 )
 
         # Logowanie do LogBooka
-        ActivityLog.objects.create(
-            user=self.user,
-            action=ActivityLog.ActionType.USER_LOGIN,
-            details=f"Użytkownik {self.user.username} zalogował się pomyślnie.",
+        ActivityLog.objects.log(
+            self.user,
+            ActivityLog.ActionType.USER_LOGIN,
+            f"Użytkownik {self.user.username} zalogował się pomyślnie.",
+            otp=has_otp,
         )
         return data
 
@@ -130,10 +132,13 @@ class ToggleStaffStatusView(APIView):
         )
 
         # Zapisz log (jeśli chcesz mieć logi na poziomie LogBooka)
-        ActivityLog.objects.create(
-            user=request.user,
-            action=ActivityLog.ActionType.USER_STATUS_CHANGE,  # Musisz dodać ten typ do logs/models.py!
-            details=f"Zmieniono status użytkownika {username} na: {new_status}.",
+        ActivityLog.objects.log(
+            request.user,
+            ActivityLog.ActionType.USER_STATUS_CHANGE,
+            f"Zmieniono status użytkownika {username} na: {new_status}.",
+            target_user=username,
+            target_user_id=user_to_update.pk,
+            is_staff=user_to_update.is_staff,
         )
 
         return Response(
@@ -249,4 +254,4 @@ class TOTPStatusView(APIView):
 
     def get(self, request, *args, **kwargs):
         enabled = TOTPDevice.objects.filter(user=request.user, confirmed=True).exists()
-        return Response({"enabled": enabled}, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response({"enabled": enabled}, status=status.HTTP_200_OK)